@@ -0,0 +1,295 @@
+"""
+Native async variants of v1 API views.
+
+DRF views are synchronous: under ASGI, django runs each of them in a
+thread, so every in-flight request (e.g. a slow cellular client posting
+device data) holds a thread. These views handle their hot paths (GET and
+POST) in the event loop, using django's async ORM interface, so a single
+worker can hold thousands of concurrent requests. They use the parsers,
+renderers, serializers and throttles of their DRF counterparts, and give
+the same responses.
+
+Requests to other methods (PUT, PATCH, DELETE, OPTIONS) are served by the
+DRF view (`sync_view_class`), in a thread.
+
+The async views are routed instead of the DRF views when `API_ASYNC_VIEWS`
+is set (see api.v1.urls), for ASGI deployments (sia.asgi). Under WSGI,
+django runs async views in an event loop of their own, per request, which
+is slower than the DRF views. All middleware must be async capable for
+requests to stay in the event loop (the debug toolbar middleware isn't).
+
+Views:
+------
+
+    - AsyncDeviceDetailsAPIView
+    - AsyncDeviceDataListAPIView
+    - AsyncDeviceCommandListAPIView
+
+"""
+
+from typing import *
+
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from api.v1.parsers import API_PARSER_CLASSES
+from api.v1.renderers import API_RENDERER_CLASSES
+from api.v1.serializers import (
+    DeviceCommandPollSerializer,
+    DeviceCommandSerializer,
+    DeviceDataSerializer,
+    DeviceSerializer,
+)
+from api.v1.throttling import get_throttles_wait
+from api.v1.views import (
+    DeviceCommandListAPIView,
+    DeviceDataListAPIView,
+    DeviceDetailsAPIView,
+)
+from devices.commands import await_commands
+from devices.models import Device, DeviceData
+
+
+# -----------------------------------------------------------------------------
+# Helper functions
+# -----------------------------------------------------------------------------
+def get_device_filters(username: str, group_name: str, device_uid: str) -> Q:
+    """Filters of a member's device"""
+    return (
+        Q(uid=device_uid)
+        & Q(group__name=group_name)
+        & Q(group__owner__username=username)
+    )
+
+
+async def aget_device_or_404(queryset, filters: Q) -> Device:
+    try:
+        return await queryset.aget(filters)
+    except (Device.DoesNotExist, ValidationError):
+        # ValidationError: malformed device uid
+        raise Http404("No Device matches the given query.")
+
+
+# -----------------------------------------------------------------------------
+# Base classes
+# -----------------------------------------------------------------------------
+class AsyncAPIView(View):
+    """
+    Async API view: throttling, session authentication and owner permission,
+    content negotiation, parsing and rendering, like AuthenticatedUserAPIView
+    (with ThrottleBeforeAuthenticationMixin), without DRF's request handling.
+
+    Handlers return (data, status, headers), rendered by the view.
+    """
+
+    # DRF view serving methods without an async handler
+    sync_view_class: Type[Any] = None
+    async_methods: Tuple[str, ...] = ("get", "head", "post")
+
+    parser_classes = API_PARSER_CLASSES
+    # renderers of HTML pages (browsable API) call back into DRF views
+    renderer_classes = [
+        renderer
+        for renderer in API_RENDERER_CLASSES
+        if getattr(renderer, "format", None) not in ("api", "admin")
+    ]
+    throttle_classes: List[Type[Any]] = []
+    content_negotiation_class = DefaultContentNegotiation
+
+    # safe requests read from database replicas (see common.middleware)
+    read_from_replica = True
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        method = request.method.lower()
+        if method not in self.async_methods or not hasattr(self, method):
+            sync_view = self.sync_view_class.as_view()
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        api_request = self.initialize_request(request, *args, **kwargs)
+        try:
+            self.check_throttles(api_request, peek=True)
+            await self.authenticate(api_request)
+            self.check_permissions(api_request)
+            self.check_throttles(api_request)
+            data, status_code, headers = await getattr(self, method)(
+                api_request, *args, **kwargs
+            )
+        except Exception as exc:
+            data, status_code, headers = self.handle_exception(exc, api_request)
+        return self.finalize_response(api_request, data, status_code, headers)
+
+    def initialize_request(self, request: HttpRequest, *args: Any, **kwargs: Any) -> Request:
+        return Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=(),
+            negotiator=self.content_negotiation_class(),
+            parser_context=dict(view=self, args=args, kwargs=kwargs),
+        )
+
+    def check_throttles(self, request: Request, peek: bool = False) -> None:
+        """
+        Check throttles: peek before authentication, take tokens after
+        permissions (like ThrottleBeforeAuthenticationMixin)
+        """
+        throttles = [throttle_class() for throttle_class in self.throttle_classes]
+        wait = get_throttles_wait(throttles, request, self, peek=peek)
+        if wait is not None:
+            raise exceptions.Throttled(wait or None)
+
+    async def authenticate(self, request: Request) -> None:
+        """Session authentication, CSRF is checked by CsrfViewMiddleware"""
+        user = await sync_to_async(auth.get_user)(request._request)
+        request.user = user
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+
+    def check_permissions(self, request: Request) -> None:
+        # IsObjectOwner
+        if request.user.username != self.kwargs.get("username"):
+            raise exceptions.PermissionDenied()
+
+    def handle_exception(
+        self, exc: Exception, request: Request
+    ) -> Tuple[Any, int, Dict[str, str]]:
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # session authentication has no WWW-Authenticate header
+            exc.status_code = status.HTTP_403_FORBIDDEN
+        context = dict(view=self, args=self.args, kwargs=self.kwargs, request=request)
+        response = exception_handler(exc, context)
+        if response is None:
+            raise exc
+        return response.data, response.status_code, dict(response.items())
+
+    def finalize_response(
+        self,
+        request: Request,
+        data: Any,
+        status_code: int,
+        headers: Dict[str, str] | None = None,
+    ) -> HttpResponse:
+        renderers = [renderer() for renderer in self.renderer_classes]
+        try:
+            renderer, media_type = request.negotiator.select_renderer(request, renderers)
+        except exceptions.NotAcceptable as exc:
+            renderer, media_type = renderers[0], renderers[0].media_type
+            data, status_code, headers = self.handle_exception(exc, request)
+
+        content_type = media_type
+        if renderer.charset:
+            content_type = f"{media_type}; charset={renderer.charset}"
+        renderer_context = dict(view=self, args=self.args, kwargs=self.kwargs, request=request)
+        content = renderer.render(data, media_type, renderer_context)
+        response = HttpResponse(content, status=status_code, content_type=content_type)
+        for name, value in (headers or {}).items():
+            if name.lower() != "content-type":
+                response[name] = value
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+
+# -----------------------------------------------------------------------------
+# Devices
+# -----------------------------------------------------------------------------
+class AsyncDeviceDetailsAPIView(AsyncAPIView):
+    """
+    Retrieve a device instance
+    """
+
+    sync_view_class = DeviceDetailsAPIView
+    async_methods = ("get", "head")
+
+    async def get(
+        self, request: Request, username: str, group_name: str, device_uid: str
+    ) -> Tuple[Any, int, Dict[str, str]]:
+        # everything the serializer needs, so it never queries the database
+        device = await aget_device_or_404(
+            Device.objects.select_related("group__owner", "heartbeat").prefetch_related("devicedata_set"),
+            get_device_filters(username, group_name, device_uid),
+        )
+        serializer = DeviceSerializer(instance=device, context=dict(request=request))
+        return serializer.data, status.HTTP_200_OK, {}
+
+
+# -----------------------------------------------------------------------------
+# Device Data
+# -----------------------------------------------------------------------------
+class AsyncDeviceDataListAPIView(AsyncAPIView):
+    """
+    List all device's data, or create new data
+    """
+
+    sync_view_class = DeviceDataListAPIView
+    load_shedding_priority = DeviceDataListAPIView.load_shedding_priority
+    throttle_classes = DeviceDataListAPIView.throttle_classes
+
+    async def get(
+        self, request: Request, username: str, group_name: str, device_uid: str
+    ) -> Tuple[Any, int, Dict[str, str]]:
+        device = await aget_device_or_404(
+            Device.objects.select_related("group__owner"),
+            get_device_filters(username, group_name, device_uid),
+        )
+        data_list = [data async for data in DeviceData.objects.filter(device=device)]
+        # hyperlinked fields need device's group and owner for every row
+        for device_data in data_list:
+            device_data.device = device
+        serializer = DeviceDataSerializer(
+            instance=data_list, many=True, context=dict(request=request)
+        )
+        return serializer.data, status.HTTP_200_OK, {}
+
+    async def post(
+        self, request: Request, username: str, group_name: str, device_uid: str
+    ) -> Tuple[Any, int, Dict[str, str]]:
+        # device's group is needed to set the data's owner
+        device = await aget_device_or_404(
+            Device.objects.select_related("group__owner"),
+            get_device_filters(username, group_name, device_uid),
+        )
+        serializer = DeviceDataSerializer(data=request.data, context=dict(request=request))
+        serializer.is_valid(raise_exception=True)
+        serializer.instance = await DeviceData.objects.acreate(
+            device=device,
+            **serializer.with_serialized_message(dict(serializer.validated_data)),
+        )
+        data = serializer.data
+        headers = {"Location": str(data[api_settings.URL_FIELD_NAME])}
+        return data, status.HTTP_201_CREATED, headers
+
+
+# -----------------------------------------------------------------------------
+# Device Commands
+# -----------------------------------------------------------------------------
+class AsyncDeviceCommandListAPIView(AsyncAPIView):
+    """
+    Wait for device's commands (long polling) in the event loop, waiting
+    requests hold no thread
+    """
+
+    sync_view_class = DeviceCommandListAPIView
+    async_methods = ("get",)
+    read_from_replica = DeviceCommandListAPIView.read_from_replica
+    load_shedding_priority = DeviceCommandListAPIView.load_shedding_priority
+
+    async def get(
+        self, request: Request, username: str, group_name: str, device_uid: str
+    ) -> Tuple[Any, int, Dict[str, str]]:
+        params = DeviceCommandPollSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        device = await aget_device_or_404(
+            Device.objects.all(), get_device_filters(username, group_name, device_uid)
+        )
+        commands = await await_commands(device.id, **params.validated_data)
+        serializer = DeviceCommandSerializer(instance=commands, many=True)
+        return serializer.data, status.HTTP_200_OK, {}
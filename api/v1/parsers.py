@@ -0,0 +1,99 @@
+"""
+Parsers for the v1 API.
+
+Counterparts of the renderers in `api.v1.renderers`, so devices can post
+data in the same format they receive it. A binary parser is only
+registered on the API views when its library is installed.
+
+Parsers:
+--------
+
+    - FastJSONParser: application/json
+    - MessagePackParser: application/msgpack
+    - CBORParser: application/cbor
+
+"""
+
+from typing import *
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.settings import api_settings
+
+from api.v1.renderers import (
+    CBORRenderer,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    cbor2,
+    msgpack,
+)
+from common import fastjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    JSONParser that decodes with orjson, falls back to DRF's JSONParser
+    when orjson is not installed, or the request is not UTF-8 encoded.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if fastjson.orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return fastjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class MessagePackParser(parsers.BaseParser):
+    """
+    Parses MessagePack-serialized data.
+    """
+
+    media_type = MessagePackRenderer.media_type
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError("MessagePack parse error - %s" % str(exc))
+
+
+class CBORParser(parsers.BaseParser):
+    """
+    Parses CBOR-serialized data.
+    """
+
+    media_type = CBORRenderer.media_type
+    renderer_class = CBORRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except (ValueError, cbor2.CBORDecodeError) as exc:
+            raise ParseError("CBOR parse error - %s" % str(exc))
+
+
+BINARY_PARSER_CLASSES: List[Type[parsers.BaseParser]] = [
+    parser
+    for parser, library in (
+        (MessagePackParser, msgpack),
+        (CBORParser, cbor2),
+    )
+    if library is not None
+]
+
+API_PARSER_CLASSES: List[Type[parsers.BaseParser]] = [
+    *(
+        FastJSONParser if parser is parsers.JSONParser else parser
+        for parser in api_settings.DEFAULT_PARSER_CLASSES
+    ),
+    *BINARY_PARSER_CLASSES,
+]
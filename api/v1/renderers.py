@@ -0,0 +1,131 @@
+"""
+Renderers for the v1 API.
+
+FastJSONRenderer replaces DRF's JSONRenderer, encoding with orjson when it's
+installed. MessagePack and CBOR are compact alternatives to JSON for devices
+with limited bandwidth and CPU. Both libraries are optional, a renderer is
+only registered on the API views when its library is installed.
+
+Renderers:
+----------
+
+    - FastJSONRenderer: application/json
+    - MessagePackRenderer: application/msgpack
+    - CBORRenderer: application/cbor
+
+"""
+
+from typing import *
+
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from common import fastjson
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+
+
+# -----------------------------------------------------------------------------
+# Helper functions
+# -----------------------------------------------------------------------------
+_json_encoder = JSONEncoder()
+
+
+def encode_default(obj: Any) -> Any:
+    """
+    Convert objects that are not natively supported by the binary encoders
+    (lazy strings, UUIDs, decimals, querysets, etc) the same way DRF's
+    JSONEncoder does, so all formats carry the same values.
+    """
+    return _json_encoder.default(obj)
+
+
+# -----------------------------------------------------------------------------
+# Renderers
+# -----------------------------------------------------------------------------
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson, falls back to DRF's JSONRenderer
+    when orjson is not installed, or when the output must be indented or
+    ASCII escaped (e.g. the browsable API).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if (
+            fastjson.orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = fastjson.dumps_bytes(data, cls=self.encoder_class)
+        # escape line/paragraph separators like JSONRenderer does
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Renderer which serializes to MessagePack.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class CBORRenderer(renderers.BaseRenderer):
+    """
+    Renderer which serializes to CBOR.
+    """
+
+    media_type = "application/cbor"
+    format = "cbor"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return cbor2.dumps(
+            data, default=lambda encoder, obj: encoder.encode(encode_default(obj))
+        )
+
+
+BINARY_RENDERER_CLASSES: List[Type[renderers.BaseRenderer]] = [
+    renderer
+    for renderer, library in (
+        (MessagePackRenderer, msgpack),
+        (CBORRenderer, cbor2),
+    )
+    if library is not None
+]
+
+API_RENDERER_CLASSES: List[Type[renderers.BaseRenderer]] = [
+    *(
+        FastJSONRenderer if renderer is renderers.JSONRenderer else renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ),
+    *BINARY_RENDERER_CLASSES,
+]
@@ -1,17 +1,16 @@
-import json
-from io import BytesIO
 from typing import *
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.forms import JSONField
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
 
 from accounts.models import Member
-from devices.models import Device, DeviceData, DeviceGroup
+from devices.models import Device, DeviceCommand, DeviceData, DeviceGroup, DeviceGroupCommand
+from devices.validators import DeviceMessageValidator
 
 
 # -----------------------------------------------------------------------------
@@ -436,6 +435,23 @@ class DeviceGroupSerializer(serializers.HyperlinkedModelSerializer):
             "device_set",
         )
 
+    def validate_name(self, value):
+        """Group names are unique per owner, case insensitive"""
+        if self.instance is not None:
+            owner = self.instance.owner
+            groups = DeviceGroup.objects.exclude(pk=self.instance.pk)
+        else:
+            owner = getattr(self.context.get("request"), "user", None)
+            groups = DeviceGroup.objects.all()
+        if (
+            getattr(owner, "is_authenticated", False)
+            and groups.filter(owner=owner, name=value).exists()
+        ):
+            raise serializers.ValidationError(
+                "A device group with this name already exists.", code="unique"
+            )
+        return value.lower()
+
     def validate_creation_date(self, value):
         if value > timezone.now():
             raise serializers.ValidationError(
@@ -465,6 +481,9 @@ class DeviceSerializer(serializers.HyperlinkedModelSerializer):
         read_only=True,
     )
     uid = serializers.UUIDField(format="hex_verbose", read_only=True)
+    # from the device's heartbeat (see devices.heartbeats), select_related("heartbeat") in lists
+    is_online = serializers.BooleanField(read_only=True)
+    last_seen = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Device
@@ -474,10 +493,26 @@ class DeviceSerializer(serializers.HyperlinkedModelSerializer):
             "uid",
             "date_added",
             "is_active",
+            "heartbeat_interval",
+            "is_online",
+            "last_seen",
             "group",
             "devicedata_set",
         )
 
+    def validate_name(self, value):
+        """Device names are unique per member, case insensitive"""
+        resolver_match = getattr(self.context.get("request"), "resolver_match", None)
+        username = resolver_match and resolver_match.kwargs.get("username")
+        devices = Device.objects.filter(group__owner__username=username, name=value)
+        if self.instance is not None:
+            devices = devices.exclude(pk=self.instance.pk)
+        if username and devices.exists():
+            raise serializers.ValidationError(
+                "A device with this name already exists.", code="unique"
+            )
+        return value.lower()
+
     def validate_date_added(self, value):
         if value > timezone.now():
             raise serializers.ValidationError(
@@ -526,38 +561,97 @@ class DeviceDataSerializer(serializers.ModelSerializer):
         return value
 
     def validate_message(self, value):
-        self.error_messages[
-            "invalid_json"
-        ] = "Message must be either a valid JSON object or a UTF-8 encoded JSON string."
-
-        if isinstance(value, str):
-            json_parser = JSONParser()
-
-            try:
-                stream = BytesIO(value.encode("utf-8"))
-            except Exception as e:
-                raise serializers.ValidationError(
-                    self.error_messages["invalid_json"], code="invalid_json"
-                )
+        message = DeviceMessageValidator()(value)
+        # keep the encoded message, so it is stored without encoding it again
+        self._serialized_message = message
+        return message.value
 
-            try:
-                value = json_parser.parse(stream=stream)
-            except Exception as e:
-                raise serializers.ValidationError(
-                    self.error_messages["invalid_json"], code="invalid_json"
-                )
+    def with_serialized_message(self, validated_data):
+        """Replace validated message with its already serialized form"""
+        message = getattr(self, "_serialized_message", None)
+        if message is not None and validated_data.get("message") is message.value:
+            validated_data["message"] = message
+        return validated_data
 
-        elif isinstance(value, (dict, Mapping, list, Iterable)):
-            try:
-                json.dumps(value)
-            except json.decoder.JSONDecodeError as e:
-                raise serializers.ValidationError(
-                    self.error_messages["invalid_json"], code="invalid_json"
-                )
+    def create(self, validated_data):
+        return super().create(self.with_serialized_message(validated_data))
 
-        else:
+    def update(self, instance, validated_data):
+        return super().update(instance, self.with_serialized_message(validated_data))
+
+
+class DeviceCommandSerializer(serializers.ModelSerializer):
+    payload = serializers.JSONField(required=False)
+
+    class Meta:
+        model = DeviceCommand
+        fields = (
+            "id",
+            "name",
+            "payload",
+            "status",
+            "created",
+            "delivered",
+            "acknowledged",
+            "expires",
+        )
+        read_only_fields = ("status", "created", "delivered", "acknowledged")
+
+    def validate_expires(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("Field `expires` must be in the future.")
+        return value
+
+
+class DeviceGroupCommandSerializer(serializers.ModelSerializer):
+    """A command for a group's devices, and the number of its devices' commands, by state"""
+
+    payload = serializers.JSONField(required=False)
+    total = serializers.IntegerField(read_only=True)
+    pending = serializers.IntegerField(read_only=True)
+    delivered = serializers.IntegerField(read_only=True)
+    acknowledged = serializers.IntegerField(read_only=True)
+    expired = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = DeviceGroupCommand
+        fields = (
+            "id",
+            "name",
+            "payload",
+            "created",
+            "expires",
+            "total",
+            "pending",
+            "delivered",
+            "acknowledged",
+            "expired",
+        )
+        read_only_fields = ("created",)
+
+    def validate_expires(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("Field `expires` must be in the future.")
+        return value
+
+
+class DeviceCommandPollSerializer(serializers.Serializer):
+    """Query parameters of a long-poll request for commands"""
+
+    # id of the last command the device received
+    after = serializers.IntegerField(min_value=0, required=False)
+    # max seconds to wait for commands, at most `DEVICE_COMMANDS_POLL_TIMEOUT`
+    timeout = serializers.FloatField(min_value=0, required=False)
+
+
+class DeviceCommandAcknowledgementSerializer(serializers.Serializer):
+    """Ids of the commands a device ran"""
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, value):
+        if len(value) > settings.DEVICE_COMMANDS_BATCH_SIZE:
             raise serializers.ValidationError(
-                self.error_messages["invalid_json"], code="invalid_json"
+                f"Acknowledge at most {settings.DEVICE_COMMANDS_BATCH_SIZE} commands per request."
             )
-
         return value
@@ -0,0 +1,168 @@
+import json
+from typing import *
+from unittest import mock
+
+from django.db.models import Q
+from django.test import AsyncClient, override_settings
+from django.urls import include, path, reverse_lazy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Member
+from api.v1 import urls as v1_urls
+from api.v1.async_views import AsyncDeviceDataListAPIView, AsyncDeviceDetailsAPIView
+from api.v1.throttling import DeviceIngestThrottle, get_token_bucket_store
+from devices.models import Device, DeviceData
+
+# v1 API, with the async views (API_ASYNC_VIEWS)
+ASYNC_VIEWS: Final[Dict[str, Callable]] = {
+    "device_details": AsyncDeviceDetailsAPIView.as_view(),
+    "data_list": AsyncDeviceDataListAPIView.as_view(),
+}
+
+members_urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+    for pattern in v1_urls.members_urlpatterns
+]
+
+v1_urlpatterns = [path("members/", include(members_urlpatterns))]
+
+urlpatterns = [
+    path(
+        "api/",
+        include(
+            ([path("v1/", include((v1_urlpatterns, "api"), namespace="v1"))], "api"),
+            namespace="api",
+        ),
+    ),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TestAsyncAPIViews(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def setUp(self) -> None:
+        get_token_bucket_store().clear()
+        self.addCleanup(get_token_bucket_store().clear)
+
+        self.member: Member = Member.objects.filter(is_active=True).first()
+        self.other_member: Member = Member.objects.filter(
+            Q(is_active=True) & ~Q(id=self.member.id)
+        ).first()
+        self.device: Device = self.member.devicegroup_set.first().device_set.first()
+        self.url_kwargs = dict(
+            username=self.member.username,
+            group_name=self.device.group.name,
+            device_uid=self.device.uid,
+        )
+        self.data_list_url = reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs)
+        self.device_url = reverse_lazy("api:v1:device_details", kwargs=self.url_kwargs)
+        self.client.force_login(self.member)
+
+    def get_sync_response(self, url_name: str):
+        """Response of the DRF view"""
+        with override_settings(ROOT_URLCONF="sia.urls"):
+            return self.client.get(reverse_lazy(url_name, kwargs=self.url_kwargs))
+
+    def test_async_data_list_get(self):
+        response = self.client.get(self.data_list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            sorted(response.json(), key=lambda data: data["id"]),
+            sorted(self.get_sync_response("api:v1:data_list").json(), key=lambda data: data["id"]),
+        )
+
+    def test_async_data_list_post(self):
+        response = self.client.post(
+            self.data_list_url, data=dict(message={"temperature": 21}), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        device_data = DeviceData.objects.get(id=response.json()["id"])
+        self.assertEqual(device_data.message, {"temperature": 21})
+        self.assertEqual(device_data.owner, self.member)
+        self.assertEqual(response["Location"], response.json()["url"])
+
+    def test_async_data_list_post_invalid_data_is_400(self):
+        response = self.client.post(
+            self.data_list_url,
+            data=dict(message={"temperature": 21}, date="3000-01-01T00:00:00Z"),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("date", response.json())
+
+    def test_async_data_list_unauthenticated_is_403(self):
+        self.client.logout()
+
+        response = self.client.get(self.data_list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_async_data_list_other_member_is_403(self):
+        self.client.force_login(self.other_member)
+
+        response = self.client.get(self.data_list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_async_data_list_unknown_device_is_404(self):
+        url_kwargs = dict(self.url_kwargs, device_uid="not-a-uid")
+
+        response = self.client.get(reverse_lazy("api:v1:data_list", kwargs=url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "1/min", create=True)
+    def test_async_data_list_post_is_throttled(self):
+        data = dict(message={"temperature": 21})
+        self.client.post(self.data_list_url, data=data, format="json")
+
+        response = self.client.post(self.data_list_url, data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "60")
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "1/min", create=True)
+    def test_async_anonymous_post_does_not_use_up_the_owner_bucket(self):
+        data = dict(message={"temperature": 21})
+        self.client.logout()
+        for _ in range(2):
+            response = self.client.post(self.data_list_url, data=data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(self.member)
+
+        response = self.client.post(self.data_list_url, data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_async_device_details_get(self):
+        response = self.client.get(self.device_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.get_sync_response("api:v1:device_details").json())
+
+    def test_async_device_details_patch_is_served_by_drf_view(self):
+        response = self.client.patch(
+            self.device_url, data=dict(is_active=False), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.device.refresh_from_db()
+        self.assertFalse(self.device.is_active)
+
+    async def test_async_data_list_asgi_request(self):
+        client = AsyncClient()
+        client.cookies = self.client.cookies
+
+        response = await client.get(self.data_list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(json.loads(response.content)),
+            await DeviceData.objects.filter(device=self.device).acount(),
+        )
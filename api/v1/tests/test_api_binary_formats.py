@@ -0,0 +1,135 @@
+import io
+from typing import *
+from unittest import skipIf
+
+from django.urls import reverse_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APITestCase
+
+from accounts.models import Member
+from api.v1.parsers import CBORParser, MessagePackParser
+from api.v1.renderers import CBORRenderer, MessagePackRenderer, cbor2, msgpack
+from devices.models import Device, DeviceData, DeviceGroup
+
+# -----------------------------------------------------------------------------
+# Base Test classes (common set ups)
+# -----------------------------------------------------------------------------
+
+
+class BaseBinaryFormatTestCase(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+    renderer_class = None
+    parser_class = None
+
+    def setUp(self):
+        self.first_member: Member = Member.objects.filter(is_active=True).first()
+        self.first_group: DeviceGroup = self.first_member.devicegroup_set.first()
+        self.first_device: Device = self.first_group.device_set.first()
+
+        self.url: str = reverse_lazy(
+            "api:v1:data_list",
+            kwargs=dict(
+                username=self.first_member.username,
+                group_name=self.first_group.name,
+                device_uid=self.first_device.uid,
+            ),
+        )
+        self.renderer = self.renderer_class()
+        self.parser = self.parser_class()
+        self.client.force_login(self.first_member)
+
+    def decode(self, content: bytes) -> Any:
+        return self.parser.parse(io.BytesIO(content))
+
+    def encode(self, data: Any) -> bytes:
+        return self.renderer.render(data)
+
+
+class BinaryFormatTestsMixin:
+    def test_binary_format_round_trip(self):
+        data = [{"id": 1, "message": {"foo": "bar", "values": [1, 2.5, None]}}]
+
+        self.assertEqual(self.decode(self.encode(data)), data)
+
+    def test_binary_format_render_none_is_empty(self):
+        self.assertEqual(self.renderer.render(None), b"")
+
+    def test_binary_format_invalid_payload_is_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.decode(b"\xc1")
+
+    def test_binary_format_get_data_list(self):
+        response = self.client.get(
+            self.url, HTTP_ACCEPT=self.renderer.media_type, follow=True
+        )
+        data_list = self.decode(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], self.renderer.media_type)
+        for index, data in enumerate(
+            self.first_device.devicedata_set.all().order_by("id"), start=0
+        ):
+            self.assertEqual(data_list[index]["id"], data.id)
+            self.assertEqual(data_list[index]["message"], data.message)
+
+    def test_binary_format_get_data_list_format_query_param(self):
+        response = self.client.get(
+            self.url, data=dict(format=self.renderer.format), follow=True
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], self.renderer.media_type)
+
+    def test_binary_format_create_device_data(self):
+        new_data = dict(message={"moisture": 24, "valve_open": False})
+        data_count_before = self.first_device.devicedata_set.count()
+        response = self.client.post(
+            self.url,
+            data=self.encode(new_data),
+            content_type=self.parser.media_type,
+            HTTP_ACCEPT=self.renderer.media_type,
+        )
+        data_count_after = self.first_device.devicedata_set.count()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(data_count_before + 1, data_count_after)
+        self.assertEqual(self.decode(response.content)["message"], new_data["message"])
+        self.assertEqual(DeviceData.objects.last().message, new_data["message"])
+
+    def test_binary_format_invalid_body_is_400(self):
+        response = self.client.post(
+            self.url,
+            data=b"\xc1",
+            content_type=self.parser.media_type,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# -----------------------------------------------------------------------------
+# Test cases
+# -----------------------------------------------------------------------------
+@skipIf(msgpack is None, "msgpack is not installed")
+class TestMessagePackFormat(BinaryFormatTestsMixin, BaseBinaryFormatTestCase):
+    renderer_class = MessagePackRenderer
+    parser_class = MessagePackParser
+
+
+@skipIf(cbor2 is None, "cbor2 is not installed")
+class TestCBORFormat(BinaryFormatTestsMixin, BaseBinaryFormatTestCase):
+    renderer_class = CBORRenderer
+    parser_class = CBORParser
+
+    def test_binary_format_invalid_payload_is_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.decode(b"\xa1")
+
+    def test_binary_format_invalid_body_is_400(self):
+        response = self.client.post(
+            self.url,
+            data=b"\xa1",
+            content_type=self.parser.media_type,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
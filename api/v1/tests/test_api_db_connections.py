@@ -0,0 +1,125 @@
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import *
+from unittest import mock, skipUnless
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from common.db.pool import ConnectionPool, close_pools, get_pool
+
+
+class TestConnectionPool(SimpleTestCase):
+    def test_connection_pool_reuses_most_recent_connection(self):
+        pool = ConnectionPool(max_size=2, max_idle=10.0)
+        first, second = mock.Mock(), mock.Mock()
+
+        self.assertTrue(pool.put(first, now=1.0))
+        self.assertTrue(pool.put(second, now=2.0))
+
+        self.assertIs(pool.get(now=3.0), second)
+        self.assertIs(pool.get(now=3.0), first)
+        self.assertIsNone(pool.get(now=3.0))
+
+    def test_connection_pool_max_size(self):
+        pool = ConnectionPool(max_size=1, max_idle=10.0)
+
+        self.assertTrue(pool.put(mock.Mock()))
+        self.assertFalse(pool.put(mock.Mock()))
+        self.assertEqual(len(pool), 1)
+
+    def test_connection_pool_closes_expired_connections(self):
+        pool = ConnectionPool(max_size=2, max_idle=10.0)
+        expired, recent = mock.Mock(), mock.Mock()
+        pool.put(expired, now=1.0)
+        pool.put(recent, now=8.0)
+
+        self.assertIs(pool.get(now=12.0), recent)
+        expired.close.assert_called_once()
+        self.assertEqual(len(pool), 0)
+
+    @override_settings(DATABASE_POOL_SIZE=0)
+    def test_connection_pool_disabled(self):
+        self.assertIsNone(get_pool("default"))
+
+
+# database access must be allowed, for the test's own connections
+class TestDatabaseConnections(TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(close_pools)
+        self.databases_settings = {
+            "default": {"ENGINE": "django.db.backends.dummy"},
+            "pooled": {
+                "ENGINE": "common.db.backends.sqlite3",
+                "NAME": str(Path(directory) / "pooled.sqlite3"),
+            },
+        }
+
+    def connect(self):
+        """A connection of the (new) thread serving a request"""
+        connection = ConnectionHandler(self.databases_settings)["pooled"]
+        connection.ensure_connection()
+        self.addCleanup(connection.close)
+        return connection
+
+    @override_settings(SQLITE_PRAGMAS={"journal_mode": "WAL", "busy_timeout": 1234})
+    def test_sqlite_pragmas_are_applied(self):
+        connection = self.connect()
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    @skipUnless(hasattr(sqlite3.Connection, "getlimit"), "Connection.getlimit() is new in Python 3.11")
+    def test_sqlite_library_variables_limit(self):
+        connection = self.connect()
+
+        self.assertEqual(
+            connection.features.max_query_params,
+            connection.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER),
+        )
+
+    @override_settings(DATABASE_POOL_SIZE=2)
+    def test_pooled_connection_is_reused(self):
+        connection = self.connect()
+        raw_connection = connection.connection
+        connection.close()
+
+        with mock.patch(
+            "common.db.backends.sqlite3.base.DatabaseWrapper.configure_new_connection"
+        ) as configure:
+            self.assertIs(self.connect().connection, raw_connection)
+            configure.assert_not_called()
+
+    @override_settings(DATABASE_POOL_SIZE=2)
+    def test_connection_closed_in_transaction_is_not_pooled(self):
+        connection = self.connect()
+        connection.set_autocommit(False)
+        connection.close()
+
+        self.assertEqual(len(get_pool("pooled")), 0)
+
+    @override_settings(DATABASE_POOL_SIZE=0)
+    def test_connection_without_pool_is_closed(self):
+        connection = self.connect()
+        raw_connection = connection.connection
+        connection.close()
+
+        self.assertIsNot(self.connect().connection, raw_connection)
+
+    @override_settings(DATABASE_POOL_SIZE=2)
+    def test_pooled_connection_health_check(self):
+        self.databases_settings["pooled"]["CONN_HEALTH_CHECKS"] = True
+        connection = self.connect()
+        raw_connection = connection.connection
+        connection.close()
+        # closed by the database, while idle
+        raw_connection.close()
+
+        self.assertIsNot(self.connect().connection, raw_connection)
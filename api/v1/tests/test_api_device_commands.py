@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from typing import *
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Q
+from django.test import TransactionTestCase, override_settings
+from django.urls import include, path, reverse_lazy
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from accounts.models import Member
+from api.v1 import urls as v1_urls
+from api.v1.async_views import AsyncDeviceCommandListAPIView
+from devices.commands import await_commands, get_command_notifier, queue_commands, wait_for_commands
+from devices.models import Device, DeviceCommand
+
+# v1 API, with the async commands view (API_ASYNC_VIEWS)
+members_urlpatterns = [
+    path(
+        str(pattern.pattern),
+        AsyncDeviceCommandListAPIView.as_view() if pattern.name == "commands_list" else pattern.callback,
+        name=pattern.name,
+    )
+    for pattern in v1_urls.members_urlpatterns
+]
+
+urlpatterns = [
+    path(
+        "api/",
+        include(
+            ([path("v1/", include(([path("members/", include(members_urlpatterns))], "api"), namespace="v1"))], "api"),
+            namespace="api",
+        ),
+    ),
+]
+
+
+class BaseDeviceCommandsTestCase(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def setUp(self) -> None:
+        self.member: Member = Member.objects.filter(is_active=True).first()
+        self.other_member: Member = Member.objects.filter(
+            Q(is_active=True) & ~Q(id=self.member.id)
+        ).first()
+        self.device: Device = self.member.devicegroup_set.first().device_set.first()
+        url_kwargs = dict(
+            username=self.member.username,
+            group_name=self.device.group.name,
+            device_uid=self.device.uid,
+        )
+        self.commands_url = reverse_lazy("api:v1:commands_list", kwargs=url_kwargs)
+        self.ack_url = reverse_lazy("api:v1:commands_ack", kwargs=url_kwargs)
+        self.client.force_login(self.member)
+
+
+class TestDeviceCommandsAPI(BaseDeviceCommandsTestCase):
+    def test_queue_command(self):
+        response = self.client.post(
+            self.commands_url, data=dict(name="open_valve", payload={"valve": 1}), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        command = DeviceCommand.objects.get(id=response.json()["id"])
+        self.assertEqual(command.device, self.device)
+        self.assertEqual(command.name, "open_valve")
+        self.assertEqual(command.payload, {"valve": 1})
+        self.assertEqual(command.status, DeviceCommand.Status.PENDING)
+
+    def test_queue_expired_command_is_400(self):
+        response = self.client.post(
+            self.commands_url,
+            data=dict(name="open_valve", expires=timezone.now() - timedelta(minutes=1)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expires", response.json())
+
+    def test_other_member_is_403(self):
+        self.client.force_login(self.other_member)
+
+        response = self.client.get(self.commands_url, data=dict(timeout=0))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_poll_delivers_pending_commands_in_order(self):
+        first, = queue_commands([self.device], "open_valve")
+        second, = queue_commands([self.device], "close_valve")
+
+        response = self.client.get(self.commands_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([command["id"] for command in response.json()], [first.id, second.id])
+        self.assertEqual(
+            set(DeviceCommand.objects.values_list("status", flat=True)),
+            {DeviceCommand.Status.DELIVERED},
+        )
+
+    def test_poll_without_commands_times_out(self):
+        start = time.monotonic()
+
+        response = self.client.get(self.commands_url, data=dict(timeout=0.1))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    @override_settings(DEVICE_COMMANDS_POLL_TIMEOUT=0)
+    def test_poll_timeout_is_capped(self):
+        start = time.monotonic()
+
+        response = self.client.get(self.commands_url, data=dict(timeout=60))
+
+        self.assertEqual(response.json(), [])
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_poll_after_skips_received_commands(self):
+        command, = queue_commands([self.device], "open_valve")
+
+        response = self.client.get(self.commands_url, data=dict(after=command.id, timeout=0))
+
+        self.assertEqual(response.json(), [])
+
+    def test_unacknowledged_commands_are_delivered_again(self):
+        command, = queue_commands([self.device], "open_valve")
+        self.client.get(self.commands_url)
+
+        response = self.client.get(self.commands_url, data=dict(timeout=0))
+
+        self.assertEqual([command["id"] for command in response.json()], [command.id])
+
+    def test_expired_commands_are_not_delivered(self):
+        queue_commands([self.device], "open_valve", expires=timezone.now() - timedelta(seconds=1))
+
+        response = self.client.get(self.commands_url, data=dict(timeout=0))
+
+        self.assertEqual(response.json(), [])
+
+    def test_invalid_poll_parameters_are_400(self):
+        response = self.client.get(self.commands_url, data=dict(after=-1))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("after", response.json())
+
+    def test_acknowledge_commands(self):
+        commands = [queue_commands([self.device], "open_valve")[0] for _ in range(3)]
+
+        response = self.client.post(
+            self.ack_url, data=dict(ids=[command.id for command in commands[:2]]), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"acknowledged": 2})
+        response = self.client.get(self.commands_url, data=dict(timeout=0))
+        self.assertEqual([command["id"] for command in response.json()], [commands[2].id])
+
+    def test_acknowledge_other_device_commands_is_skipped(self):
+        other_device = Device.objects.exclude(id=self.device.id).first()
+        command, = queue_commands([other_device], "open_valve")
+
+        response = self.client.post(self.ack_url, data=dict(ids=[command.id]), format="json")
+
+        self.assertEqual(response.json(), {"acknowledged": 0})
+        command.refresh_from_db()
+        self.assertEqual(command.status, DeviceCommand.Status.PENDING)
+
+    @override_settings(DEVICE_COMMANDS_BATCH_SIZE=2)
+    def test_acknowledge_too_many_commands_is_400(self):
+        response = self.client.post(self.ack_url, data=dict(ids=[1, 2, 3]), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ids", response.json())
+
+
+class TestCommandNotifier(BaseDeviceCommandsTestCase):
+    def test_queued_commands_notify_their_devices_on_commit(self):
+        woken = []
+        notifier = get_command_notifier()
+
+        with notifier.subscribe(self.device.id, lambda: woken.append(self.device.id)):
+            with notifier.subscribe(self.device.id + 1000, lambda: woken.append("other")):
+                with self.captureOnCommitCallbacks(execute=True):
+                    queue_commands([self.device], "open_valve")
+                    self.assertEqual(woken, [])
+
+        self.assertEqual(woken, [self.device.id])
+        self.assertEqual(notifier.waiting(), 0)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TestAsyncDeviceCommandsAPI(BaseDeviceCommandsTestCase):
+    def queue_command(self) -> DeviceCommand:
+        with self.captureOnCommitCallbacks(execute=True):
+            return queue_commands([self.device], "open_valve")[0]
+
+    async def test_waiting_request_is_woken_by_queued_command(self):
+        start = time.monotonic()
+
+        # awaited directly, the test client runs sync middleware in this test's thread
+        waiting = asyncio.ensure_future(await_commands(self.device.id, timeout=5))
+        while get_command_notifier().waiting(self.device.id) == 0:
+            await asyncio.sleep(0.01)
+        command = await sync_to_async(self.queue_command)()
+        commands = await waiting
+
+        self.assertEqual([command.id for command in commands], [command.id])
+        self.assertEqual(commands[0].status, DeviceCommand.Status.DELIVERED)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_async_poll_times_out(self):
+        response = self.client.get(self.commands_url, data=dict(timeout=0.05))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+
+    def test_async_poll_delivers_pending_commands(self):
+        command = self.queue_command()
+
+        response = self.client.get(self.commands_url)
+
+        self.assertEqual([command["id"] for command in response.json()], [command.id])
+
+    def test_async_queue_command_is_served_by_drf_view(self):
+        response = self.client.post(self.commands_url, data=dict(name="open_valve"), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TestDeviceCommandsLongPoll(TransactionTestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def test_waiting_request_is_woken_by_command_queued_in_another_thread(self):
+        member = Member.objects.filter(is_active=True).first()
+        device = member.devicegroup_set.first().device_set.first()
+        url = reverse_lazy(
+            "api:v1:commands_list",
+            kwargs=dict(username=member.username, group_name=device.group.name, device_uid=device.uid),
+        )
+        client = APIClient()
+        client.force_login(member)
+
+        def queue_command() -> None:
+            try:
+                while get_command_notifier().waiting(device.id) == 0:
+                    time.sleep(0.01)
+                queue_commands([device.id], "open_valve")
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=queue_command)
+        thread.start()
+        start = time.monotonic()
+        response = client.get(url, data=dict(timeout=5))
+        thread.join()
+
+        self.assertEqual([command["name"] for command in response.json()], ["open_valve"])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_waiting_request_releases_its_database_connection(self):
+        device = Device.objects.first()
+
+        with mock.patch.object(connection, "close", wraps=connection.close) as close:
+            self.assertEqual(wait_for_commands(device.id, timeout=0.05), [])
+
+        close.assert_called_once()
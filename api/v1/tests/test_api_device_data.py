@@ -2,6 +2,7 @@ import json
 from typing import *
 
 from django.db.models import Q
+from django.test import override_settings
 from django.urls import reverse_lazy
 from django.utils import timezone
 from rest_framework import status
@@ -442,6 +443,35 @@ class TestDeviceDataAPIViewList(BaseDeviceDataAPIViewListTestCase):
             "Message must be either a valid JSON object or a UTF-8 encoded JSON string.",
         )
 
+    @override_settings(DEVICE_MESSAGE_MAX_BYTES=32)
+    def test_api_data_list_too_large_message_is_400(self):
+        large_data = dict(message={"foo": "x" * 64})
+        data_count_before = self.first_device.devicedata_set.count()
+        response = self.client.post(
+            self.url,
+            data=large_data,
+            format="json",
+            follow=True,
+        )
+        data_count_after = self.first_device.devicedata_set.count()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(data_count_before, data_count_after)
+        self.assertEqual(response.data["message"][0].code, "max_bytes")
+
+    def test_api_data_list_json_string_message_is_stored(self):
+        string_data = dict(message='{"foo": "bar"}')
+        response = self.client.post(
+            self.url,
+            data=string_data,
+            format="json",
+            follow=True,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["message"], {"foo": "bar"})
+        self.assertEqual(DeviceData.objects.last().message, {"foo": "bar"})
+
     def test_api_data_list_creation_time_is_optional(self):
         new_device_data = self.data.copy()
         new_device_data.pop("date", None)
@@ -399,6 +399,26 @@ class TestDeviceGroupsAPIViewList(BaseDeviceGroupsAPIViewListTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(device_count_before + 1, device_count_after)
 
+    def test_api_device_group_list_create_normalizes_name(self):
+        response = self.client.post(self.url, data=dict(name="Test_Device_Group"))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["name"], "test_device_group")
+        self.assertTrue(
+            self.first_member.devicegroup_set.filter(name="test_device_group").exists()
+        )
+
+    def test_api_device_group_list_duplicate_name_is_400(self):
+        group_count_before = self.first_member.devicegroup_set.count()
+        response = self.client.post(
+            self.url, data=dict(name=self.device_group.name.upper())
+        )
+        group_count_after = self.first_member.devicegroup_set.count()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["name"][0].code, "unique")
+        self.assertEqual(group_count_before, group_count_after)
+
     def test_api_device_group_list_another_member_is_403(self):
         self.client.logout()
         self.client.force_login(self.second_member)
@@ -435,6 +455,21 @@ class TestDeviceGroupsAPIViewDetails(BaseDeviceGroupsAPIViewDetailsTestCase):
             self.serialized_device_group["creation_date"].value,
         )
 
+    def test_api_device_group_details_name_is_case_insensitive(self):
+        url = reverse_lazy(
+            "api:v1:group_details",
+            kwargs=dict(
+                username=self.first_member.username,
+                group_name=self.serialized_device_group["name"].value.upper(),
+            ),
+        )
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["name"], self.serialized_device_group["name"].value
+        )
+
     def test_api_device_group_details_non_existent_group_is_404(self):
         response = self.client.get(
             reverse_lazy(
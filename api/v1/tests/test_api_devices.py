@@ -359,6 +359,17 @@ class TestDeviceAPIViewList(BaseDeviceAPIViewListTestCase):
         self.assertEqual(response.data["name"][0].code, "invalid")
         self.assertEqual(device_count_before, device_count_after)
 
+    def test_api_device_list_duplicate_name_is_400(self):
+        device_data = self.device_data.copy()
+        device_data["name"] = self.first_device.name.upper()
+        device_count_before = self.first_group.device_set.count()
+        response = self.client.post(self.url, data=device_data)
+        device_count_after = self.first_group.device_set.count()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["name"][0].code, "unique")
+        self.assertEqual(device_count_before, device_count_after)
+
     def test_api_device_list_creation_time_is_optional(self):
         new_device_data = self.device_data.copy()
         new_device_data.pop("date_added", None)
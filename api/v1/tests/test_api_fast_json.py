@@ -0,0 +1,120 @@
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import *
+from unittest import mock
+from uuid import UUID
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.v1.parsers import API_PARSER_CLASSES, FastJSONParser
+from api.v1.renderers import API_RENDERER_CLASSES, FastJSONRenderer
+from common import fastjson
+
+DATA: Final[Dict[str, Any]] = {
+    "id": 1,
+    "message": {"temperature": 21.5, "valves": [True, False], "name": "é\u2028"},
+    "date": datetime(2023, 7, 26, 12, 23, 57, 879000, tzinfo=timezone.utc),
+    "uid": UUID("12345678-1234-5678-1234-567812345678"),
+    "amount": Decimal("1.50"),
+    "big": 2**70,
+}
+
+
+class TestFastJSON(SimpleTestCase):
+    def test_fast_json_dumps_matches_stdlib(self):
+        encoded = fastjson.dumps(DATA, cls=DjangoJSONEncoder)
+
+        self.assertEqual(
+            json.loads(encoded), json.loads(json.dumps(DATA, cls=DjangoJSONEncoder))
+        )
+
+    def test_fast_json_dumps_unsupported_type_is_type_error(self):
+        with self.assertRaises(TypeError):
+            fastjson.dumps({"foo": b"bar"})
+
+    def test_fast_json_dumps_non_finite_floats(self):
+        for value in (float("nan"), float("inf"), -float("inf")):
+            with self.subTest(value=value):
+                if fastjson.orjson is None:
+                    with self.assertRaises(ValueError):
+                        fastjson.dumps({"foo": [None, value]})
+                else:
+                    self.assertEqual(fastjson.dumps({"foo": [None, value]}), '{"foo":[null,null]}')
+
+    def test_fast_json_dumps_nulls_with_orjson(self):
+        if fastjson.orjson is None:
+            self.skipTest("orjson is not installed")
+
+        with mock.patch.object(fastjson.json, "dumps") as json_dumps:
+            self.assertEqual(fastjson.dumps({"foo": None, "bar": "null"}), '{"foo":null,"bar":"null"}')
+
+        json_dumps.assert_not_called()
+
+    def test_fast_json_loads(self):
+        self.assertEqual(fastjson.loads('{"foo": [1, 2.5]}'), {"foo": [1, 2.5]})
+        self.assertEqual(fastjson.loads(b'{"foo": null}'), {"foo": None})
+
+    def test_fast_json_loads_invalid_is_value_error(self):
+        for data in ('{"foo": ', '{"foo": NaN}', b"\xff"):
+            with self.assertRaises(ValueError):
+                fastjson.loads(data)
+
+    def test_fast_json_without_orjson(self):
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.dumps({"foo": "é"}), '{"foo":"é"}')
+            self.assertEqual(fastjson.loads('{"foo": 1}'), {"foo": 1})
+            with self.assertRaises(ValueError):
+                fastjson.dumps({"foo": float("nan")})
+
+
+class TestFastJSONRendererAndParser(SimpleTestCase):
+    def setUp(self) -> None:
+        self.renderer = FastJSONRenderer()
+        self.parser = FastJSONParser()
+
+    def test_fast_json_classes_replace_drf_json_classes(self):
+        self.assertIn(FastJSONRenderer, API_RENDERER_CLASSES)
+        self.assertNotIn(JSONRenderer, API_RENDERER_CLASSES)
+        self.assertIn(FastJSONParser, API_PARSER_CLASSES)
+        self.assertNotIn(JSONParser, API_PARSER_CLASSES)
+
+    def test_fast_json_renderer_matches_json_renderer(self):
+        rendered = self.renderer.render(DATA)
+        expected = JSONRenderer().render(DATA)
+
+        self.assertEqual(json.loads(rendered), json.loads(expected))
+        self.assertNotIn("\u2028".encode("utf-8"), rendered)
+        self.assertIn(b"\\u2028", rendered)
+
+    def test_fast_json_renderer_none_is_empty(self):
+        self.assertEqual(self.renderer.render(None), b"")
+
+    def test_fast_json_renderer_indent(self):
+        rendered = self.renderer.render(
+            {"foo": "bar"}, accepted_media_type="application/json; indent=4"
+        )
+
+        self.assertEqual(rendered, b'{\n    "foo": "bar"\n}')
+
+    def test_fast_json_parser(self):
+        parsed = self.parser.parse(io.BytesIO(b'{"foo": ["bar", 1]}'))
+
+        self.assertEqual(parsed, {"foo": ["bar", 1]})
+
+    def test_fast_json_parser_other_encoding(self):
+        parsed = self.parser.parse(
+            io.BytesIO('{"foo": "é"}'.encode("latin-1")),
+            parser_context={"encoding": "latin-1"},
+        )
+
+        self.assertEqual(parsed, {"foo": "é"})
+
+    def test_fast_json_parser_invalid_is_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parser.parse(io.BytesIO(b'{"foo": '))
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from typing import *
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Member
+from devices.commands import acknowledge_commands, deliver_commands, queue_group_command
+from devices.models import Device, DeviceCommand, DeviceGroup, DeviceGroupCommand
+
+
+class TestDeviceGroupCommandsAPI(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def setUp(self) -> None:
+        self.member: Member = Member.objects.filter(is_active=True).first()
+        self.other_member: Member = Member.objects.filter(
+            Q(is_active=True) & ~Q(id=self.member.id)
+        ).first()
+        self.group: DeviceGroup = self.member.devicegroup_set.create(name="zone_1")
+        self.add_devices(3)
+        url_kwargs = dict(username=self.member.username, group_name=self.group.name)
+        self.commands_url = reverse_lazy("api:v1:group_commands_list", kwargs=url_kwargs)
+        self.client.force_login(self.member)
+
+    def add_devices(self, count: int) -> None:
+        start = self.group.device_set.count()
+        Device.objects.bulk_create(
+            Device(
+                name=f"valve_{index}",
+                uid=Device.generate_device_uid(f"{self.group.pk}_{index}"),
+                group=self.group,
+            )
+            for index in range(start, start + count)
+        )
+
+    def get_details_url(self, group_command_id: int) -> str:
+        return reverse_lazy(
+            "api:v1:group_command_details",
+            kwargs=dict(
+                username=self.member.username, group_name=self.group.name, command_id=group_command_id
+            ),
+        )
+
+    def test_queue_group_command(self):
+        inactive = self.group.device_set.first()
+        inactive.is_active = False
+        inactive.save()
+
+        response = self.client.post(
+            self.commands_url, data=dict(name="open_valve", payload={"duration": 600}), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            {key: response.json()[key] for key in ("name", "payload", "total", "pending", "acknowledged")},
+            dict(name="open_valve", payload={"duration": 600}, total=2, pending=2, acknowledged=0),
+        )
+        group_command = DeviceGroupCommand.objects.get(pk=response.json()["id"])
+        self.assertEqual(
+            set(group_command.device_commands.values_list("device_id", "name")),
+            {(device.pk, "open_valve") for device in self.group.device_set.exclude(pk=inactive.pk)},
+        )
+
+    def test_queue_group_command_costs_constant_queries(self):
+        query_counts = []
+        for devices in (10, 490):
+            self.add_devices(devices)
+            with CaptureQueriesContext(connection) as queries:
+                group_command = queue_group_command(self.group, "open_valve")
+            self.assertEqual(group_command.device_commands.count(), self.group.device_set.count())
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_acknowledgement_state(self):
+        expires = timezone.now() + timedelta(minutes=10)
+        group_command = queue_group_command(self.group, "open_valve", expires=expires)
+        first, second, third = DeviceCommand.objects.filter(group_command=group_command).order_by("pk")
+        deliver_commands(first.device_id)
+        deliver_commands(second.device_id)
+        acknowledge_commands(first.device_id, [first.pk])
+
+        response = self.client.get(self.get_details_url(group_command.pk))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {key: response.json()[key] for key in ("total", "pending", "delivered", "acknowledged", "expired")}
+        self.assertEqual(counts, dict(total=3, pending=1, delivered=1, acknowledged=1, expired=0))
+        counts = DeviceGroupCommand.objects.with_counts(now=expires).get(pk=group_command.pk)
+        self.assertEqual((counts.pending, counts.delivered, counts.expired), (0, 0, 2))
+
+    def test_list_group_commands(self):
+        for name in ("open_valve", "close_valve"):
+            queue_group_command(self.group, name)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.commands_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(command["name"], command["total"]) for command in response.json()],
+            [("close_valve", 3), ("open_valve", 3)],
+        )
+        # one aggregate query, whatever the number of commands
+        self.assertEqual(len([query for query in queries if "devices_devicecommand" in query["sql"]]), 1)
+
+    def test_queue_expired_group_command_is_400(self):
+        response = self.client.post(
+            self.commands_url,
+            data=dict(name="open_valve", expires=timezone.now() - timedelta(minutes=1)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DeviceGroupCommand.objects.exists())
+
+    def test_other_members_group_commands_are_not_found(self):
+        group_command = queue_group_command(self.group, "open_valve")
+        self.client.force_login(self.other_member)
+
+        response = self.client.get(self.get_details_url(group_command.pk))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        other_group = self.other_member.devicegroup_set.create(name="other_zone")
+        url = reverse_lazy(
+            "api:v1:group_command_details",
+            kwargs=dict(
+                username=self.other_member.username,
+                group_name=other_group.name,
+                command_id=group_command.pk,
+            ),
+        )
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
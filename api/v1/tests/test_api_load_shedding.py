@@ -0,0 +1,216 @@
+from typing import *
+
+from django.conf import settings
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from django.urls import reverse_lazy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Member
+from api.v1.async_views import AsyncDeviceDataListAPIView
+from api.v1.views import DeviceDataListAPIView, DeviceListAPIView
+from common.middleware import (
+    LatencyWindow,
+    LoadMonitor,
+    Priority,
+    get_view_key,
+    get_view_priority,
+    load_monitor,
+)
+from devices.models import Device
+from devices.views import DeviceDataHistoryView
+
+# async capable middleware (as in production, without the debug toolbar),
+# that runs in the event loop under ASGI
+ASYNC_MIDDLEWARE: Final[List[str]] = [
+    middleware for middleware in settings.MIDDLEWARE if not middleware.startswith("debug_toolbar.")
+]
+
+LOAD_SHEDDING_SETTINGS: Final[Dict[str, Any]] = dict(
+    LOAD_SHEDDING_ENABLED=True,
+    LOAD_SHEDDING_WINDOW=10.0,
+    LOAD_SHEDDING_MIN_SAMPLES=3,
+    LOAD_SHEDDING_DB_LATENCY=0.5,
+    LOAD_SHEDDING_REQUEST_LATENCY=2.0,
+    LOAD_SHEDDING_RETRY_AFTER=7,
+)
+
+
+class TestLatencyWindow(SimpleTestCase):
+    def test_latency_window_means(self):
+        window = LatencyWindow()
+        window.add(1.0, request_time=1.0, db_time=0.5)
+        window.add(2.0, request_time=3.0, db_time=1.5)
+
+        self.assertEqual(len(window), 2)
+        self.assertAlmostEqual(window.mean_request_time(), 2.0)
+        self.assertAlmostEqual(window.mean_db_time(), 1.0)
+
+    def test_latency_window_expire(self):
+        window = LatencyWindow()
+        window.add(1.0, request_time=1.0, db_time=0.5)
+        window.add(2.0, request_time=3.0, db_time=1.5)
+        window.expire(before=1.5)
+
+        self.assertEqual(len(window), 1)
+        self.assertAlmostEqual(window.mean_request_time(), 3.0)
+
+        window.expire(before=5.0)
+        self.assertEqual(len(window), 0)
+        self.assertEqual(window.mean_db_time(), 0.0)
+
+
+@override_settings(**LOAD_SHEDDING_SETTINGS)
+class TestLoadMonitor(SimpleTestCase):
+    def setUp(self) -> None:
+        self.monitor = LoadMonitor()
+
+    def record(self, view: str, request_time: float, db_time: float, count: int = 3):
+        for _ in range(count):
+            self.monitor.record(view, request_time, db_time, now=100.0)
+
+    def test_load_monitor_pressure_needs_min_samples(self):
+        self.record("view", 10.0, 10.0, count=2)
+
+        self.assertEqual(self.monitor.pressure("view", now=100.0), 0.0)
+
+    def test_load_monitor_db_pressure_is_shared(self):
+        self.record("slow", 1.0, 1.0)
+
+        self.assertAlmostEqual(self.monitor.pressure("other", now=100.0), 2.0)
+
+    def test_load_monitor_request_pressure_is_per_view(self):
+        self.record("slow", 6.0, 0.0)
+
+        self.assertAlmostEqual(self.monitor.pressure("slow", now=100.0), 3.0)
+        self.assertEqual(self.monitor.pressure("other", now=100.0), 0.0)
+
+    def test_load_monitor_pressure_expires(self):
+        self.record("slow", 6.0, 1.0)
+
+        self.assertEqual(self.monitor.pressure("slow", now=111.0), 0.0)
+
+
+class TestViewPriority(SimpleTestCase):
+    def test_view_priority_by_method(self):
+        self.assertEqual(
+            get_view_priority(DeviceDataListAPIView, "GET"), Priority.LOW
+        )
+        self.assertEqual(
+            get_view_priority(DeviceDataListAPIView, "POST"), Priority.CRITICAL
+        )
+        self.assertEqual(
+            get_view_priority(DeviceDataListAPIView, "PUT"), Priority.NORMAL
+        )
+
+    def test_view_priority_default(self):
+        self.assertEqual(get_view_priority(DeviceListAPIView, "GET"), Priority.NORMAL)
+        self.assertEqual(get_view_priority(lambda request: None, "GET"), Priority.NORMAL)
+
+
+@override_settings(**LOAD_SHEDDING_SETTINGS)
+class TestLoadSheddingMiddleware(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def setUp(self) -> None:
+        load_monitor.clear()
+        self.addCleanup(load_monitor.clear)
+
+        self.member: Member = Member.objects.filter(is_active=True).first()
+        self.device: Device = self.member.devicegroup_set.first().device_set.first()
+        self.url_kwargs = dict(
+            username=self.member.username,
+            group_name=self.device.group.name,
+            device_uid=self.device.uid,
+        )
+        self.client.force_login(self.member)
+
+    def overload_database(self, db_time: float) -> None:
+        for _ in range(LOAD_SHEDDING_SETTINGS["LOAD_SHEDDING_MIN_SAMPLES"]):
+            load_monitor.record("other.view", db_time, db_time)
+
+    def test_load_shedding_no_pressure(self):
+        response = self.client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_load_shedding_low_priority_is_503(self):
+        self.overload_database(0.75)
+        response = self.client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "7")
+        self.assertIn("detail", response.json())
+
+    def test_load_shedding_ingestion_is_never_shed(self):
+        self.overload_database(10.0)
+        response = self.client.post(
+            reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs),
+            data=dict(message={"foo": "bar"}),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_load_shedding_normal_priority_is_shed_later(self):
+        url = reverse_lazy(
+            "api:v1:devices_list",
+            kwargs=dict(username=self.member.username, group_name=self.device.group.name),
+        )
+        self.overload_database(0.75)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.overload_database(2.0)
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def test_load_shedding_slow_view_is_shed(self):
+        for _ in range(LOAD_SHEDDING_SETTINGS["LOAD_SHEDDING_MIN_SAMPLES"]):
+            load_monitor.record(get_view_key(DeviceDataHistoryView), 5.0, 0.0)
+        response = self.client.get(
+            reverse_lazy(
+                "devices:device_data_list",
+                kwargs=dict(device_uid=self.device.uid),
+            )
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Content-Type"], "text/plain")
+
+    def test_load_shedding_records_served_requests(self):
+        self.client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+        view_window = load_monitor._views[get_view_key(DeviceDataListAPIView)]
+
+        self.assertEqual(len(view_window), 1)
+        self.assertGreater(view_window.db_time, 0)
+
+    @override_settings(MIDDLEWARE=ASYNC_MIDDLEWARE)
+    async def test_load_shedding_records_database_time_of_asgi_requests(self):
+        client = AsyncClient()
+        client.cookies = self.client.cookies
+
+        response = await client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        view_window = load_monitor._views[get_view_key(DeviceDataListAPIView)]
+        self.assertEqual(len(view_window), 1)
+        self.assertGreater(view_window.db_time, 0)
+
+    @override_settings(MIDDLEWARE=ASYNC_MIDDLEWARE, ROOT_URLCONF="api.v1.tests.test_api_async_views")
+    async def test_load_shedding_records_database_time_of_async_views(self):
+        client = AsyncClient()
+        client.cookies = self.client.cookies
+
+        response = await client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        view_window = load_monitor._views[get_view_key(AsyncDeviceDataListAPIView)]
+        self.assertGreater(view_window.db_time, 0)
+
+    @override_settings(LOAD_SHEDDING_ENABLED=False)
+    def test_load_shedding_disabled(self):
+        self.overload_database(10.0)
+        response = self.client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,193 @@
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import *
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse_lazy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Member
+from common.middleware import ReadReplicaMiddleware
+from common.routers import TelemetryRouter, replica_reads
+from devices.models import Device, DeviceData, DeviceGroup
+
+REPLICAS: Final[Dict[str, List[str]]] = {
+    "default": ["default_replica_0", "default_replica_1"],
+    "telemetry": ["telemetry_replica_0"],
+}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class TestReadReplicaRouter(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router = TelemetryRouter()
+
+    def read_from_replicas(self) -> None:
+        token = replica_reads.set(True)
+        self.addCleanup(replica_reads.reset, token)
+
+    def test_router_reads_from_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Device))
+
+    def test_router_reads_from_replicas(self):
+        self.read_from_replicas()
+
+        self.assertIn(self.router.db_for_read(Device), REPLICAS["default"])
+
+    def test_router_reads_telemetry_from_telemetry_replicas(self):
+        self.read_from_replicas()
+
+        with mock.patch("common.routers.get_telemetry_db_alias", new=lambda: "telemetry"):
+            self.assertEqual(self.router.db_for_read(DeviceData), "telemetry_replica_0")
+
+    def test_router_writes_to_primary(self):
+        self.read_from_replicas()
+
+        self.assertIsNone(self.router.db_for_write(Device))
+
+    def test_router_never_migrates_replicas(self):
+        self.assertFalse(self.router.allow_migrate("default_replica_0", "devices", "device"))
+        self.assertIsNone(self.router.allow_migrate("default", "devices", "device"))
+
+    def test_router_allows_relations_with_replica_objects(self):
+        group = DeviceGroup(id=1)
+        group._state.db = "default_replica_1"
+        device = Device(id=1)
+        device._state.db = "default"
+
+        self.assertTrue(self.router.allow_relation(group, device))
+
+
+class TestReadReplicaMiddleware(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def setUp(self) -> None:
+        self.member: Member = Member.objects.filter(is_active=True).first()
+        self.device: Device = self.member.devicegroup_set.first().device_set.first()
+        self.url_kwargs = dict(
+            username=self.member.username,
+            group_name=self.device.group.name,
+            device_uid=self.device.uid,
+        )
+        self.client.force_login(self.member)
+
+        # the test database is its own replica, replica reads are recorded
+        replicas = override_settings(DATABASE_REPLICAS={"default": ["default"]})
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        patcher = mock.patch("common.routers.get_replica_aliases", return_value=["default"])
+        self.replica_aliases = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_replica_get_reads_from_replica(self):
+        response = self.client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.replica_aliases.called)
+        self.assertFalse(replica_reads.get())
+
+    def test_read_replica_write_reads_from_primary(self):
+        response = self.client.post(
+            reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs),
+            data={"message": {"temperature": 21}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.replica_aliases.called)
+        self.assertIn(ReadReplicaMiddleware.STICKY_COOKIE, response.cookies)
+
+    def test_read_replica_sticky_primary_after_write(self):
+        self.client.post(
+            reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs),
+            data={"message": {"temperature": 21}},
+            format="json",
+        )
+        response = self.client.get(reverse_lazy("api:v1:data_list", kwargs=self.url_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.replica_aliases.called)
+
+    def test_read_replica_not_used_by_other_views(self):
+        response = self.client.get(reverse_lazy("devices:group_list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.replica_aliases.called)
+
+
+class TestRefreshReplicaSnapshots(SimpleTestCase):
+    def test_refresh_replica_snapshots_without_replicas(self):
+        out = StringIO()
+        call_command("refresh_replica_snapshots", stdout=out)
+
+        self.assertEqual(out.getvalue(), "")
+
+    def test_refresh_replica_snapshots_unknown_database(self):
+        with self.assertRaises(CommandError):
+            call_command("refresh_replica_snapshots", database="default", stdout=StringIO())
+
+
+# database access must be allowed, for the test's own connections
+@override_settings(DATABASE_REPLICAS={"telemetry": ["telemetry_replica_0"]})
+class TestRefreshPartitionedReplicaSnapshots(TestCase):
+    def setUp(self) -> None:
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.connections = ConnectionHandler(
+            {
+                "default": {"ENGINE": "django.db.backends.dummy"},
+                "telemetry": {
+                    "ENGINE": "common.db.backends.sqlite3",
+                    "NAME": str(directory / "telemetry.sqlite3"),
+                },
+                "telemetry_replica_0": {
+                    "ENGINE": "common.db.backends.sqlite3",
+                    "NAME": str(directory / "replica.sqlite3"),
+                },
+            }
+        )
+        self.addCleanup(self.connections.close_all)
+        for patcher in (
+            mock.patch("devices.management.commands.refresh_replica_snapshots.connections", self.connections),
+            mock.patch("common.db.backends.sqlite3.base.get_telemetry_db_alias", return_value="telemetry"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # device data of a month that ended, moved to its partition
+        self.partition = "devices_devicedata_p2023_07"
+        (directory / "telemetry.sqlite3.partitions").mkdir()
+        for path, rows in (
+            (directory / "telemetry.sqlite3", 1),
+            (directory / "telemetry.sqlite3.partitions" / f"{self.partition}.sqlite3", 2),
+        ):
+            with sqlite3.connect(path) as database:
+                database.execute("CREATE TABLE devices_devicedata (id integer PRIMARY KEY)")
+                database.executemany("INSERT INTO devices_devicedata VALUES (NULL)", [()] * rows)
+            database.close()
+        # partition dropped from the primary
+        (directory / "replica.sqlite3.partitions").mkdir()
+        (directory / "replica.sqlite3.partitions" / "devices_devicedata_p2023_06.sqlite3").touch()
+
+    def test_refresh_replica_snapshots_copies_partitions(self):
+        out = StringIO()
+        call_command("refresh_replica_snapshots", stdout=out)
+
+        self.assertEqual(out.getvalue(), "Refreshed replica telemetry_replica_0 of telemetry\n")
+        replica = self.connections["telemetry_replica_0"]
+        self.assertEqual(replica.sync_partitions(), {"devices_devicedata": [self.partition]})
+        with replica.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {self.partition}.devices_devicedata")
+            self.assertEqual(cursor.fetchone(), (2,))
+            cursor.execute("SELECT count(*) FROM main.devices_devicedata")
+            self.assertEqual(cursor.fetchone(), (1,))
+        self.assertEqual(
+            [path.name for path in replica.partitions_dir.iterdir()], [f"{self.partition}.sqlite3"]
+        )
@@ -0,0 +1,149 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import timeit
+from typing import *
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import path
+from django.utils.module_loading import import_string
+
+from sia import settings_production
+
+# budgets are CPU time, so that they hold on busy (e.g. parallel test) machines
+
+# worker startup (new interpreter, django setup, URL configuration and middleware),
+# about 0.5s on a development machine, 1s with the development tools
+STARTUP_BUDGET_SECONDS: Final[float] = 1.5
+
+# middleware stack overhead per request, about 0.1ms on a development machine
+MIDDLEWARE_BUDGET_SECONDS: Final[float] = 0.0005
+
+# modules that must not be imported by production workers
+DEVELOPMENT_MODULES: Final[Tuple[str, ...]] = (
+    "debug_toolbar",
+    "django_extensions",
+    "django_filters",
+    "tastypie",
+    "distutils",
+    "setuptools",
+    "pkg_resources",
+)
+
+# packages of the project, whose test modules must not be imported at runtime
+PROJECT_PACKAGES: Final[Tuple[str, ...]] = (
+    "accounts",
+    "api",
+    "common",
+    "dashboard",
+    "devices",
+    "sia",
+)
+
+STARTUP_CODE: Final[str] = (
+    "import json, sys, django; django.setup(); "
+    "from django.core.handlers.wsgi import WSGIHandler; "
+    "from django.urls import get_resolver; "
+    "WSGIHandler(); get_resolver().url_patterns; "
+    "print(json.dumps(sorted(sys.modules)))"
+)
+
+
+def empty_view(request):
+    return HttpResponse()
+
+
+urlpatterns = [path("", empty_view)]
+
+
+def start_worker(settings_module: str) -> Tuple[float, List[str]]:
+    """Start a new interpreter, returns its startup (CPU) time and imported modules"""
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_CODE],
+        env=environment,
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    end = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = (end.ru_utime - start.ru_utime) + (end.ru_stime - start.ru_stime)
+    return cpu_time, json.loads(result.stdout)
+
+
+def request_time(middleware: List[str]) -> float:
+    """Best (CPU) time of a request (seconds) to an empty view, through a middleware stack"""
+    request_factory = RequestFactory()
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+        timings = timeit.repeat(
+            lambda: handler.get_response(request_factory.get("/")),
+            timer=time.process_time,
+            number=200,
+            repeat=5,
+        )
+    return min(timings) / 200
+
+
+class TestProductionSettings(SimpleTestCase):
+    def test_production_settings_exclude_development_apps(self):
+        for app in settings_production.DEVELOPMENT_APPS:
+            self.assertNotIn(app, settings_production.INSTALLED_APPS)
+
+    def test_production_settings_exclude_development_middleware(self):
+        self.assertNotIn(
+            "debug_toolbar.middleware.DebugToolbarMiddleware",
+            settings_production.MIDDLEWARE,
+        )
+
+    def test_production_settings_templates_without_debug(self):
+        for template in settings_production.TEMPLATES:
+            if template["BACKEND"] != "django.template.backends.django.DjangoTemplates":
+                continue
+            self.assertFalse(template["OPTIONS"]["debug"])
+            self.assertNotIn(
+                "django.template.context_processors.debug",
+                template["OPTIONS"]["context_processors"],
+            )
+
+    def test_production_settings_queue_emails(self):
+        self.assertEqual(settings_production.EMAIL_BACKEND, "jobs.mail.QueuedEmailBackend")
+
+    def test_production_middleware_is_async_capable(self):
+        # requests to async views stay in the event loop (see api.v1.async_views)
+        for middleware_path in settings_production.MIDDLEWARE:
+            middleware = import_string(middleware_path)
+            self.assertTrue(getattr(middleware, "async_capable", False), middleware_path)
+
+
+class TestStartupBudget(SimpleTestCase):
+    def test_production_worker_startup_budget(self):
+        startup_time = min(start_worker("sia.settings_production")[0] for _ in range(3))
+
+        self.assertLess(startup_time, STARTUP_BUDGET_SECONDS)
+
+    def test_production_worker_imports_no_development_modules(self):
+        _, modules = start_worker("sia.settings_production")
+
+        for module in modules:
+            package, *submodules = module.split(".")
+            self.assertNotIn(package, DEVELOPMENT_MODULES)
+            if package in PROJECT_PACKAGES:
+                self.assertNotIn("tests", submodules, "test modules imported at runtime")
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_production_middleware_budget(self):
+        # request time through the middleware stack, minus the time without
+        # middleware (handler, signals, URL resolution, view)
+        overhead = request_time(settings_production.MIDDLEWARE) - request_time([])
+
+        self.assertLess(overhead, MIDDLEWARE_BUDGET_SECONDS)
@@ -0,0 +1,165 @@
+from typing import *
+from unittest import mock
+
+from django.db.models import Q
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse_lazy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Member
+from api.v1.throttling import (
+    CacheTokenBucketStore,
+    DeviceIngestThrottle,
+    LocalTokenBucketStore,
+    MemberIngestThrottle,
+    get_token_bucket_store,
+)
+from devices.models import Device, DeviceGroup
+
+
+class TokenBucketStoreTestsMixin:
+    def test_token_bucket_store_burst(self):
+        for _ in range(3):
+            self.assertEqual(self.store.consume("key", 3, 1.0, now=100.0), 0)
+
+        self.assertAlmostEqual(self.store.consume("key", 3, 1.0, now=100.0), 1.0)
+
+    def test_token_bucket_store_refill(self):
+        for _ in range(3):
+            self.store.consume("key", 3, 0.5, now=100.0)
+
+        self.assertAlmostEqual(self.store.consume("key", 3, 0.5, now=101.0), 1.0)
+        self.assertEqual(self.store.consume("key", 3, 0.5, now=102.0), 0)
+
+    def test_token_bucket_store_peek_takes_no_token(self):
+        for _ in range(3):
+            self.assertEqual(self.store.peek("key", 1, 1.0, now=100.0), 0)
+        self.store.consume("key", 1, 1.0, now=100.0)
+
+        self.assertAlmostEqual(self.store.peek("key", 1, 1.0, now=100.0), 1.0)
+
+    def test_token_bucket_store_keys_are_independent(self):
+        self.store.consume("first", 1, 1.0, now=100.0)
+
+        self.assertEqual(self.store.consume("second", 1, 1.0, now=100.0), 0)
+
+
+class TestLocalTokenBucketStore(TokenBucketStoreTestsMixin, SimpleTestCase):
+    def setUp(self) -> None:
+        self.store = LocalTokenBucketStore()
+
+    def test_token_bucket_store_prunes_full_buckets(self):
+        self.store.max_buckets = 2
+        self.store.consume("first", 1, 1.0, now=100.0)
+        self.store.consume("second", 1, 1.0, now=100.0)
+        self.store.consume("third", 1, 1.0, now=105.0)
+
+        self.assertEqual(list(self.store._buckets), ["third"])
+
+
+@override_settings(
+    CACHES={
+        "throttle": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class TestCacheTokenBucketStore(TokenBucketStoreTestsMixin, SimpleTestCase):
+    def setUp(self) -> None:
+        self.store = CacheTokenBucketStore("throttle")
+        self.store.cache.clear()
+
+
+class TestDeviceDataIngestThrottling(APITestCase):
+    fixtures = ["api/test_fixture.json"]
+
+    def setUp(self):
+        get_token_bucket_store().clear()
+        self.addCleanup(get_token_bucket_store().clear)
+
+        self.first_member: Member = Member.objects.filter(is_active=True).first()
+        self.second_member: Member = Member.objects.filter(
+            Q(is_active=True) & ~Q(id=self.first_member.id)
+        ).first()
+        self.first_group: DeviceGroup = self.first_member.devicegroup_set.first()
+        self.first_device: Device = self.first_group.device_set.first()
+        self.url = self.get_url(self.first_device)
+        self.data = dict(message={"foo": "bar"})
+        self.client.force_login(self.first_member)
+
+    def get_url(self, device: Device) -> str:
+        return reverse_lazy(
+            "api:v1:data_list",
+            kwargs=dict(
+                username=device.group.owner.username,
+                group_name=device.group.name,
+                device_uid=device.uid,
+            ),
+        )
+
+    def post(self, url: str | None = None):
+        return self.client.post(url or self.url, data=self.data, format="json")
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "2/min", create=True)
+    def test_api_throttle_device_is_429(self):
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        response = self.post()
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(response.data["detail"].code, "throttled")
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "1/min", create=True)
+    def test_api_throttled_request_queries_nothing(self):
+        self.post()
+
+        with self.assertNumQueries(0):
+            response = self.post()
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "2/min", create=True)
+    @mock.patch.object(MemberIngestThrottle, "rate", "2/min", create=True)
+    def test_api_unauthorized_requests_do_not_use_up_the_owner_buckets(self):
+        self.client.logout()
+        for _ in range(3):
+            self.assertEqual(self.post().status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(self.second_member)
+        for _ in range(3):
+            self.assertEqual(self.post().status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(self.first_member)
+
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "1/min", create=True)
+    def test_api_throttle_device_is_per_device(self):
+        second_device = self.first_group.device_set.exclude(
+            id=self.first_device.id
+        ).first()
+        self.post()
+
+        response = self.post(self.get_url(second_device))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @mock.patch.object(MemberIngestThrottle, "rate", "1/min", create=True)
+    def test_api_throttle_member_is_429(self):
+        second_device = self.first_group.device_set.exclude(
+            id=self.first_device.id
+        ).first()
+        self.post()
+
+        response = self.post(self.get_url(second_device))
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @mock.patch.object(DeviceIngestThrottle, "rate", "1/min", create=True)
+    def test_api_throttle_get_is_not_throttled(self):
+        self.post()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
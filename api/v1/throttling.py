@@ -0,0 +1,267 @@
+"""
+Token bucket throttles for device data ingestion.
+
+Each throttle owns a bucket per key (device UID, member username) holding
+up to `num_requests` tokens, refilled at `num_requests / duration` tokens
+per second. A request takes one token, and is rejected (429, with a
+Retry-After header) when the bucket is empty.
+
+Buckets are kept in-process by default. Set `API_THROTTLE_CACHE` to a cache
+alias (e.g. a shared memcached/redis cache) to share buckets between workers.
+
+Keys are taken from the URL, so the throttles can be checked before
+authentication (see ThrottleBeforeAuthenticationMixin): requests to an empty
+bucket are rejected without querying the database. Tokens are only taken
+after authentication and permissions, so requests of other users (or
+anonymous ones) never use up a member's buckets.
+
+Throttles:
+----------
+
+    - DeviceIngestThrottle: scope 'device_ingest', keyed on device UID
+    - MemberIngestThrottle: scope 'member_ingest', keyed on member username
+
+"""
+
+import math
+import threading
+from functools import lru_cache
+from typing import *
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+# -----------------------------------------------------------------------------
+# Token bucket stores
+# -----------------------------------------------------------------------------
+Bucket = Tuple[float, float]
+
+
+def refill_bucket(
+    bucket: Bucket | None, capacity: float, refill_rate: float, now: float
+) -> float:
+    """Return the number of tokens in bucket at time `now`"""
+    if bucket is None:
+        return capacity
+    tokens, timestamp = bucket
+    return min(capacity, tokens + (now - timestamp) * refill_rate)
+
+
+class LocalTokenBucketStore:
+    """
+    In-process, thread safe, token bucket store
+    """
+
+    # drop full buckets when the store grows larger than this
+    max_buckets: int = 10_000
+
+    def __init__(self) -> None:
+        # key -> (tokens, timestamp, time when the bucket is full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(
+        self, key: str, capacity: float, refill_rate: float, now: float
+    ) -> float:
+        """
+        Take a token from bucket `key`
+
+        :return: 0 if a token was taken, otherwise seconds until next token
+        :rtype: float
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = refill_bucket(bucket and bucket[:2], capacity, refill_rate, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / refill_rate
+            if wait == 0:
+                tokens -= 1
+            full_at = now + (capacity - tokens) / refill_rate
+            self._buckets[key] = (tokens, now, full_at)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+            return wait
+
+    def peek(self, key: str, capacity: float, refill_rate: float, now: float) -> float:
+        """
+        Check bucket `key`, without taking a token
+
+        :return: 0 if a token is available, otherwise seconds until next token
+        :rtype: float
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+        tokens = refill_bucket(bucket and bucket[:2], capacity, refill_rate, now)
+        return 0.0 if tokens >= 1 else (1 - tokens) / refill_rate
+
+    def _prune(self, now: float) -> None:
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if bucket[2] > now
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheTokenBucketStore:
+    """
+    Token bucket store backed by a django cache, shared between workers
+    when the cache is. Updates are not atomic, concurrent requests for the
+    same key may both take the last token.
+    """
+
+    def __init__(self, alias: str) -> None:
+        self.cache = caches[alias]
+
+    def consume(
+        self, key: str, capacity: float, refill_rate: float, now: float
+    ) -> float:
+        tokens = refill_bucket(self.cache.get(key), capacity, refill_rate, now)
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / refill_rate
+        # the bucket is full again (same as missing) after capacity / rate
+        timeout = math.ceil(capacity / refill_rate)
+        self.cache.set(key, (tokens - 1 if wait == 0 else tokens, now), timeout)
+        return wait
+
+    def peek(self, key: str, capacity: float, refill_rate: float, now: float) -> float:
+        tokens = refill_bucket(self.cache.get(key), capacity, refill_rate, now)
+        return 0.0 if tokens >= 1 else (1 - tokens) / refill_rate
+
+
+def get_token_bucket_store(
+    alias: str | None = None,
+) -> LocalTokenBucketStore | CacheTokenBucketStore:
+    """Get token bucket store, in-process if alias is None"""
+    # one store per alias, however it's passed (lru_cache keys differ)
+    return _get_token_bucket_store(alias)
+
+
+@lru_cache(maxsize=None)
+def _get_token_bucket_store(
+    alias: str | None,
+) -> LocalTokenBucketStore | CacheTokenBucketStore:
+    if alias is None:
+        return LocalTokenBucketStore()
+    return CacheTokenBucketStore(alias)
+
+
+# -----------------------------------------------------------------------------
+# Throttles
+# -----------------------------------------------------------------------------
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle, burst of up to `num_requests` requests, refilled
+    over `duration` seconds. Only throttles unsafe (write) methods.
+    """
+
+    throttled_methods = ("POST", "PUT", "PATCH", "DELETE")
+
+    def get_store(self):
+        return get_token_bucket_store(getattr(settings, "API_THROTTLE_CACHE", None))
+
+    def get_ident_from_view(self, view) -> str | None:
+        raise NotImplementedError(".get_ident_from_view() must be overridden")
+
+    def get_cache_key(self, request, view):
+        if request.method not in self.throttled_methods:
+            return None
+        ident = self.get_ident_from_view(view)
+        if ident is None:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        return self._check_bucket(request, view, consume=True)
+
+    def peek_request(self, request, view) -> bool:
+        """Is a token available for the request (without taking it)"""
+        return self._check_bucket(request, view, consume=False)
+
+    def _check_bucket(self, request, view, consume: bool) -> bool:
+        self.wait_time = None
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        store = self.get_store()
+        self.wait_time = (store.consume if consume else store.peek)(
+            key,
+            capacity=self.num_requests,
+            refill_rate=self.num_requests / self.duration,
+            now=self.timer(),
+        )
+        return self.wait_time == 0
+
+    def wait(self):
+        if not self.wait_time:
+            return None
+        # Retry-After is sent in whole seconds
+        return float(math.ceil(self.wait_time))
+
+
+class DeviceIngestThrottle(TokenBucketThrottle):
+    """
+    Limit the rate of data sent by a single device
+    """
+
+    scope = "device_ingest"
+
+    def get_ident_from_view(self, view):
+        device_uid = view.kwargs.get("device_uid")
+        return str(device_uid).lower() if device_uid else None
+
+
+class MemberIngestThrottle(TokenBucketThrottle):
+    """
+    Limit the rate of data sent by all devices of a member
+    """
+
+    scope = "member_ingest"
+
+    def get_ident_from_view(self, view):
+        username = view.kwargs.get("username")
+        return username.lower() if username else None
+
+
+# -----------------------------------------------------------------------------
+# View mixins
+# -----------------------------------------------------------------------------
+def get_throttles_wait(
+    throttles: Iterable[TokenBucketThrottle], request, view, peek: bool = False
+) -> float | None:
+    """
+    Check throttles (taking a token from each one, unless peeking)
+
+    :return: None if the request is allowed, otherwise seconds to wait (0 if unknown)
+    :rtype: float | None
+    """
+    waits = [
+        throttle.wait()
+        for throttle in throttles
+        if not (throttle.peek_request if peek else throttle.allow_request)(request, view)
+    ]
+    if not waits:
+        return None
+    return max((wait for wait in waits if wait is not None), default=0.0)
+
+
+class ThrottleBeforeAuthenticationMixin:
+    """
+    Check throttles before authentication and permissions, without taking
+    tokens, so that requests to empty buckets are rejected without loading
+    the session or the user from the database. Tokens are taken after
+    authentication and permissions (DRF's check_throttles), so requests that
+    fail them never use up the buckets of the member in the URL.
+
+    Throttles of the view must not depend on `request.user`.
+    """
+
+    def perform_authentication(self, request):
+        wait = get_throttles_wait(self.get_throttles(), request, self, peek=True)
+        if wait is not None:
+            self.throttled(request, wait or None)
+        super().perform_authentication(request)
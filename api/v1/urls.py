@@ -1,9 +1,19 @@
+from django.conf import settings
 from django.urls import include, path
 
+from api.v1.async_views import (
+    AsyncDeviceCommandListAPIView,
+    AsyncDeviceDataListAPIView,
+    AsyncDeviceDetailsAPIView,
+)
 from api.v1.views import (
+    DeviceCommandAcknowledgementAPIView,
+    DeviceCommandListAPIView,
     DeviceDataDetailsAPIView,
     DeviceDataListAPIView,
     DeviceDetailsAPIView,
+    DeviceGroupCommandDetailsAPIView,
+    DeviceGroupCommandListAPIView,
     DeviceGroupDetailsAPIView,
     DeviceGroupListAPIView,
     DeviceListAPIView,
@@ -16,15 +26,30 @@ from api.v1.views import (
 - /api/v1/member/<str:username>/
 - /api/v1/member/<str:username>/groups/
 - /api/v1/member/<str:username>/groups/<str:group_name>/
+- /api/v1/member/<str:username>/groups/<str:group_name>/commands/
+- /api/v1/member/<str:username>/groups/<str:group_name>/commands/<int:command_id>/
 - /api/v1/member/<str:username>/groups/<str:group_name>/devices/
 - /api/v1/member/<str:username>/groups/<str:group_name>/devices/<str:device_name>/
 - /api/v1/member/<str:username>/groups/<str:group_name>/devices/<str:device_name>/data/
 - /api/v1/member/<str:username>/groups/<str:group_name>/devices/<str:device_name>/data/<str:data_id>/
+- /api/v1/member/<str:username>/groups/<str:group_name>/devices/<str:device_name>/commands/
+- /api/v1/member/<str:username>/groups/<str:group_name>/devices/<str:device_name>/commands/ack/
 
 """
 
 namespace = "v1"
 
+# native async views of the device, device data and commands paths, for ASGI
+# deployments (see api.v1.async_views)
+if settings.API_ASYNC_VIEWS:
+    device_details_view = AsyncDeviceDetailsAPIView.as_view()
+    data_list_view = AsyncDeviceDataListAPIView.as_view()
+    commands_list_view = AsyncDeviceCommandListAPIView.as_view()
+else:
+    device_details_view = DeviceDetailsAPIView.as_view()
+    data_list_view = DeviceDataListAPIView.as_view()
+    commands_list_view = DeviceCommandListAPIView.as_view()
+
 members_urlpatterns = [
     # member details
     path("<str:username>/", MemberDetailsAPIView.as_view(), name="member_details"),
@@ -37,6 +62,17 @@ members_urlpatterns = [
         DeviceGroupDetailsAPIView.as_view(),
         name="group_details",
     ),
+    # group commands
+    path(
+        "<str:username>/groups/<str:group_name>/commands/",
+        DeviceGroupCommandListAPIView.as_view(),
+        name="group_commands_list",
+    ),
+    path(
+        "<str:username>/groups/<str:group_name>/commands/<int:command_id>/",
+        DeviceGroupCommandDetailsAPIView.as_view(),
+        name="group_command_details",
+    ),
     # devices
     path(
         "<str:username>/groups/<str:group_name>/devices/",
@@ -45,13 +81,13 @@ members_urlpatterns = [
     ),
     path(
         "<str:username>/groups/<str:group_name>/devices/<str:device_uid>/",
-        DeviceDetailsAPIView.as_view(),
+        device_details_view,
         name="device_details",
     ),
     # data
     path(
         "<str:username>/groups/<str:group_name>/devices/<str:device_uid>/data/",
-        DeviceDataListAPIView.as_view(),
+        data_list_view,
         name="data_list",
     ),
     path(
@@ -59,6 +95,17 @@ members_urlpatterns = [
         DeviceDataDetailsAPIView.as_view(),
         name="data_details",
     ),
+    # commands
+    path(
+        "<str:username>/groups/<str:group_name>/devices/<str:device_uid>/commands/",
+        commands_list_view,
+        name="commands_list",
+    ),
+    path(
+        "<str:username>/groups/<str:group_name>/devices/<str:device_uid>/commands/ack/",
+        DeviceCommandAcknowledgementAPIView.as_view(),
+        name="commands_ack",
+    ),
 ]
 
 
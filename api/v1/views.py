@@ -8,14 +8,31 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 
 from accounts.models import Member
+from api.v1.parsers import API_PARSER_CLASSES
+from api.v1.renderers import API_RENDERER_CLASSES
 from api.v1.serializers import (
+    DeviceCommandAcknowledgementSerializer,
+    DeviceCommandPollSerializer,
+    DeviceCommandSerializer,
     DeviceDataSerializer,
+    DeviceGroupCommandSerializer,
     DeviceGroupSerializer,
     DeviceSerializer,
     MemberSerializer,
 )
-from devices.models import Device, DeviceData, DeviceGroup
-from devices.tests import device
+from api.v1.throttling import (
+    DeviceIngestThrottle,
+    MemberIngestThrottle,
+    ThrottleBeforeAuthenticationMixin,
+)
+from common.middleware import Priority
+from devices.commands import (
+    acknowledge_commands,
+    queue_commands,
+    queue_group_command,
+    wait_for_commands,
+)
+from devices.models import Device, DeviceData, DeviceGroup, DeviceGroupCommand
 
 
 # -----------------------------------------------------------------------------
@@ -44,6 +61,14 @@ class AuthenticatedUserAPIView(views.APIView):
         IsObjectOwner,
     ]
 
+    # content negotiation, JSON by default, plus MessagePack and CBOR
+    # when their libraries are installed
+    parser_classes = API_PARSER_CLASSES
+    renderer_classes = API_RENDERER_CLASSES
+
+    # safe requests read from database replicas (see common.middleware)
+    read_from_replica = True
+
     def get_serializer_context(self):
         return dict(request=self.request)
 
@@ -76,7 +101,7 @@ class DeviceGroupListAPIView(generics.ListCreateAPIView, AuthenticatedUserAPIVie
 
     def filter_queryset(self, queryset):
         username = self.kwargs["username"]
-        query_filters = Q(owner__username__iexact=username)
+        query_filters = Q(owner__username=username)
         return queryset.filter(query_filters)
 
     def get_object(self):
@@ -119,7 +144,7 @@ class DeviceGroupDetailsAPIView(generics.RetrieveUpdateDestroyAPIView, Authentic
     def get_object(self):
         username = self.kwargs["username"]
         group_name = self.kwargs["group_name"]
-        query_filters = Q(name__iexact=group_name) & Q(owner__username__iexact=username)
+        query_filters = Q(name=group_name) & Q(owner__username=username)
         return get_object_or_404(DeviceGroup, query_filters)
 
     # def get_object(self, username: str, group_name: str) -> DeviceGroup:
@@ -179,12 +204,12 @@ class DeviceListAPIView(generics.ListCreateAPIView, AuthenticatedUserAPIView):
     """
     
     serializer_class = DeviceSerializer
-    queryset = Device.objects.all()
+    queryset = Device.objects.select_related("heartbeat")
     
     def filter_queryset(self, queryset):
         username = self.kwargs["username"]
         group_name = self.kwargs["group_name"]
-        query_filters = Q(group__owner__username__iexact=username) & Q(group__name__iexact=group_name)
+        query_filters = Q(group__owner__username=username) & Q(group__name=group_name)
         return queryset.filter(query_filters)
     
     def perform_create(self, serializer):
@@ -231,7 +256,7 @@ class DeviceDetailsAPIView(generics.RetrieveUpdateDestroyAPIView, AuthenticatedU
         group_name = self.kwargs["group_name"]
         device_uid = self.kwargs["device_uid"]
         query_filters = Q(uid=device_uid) & Q(group__name=group_name) & Q(group__owner__username=username)
-        return get_object_or_404(Device, query_filters)
+        return get_object_or_404(Device.objects.select_related("heartbeat"), query_filters)
 
     def perform_update(self, serializer):
         username = self.kwargs["username"]
@@ -315,13 +340,20 @@ class DeviceDetailsAPIView(generics.RetrieveUpdateDestroyAPIView, AuthenticatedU
 # -----------------------------------------------------------------------------
 # Device Data
 # -----------------------------------------------------------------------------
-class DeviceDataListAPIView(generics.ListCreateAPIView, AuthenticatedUserAPIView):
+class DeviceDataListAPIView(
+    ThrottleBeforeAuthenticationMixin,
+    generics.ListCreateAPIView,
+    AuthenticatedUserAPIView,
+):
     """
     List all device's data, or create new data
     """
 
     serializer_class = DeviceDataSerializer
     queryset = DeviceData.objects.all()
+    throttle_classes = [DeviceIngestThrottle, MemberIngestThrottle]
+    # history reads are shed under load, ingestion never is
+    load_shedding_priority = {"GET": Priority.LOW, "POST": Priority.CRITICAL}
     
     def filter_queryset(self, queryset):
         username = self.kwargs["username"]
@@ -333,11 +365,14 @@ class DeviceDataListAPIView(generics.ListCreateAPIView, AuthenticatedUserAPIView
             & Q(group__owner__username=username)
         )
         device = get_object_or_404(Device, query_filters)
-        return queryset.filter(device=device)
+        # hyperlinked fields need device's group and owner for every row,
+        # prefetched, as device data may be in another database
+        return queryset.filter(device=device).prefetch_related("device__group__owner")
 
     def perform_create(self, serializer):
         device_uid = self.kwargs["device_uid"]
-        device = get_object_or_404(Device, uid=device_uid)
+        # device's group is needed to set the data's owner
+        device = get_object_or_404(Device.objects.select_related("group"), uid=device_uid)
         serializer.save(device=device)
 
 #    def get(
@@ -394,13 +429,14 @@ class DeviceDataDetailsAPIView(generics.RetrieveUpdateDestroyAPIView, Authentica
         group_name = self.kwargs["group_name"]
         device_uid = self.kwargs["device_uid"]
         data_id = self.kwargs["data_id"]
-        query_filters = (
-            Q(device__uid=device_uid)
-            & Q(device__group__name__iexact=group_name)
-            & Q(device__group__owner__username__iexact=username)
-            & Q(id=data_id)
+        # device data may be in another database, find the device first
+        device_filters = (
+            Q(uid=device_uid)
+            & Q(group__name=group_name)
+            & Q(group__owner__username=username)
         )
-        return get_object_or_404(DeviceData, query_filters)
+        device = get_object_or_404(Device.objects.select_related("group__owner"), device_filters)
+        return get_object_or_404(DeviceData, Q(device=device) & Q(id=data_id))
 
 
     # def get_object(
@@ -482,3 +518,102 @@ class DeviceDataDetailsAPIView(generics.RetrieveUpdateDestroyAPIView, Authentica
     #     device_data = self.get_object(username, group_name, device_uid, data_id)
     #     device_data.delete()
     #     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# -----------------------------------------------------------------------------
+# Device Commands
+# -----------------------------------------------------------------------------
+class DeviceCommandListAPIView(AuthenticatedUserAPIView):
+    """
+    Wait for device's commands (long polling), or queue a new command
+    """
+
+    # delivering commands writes their status
+    read_from_replica = False
+    # requests are held until a command is queued, their latency is not load
+    load_shedding_priority = Priority.CRITICAL
+
+    def get_device(self) -> Device:
+        username = self.kwargs["username"]
+        group_name = self.kwargs["group_name"]
+        device_uid = self.kwargs["device_uid"]
+        query_filters = Q(uid=device_uid) & Q(group__name=group_name) & Q(group__owner__username=username)
+        return get_object_or_404(Device, query_filters)
+
+    def get(self, request: Request, username: str, group_name: str, device_uid: str) -> Response:
+        """Device's unacknowledged commands, held until one is queued or the timeout expires"""
+        params = DeviceCommandPollSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        device = self.get_device()
+        commands = wait_for_commands(device.id, **params.validated_data)
+        serializer = DeviceCommandSerializer(instance=commands, many=True)
+        return Response(data=serializer.data)
+
+    def post(self, request: Request, username: str, group_name: str, device_uid: str) -> Response:
+        """Queue a command for the device"""
+        serializer = DeviceCommandSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        device = self.get_device()
+        serializer.instance = queue_commands([device], **serializer.validated_data)[0]
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+
+class DeviceCommandAcknowledgementAPIView(AuthenticatedUserAPIView):
+    """
+    Acknowledge device's commands, in batches
+    """
+
+    read_from_replica = False
+    load_shedding_priority = Priority.CRITICAL
+
+    def post(self, request: Request, username: str, group_name: str, device_uid: str) -> Response:
+        serializer = DeviceCommandAcknowledgementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        query_filters = Q(uid=device_uid) & Q(group__name=group_name) & Q(group__owner__username=username)
+        device = get_object_or_404(Device, query_filters)
+        acknowledged = acknowledge_commands(device.id, serializer.validated_data["ids"])
+        return Response(data=dict(acknowledged=acknowledged))
+
+
+class DeviceGroupCommandListAPIView(AuthenticatedUserAPIView):
+    """
+    List group's commands, and their acknowledgement state, or queue a
+    command for all the group's active devices
+    """
+
+    load_shedding_priority = {"GET": Priority.NORMAL, "POST": Priority.CRITICAL}
+
+    def get_group(self) -> DeviceGroup:
+        query_filters = Q(name=self.kwargs["group_name"]) & Q(owner__username=self.kwargs["username"])
+        return get_object_or_404(DeviceGroup, query_filters)
+
+    def get(self, request: Request, username: str, group_name: str) -> Response:
+        """Group's commands, newest first, with their devices' commands counts, in one query"""
+        group = self.get_group()
+        group_commands = DeviceGroupCommand.objects.filter(group=group).with_counts().order_by("-id")
+        serializer = DeviceGroupCommandSerializer(instance=group_commands, many=True)
+        return Response(data=serializer.data)
+
+    def post(self, request: Request, username: str, group_name: str) -> Response:
+        """Queue a command for the group's devices, in a constant number of queries"""
+        serializer = DeviceGroupCommandSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        group = self.get_group()
+        serializer.instance = queue_group_command(group, **serializer.validated_data)
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+
+class DeviceGroupCommandDetailsAPIView(AuthenticatedUserAPIView):
+    """
+    Group command's acknowledgement state
+    """
+
+    def get(self, request: Request, username: str, group_name: str, command_id: int) -> Response:
+        query_filters = (
+            Q(pk=command_id)
+            & Q(group__name=group_name)
+            & Q(group__owner__username=username)
+        )
+        group_command = get_object_or_404(DeviceGroupCommand.objects.with_counts(), query_filters)
+        serializer = DeviceGroupCommandSerializer(instance=group_command)
+        return Response(data=serializer.data)
@@ -0,0 +1,8 @@
+"""
+Micro benchmarks for SIA hot paths.
+
+Each module is a standalone script, run it from the project root:
+
+    python -m benchmarks.<module_name>
+
+"""
@@ -0,0 +1,90 @@
+"""
+Compare payload size and encode/decode time of the v1 API formats
+(JSON, MessagePack and CBOR) for batches of serialized DeviceData.
+
+Usage:
+
+    python -m benchmarks.bench_api_codecs [batch_size ...]
+
+"""
+
+import io
+import sys
+import uuid
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django
+
+setup_django()
+
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.v1.parsers import BINARY_PARSER_CLASSES
+
+DEFAULT_BATCH_SIZES: Final[List[int]] = [1, 100, 1000]
+
+
+def make_device_data_batch(size: int) -> List[Dict[str, Any]]:
+    """Build a list of dicts shaped like DeviceDataSerializer output"""
+    device_uid = str(uuid.uuid4())
+    device_url = (
+        "http://testserver/api/v1/members/member/groups/group/devices/"
+        f"{device_uid}/"
+    )
+    now = timezone.now()
+    return [
+        {
+            "url": f"{device_url}data/{index}/",
+            "id": index,
+            "message": {
+                "temperature": 20.5 + index % 10,
+                "moisture": 40 + index % 30,
+                "salts": 0.125,
+                "water_level": index % 100,
+                "valve_open": bool(index % 2),
+            },
+            "date": (now - timezone.timedelta(seconds=index)).isoformat(),
+            "device": device_url,
+        }
+        for index in range(size)
+    ]
+
+
+def main(batch_sizes: Sequence[int]) -> None:
+    codecs = [(JSONRenderer, JSONParser)] + [
+        (parser_class.renderer_class, parser_class)
+        for parser_class in BINARY_PARSER_CLASSES
+    ]
+    rows = []
+    for size in batch_sizes:
+        batch = make_device_data_batch(size)
+        number = max(1, 1000 // size)
+        json_size = None
+        for renderer_class, parser_class in codecs:
+            renderer, parser = renderer_class(), parser_class()
+            payload = renderer.render(batch)
+            json_size = json_size or len(payload)
+            render_time = measure(lambda: renderer.render(batch), number=number)
+            parse_time = measure(
+                lambda: parser.parse(io.BytesIO(payload)), number=number
+            )
+            rows.append(
+                (
+                    size,
+                    renderer.format,
+                    len(payload),
+                    f"{len(payload) / json_size:.2f}",
+                    f"{render_time * 1e6:.1f}",
+                    f"{parse_time * 1e6:.1f}",
+                )
+            )
+
+    print_table(
+        ("batch", "format", "bytes", "vs json", "render (us)", "parse (us)"), rows
+    )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_BATCH_SIZES)
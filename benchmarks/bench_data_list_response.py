@@ -0,0 +1,101 @@
+"""
+Time a v1 `data_list` response with 10k DeviceData rows, rendered with
+DRF's JSONRenderer and with FastJSONRenderer (orjson when installed).
+
+Usage:
+
+    python -m benchmarks.bench_data_list_response [rows]
+
+"""
+
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import Member
+from api.v1.renderers import FastJSONRenderer
+from api.v1.views import DeviceDataListAPIView
+from devices.models import Device, DeviceData
+
+DEFAULT_ROWS: Final[int] = 10_000
+
+
+def create_device_data(rows: int) -> Tuple[Member, Device]:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    device = group.device_set.create(
+        name="bench_device", uid=Device.generate_device_uid("bench_device")
+    )
+    now = timezone.now()
+    DeviceData.objects.bulk_create(
+        DeviceData(
+            device=device,
+            date=now - timezone.timedelta(seconds=index),
+            message={
+                "temperature": 20.5 + index % 10,
+                "moisture": 40 + index % 30,
+                "valves": [bool(index % 2), bool(index % 3)],
+            },
+        )
+        for index in range(rows)
+    )
+    return member, device
+
+
+def main(rows: int) -> None:
+    member, device = create_device_data(rows)
+    url = reverse(
+        "api:v1:data_list",
+        kwargs=dict(
+            username=member.username,
+            group_name=device.group.name,
+            device_uid=device.uid,
+        ),
+    )
+    factory = APIRequestFactory()
+
+    def make_request(view):
+        request = factory.get(url, HTTP_ACCEPT="application/json")
+        force_authenticate(request, user=member)
+        response = view(
+            request,
+            username=member.username,
+            group_name=device.group.name,
+            device_uid=str(device.uid),
+        )
+        return response
+
+    table = []
+    for renderer_class in (JSONRenderer, FastJSONRenderer):
+        view = DeviceDataListAPIView.as_view(renderer_classes=[renderer_class])
+        response = make_request(view)
+        response.render()
+        data = response.data
+        renderer = renderer_class()
+
+        request_time = measure(lambda: make_request(view).render(), number=1, repeat=3)
+        render_time = measure(lambda: renderer.render(data), number=1, repeat=5)
+        table.append(
+            (
+                renderer_class.__name__,
+                rows,
+                len(response.content),
+                f"{request_time * 1e3:.1f}",
+                f"{render_time * 1e3:.1f}",
+            )
+        )
+
+    print_table(("renderer", "rows", "bytes", "request (ms)", "render (ms)"), table)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
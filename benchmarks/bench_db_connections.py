@@ -0,0 +1,103 @@
+"""
+Time the database connection overhead of a request: connect (or reuse a
+connection), run one query, then close (or keep) the connection, like
+django does at the start and end of each request. Requests are served by
+the same thread (sync workers), or by a new thread each (threaded/async
+workers), on a SQLite file database with production pragmas.
+
+    - reconnect: CONN_MAX_AGE=0, a new connection per request
+    - persistent: CONN_MAX_AGE=600, one connection per thread
+    - pooled: CONN_MAX_AGE=0, DATABASE_POOL_SIZE=4
+
+Usage:
+
+    python -m benchmarks.bench_db_connections [requests]
+
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django
+
+setup_django()
+
+from django.db.utils import ConnectionHandler
+from django.test.utils import override_settings
+
+from common.db.pool import close_pools
+
+DEFAULT_REQUESTS: Final[int] = 1000
+
+SQLITE_PRAGMAS: Final[Dict[str, str]] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "temp_store": "MEMORY",
+}
+
+MODES: Final[Dict[str, Dict[str, Any]]] = {
+    "reconnect": dict(conn_max_age=0, pool_size=0),
+    "persistent": dict(conn_max_age=600, pool_size=0),
+    "pooled": dict(conn_max_age=0, pool_size=4),
+}
+
+
+def serve_request(connections: ConnectionHandler) -> None:
+    connection = connections["default"]
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    connection.close_if_unusable_or_obsolete()
+
+
+def serve_request_in_new_thread(connections: ConnectionHandler) -> None:
+    thread = threading.Thread(target=serve_request, args=(connections,))
+    thread.start()
+    thread.join()
+
+
+def main(requests: int) -> None:
+    directory = tempfile.mkdtemp()
+    table = []
+    try:
+        for mode, options in MODES.items():
+            connections = ConnectionHandler(
+                {
+                    "default": {
+                        "ENGINE": "common.db.backends.sqlite3",
+                        "NAME": str(Path(directory) / "bench.sqlite3"),
+                        "CONN_MAX_AGE": options["conn_max_age"],
+                    }
+                }
+            )
+            with override_settings(
+                SQLITE_PRAGMAS=SQLITE_PRAGMAS,
+                DATABASE_POOL_SIZE=options["pool_size"],
+            ):
+                same_thread = measure(
+                    lambda: serve_request(connections), number=requests, repeat=3
+                )
+                new_thread = measure(
+                    lambda: serve_request_in_new_thread(connections),
+                    number=requests // 10,
+                    repeat=3,
+                )
+                close_pools()
+            connections.close_all()
+            table.append(
+                (mode, f"{same_thread * 1e6:.1f}", f"{new_thread * 1e6:.1f}")
+            )
+    finally:
+        shutil.rmtree(directory)
+
+    print_table(("mode", "same thread (us)", "new thread (us)"), table)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS)
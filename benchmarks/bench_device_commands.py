@@ -0,0 +1,95 @@
+"""
+Time devices waiting for commands: polling the commands endpoint every
+second, against long polling (devices.commands), where an idle device makes
+a request every `DEVICE_COMMANDS_POLL_TIMEOUT` seconds, and a queued command
+wakes its waiting request. And time the delivery of a queued command to a
+waiting request (the mean delay of 1 second polling is half a second).
+
+Usage:
+
+    python -m benchmarks.bench_device_commands [devices] [commands]
+
+"""
+
+import sys
+import threading
+import time
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import Member
+from devices.commands import get_command_notifier, queue_commands, wait_for_commands
+from devices.models import Device
+
+DEFAULT_DEVICES: Final[int] = 1000
+DEFAULT_COMMANDS: Final[int] = 50
+
+
+def main(devices: int, commands: int) -> None:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    device = Device.objects.create(name="bench_device", uid=Device.generate_device_uid("bench_device"), group=group)
+    client = APIClient()
+    client.force_login(member)
+    url = reverse(
+        "api:v1:commands_list",
+        kwargs=dict(username=member.username, group_name=group.name, device_uid=device.uid),
+    )
+
+    # an empty poll, the request an idle device makes
+    with override_settings(LOAD_SHEDDING_ENABLED=False):
+        empty_poll = measure(lambda: client.get(url, data=dict(timeout=0)), number=50)
+    polls_per_minute = {
+        "1s polling": 60,
+        "long polling": 60 / settings.DEVICE_COMMANDS_POLL_TIMEOUT,
+    }
+    print_table(
+        ("idle devices", "requests per minute", "server time per minute (s)"),
+        [
+            (f"{devices} ({name})", f"{devices * polls:.0f}", f"{devices * polls * empty_poll:.2f}")
+            for name, polls in polls_per_minute.items()
+        ],
+    )
+
+    # delivery of queued commands to a waiting request
+    delays = []
+    received = []
+    after = None
+    for _ in range(commands):
+        waiting = threading.Thread(
+            target=lambda: received.extend(wait_for_commands(device.id, after=after, timeout=5))
+        )
+        waiting.start()
+        while get_command_notifier().waiting(device.id) == 0:
+            time.sleep(0.001)
+        queued = time.perf_counter()
+        command = queue_commands([device], "open_valve")[0]
+        waiting.join()
+        delays.append(time.perf_counter() - queued)
+        after = command.id
+    connection.close()
+    delays.sort()
+    print_table(
+        ("delivery", "median (ms)", "max (ms)"),
+        [
+            ("1s polling (expected)", "500.00", "1000.00"),
+            ("long polling", f"{delays[len(delays) // 2] * 1e3:.2f}", f"{delays[-1] * 1e3:.2f}"),
+        ],
+    )
+    assert len(received) == commands
+
+
+if __name__ == "__main__":
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEVICES
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COMMANDS
+    main(devices, commands)
@@ -0,0 +1,88 @@
+"""
+Time the deletion of a device with many data rows: the device deletion
+itself (what the delete views wait for, the data purge is only scheduled),
+and the purge of its data in batches (devices.purge), against a single
+`DELETE` of all its data (the former post_delete handler).
+
+Usage:
+
+    python -m benchmarks.bench_device_delete [rows]
+
+"""
+
+import sys
+import time
+from typing import *
+
+from benchmarks.utils import print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.conf import settings
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import Member
+from devices.models import Device, DeviceData, DeviceDataPurge
+from devices.purge import purge_device_data
+
+DEFAULT_ROWS: Final[int] = 200_000
+
+
+def create_device(member: Member, name: str, rows: int) -> Device:
+    group = member.devicegroup_set.create(name=name)
+    device = group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+    now = timezone.now()
+    DeviceData.objects.bulk_create(
+        (
+            DeviceData(
+                device=device,
+                date=now - timezone.timedelta(seconds=index),
+                message={"temperature": 20 + index % 10},
+            )
+            for index in range(rows)
+        ),
+        batch_size=5000,
+    )
+    return device
+
+
+def timed(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(rows: int) -> None:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+
+    # former post_delete handler: one DELETE of all the data, in the request
+    device = create_device(member, "single_delete", rows)
+    single = timed(lambda: DeviceData.objects.filter(device_id=device.pk).delete())
+    single_request = single + timed(device.delete)
+
+    device = create_device(member, "purged_delete", rows)
+    purged_device_id = device.pk
+    with override_settings(DEVICE_DATA_PURGE_IN_BACKGROUND=False):
+        purged_request = timed(device.delete)
+    purge = DeviceDataPurge.objects.get(device_id=purged_device_id)
+    purging = timed(lambda: purge_device_data(purge, pause=0))
+    batches = -(-rows // settings.DEVICE_DATA_PURGE_BATCH_SIZE)
+
+    print_table(
+        ("strategy", "request (ms)", "data delete (ms)", "longest transaction (ms)"),
+        [
+            ("single DELETE", f"{single_request * 1e3:.1f}", f"{single * 1e3:.1f}", f"{single * 1e3:.1f}"),
+            (
+                "batched purge",
+                f"{purged_request * 1e3:.1f}",
+                f"{purging * 1e3:.1f}",
+                f"~{purging / batches * 1e3:.1f}",
+            ),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
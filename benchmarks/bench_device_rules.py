@@ -0,0 +1,111 @@
+"""
+Time the evaluation of device rules on received data (devices.rules): with
+the in-memory index, each reading is compared to the rules of its own keys,
+against comparing every rule to every reading. And time loading the index,
+and the whole ingestion of a reading, with and without rules.
+
+Usage:
+
+    python -m benchmarks.bench_device_rules [rules] [readings per second]
+
+"""
+
+import random
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from accounts.models import Member
+from devices.models import Device, DeviceData, DeviceRule
+from devices.rules import OPERATORS, RuleIndex, get_rule_index
+
+DEFAULT_RULES: Final[int] = 10_000
+DEFAULT_RATE: Final[int] = 1000
+# rules per device, over its message keys
+RULES_PER_DEVICE: Final[int] = 10
+KEYS: Final[Tuple[str, ...]] = ("moisture", "temperature", "salinity", "water_level", "battery")
+
+
+def main(rules: int, rate: int) -> None:
+    random.seed(0)
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    devices = Device.objects.bulk_create(
+        Device(name=f"device_{index}", uid=Device.generate_device_uid(f"device_{index}"), group=group)
+        for index in range(max(1, rules // RULES_PER_DEVICE))
+    )
+    # whole ingestion of a reading, evaluation included (no transitions)
+    device = devices[0]
+    quiet = {key: 1000.0 for key in KEYS}
+
+    def ingest() -> None:
+        DeviceData.objects.create(device=device, message=quiet)
+
+    without_rules = measure(ingest, number=200)
+
+    DeviceRule.objects.bulk_create(
+        DeviceRule(
+            name=f"rule_{index}",
+            device=devices[index % len(devices)],
+            key=KEYS[index % len(KEYS)],
+            operator=random.choice(list(OPERATORS)),
+            threshold=random.uniform(0, 100),
+            hysteresis=2.0,
+            command="toggle",
+        )
+        for index in range(rules)
+    )
+    readings = [
+        (random.choice(devices).pk, {key: random.uniform(0, 100) for key in KEYS})
+        for _ in range(1000)
+    ]
+
+    index = RuleIndex(refresh_interval=3600)
+    load = measure(lambda: (index.clear(), index.evaluate([], 0.0)), number=3, repeat=3)
+
+    def indexed() -> None:
+        index.evaluate(readings, 0.0)
+
+    all_rules = list(
+        DeviceRule.objects.values_list("device_id", "key", "operator", "threshold")
+    )
+
+    def every_rule() -> None:
+        for device_id, message in readings:
+            for rule_device_id, key, op, threshold in all_rules:
+                if rule_device_id == device_id and key in message:
+                    OPERATORS[op](message[key], threshold)
+
+    per_reading = {
+        "rule index": measure(indexed, number=5) / len(readings),
+        "every rule": measure(every_rule, number=1, repeat=3) / len(readings),
+    }
+    print(f"{rules} rules, index loaded in {load * 1e3:.1f} ms")
+    print_table(
+        ("evaluation", "per reading (us)", "max readings/s", f"CPU at {rate} readings/s"),
+        [
+            (name, f"{seconds * 1e6:.2f}", f"{1 / seconds:.0f}", f"{rate * seconds:.1%}")
+            for name, seconds in per_reading.items()
+        ],
+    )
+
+    DeviceRule.objects.filter(device=device).update(operator=DeviceRule.Operator.LT, threshold=-1)
+    get_rule_index().clear()
+    with_rules = measure(ingest, number=200)
+    print_table(
+        ("ingestion", "per reading (ms)"),
+        [
+            (f"{rules} rules", f"{with_rules * 1e3:.3f}"),
+            ("no rules", f"{without_rules * 1e3:.3f}"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    rules = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RULES
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RATE
+    main(rules, rate)
@@ -0,0 +1,131 @@
+"""
+Time the device scheduler (devices.schedules): the daily cost of keeping the
+next run times in a heap, waking at the earliest one and loading changed
+schedules every refresh interval, against scanning the schedules table every
+minute. And time a group schedule's run (its commands fan out to the group's
+devices).
+
+Usage:
+
+    python -m benchmarks.bench_device_schedules [schedules] [devices per group]
+
+"""
+
+import random
+import sys
+from datetime import timedelta
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Member
+from devices.cron import CronExpression
+from devices.models import Device, DeviceCommand, DeviceSchedule
+from devices.schedules import Scheduler
+
+DEFAULT_SCHEDULES: Final[int] = 10_000
+DEFAULT_GROUP_DEVICES: Final[int] = 10
+# schedules per group (zones' programs)
+GROUP_SCHEDULES: Final[int] = 4
+MINUTES_PER_DAY: Final[int] = 24 * 60
+
+
+class Rollback(Exception):
+    pass
+
+
+def main(schedules: int, group_devices: int) -> None:
+    random.seed(0)
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    groups = [
+        member.devicegroup_set.create(name=f"group_{index}")
+        for index in range(max(1, schedules // GROUP_SCHEDULES))
+    ]
+    Device.objects.bulk_create(
+        Device(name=f"device_{index}", uid=Device.generate_device_uid(f"{group.pk}_{index}"), group=group)
+        for group in groups
+        for index in range(group_devices)
+    )
+    now = timezone.now()
+    crons = [f"{random.randrange(60)} {random.randrange(24)} * * *" for _ in range(schedules)]
+    DeviceSchedule.objects.bulk_create(
+        DeviceSchedule(
+            name=f"schedule_{index}",
+            group=groups[index % len(groups)],
+            cron=cron,
+            command="open_valve",
+            next_run_at=CronExpression(cron).next_after(now),
+        )
+        for index, cron in enumerate(crons)
+    )
+    # saved earlier (steady state: the scheduler loads recent saves only)
+    DeviceSchedule.objects.update(updated=now - timedelta(hours=1))
+
+    # scanning: every minute, every active schedule is compared to the time
+    def scan() -> List[int]:
+        scan_now = timezone.now()
+        return [
+            schedule_id
+            for schedule_id, next_run_at in DeviceSchedule.objects.filter(is_active=True).values_list(
+                "pk", "next_run_at"
+            )
+            if next_run_at <= scan_now
+        ]
+
+    scan_time = measure(scan, number=3, repeat=3)
+
+    scheduler = Scheduler(refresh_interval=settings.DEVICE_SCHEDULES_REFRESH_INTERVAL)
+    load_time = measure(lambda: Scheduler().load(), number=1, repeat=3)
+    scheduler.load()
+    refresh_time = measure(scheduler.load, number=50)
+
+    # a run of a group schedule, rolled back
+    run_at = min(DeviceSchedule.objects.values_list("next_run_at", flat=True))
+    schedule_id = DeviceSchedule.objects.filter(next_run_at=run_at).values_list("pk", flat=True)[0]
+
+    def run() -> None:
+        try:
+            with transaction.atomic():
+                scheduler.fire(schedule_id, run_at, run_at)
+                raise Rollback
+        except Rollback:
+            pass
+
+    run_time = measure(run, number=20)
+    assert not DeviceCommand.objects.exists()
+
+    refreshes = int(24 * 3600 / scheduler.refresh_interval)
+    # each schedule runs daily
+    runs = schedules
+    daily = {
+        "scan every minute": (scan_time, MINUTES_PER_DAY, MINUTES_PER_DAY * scan_time),
+        "heap + refresh": (refresh_time, refreshes, refreshes * refresh_time + load_time),
+    }
+    print(
+        f"{schedules} schedules, {len(groups)} groups of {group_devices} devices, "
+        f"loaded in {load_time * 1e3:.1f} ms"
+    )
+    print_table(
+        ("scheduler (no runs)", "per wake (ms)", "wakes/day", "seconds/day"),
+        [
+            (name, f"{per_wake * 1e3:.3f}", f"{wakes}", f"{total:.2f}")
+            for name, (per_wake, wakes, total) in daily.items()
+        ],
+    )
+    print_table(
+        ("runs", "per run (ms)", "runs/day", "seconds/day"),
+        [(f"group of {group_devices} devices", f"{run_time * 1e3:.3f}", f"{runs}", f"{runs * run_time:.2f}")],
+    )
+
+
+if __name__ == "__main__":
+    schedules = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SCHEDULES
+    group_devices = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_GROUP_DEVICES
+    main(schedules, group_devices)
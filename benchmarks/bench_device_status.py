@@ -0,0 +1,94 @@
+"""
+Time the online status of a member's devices: from their heartbeats
+(devices.heartbeats, one row per device, joined to the devices list), and
+from the newest data of each device (`Max("devicedata__date")`), the former
+way to tell silent devices, as the data history grows. And time recording
+reports in memory, against writing a heartbeat per report.
+
+Usage:
+
+    python -m benchmarks.bench_device_status [devices] [rows per device]
+
+"""
+
+import sys
+from datetime import timedelta
+from typing import *
+from unittest import mock
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import Member
+from devices.heartbeats import HeartbeatTracker, flush_heartbeats
+from devices.models import Device, DeviceData
+
+DEFAULT_DEVICES: Final[int] = 100
+DEFAULT_ROWS: Final[int] = 1000
+
+
+def main(devices: int, rows: int) -> None:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    Device.objects.bulk_create(
+        Device(name=f"device_{index}", uid=Device.generate_device_uid(f"device_{index}"), group=group)
+        for index in range(devices)
+    )
+    device_ids = list(Device.objects.values_list("pk", flat=True))
+    now = timezone.now()
+    flush_heartbeats({device_id: now for device_id in device_ids})
+
+    def by_heartbeats() -> List[bool]:
+        return [device.is_online for device in Device.objects.filter(group__owner=member).select_related("heartbeat")]
+
+    def by_newest_data() -> List[bool]:
+        deadline = timezone.now() - timedelta(minutes=5)
+        return [
+            device.newest is not None and device.newest > deadline
+            for device in Device.objects.filter(group__owner=member).annotate(newest=Max("devicedata__date"))
+        ]
+
+    table = []
+    loaded = 0
+    for history in (0, rows // 10, rows):
+        DeviceData.objects.bulk_create(
+            (
+                DeviceData(device_id=device_id, date=now, message={"value": index})
+                for device_id in device_ids
+                for index in range(history - loaded)
+            ),
+            batch_size=5000,
+        )
+        loaded = history
+        table.append(
+            (
+                history,
+                f"{measure(by_heartbeats, number=20) * 1e3:.2f}",
+                f"{measure(by_newest_data, number=5) * 1e3:.2f}",
+            )
+        )
+    print_table(("rows per device", "heartbeats (ms)", "newest data (ms)"), table)
+
+    write_through = HeartbeatTracker(flush_interval=0)
+    in_memory = HeartbeatTracker(flush_interval=3600)
+    # the flusher thread isn't run, reports stay in memory
+    with mock.patch.object(HeartbeatTracker, "_run_flusher"):
+        print_table(
+            ("report", "time (µs)"),
+            [
+                ("heartbeat written per report", f"{measure(lambda: write_through.record([device_ids[0]]), number=200) * 1e6:.0f}"),
+                ("recorded in memory", f"{measure(lambda: in_memory.record([device_ids[0]]), number=200) * 1e6:.1f}"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEVICES,
+        int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ROWS,
+    )
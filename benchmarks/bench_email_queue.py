@@ -0,0 +1,93 @@
+"""
+Time the password reset request (the view sending the reset email) against
+a slow SMTP server stand-in (connection and message delays): with the SMTP
+backend, connecting and sending in the request, and with the queued backend
+(jobs.mail), queueing the email only. Then time the delivery of queued
+emails by a worker, over one connection per batch, against one connection
+per email.
+
+Usage:
+
+    python -m benchmarks.bench_email_queue [emails]
+
+"""
+
+import sys
+import time
+from typing import *
+from unittest import mock
+
+from benchmarks.utils import print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.core.mail import send_mass_mail
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.models import Member
+from jobs.mail import send_queued_emails
+from jobs.models import QueuedEmail
+
+DEFAULT_EMAILS: Final[int] = 50
+
+# SMTP server stand-in delays (seconds)
+CONNECT_DELAY: Final[float] = 0.05
+SEND_DELAY: Final[float] = 0.005
+
+SMTP_BACKEND: Final[str] = "django.core.mail.backends.smtp.EmailBackend"
+
+
+class SlowSMTP:
+    """smtplib.SMTP stand-in, slow to connect and to send"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        time.sleep(CONNECT_DELAY)
+
+    def sendmail(self, *args: Any, **kwargs: Any) -> Dict:
+        time.sleep(SEND_DELAY)
+        return {}
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        return lambda *args, **kwargs: None
+
+
+def timed(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(emails: int) -> None:
+    Member.objects.create_user(username="bench_member", password="bench", email="member@example.com")
+    client = Client()
+    url = reverse("accounts:password_reset")
+    reset = lambda: client.post(url, data=dict(email="member@example.com"))
+    messages = [("subject", "body", "sia@example.com", [f"member_{index}@example.com"]) for index in range(emails)]
+
+    with mock.patch("smtplib.SMTP", SlowSMTP), override_settings(EMAIL_QUEUE_BACKEND=SMTP_BACKEND):
+        with override_settings(EMAIL_BACKEND=SMTP_BACKEND):
+            smtp_request = timed(reset)
+        with override_settings(EMAIL_BACKEND="jobs.mail.QueuedEmailBackend"):
+            queued_request = timed(reset)
+            QueuedEmail.objects.all().delete()
+
+            send_mass_mail(messages)
+            batched = timed(lambda: send_queued_emails(batch_size=emails))
+            send_mass_mail(messages)
+            per_email = timed(lambda: send_queued_emails(batch_size=1))
+
+    print_table(
+        ("password reset request", "time (ms)"),
+        [("SMTP backend", f"{smtp_request * 1e3:.1f}"), ("queued backend", f"{queued_request * 1e3:.1f}")],
+    )
+    print_table(
+        ("queued delivery", f"{emails} emails (ms)"),
+        [("one connection per batch", f"{batched * 1e3:.1f}"), ("one connection per email", f"{per_email * 1e3:.1f}")],
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_EMAILS)
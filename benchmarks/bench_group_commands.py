@@ -0,0 +1,60 @@
+"""
+Time queuing a command for all the devices of a group (devices.commands):
+one group command, the group's devices in one query and their commands in
+one insert, against a query and an insert per device. And count their
+queries.
+
+Usage:
+
+    python -m benchmarks.bench_group_commands [devices]
+
+"""
+
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Member
+from devices.commands import queue_commands, queue_group_command
+from devices.models import Device, DeviceGroup
+
+DEFAULT_DEVICES: Final[int] = 500
+
+
+def queue_per_device(group: DeviceGroup) -> None:
+    """The naive fan-out: a command per device, each one queued on its own"""
+    with transaction.atomic():
+        for device in group.device_set.filter(is_active=True):
+            queue_commands([device], "open_valve")
+
+
+def main(devices: int) -> None:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    Device.objects.bulk_create(
+        Device(name=f"device_{index}", uid=Device.generate_device_uid(f"device_{index}"), group=group)
+        for index in range(devices)
+    )
+    fan_outs = {
+        "group command": lambda: queue_group_command(group, "open_valve"),
+        "per device": lambda: queue_per_device(group),
+    }
+    rows = []
+    for name, fan_out in fan_outs.items():
+        with CaptureQueriesContext(connection) as queries:
+            fan_out()
+        seconds = measure(fan_out, number=5, repeat=3)
+        rows.append((name, f"{seconds * 1e3:.2f}", len(queries)))
+    print(f"group of {devices} devices")
+    print_table(("fan-out", "per command (ms)", "queries"), rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEVICES)
@@ -0,0 +1,112 @@
+"""
+Time the rendering of the hot pages (device list, data list and data
+history) with their django templates and with their Jinja2 templates, side
+by side, on large pages (hundreds of rows, with nested JSON messages).
+Both engines use the production settings (sia.settings_production, compiled
+templates cached, no debug information).
+
+Usage:
+
+    python -m benchmarks.bench_jinja2_render [rows]
+
+"""
+
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.core.paginator import Paginator
+from django.template import engines
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import Member
+from devices.forms import DeviceSearchForm
+from devices.models import Device, DeviceData
+from sia import settings_production
+
+DEFAULT_ROWS: Final[int] = 500
+
+TEMPLATE_NAMES: Final[Tuple[str, ...]] = (
+    "devices/device/list.html",
+    "devices/data/list.html",
+    "devices/device/data_history.html",
+)
+
+
+def create_pages_data(rows: int) -> Tuple[Member, List[Device], List[DeviceData]]:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    devices = Device.objects.bulk_create(
+        Device(
+            name=f"bench_device_{index}",
+            uid=Device.generate_device_uid(f"bench_device_{index}"),
+            group=group,
+        )
+        for index in range(rows)
+    )
+    now = timezone.now()
+    device_data = [
+        DeviceData(
+            device=devices[index % len(devices)],
+            date=now - timezone.timedelta(seconds=index),
+            message={
+                "temperature": 20.5 + index % 10,
+                "moisture": {"top": 40 + index % 30, "bottom": 55 + index % 20},
+                "valves": [bool(index % 2), bool(index % 3), bool(index % 5)],
+                "battery": {"level": index % 100, "charging": bool(index % 7)},
+            },
+        )
+        for index in range(rows)
+    ]
+    return member, devices, device_data
+
+
+def main(rows: int) -> None:
+    member, devices, device_data = create_pages_data(rows)
+    request = RequestFactory().get("/")
+    request.user = member
+
+    def page_context(object_list: List[Any], name: str) -> Dict[str, Any]:
+        page = Paginator(object_list, rows).page(1)
+        return {
+            name: page.object_list,
+            "page_obj": page,
+            "paginator": page.paginator,
+            "is_paginated": False,
+            "search_form": DeviceSearchForm(),
+            "device": devices[0],
+            "user": member,
+        }
+
+    contexts = {
+        "devices/device/list.html": page_context(devices, "device_list"),
+        "devices/data/list.html": page_context(device_data, "device_data_list"),
+        "devices/device/data_history.html": page_context(device_data, "device_data_list"),
+    }
+
+    table = []
+    with override_settings(TEMPLATES=settings_production.TEMPLATES):
+        for template_name in TEMPLATE_NAMES:
+            row = [template_name]
+            for engine_name in ("django", "jinja2"):
+                template = engines[engine_name].get_template(template_name)
+                timing = measure(
+                    lambda: template.render(contexts[template_name], request),
+                    number=5,
+                    repeat=10,
+                )
+                row.append(f"{timing * 1e3:.2f}")
+            row.append(f"{float(row[1]) / float(row[2]):.1f}x")
+            table.append(row)
+
+    print_table(("template", "django (ms)", "jinja2 (ms)", "speedup"), table)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
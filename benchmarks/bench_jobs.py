@@ -0,0 +1,64 @@
+"""
+Time background jobs throughput (jobs.runner): jobs of a no-op task
+enqueued, then run by an inline worker, and by pools of worker threads,
+each job being leased (conditional `UPDATE` on SQLite, `SKIP LOCKED` on
+PostgreSQL), run, and its result recorded.
+
+Usage:
+
+    python -m benchmarks.bench_jobs [jobs]
+
+"""
+
+import sys
+import time
+from typing import *
+
+from benchmarks.utils import print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from jobs.models import Job
+from jobs.runner import run_pending_jobs, run_workers
+from jobs.tasks import enqueue, task
+
+DEFAULT_JOBS: Final[int] = 2000
+
+
+@task(name="benchmarks.noop")
+def noop(value: int) -> None:
+    pass
+
+
+def timed(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(jobs: int) -> None:
+    rows = []
+    for name, run in (
+        ("inline", run_pending_jobs),
+        ("2 threads", lambda: run_workers(2, poll_interval=0.01, burst=True)),
+        ("4 threads", lambda: run_workers(4, poll_interval=0.01, burst=True)),
+    ):
+        Job.objects.all().delete()
+        enqueuing = timed(lambda: [enqueue(noop, [value]) for value in range(jobs)])
+        running = timed(run)
+        succeeded = Job.objects.filter(status=Job.Status.SUCCEEDED).count()
+        rows.append(
+            (
+                name,
+                f"{enqueuing / jobs * 1e6:.0f}",
+                f"{running / jobs * 1e6:.0f}",
+                f"{succeeded / running:.0f}",
+            )
+        )
+
+    print_table(("workers", "enqueue (µs/job)", "run (µs/job)", "jobs/s"), rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_JOBS)
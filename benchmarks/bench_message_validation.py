@@ -0,0 +1,72 @@
+"""
+Compare the single-pass DeviceMessageValidator with the previous
+`DeviceDataSerializer.validate_message` implementation (parse strings with
+JSONParser through BytesIO, encode objects once and discard the result),
+including the cost of encoding the message again on save.
+
+Usage:
+
+    python -m benchmarks.bench_message_validation
+
+"""
+
+import json
+from io import BytesIO
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django
+
+setup_django()
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.parsers import JSONParser
+
+from devices.validators import DeviceMessageValidator
+
+MESSAGES: Final[Dict[str, Any]] = {
+    "small object": {"moisture": 24, "temperature": 21.5},
+    "medium object": {
+        f"sensor_{index}": {"value": index * 1.5, "unit": "C", "ok": True}
+        for index in range(16)
+    },
+    "nested list": [[index, index * 0.5, [index, str(index)]] for index in range(32)],
+}
+
+
+def legacy_validate_message(value: Any) -> Any:
+    """Previous implementation, without the error handling"""
+    if isinstance(value, str):
+        value = JSONParser().parse(stream=BytesIO(value.encode("utf-8")))
+    else:
+        json.dumps(value)
+    return value
+
+
+def legacy_pipeline(value: Any) -> str:
+    """Validate then encode the message for storage"""
+    value = legacy_validate_message(value)
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def main() -> None:
+    validator = DeviceMessageValidator(max_bytes=1 << 20)
+    rows = []
+    for name, message in MESSAGES.items():
+        for kind, value in (("object", message), ("string", json.dumps(message))):
+            legacy_time = measure(lambda: legacy_pipeline(value), number=2000)
+            new_time = measure(lambda: validator(value).serialized, number=2000)
+            rows.append(
+                (
+                    name,
+                    kind,
+                    f"{legacy_time * 1e6:.2f}",
+                    f"{new_time * 1e6:.2f}",
+                    f"{legacy_time / new_time:.2f}x",
+                )
+            )
+
+    print_table(("message", "input", "legacy (us)", "single pass (us)", "speedup"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Time the search of a member's devices by name, with the search index
+(devices.search, FTS5 trigram table on SQLite) and with the former
+`name__icontains` scan, for the first page of results and its count, on
+substring, prefix and exact queries.
+
+Usage:
+
+    python -m benchmarks.bench_search [devices]
+
+"""
+
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.conf import settings
+from django.core.paginator import Paginator
+
+from accounts.models import Member
+from devices.models import Device
+from devices.search import rebuild_search_index, search
+
+DEFAULT_DEVICES: Final[int] = 50_000
+
+QUERIES: Final[Dict[str, str]] = {
+    "substring": "ump_12",
+    "prefix": "pump_4",
+    "exact": "pump_00042",
+    "no match": "sprinkler",
+}
+
+
+def create_devices(devices: int) -> Member:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    Device.objects.bulk_create(
+        (
+            Device(
+                name=f"{('pump', 'valve', 'sensor')[index % 3]}_{index:05}",
+                uid=Device.generate_device_uid(f"bench_device_{index}"),
+                group=group,
+            )
+            for index in range(devices)
+        ),
+        batch_size=1000,
+    )
+    # bulk_create skips signals
+    rebuild_search_index()
+    return member
+
+
+def first_page(results: Any) -> None:
+    page = Paginator(results, settings.PAGINATION_SIZE).page(1)
+    list(page.object_list)
+
+
+def main(devices: int) -> None:
+    member = create_devices(devices)
+
+    table = []
+    for label, query in QUERIES.items():
+        indexed = measure(lambda: first_page(search(Device, member, query)), number=20, repeat=3)
+        scan = measure(
+            lambda: first_page(
+                Device.objects.filter(group__owner=member, name__icontains=query).order_by("name")
+            ),
+            number=20,
+            repeat=3,
+        )
+        table.append(
+            (
+                label,
+                query,
+                f"{indexed * 1e3:.2f}",
+                f"{scan * 1e3:.2f}",
+                f"{scan / indexed:.1f}x",
+            )
+        )
+
+    print_table(("query", "text", "index (ms)", "icontains (ms)", "speedup"), table)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEVICES)
@@ -0,0 +1,146 @@
+"""
+Time the startup of a worker, for each settings profile: a new interpreter
+imports django, sets it up (apps, models) and builds the WSGI handler (URL
+configuration, middleware), like gunicorn or uwsgi workers do on (re)start.
+Import time (`python -X importtime`) is reported per top-level package.
+
+Then time the per-request overhead of each profile's middleware stack: a
+request to a view returning an empty response, through django's handler,
+minus the same request without middleware.
+
+Usage:
+
+    python -m benchmarks.bench_startup [runs]
+
+"""
+
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from importlib import import_module
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django
+
+setup_django()
+
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import path
+
+DEFAULT_RUNS: Final[int] = 5
+
+PROFILES: Final[Tuple[str, ...]] = ("sia.settings", "sia.settings_production")
+
+# number of packages with the highest import time, reported by profile
+TOP_PACKAGES: Final[int] = 15
+
+STARTUP_CODE: Final[str] = (
+    "import django; django.setup(); "
+    "from django.core.handlers.wsgi import WSGIHandler; "
+    "from django.urls import get_resolver; "
+    "WSGIHandler(); get_resolver().url_patterns"
+)
+
+
+def empty_view(request):
+    return HttpResponse()
+
+
+urlpatterns = [path("", empty_view)]
+
+
+def run_startup(settings_module: str, importtime: bool = False) -> Tuple[float, str]:
+    """
+    Start a new interpreter with a settings profile
+
+    :return: wall time (seconds), and the interpreter's stderr
+    :rtype: Tuple[float, str]
+    """
+    options = ["-X", "importtime"] if importtime else []
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *options, "-c", STARTUP_CODE],
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, result.stderr
+
+
+def parse_import_times(output: str) -> Dict[str, float]:
+    """
+    Self import time (seconds) of each top-level package,
+    from the output of `python -X importtime`
+    """
+    packages = defaultdict(float)
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, _, module = line[len("import time:"):].split("|")
+        packages[module.strip().split(".")[0]] += int(self_time) / 1e6
+    return packages
+
+
+def middleware_time(middleware: List[str], requests: int) -> float:
+    """Time of a request (seconds) through a middleware stack"""
+    factory = RequestFactory()
+    with override_settings(MIDDLEWARE=middleware, ROOT_URLCONF=__name__):
+        handler = BaseHandler()
+        handler.load_middleware()
+        return measure(
+            lambda: handler.get_response(factory.get("/")), number=requests, repeat=5
+        )
+
+
+def main(runs: int) -> None:
+    startup_table = []
+    import_times = {}
+    for settings_module in PROFILES:
+        wall_times = [run_startup(settings_module)[0] for _ in range(runs)]
+        _, output = run_startup(settings_module, importtime=True)
+        import_times[settings_module] = parse_import_times(output)
+        startup_table.append(
+            (
+                settings_module,
+                f"{min(wall_times) * 1e3:.1f}",
+                f"{sum(import_times[settings_module].values()) * 1e3:.1f}",
+            )
+        )
+
+    print_table(("profile", "startup (ms)", "imports (ms)"), startup_table)
+
+    packages = sorted(
+        set().union(*(times.keys() for times in import_times.values())),
+        key=lambda package: -max(times.get(package, 0.0) for times in import_times.values()),
+    )
+    print_table(
+        ("package", *(f"{profile} (ms)" for profile in PROFILES)),
+        [
+            (package, *(f"{import_times[profile].get(package, 0.0) * 1e3:.1f}" for profile in PROFILES))
+            for package in packages[:TOP_PACKAGES]
+        ],
+    )
+
+    baseline = middleware_time([], requests=1000)
+    print_table(
+        ("profile", "middleware", "overhead (us)"),
+        [
+            (
+                profile,
+                len(import_module(profile).MIDDLEWARE),
+                f"{(middleware_time(import_module(profile).MIDDLEWARE, 1000) - baseline) * 1e6:.1f}",
+            )
+            for profile in PROFILES
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS)
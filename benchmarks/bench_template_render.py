@@ -0,0 +1,131 @@
+"""
+Time the response of each HTML page, with the development templates
+settings (debug templates) and with the production ones (sia.settings_production,
+cached loader without debug information), on the first request of a worker
+(cold, templates are compiled), and once templates are compiled (warm, e.g.
+after common.warmup.warm_up_templates).
+
+Usage:
+
+    python -m benchmarks.bench_template_render [requests]
+
+"""
+
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Member
+from common.warmup import get_template_engines, warm_up_templates
+from devices.models import Device, DeviceData
+from sia import settings_production
+
+DEFAULT_REQUESTS: Final[int] = 100
+
+DEVICES: Final[int] = 20
+DEVICE_DATA: Final[int] = 200
+
+PROFILES: Final[Dict[str, List[Dict[str, Any]]]] = {
+    "development": settings.TEMPLATES,
+    "production": settings_production.TEMPLATES,
+}
+
+
+def create_pages_data() -> Tuple[Member, Device]:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    devices = [
+        group.device_set.create(
+            name=f"bench_device_{index}",
+            uid=Device.generate_device_uid(f"bench_device_{index}"),
+        )
+        for index in range(DEVICES)
+    ]
+    now = timezone.now()
+    DeviceData.objects.bulk_create(
+        DeviceData(
+            device=devices[0],
+            date=now - timezone.timedelta(seconds=index),
+            message={
+                "temperature": 20.5 + index % 10,
+                "moisture": 40 + index % 30,
+                "valves": [bool(index % 2), bool(index % 3)],
+            },
+        )
+        for index in range(DEVICE_DATA)
+    )
+    return member, devices[0]
+
+
+def get_page_urls(device: Device) -> Dict[str, str]:
+    device_kwargs = dict(device_uid=device.uid)
+    return {
+        "device list": reverse("devices:device_list"),
+        "group details": reverse(
+            "devices:group_details", kwargs=dict(group_name=device.group.name)
+        ),
+        "search": reverse("devices:search") + "?search_for=device&name=bench",
+        "data history": reverse("devices:device_data_list", kwargs=device_kwargs),
+        "data list": reverse("devices:data_list"),
+    }
+
+
+def reset_template_caches() -> None:
+    """Drop compiled templates, like a new worker"""
+    for engine, _ in get_template_engines():
+        for loader in engine.engine.template_loaders:
+            if hasattr(loader, "reset"):
+                loader.reset()
+
+
+def main(requests: int) -> None:
+    member, device = create_pages_data()
+    client = Client()
+    client.force_login(member)
+    urls = get_page_urls(device)
+
+    def cold_request(url: str) -> None:
+        reset_template_caches()
+        client.get(url)
+
+    table = []
+    for page, url in urls.items():
+        row = [page]
+        for templates in PROFILES.values():
+            with override_settings(TEMPLATES=templates):
+                assert client.get(url).status_code == 200, page
+                cold = measure(lambda: cold_request(url), number=requests // 10, repeat=3)
+                warm_up_templates()
+                warm = measure(lambda: client.get(url), number=requests, repeat=3)
+            row.extend((f"{cold * 1e3:.2f}", f"{warm * 1e3:.2f}"))
+        table.append(row)
+
+    print_table(
+        (
+            "page",
+            *(
+                f"{profile} {state} (ms)"
+                for profile in PROFILES
+                for state in ("cold", "warm")
+            ),
+        ),
+        table,
+    )
+
+    with override_settings(TEMPLATES=settings_production.TEMPLATES):
+        reset_template_caches()
+        print(f"warmup: {measure(warm_up_templates, number=1, repeat=1) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS)
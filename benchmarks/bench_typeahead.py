@@ -0,0 +1,83 @@
+"""
+Time typeahead lookups (top names of a member's devices and groups starting
+with a prefix): from the member's in-memory index (devices.typeahead), the
+typeahead endpoint (index lookup, session and JSON response), and a
+`name__startswith` database query, for comparison.
+
+Usage:
+
+    python -m benchmarks.bench_typeahead [devices]
+
+"""
+
+import sys
+from typing import *
+
+from benchmarks.utils import measure, print_table, setup_django, setup_test_database
+
+setup_django()
+setup_test_database()
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import Member
+from devices.models import Device
+from devices.typeahead import get_typeahead_store
+
+DEFAULT_DEVICES: Final[int] = 20_000
+
+PREFIXES: Final[Tuple[str, ...]] = ("p", "pump_1", "valve_0004", "sprinkler")
+
+
+def create_devices(devices: int) -> Member:
+    member = Member.objects.create_user(username="bench_member", password="bench")
+    group = member.devicegroup_set.create(name="bench_group")
+    Device.objects.bulk_create(
+        (
+            Device(
+                name=f"{('pump', 'valve', 'sensor')[index % 3]}_{index:05}",
+                uid=Device.generate_device_uid(f"bench_device_{index}"),
+                group=group,
+            )
+            for index in range(devices)
+        ),
+        batch_size=1000,
+    )
+    return member
+
+
+def main(devices: int) -> None:
+    member = create_devices(devices)
+    client = Client()
+    client.force_login(member)
+    url = reverse("devices:typeahead")
+    store = get_typeahead_store()
+    limit = settings.TYPEAHEAD_RESULTS
+
+    build = measure(lambda: (store.clear(), store.get(member.pk)), number=1, repeat=3)
+    print(f"index build ({devices} devices): {build * 1e3:.1f} ms")
+
+    table = []
+    for prefix in PREFIXES:
+        index = measure(lambda: store.get(member.pk).top(prefix, limit), number=1000, repeat=3)
+        endpoint = measure(lambda: client.get(url, dict(name=prefix)), number=100, repeat=3)
+        query = measure(
+            lambda: list(
+                Device.objects.filter(group__owner=member, name__startswith=prefix)
+                .order_by("name")
+                .values_list("name", "uid")[:limit]
+            ),
+            number=100,
+            repeat=3,
+        )
+        table.append(
+            (prefix, f"{index * 1e6:.1f}", f"{endpoint * 1e3:.2f}", f"{query * 1e3:.2f}")
+        )
+
+    print_table(("prefix", "index (us)", "endpoint (ms)", "query (ms)"), table)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEVICES)
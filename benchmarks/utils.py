@@ -0,0 +1,85 @@
+"""
+Helper functions for benchmarks
+
+Functions:
+----------
+
+    - setup_django(settings_module: str = "sia.settings") -> None
+    - setup_test_database() -> None
+    - measure(func: Callable, number: int, repeat: int) -> float
+    - print_table(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> None
+
+"""
+
+import os
+import timeit
+from typing import *
+
+
+def setup_django(settings_module: str = "sia.settings") -> None:
+    """
+    Configure django, so that benchmarks can import models, serializers, etc.
+
+    :param settings_module: dotted path of the settings module to use
+    :type settings_module: str
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+
+    django.setup()
+
+
+def setup_test_database() -> None:
+    """
+    Create an empty test database (migrated), like django's test runner does,
+    so that benchmarks never touch the development database.
+    Must be called after setup_django.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def measure(func: Callable[[], Any], number: int = 100, repeat: int = 5) -> float:
+    """
+    Time a function call, returns the best time per call (in seconds)
+
+    :param func: callable to measure
+    :type func: Callable[[], Any]
+    :param number: number of calls in each repetition
+    :type number: int
+    :param repeat: number of repetitions
+    :type repeat: int
+    :return: best time per call in seconds
+    :rtype: float
+    """
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return min(timings) / number
+
+
+def print_table(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+    """
+    Print benchmark results as a plain text table
+
+    :param headers: column headers
+    :type headers: Sequence[str]
+    :param rows: table rows, each row has as many cells as headers
+    :type rows: Iterable[Sequence[Any]]
+    """
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [
+        max(len(str(header)), *(len(row[index]) for row in rows))
+        if rows
+        else len(str(header))
+        for index, header in enumerate(headers)
+    ]
+    line = "+".join("-" * (width + 2) for width in widths)
+    print(line)
+    print("|".join(f" {header:<{width}} " for header, width in zip(headers, widths)))
+    print(line)
+    for row in rows:
+        print("|".join(f" {cell:>{width}} " for cell, width in zip(row, widths)))
+    print(line)
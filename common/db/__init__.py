@@ -0,0 +1,15 @@
+"""
+Database connection management.
+
+Database backends (common.db.backends.sqlite3, common.db.backends.postgresql)
+extending django's, used for all databases (see `DATABASES`):
+
+    - persistent connections (`DATABASE_CONN_MAX_AGE`) and health checks
+      (`DATABASE_CONN_HEALTH_CHECKS`), set on all databases
+    - an optional in-process pool of idle connections (see common.db.pool),
+      shared by all threads, for threaded and async workers, whose threads
+      come and go with requests
+    - SQLite pragmas (`SQLITE_PRAGMAS`), applied once, when a connection is
+      created, not when it's reused (persistent or pooled)
+
+"""
@@ -0,0 +1,11 @@
+"""
+PostgreSQL backend, with connection pooling (see common.db.pool).
+"""
+
+from django.db.backends.postgresql import base
+
+from common.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,171 @@
+"""
+SQLite backend, with connection pooling (see common.db.pool), and pragmas
+(`SQLITE_PRAGMAS`) applied once per connection.
+
+Django assumes SQLite's default limit of 999 variables per statement, which
+splits bulk inserts into batches (e.g. 111 rows of a 9 columns model), the
+actual limit of the SQLite library is used instead (32766 since SQLite 3.32).
+
+Tables of telemetry models (`TELEMETRY_MODELS`, see common.routers) may be
+partitioned in database files of the partitions directory of the database
+that stores them, and of its replicas (`PARTITIONS_DIR` of the database
+settings, `<NAME>.partitions` by default, none for in-memory databases): the
+file `<table>_p<digits and underscores>.sqlite3` (e.g.
+`devices_devicedata_p2023_07.sqlite3`) holds a partition of `<table>`, a
+table of the same name and columns. Files of the directory are attached to
+the connection (and detached when they're removed) before queries of those
+tables, when the directory changed, outside of transactions. Queries read a partitioned table as the union of the table and
+its partitions, deletes and updates run on each of them, inserts go to the
+table (see common.db.backends.sqlite3.compiler). At most
+`SQLITE_LIMIT_ATTACHED` (10 by default) partitions are attached.
+"""
+
+import functools
+import logging
+import re
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+from typing import *
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.sqlite3 import base, features, operations
+from django.utils.functional import cached_property
+
+from common.db.pool import PooledDatabaseWrapperMixin
+from common.routers import get_primary_alias, get_telemetry_db_alias
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FILE_SUFFIX: Final[str] = ".sqlite3"
+
+# partition (attached database) name, and its table
+PARTITION_RE: Final[re.Pattern] = re.compile(r"^(?P<table>\w+)_p[\d_]+$")
+
+
+@functools.lru_cache
+def get_tables(models: Tuple[str, ...]) -> FrozenSet[str]:
+    """Tables of models (app_label.model_name)"""
+    return frozenset(apps.get_model(model)._meta.db_table for model in models)
+
+
+class DatabaseFeatures(features.DatabaseFeatures):
+    @cached_property
+    def max_query_params(self) -> int:
+        """Max variables per statement, of the SQLite library"""
+        # Connection.getlimit() is new in Python 3.11
+        if not hasattr(sqlite3.Connection, "getlimit"):
+            return super().max_query_params
+        self.connection.ensure_connection()
+        return self.connection.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+
+
+class DatabaseOperations(operations.DatabaseOperations):
+    compiler_module = "common.db.backends.sqlite3.compiler"
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    features_class = DatabaseFeatures
+    ops_class = DatabaseOperations
+
+    # (directory, modification time) of the attached partitions
+    _partitions_version: Tuple[Path, int | None] | None = None
+    # attached partitions (database names), by table
+    _table_partitions: Dict[str, List[str]] = {}
+
+    def configure_new_connection(self, connection) -> None:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+
+    def init_connection_state(self) -> None:
+        super().init_connection_state()
+        # partitions attached to a reused connection are found by the next sync
+        self._partitions_version = None
+        self._table_partitions = {}
+
+    @property
+    def partitioned_tables(self) -> FrozenSet[str]:
+        """Tables that may be partitioned, of the telemetry models the database stores"""
+        if get_primary_alias(self.alias) != (get_telemetry_db_alias() or DEFAULT_DB_ALIAS):
+            return frozenset()
+        return get_tables(tuple(settings.TELEMETRY_MODELS))
+
+    @property
+    def partitions_dir(self) -> Path | None:
+        """Directory of the partitions of the database's tables, None if it has none"""
+        if not self.partitioned_tables:
+            return None
+        directory = self.settings_dict.get("PARTITIONS_DIR")
+        if directory is None and not self.is_in_memory_db():
+            directory = f"{self.settings_dict['NAME']}.partitions"
+        return None if directory is None else Path(directory)
+
+    def get_attached_limit(self) -> int:
+        """Max attached databases, of the SQLite library"""
+        if not hasattr(sqlite3.Connection, "getlimit"):
+            return 10
+        self.ensure_connection()
+        return self.connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+    def sync_partitions(self) -> Dict[str, List[str]]:
+        """
+        Attach the partitions added to the partitions directory, and detach
+        the removed ones, when it changed (outside of transactions)
+
+        :return: attached partitions (database names), by table
+        :rtype: Dict[str, List[str]]
+        """
+        directory = self.partitions_dir
+        if directory is None:
+            return {}
+        self.ensure_connection()
+        try:
+            version = (directory, directory.stat().st_mtime_ns)
+        except FileNotFoundError:
+            version = (directory, None)
+        if version == self._partitions_version:
+            return self._table_partitions
+        # databases can't be attached or detached in transactions
+        if self.in_atomic_block or not self.get_autocommit():
+            return self._table_partitions
+
+        files = {}
+        if version[1] is not None:
+            tables = self.partitioned_tables
+            for path in directory.glob(f"*{PARTITION_FILE_SUFFIX}"):
+                match = PARTITION_RE.match(path.name[: -len(PARTITION_FILE_SUFFIX)])
+                if match and match["table"] in tables:
+                    files[match[0]] = path
+        attached = {
+            name for _, name, _ in self.connection.execute("PRAGMA database_list")
+        } - {"main", "temp"}
+
+        for name in attached - files.keys():
+            try:
+                self.connection.execute(f"DETACH DATABASE {self.ops.quote_name(name)}")
+            except self.Database.Error:
+                # e.g. used by an unfinished statement, detached by the next sync
+                logger.warning("Failed to detach partition %s", name, exc_info=True)
+                version = None
+            else:
+                attached.discard(name)
+        for name in sorted(files.keys() - attached):
+            try:
+                self.connection.execute(
+                    f"ATTACH DATABASE ? AS {self.ops.quote_name(name)}",
+                    [f"{files[name].resolve().as_uri()}?mode=rw"],
+                )
+            except self.Database.Error:
+                # e.g. removed meanwhile, or too many attached databases
+                logger.warning("Failed to attach partition %s", name, exc_info=True)
+            else:
+                attached.add(name)
+
+        table_partitions = defaultdict(list)
+        for name in sorted(attached & files.keys()):
+            table_partitions[PARTITION_RE.match(name)["table"]].append(name)
+        self._table_partitions = dict(table_partitions)
+        self._partitions_version = version
+        return self._table_partitions
@@ -0,0 +1,138 @@
+"""
+SQL compilers of the SQLite backend.
+
+Partitioned tables (see common.db.backends.sqlite3.base) are read as the
+union of the table and its partitions, SQLite pushes the conditions of the
+query down into each part of the union, so partitions are searched with
+their own indexes (e.g. a date range costs one index search in each
+partition outside of it). Deletes and updates run on the table and on each
+of its partitions, and count the rows of all of them.
+"""
+
+from typing import *
+
+from django.db.models.sql import compiler
+from django.db.models.sql.constants import CURSOR, MULTI
+from django.db.models.sql.datastructures import BaseTable, Join
+from django.utils.functional import cached_property
+
+
+class SQLCompiler(compiler.SQLCompiler):
+    @cached_property
+    def table_partitions(self) -> Dict[str, List[str]]:
+        # the partitions directory is checked by queries of partitioned tables only
+        tables = self.connection.partitioned_tables
+        if not any(join.table_name in tables for join in self.query.alias_map.values()):
+            return {}
+        return self.connection.sync_partitions()
+
+    def compile(self, node):
+        sql, params = super().compile(node)
+        if isinstance(node, (BaseTable, Join)):
+            partitions = self.table_partitions.get(node.table_name)
+            if partitions:
+                sql = self.partitioned_table_sql(node, sql, partitions)
+        return sql, params
+
+    def partitioned_table_sql(self, node: BaseTable | Join, sql: str, partitions: List[str]) -> str:
+        """Replace the table of a FROM clause (or a join) with the union of its partitions"""
+        qn = self.connection.ops.quote_name
+        table = qn(node.table_name)
+        union = " UNION ALL ".join(
+            f"SELECT * FROM {qn(name)}.{table}" for name in ["main", *partitions]
+        )
+        if node.table_alias == node.table_name:
+            return sql.replace(table, f"({union}) {table}", 1)
+        alias = f"{table} {node.table_alias}"
+        return sql.replace(alias, f"({union}) {node.table_alias}", 1)
+
+
+class PartitionedTableWriteMixin:
+    """
+    Run the statement on the partitions of its table too
+    """
+
+    # statement, followed by the table
+    statement: str = ""
+    # partition the statement runs on, the table itself if None
+    partition: str | None = None
+
+    def as_sql(self):
+        sql, params = super().as_sql()
+        if sql and self.partition is not None:
+            qn = self.connection.ops.quote_name
+            table = self.quote_name_unless_alias(self.query.base_table)
+            sql = sql.replace(
+                f"{self.statement} {table}", f"{self.statement} {qn(self.partition)}.{table}", 1
+            )
+        return sql, params
+
+    def execute_partitions(self) -> int:
+        """
+        Run the statement on the partitions of its table
+
+        :return: number of rows of the partitions
+        :rtype: int
+        """
+        rows = 0
+        for partition in self.table_partitions.get(self.query.get_meta().db_table, []):
+            self.partition = partition
+            try:
+                cursor = compiler.SQLCompiler.execute_sql(self, CURSOR)
+            finally:
+                self.partition = None
+            if cursor is not None:
+                with cursor:
+                    rows += cursor.rowcount
+        return rows
+
+
+class PartitionsRowCountCursor:
+    """
+    Cursor of a statement run on a table, its row count includes the rows of
+    the table's partitions
+    """
+
+    def __init__(self, cursor, partitions_rows: int) -> None:
+        self.cursor = cursor
+        self.partitions_rows = partitions_rows
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount + self.partitions_rows
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cursor, name)
+
+    def __enter__(self) -> "PartitionsRowCountCursor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.cursor.close()
+
+
+class SQLInsertCompiler(compiler.SQLInsertCompiler, SQLCompiler):
+    pass
+
+
+class SQLDeleteCompiler(PartitionedTableWriteMixin, compiler.SQLDeleteCompiler, SQLCompiler):
+    statement = "DELETE FROM"
+
+    def execute_sql(self, result_type=MULTI, *args: Any, **kwargs: Any):
+        rows = self.execute_partitions()
+        cursor = super().execute_sql(result_type, *args, **kwargs)
+        if rows and result_type == CURSOR and cursor is not None:
+            return PartitionsRowCountCursor(cursor, rows)
+        return cursor
+
+
+class SQLUpdateCompiler(PartitionedTableWriteMixin, compiler.SQLUpdateCompiler, SQLCompiler):
+    statement = "UPDATE"
+
+    def execute_sql(self, result_type):
+        rows = self.execute_partitions()
+        return rows + super().execute_sql(result_type)
+
+
+class SQLAggregateCompiler(compiler.SQLAggregateCompiler, SQLCompiler):
+    pass
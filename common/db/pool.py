@@ -0,0 +1,171 @@
+"""
+In-process connection pool.
+
+Django keeps one connection per thread (and database alias), closed at the
+end of each request, unless it's persistent (CONN_MAX_AGE), in which case
+it's tied to its thread. Threaded and async (ASGI) workers run requests in
+short lived threads, so their connections are neither shared nor reused.
+
+With `DATABASE_POOL_SIZE` > 0, connections closed outside of a transaction
+are kept idle in a pool of their database, and handed to the next thread
+that connects, instead of opening a new connection. Idle connections are
+dropped after `DATABASE_POOL_MAX_IDLE` seconds, and checked before reuse
+when the database has health checks enabled.
+
+Classes:
+--------
+
+    - ConnectionPool
+    - PooledDatabaseWrapperMixin
+
+Functions:
+----------
+
+    - get_pool(alias: str) -> ConnectionPool | None
+    - close_pools() -> None
+
+"""
+
+import threading
+import time
+from collections import deque
+from typing import *
+
+from django.conf import settings
+
+
+class ConnectionPool:
+    """
+    Idle (raw) connections of a database, shared by the threads of a process
+    """
+
+    def __init__(self, max_size: int, max_idle: float) -> None:
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        # (release time, connection), most recently released last
+        self._idle: Deque[Tuple[float, Any]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def get(self, now: float | None = None) -> Any | None:
+        """
+        Get the most recently released (warmest) idle connection, None when
+        there is no idle connection. Expired connections are closed.
+        """
+        now = time.monotonic() if now is None else now
+        expired = []
+        connection = None
+        with self._lock:
+            while self._idle and now - self._idle[0][0] > self.max_idle:
+                expired.append(self._idle.popleft()[1])
+            if self._idle:
+                connection = self._idle.pop()[1]
+        for expired_connection in expired:
+            close_quietly(expired_connection)
+        return connection
+
+    def put(self, connection: Any, now: float | None = None) -> bool:
+        """
+        Release a connection to the pool
+
+        :return: False if the pool is full (the connection must be closed)
+        :rtype: bool
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if len(self._idle) >= self.max_size:
+                return False
+            self._idle.append((now, connection))
+        return True
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for _, connection in idle:
+            close_quietly(connection)
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def close_quietly(connection: Any) -> None:
+    try:
+        connection.close()
+    except Exception:  # broken connections may fail to close
+        pass
+
+
+def get_pool(alias: str) -> ConnectionPool | None:
+    """Get connection pool of database `alias`, None if pooling is disabled"""
+    if settings.DATABASE_POOL_SIZE <= 0:
+        return None
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(
+                settings.DATABASE_POOL_SIZE, settings.DATABASE_POOL_MAX_IDLE
+            )
+        return pool
+
+
+def close_pools() -> None:
+    """Close idle connections of all pools, e.g. before forking workers"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    DatabaseWrapper mixin, takes connections from the pool of the database
+    (when enabled), and releases them to it instead of closing them
+    """
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias)
+        while pool is not None:
+            connection = pool.get()
+            if connection is None:
+                break
+            if self.is_pooled_connection_usable(connection):
+                return connection
+            close_quietly(connection)
+
+        connection = super().get_new_connection(conn_params)
+        self.configure_new_connection(connection)
+        return connection
+
+    def configure_new_connection(self, connection) -> None:
+        """Configure a new connection, once (reused connections keep it)"""
+
+    def is_pooled_connection_usable(self, connection) -> bool:
+        if not self.settings_dict["CONN_HEALTH_CHECKS"]:
+            return True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        pool = get_pool(self.alias)
+        if (
+            pool is None
+            or self.connection is None
+            or self.in_atomic_block
+            or not self.get_autocommit()
+            or self.errors_occurred
+        ):
+            return super()._close()
+        if not pool.put(self.connection):
+            return super()._close()
@@ -0,0 +1,93 @@
+"""
+JSON encoding and decoding, accelerated by orjson when it's installed.
+
+orjson is an optional dependency. When it's not installed, or can't handle
+a value (e.g. integers larger than 64 bits), the standard json module is
+used instead, so results are the same either way, except that:
+
+    - output is compact (no spaces after separators) and not ASCII escaped
+    - integers larger than 64 bits are decoded as floats by orjson
+
+NaN and Infinity are encoded as null by orjson, and rejected (ValueError) by
+the json module, values that may have them are validated on input (e.g.
+device messages, see devices.validators). They're rejected when decoding
+either way.
+
+Functions:
+----------
+
+    - dumps(value: Any, cls: Type[json.JSONEncoder] | None = None) -> str
+    - dumps_bytes(value: Any, cls: Type[json.JSONEncoder] | None = None) -> bytes
+    - loads(data: str | bytes) -> Any
+
+"""
+
+import json
+from typing import *
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+if orjson is not None:
+    ORJSON_OPTIONS: Final[int] = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def _reject_constant(constant: str) -> NoReturn:
+    raise ValueError(f"{constant} is not a valid JSON value")
+
+
+def dumps_bytes(value: Any, cls: Type[json.JSONEncoder] | None = None) -> bytes:
+    """
+    Encode value to UTF-8 encoded JSON
+
+    :param value: value to encode
+    :type value: Any
+    :param cls: JSON encoder class, its `default` method is used to encode
+    values that are not natively supported (datetime, Decimal, etc)
+    :type cls: Type[json.JSONEncoder] | None
+    :return: UTF-8 encoded JSON
+    :rtype: bytes
+    :raises: TypeError if value can't be encoded, ValueError for NaN and
+    Infinity (without orjson)
+    """
+    if orjson is not None:
+        default = cls().default if cls is not None else None
+        try:
+            return orjson.dumps(value, default=default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(
+        value, cls=cls, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps(value: Any, cls: Type[json.JSONEncoder] | None = None) -> str:
+    """
+    Encode value to a JSON string, see dumps_bytes
+    """
+    return dumps_bytes(value, cls).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    Decode JSON, NaN and Infinity are rejected
+
+    :param data: JSON string, or UTF-8 encoded JSON
+    :type data: str | bytes
+    :return: decoded value
+    :rtype: Any
+    :raises: ValueError if data is not valid JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data, parse_constant=_reject_constant)
@@ -65,7 +65,7 @@ class UniqueDevicePerMemberMixin:
     
     def clean_name(self) -> str:
         device_name = self.cleaned_data["name"].lower()
-        if "name" in self.changed_data and self.owner.devicegroup_set.filter(device__name__iexact=device_name).exists():
+        if "name" in self.changed_data and self._meta.model.objects.filter(group__owner=self.owner, name=device_name).exists():
             raise ValidationError(
                 self.error_messages["unique_name"],
                 code="unique_name",
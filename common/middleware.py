@@ -0,0 +1,409 @@
+"""
+Admission control, load shedding, and read replica routing.
+
+LoadSheddingMiddleware keeps a moving window of request latency for each
+view class, and of the time spent in the database by all requests. When
+the database, or a view, is slower than its threshold, requests to low
+priority views (history pages, exports) are rejected with a 503 and a
+Retry-After header, so that workers are free for the ingest path. Normal
+priority views are shed when the pressure doubles, critical views (device
+data ingestion) are never shed.
+
+Views declare their priority with a `load_shedding_priority` attribute,
+either a Priority, or a dict of Priority by HTTP method. Views without
+one have normal priority.
+
+Windows are kept per process, each worker sheds load based on what it
+observes itself. A window with no recent samples (e.g. all its requests
+were shed) is empty, so shedding stops after `LOAD_SHEDDING_WINDOW`
+seconds without samples.
+
+ReadReplicaMiddleware routes the reads of safe (GET, HEAD) requests to
+views with a true `read_from_replica` attribute to database replicas (see
+common.routers). After a successful write request, a cookie keeps the
+client on the primaries for `DATABASE_REPLICA_STICKY_SECONDS`, so that it
+sees its own changes before they reach the replicas.
+
+Settings:
+---------
+
+    - LOAD_SHEDDING_ENABLED: enable load shedding
+    - LOAD_SHEDDING_WINDOW: moving window length (seconds)
+    - LOAD_SHEDDING_MIN_SAMPLES: min number of samples before shedding
+    - LOAD_SHEDDING_DB_LATENCY: max mean database time per request (seconds)
+    - LOAD_SHEDDING_REQUEST_LATENCY: max mean latency of a view (seconds)
+    - LOAD_SHEDDING_RETRY_AFTER: Retry-After header of shed requests (seconds)
+    - DATABASE_REPLICA_STICKY_SECONDS: primary reads after a write (seconds)
+
+"""
+
+import contextlib
+import enum
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import *
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from rest_framework.views import APIView
+
+from common.routers import replica_reads
+
+
+class Priority(enum.IntEnum):
+    """Load shedding priority of a view, lower priorities are shed first"""
+
+    LOW = 0
+    NORMAL = 1
+    CRITICAL = 2
+
+
+# pressure (observed latency / threshold) from which views are shed
+SHED_PRESSURE: Final[Dict[Priority, float]] = {
+    Priority.LOW: 1.0,
+    Priority.NORMAL: 2.0,
+}
+
+
+# -----------------------------------------------------------------------------
+# Latency tracking
+# -----------------------------------------------------------------------------
+class LatencyWindow:
+    """
+    Moving time window of (request latency, database time) samples, with
+    running sums so means are computed in constant time
+    """
+
+    def __init__(self) -> None:
+        self._samples: Deque[Tuple[float, float, float]] = deque()
+        self.request_time = 0.0
+        self.db_time = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, now: float, request_time: float, db_time: float) -> None:
+        self._samples.append((now, request_time, db_time))
+        self.request_time += request_time
+        self.db_time += db_time
+
+    def expire(self, before: float) -> None:
+        """Drop samples older than `before`"""
+        samples = self._samples
+        while samples and samples[0][0] < before:
+            _, request_time, db_time = samples.popleft()
+            self.request_time -= request_time
+            self.db_time -= db_time
+        if not samples:
+            # reset accumulated rounding errors
+            self.request_time = self.db_time = 0.0
+
+    def mean_request_time(self) -> float:
+        return self.request_time / len(self._samples) if self._samples else 0.0
+
+    def mean_db_time(self) -> float:
+        return self.db_time / len(self._samples) if self._samples else 0.0
+
+
+class LoadMonitor:
+    """
+    Latency windows of all requests, and of each view class, in this process
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._total = LatencyWindow()
+        self._views: Dict[str, LatencyWindow] = {}
+
+    def record(
+        self,
+        view: str,
+        request_time: float,
+        db_time: float,
+        now: float | None = None,
+    ) -> None:
+        """Add a request sample to the window of `view`"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._total.add(now, request_time, db_time)
+            self._views.setdefault(view, LatencyWindow()).add(
+                now, request_time, db_time
+            )
+
+    def pressure(self, view: str, now: float | None = None) -> float:
+        """
+        Load pressure of a view: the highest ratio of the observed mean
+        latency to its threshold, of the database (all requests), and of
+        the view's requests. 0 when there are not enough samples.
+
+        :param view: view key (see get_view_key)
+        :type view: str
+        :return: load pressure, >= 1 when a threshold is exceeded
+        :rtype: float
+        """
+        now = time.monotonic() if now is None else now
+        before = now - settings.LOAD_SHEDDING_WINDOW
+        min_samples = settings.LOAD_SHEDDING_MIN_SAMPLES
+        pressure = 0.0
+        with self._lock:
+            self._total.expire(before)
+            if len(self._total) >= min_samples:
+                pressure = (
+                    self._total.mean_db_time() / settings.LOAD_SHEDDING_DB_LATENCY
+                )
+
+            window = self._views.get(view)
+            if window is not None:
+                window.expire(before)
+                if len(window) >= min_samples:
+                    pressure = max(
+                        pressure,
+                        window.mean_request_time()
+                        / settings.LOAD_SHEDDING_REQUEST_LATENCY,
+                    )
+        return pressure
+
+    def clear(self) -> None:
+        with self._lock:
+            self._total = LatencyWindow()
+            self._views.clear()
+
+
+load_monitor = LoadMonitor()
+
+
+class QueryTimer:
+    """
+    Database execute wrapper, accumulates time spent executing queries
+    """
+
+    def __init__(self) -> None:
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def installed(self) -> Iterator["QueryTimer"]:
+        """
+        Time queries of the current context, run by any thread that runs in
+        a copy of it (e.g. the threads of sync views and of the async ORM,
+        under ASGI)
+        """
+        for connection in connections.all(initialized_only=True):
+            install_query_timing(connection)
+        token = current_query_timer.set(self)
+        try:
+            yield self
+        finally:
+            current_query_timer.reset(token)
+
+
+# timer of the queries of the current request
+current_query_timer: ContextVar[QueryTimer | None] = ContextVar("current_query_timer", default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper of all connections, times queries with the current timer"""
+    timer = current_query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timing(connection, **kwargs: Any) -> None:
+    # outermost, execute_wrapper() pops the last wrapper
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+connection_created.connect(install_query_timing, dispatch_uid="common.middleware.install_query_timing")
+
+
+# -----------------------------------------------------------------------------
+# Helper functions
+# -----------------------------------------------------------------------------
+def get_view_class(view_func: Callable) -> Any:
+    """Get class of a class based view, or the view function itself"""
+    return getattr(view_func, "view_class", view_func)
+
+
+def get_view_key(view_class: Any) -> str:
+    return f"{view_class.__module__}.{view_class.__qualname__}"
+
+
+def get_view_priority(view_class: Any, method: str) -> Priority:
+    """Get load shedding priority of a view for an HTTP method"""
+    priority = getattr(view_class, "load_shedding_priority", Priority.NORMAL)
+    if isinstance(priority, dict):
+        priority = priority.get(method, Priority.NORMAL)
+    return Priority(priority)
+
+
+def service_unavailable(view_class: Any) -> HttpResponse:
+    """503 response for a shed request, JSON for API views"""
+    message = "Service temporarily unavailable, try again later."
+    if isinstance(view_class, type) and issubclass(view_class, APIView):
+        response = JsonResponse({"detail": message}, status=503)
+    else:
+        response = HttpResponse(message, status=503, content_type="text/plain")
+    response["Retry-After"] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+    return response
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+class LoadSheddingMiddleware:
+    """
+    Reject low priority requests while the database or their view is slow,
+    and record the latency of requests that were served.
+
+    Sync and async capable, the database time of requests is measured in
+    the request's context (see QueryTimer), which is passed on to the
+    threads running sync views and the queries of async views, under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # a sync process_view would run in a thread
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with QueryTimer().installed() as timer:
+            response = self.get_response(request)
+        self.record(request, time.perf_counter() - start, timer.elapsed)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        with QueryTimer().installed() as timer:
+            response = await self.get_response(request)
+        self.record(request, time.perf_counter() - start, timer.elapsed)
+        return response
+
+    def record(self, request: HttpRequest, request_time: float, db_time: float) -> None:
+        view_key = getattr(request, "_load_shedding_view", None)
+        if view_key is not None:
+            load_monitor.record(view_key, request_time, db_time)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return None
+
+        view_class = get_view_class(view_func)
+        view_key = get_view_key(view_class)
+        priority = get_view_priority(view_class, request.method)
+        if (
+            priority in SHED_PRESSURE
+            and load_monitor.pressure(view_key) >= SHED_PRESSURE[priority]
+        ):
+            return service_unavailable(view_class)
+
+        # only served requests are recorded
+        request._load_shedding_view = view_key
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return LoadSheddingMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
+
+
+class ReadReplicaMiddleware:
+    """
+    Route reads of safe requests to read-only views to database replicas,
+    except for clients that wrote recently.
+
+    Sync and async capable, replica reads are enabled in the context of
+    the request (see common.routers.replica_reads), which async views
+    pass on to the threads of the async ORM.
+    """
+
+    STICKY_COOKIE: Final[str] = "read_primary"
+    SAFE_METHODS: Final[Tuple[str, ...]] = ("GET", "HEAD", "OPTIONS")
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # the context variable must be set in the request's context, not
+            # in the context of a thread running a sync process_view
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.reset_replica_reads(request)
+        return self.set_sticky_cookie(request, response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.reset_replica_reads(request)
+        return self.set_sticky_cookie(request, response)
+
+    def reset_replica_reads(self, request: HttpRequest) -> None:
+        token = getattr(request, "_replica_reads_token", None)
+        if token is not None:
+            replica_reads.reset(token)
+
+    def set_sticky_cookie(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if (
+            request.method not in self.SAFE_METHODS
+            and response.status_code < 400
+            and settings.DATABASE_REPLICAS
+        ):
+            response.set_cookie(
+                self.STICKY_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in self.SAFE_METHODS
+            and getattr(get_view_class(view_func), "read_from_replica", False)
+            and self.STICKY_COOKIE not in request.COOKIES
+            and settings.DATABASE_REPLICAS
+        ):
+            request._replica_reads_token = replica_reads.set(True)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return ReadReplicaMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
@@ -0,0 +1,121 @@
+"""
+Database routers.
+
+TelemetryRouter places high volume telemetry models (`TELEMETRY_MODELS`,
+device data) in the 'telemetry' database, when it's configured (see
+`TELEMETRY_DATABASE_URL`), and everything else in the default database.
+Without a 'telemetry' database, all models stay in the default database.
+
+Telemetry models refer to metadata (devices, groups, members) by id only:
+their foreign keys have no database constraints, and queries on them must
+not join metadata tables (filter on the denormalized owner/group ids, and
+use prefetch_related instead of select_related).
+
+Migrations must be applied to both databases:
+
+    python manage.py migrate
+    python manage.py migrate --database telemetry
+
+Each database may have read-only replicas (`DATABASE_REPLICAS`, e.g.
+PostgreSQL standbys, or periodically refreshed SQLite snapshots, see the
+`refresh_replica_snapshots` command). Reads go to a (random) replica of
+their database only while `replica_reads` is set, i.e. during safe
+requests to read-only views (see common.middleware.ReadReplicaMiddleware),
+all other reads and all writes go to the primary. Replicas are never
+migrated.
+
+Routers:
+--------
+
+    - TelemetryRouter
+
+"""
+
+import random
+from contextvars import ContextVar
+from typing import *
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+TELEMETRY_DB_ALIAS: Final[str] = "telemetry"
+
+# reads are routed to replicas while set
+replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+def get_telemetry_db_alias() -> str | None:
+    """Get alias of the telemetry database, None if it's not configured"""
+    return TELEMETRY_DB_ALIAS if TELEMETRY_DB_ALIAS in settings.DATABASES else None
+
+
+def is_telemetry_model(app_label: str, model_name: str | None) -> bool:
+    if model_name is None:
+        return False
+    return f"{app_label}.{model_name}".lower() in settings.TELEMETRY_MODELS
+
+
+def get_replica_aliases(primary: str) -> List[str]:
+    """Get aliases of the read-only replicas of database `primary`"""
+    return settings.DATABASE_REPLICAS.get(primary, [])
+
+
+def get_primary_alias(alias: str | None) -> str | None:
+    """Get alias of the primary of database `alias` (itself if it's a primary)"""
+    for primary, replicas in settings.DATABASE_REPLICAS.items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+class TelemetryRouter:
+    """
+    Route telemetry models to the telemetry database, and reads of read-only
+    views to replicas
+    """
+
+    def get_model_db(self, model) -> str | None:
+        telemetry_db = get_telemetry_db_alias()
+        if telemetry_db is None:
+            return None
+        # model class, or instance (possibly lazy, e.g. request.user)
+        if is_telemetry_model(model._meta.app_label, model._meta.model_name):
+            return telemetry_db
+        # explicitly, related objects of device data are read from the
+        # database of the instance by default
+        return DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        db = self.get_model_db(model)
+        if replica_reads.get():
+            replicas = get_replica_aliases(db or DEFAULT_DB_ALIAS)
+            if replicas:
+                return random.choice(replicas)
+        return db
+
+    def db_for_write(self, model, **hints):
+        return self.get_model_db(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # telemetry models only store ids of related objects, in any database
+        telemetry_db = get_telemetry_db_alias()
+        if telemetry_db is not None and telemetry_db in (
+            self.get_model_db(obj1),
+            self.get_model_db(obj2),
+        ):
+            return True
+        # objects read from a replica and from its primary
+        primary = get_primary_alias(obj1._state.db)
+        if primary is not None and primary == get_primary_alias(obj2._state.db):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if get_primary_alias(db) != db:
+            # replicas are copies of their primary
+            return False
+        telemetry_db = get_telemetry_db_alias()
+        if telemetry_db is None:
+            return None
+        # operations without a model (e.g. RunSQL) run on the default database
+        return is_telemetry_model(app_label, model_name) == (db == telemetry_db)
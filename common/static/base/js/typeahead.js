@@ -0,0 +1,56 @@
+// search bar suggestions: names of the member's devices and groups starting
+// with the typed name, from the typeahead endpoint (devices:typeahead)
+(function () {
+  "use strict";
+
+  const DELAY_MS = 100;
+
+  function attach(input) {
+    const list = document.getElementById(input.getAttribute("list"));
+    const form = input.form;
+    let timer = null;
+    let controller = null;
+
+    function suggest() {
+      const name = input.value.trim();
+      if (controller !== null) {
+        controller.abort();
+      }
+      if (!name) {
+        list.replaceChildren();
+        return;
+      }
+      const params = new URLSearchParams({ name: name });
+      const searchFor = form && form.elements.namedItem("search_for");
+      if (searchFor && searchFor.value) {
+        params.set("search_for", searchFor.value);
+      }
+      controller = new AbortController();
+      fetch(input.dataset.typeaheadUrl + "?" + params, {
+        credentials: "same-origin",
+        signal: controller.signal,
+      })
+        .then((response) => (response.ok ? response.json() : { results: [] }))
+        .then((data) => {
+          list.replaceChildren(
+            ...data.results.map((result) => {
+              const option = document.createElement("option");
+              option.value = result.name;
+              option.label = result.kind;
+              return option;
+            })
+          );
+        })
+        .catch(() => {});
+    }
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(suggest, DELAY_MS);
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    document.querySelectorAll("input[data-typeahead-url]").forEach(attach);
+  });
+})();
@@ -0,0 +1,53 @@
+"""
+Jinja2 environment of the 'jinja2' templates engine.
+
+Jinja2 templates of the hottest pages (device list, data list and data
+history) are in the `jinja2` directory of their app, next to their django
+templates (`templates`), with the same names. Views rendered with them are
+selected by `JINJA2_VIEWS` (see common.views.mixins.Jinja2ViewMixin).
+
+Django's Jinja2 backend doesn't run context processors, templates get the
+current member from `request.user`.
+
+Functions:
+----------
+
+    - environment(**options: Any) -> Environment
+    - url(viewname: str, *args: Any, **kwargs: Any) -> str
+    - date(value: datetime | None, arg: str | None = None) -> str
+
+"""
+
+from datetime import datetime
+from typing import *
+
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import dateformat
+from django.utils.formats import FORMAT_SETTINGS
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+
+def url(viewname: str, *args: Any, **kwargs: Any) -> str:
+    """Reverse a URL, like django's `url` tag"""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def date(value: datetime | None, arg: str | None = None) -> str:
+    """Format a date, in the current time zone, like django's `date` filter"""
+    if value in (None, "") or arg is None or arg in FORMAT_SETTINGS:
+        return defaultfilters.date(template_localtime(value), arg)
+    # explicit format, without django's lookup of format settings (by language)
+    try:
+        return dateformat.format(template_localtime(value), arg)
+    except AttributeError:
+        return ""
+
+
+def environment(**options: Any) -> Environment:
+    env = Environment(**options)
+    env.globals.update(static=static, url=url)
+    env.filters.update(date=date)
+    return env
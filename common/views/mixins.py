@@ -1,5 +1,6 @@
 from typing import *
 
+from django.conf import settings
 from django.contrib.auth.mixins import AccessMixin, LoginRequiredMixin
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
@@ -31,3 +32,18 @@ class OwnerMemberRequiredMixin(AccessMixin):
             self.permission_denied_message = "You do not have permission to access this page."
             return self.handle_no_permission()
         return super().dispatch(request, *args, **kwargs)
+
+
+class Jinja2ViewMixin:
+    """
+    Render the view with its Jinja2 templates ('jinja2' engine, see
+    common.templating) when it's selected by `JINJA2_VIEWS` (view class
+    names), with its django templates otherwise
+    """
+
+    jinja2_template_engine: str = "jinja2"
+
+    def render_to_response(self, context, **response_kwargs):
+        if type(self).__name__ in settings.JINJA2_VIEWS:
+            self.template_engine = self.jinja2_template_engine
+        return super().render_to_response(context, **response_kwargs)
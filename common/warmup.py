@@ -0,0 +1,83 @@
+"""
+Worker warmup.
+
+Templates are compiled on first use, and kept compiled by the cached
+template loader, so the first request to each page of a new worker pays
+the cost of reading and compiling its templates (and the templates they
+extend and include). When `TEMPLATES_WARMUP` is set, workers compile all
+templates at boot (see sia.wsgi and sia.asgi), before serving requests.
+With a preloading server (e.g. gunicorn --preload), templates are compiled
+once, before worker processes are forked.
+
+Functions:
+----------
+
+    - get_template_engines() -> List[Tuple[BaseEngine, str]]
+    - get_template_names(engine: BaseEngine, prefix: str = "") -> List[str]
+    - warm_up_templates() -> int
+
+"""
+
+import os
+from typing import *
+
+from django.forms.renderers import get_default_renderer
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.base import BaseEngine
+
+# templates of the form renderer's engine (its own engine, unless the form
+# renderer uses `TEMPLATES`), app templates are compiled by `TEMPLATES` engines
+FORM_TEMPLATES_PREFIX: Final[str] = "django/forms/"
+
+
+def get_template_engines() -> List[Tuple[BaseEngine, str]]:
+    """
+    Get template engines, with the prefix of the names of their templates:
+    `TEMPLATES` engines (all templates), and the form renderer's engine
+    (form and widget templates)
+    """
+    template_engines = [(engine, "") for engine in engines.all()]
+    form_engine = getattr(get_default_renderer(), "engine", None)
+    if form_engine is not None:
+        template_engines.append((form_engine, FORM_TEMPLATES_PREFIX))
+    return template_engines
+
+
+def get_template_names(engine: BaseEngine, prefix: str = "") -> List[str]:
+    """
+    Get names of all templates found by the loaders of a django or Jinja2
+    templates engine, e.g. 'devices/device/list.html'
+    """
+    if hasattr(engine, "env"):
+        # Jinja2
+        return engine.env.list_templates(filter_func=lambda name: name.startswith(prefix))
+    names = set()
+    for loader in engine.engine.template_loaders:
+        # cached loader wraps the loaders that find templates
+        for wrapped_loader in getattr(loader, "loaders", [loader]):
+            for directory in wrapped_loader.get_dirs():
+                for root, _, files in os.walk(directory):
+                    for file_name in files:
+                        path = os.path.relpath(os.path.join(root, file_name), directory)
+                        names.add(path.replace(os.sep, "/"))
+    return sorted(name for name in names if name.startswith(prefix))
+
+
+def warm_up_templates() -> int:
+    """
+    Compile all templates of all engines (see get_template_engines), so that
+    they're cached by their loaders (by the environment for Jinja2). Files that aren't valid templates are
+    skipped.
+
+    :return: number of compiled templates
+    :rtype: int
+    """
+    compiled = 0
+    for engine, prefix in get_template_engines():
+        for name in get_template_names(engine, prefix):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError):
+                continue
+            compiled += 1
+    return compiled
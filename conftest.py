@@ -0,0 +1,32 @@
+import pytest
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+
+from common.routers import get_telemetry_db_alias
+
+
+def pytest_collection_modifyitems(items) -> None:
+    """
+    Allow test cases that use only the default database to use the telemetry
+    database too (when it's configured), as device data is routed to it.
+    """
+    if get_telemetry_db_alias() is None:
+        return
+    for item in items:
+        cls = getattr(item, "cls", None)
+        if (
+            cls is not None
+            and issubclass(cls, TransactionTestCase)
+            and set(cls.databases) == {"default"}
+        ):
+            cls.databases = set(settings.DATABASES)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def flush_heartbeats_on_each_report():
+    """
+    Flush device heartbeats when devices report, a background flush thread
+    would write outside of the tests' transactions (see devices.heartbeats)
+    """
+    with override_settings(DEVICE_HEARTBEAT_FLUSH_INTERVAL=0):
+        yield
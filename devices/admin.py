@@ -1,6 +1,16 @@
 from django.contrib import admin
 
-from .models import Device, DeviceData, DeviceGroup
+from .models import (
+    Device,
+    DeviceCommand,
+    DeviceData,
+    DeviceDataPurge,
+    DeviceGroup,
+    DeviceGroupCommand,
+    DeviceHeartbeat,
+    DeviceRule,
+    DeviceSchedule,
+)
 
 # Register your models here.
 
@@ -18,12 +28,65 @@ class DeviceModelAdmin(admin.ModelAdmin):
     fields = [
         "name",
         "group",
+        "heartbeat_interval",
     ]
 
 
+class DeviceDataPurgeModelAdmin(admin.ModelAdmin):
+    model = DeviceDataPurge
+    # progress of deleted devices' data purges (see devices.purge)
+    list_display = ["device_id", "owner_id", "deleted_rows", "created", "finished"]
+    readonly_fields = list_display
+
+
+class DeviceHeartbeatModelAdmin(admin.ModelAdmin):
+    model = DeviceHeartbeat
+    # devices' last reports, and status (see devices.heartbeats)
+    list_display = ["device", "last_seen", "online", "status_changed"]
+    list_filter = ["online"]
+    readonly_fields = ["device", "last_seen", "offline_after", "online", "status_changed"]
+
+
+class DeviceCommandModelAdmin(admin.ModelAdmin):
+    model = DeviceCommand
+    # commands queued for devices, and their delivery (see devices.commands)
+    list_display = ["name", "device", "status", "created", "delivered", "acknowledged"]
+    list_filter = ["status"]
+    readonly_fields = ["status", "created", "delivered", "acknowledged"]
+
+
+class DeviceGroupCommandModelAdmin(admin.ModelAdmin):
+    model = DeviceGroupCommand
+    # commands queued for all the devices of a group (see devices.commands)
+    list_display = ["name", "group", "created", "expires"]
+    readonly_fields = ["created"]
+
+
+class DeviceRuleModelAdmin(admin.ModelAdmin):
+    model = DeviceRule
+    # condition/action rules, evaluated on received data (see devices.rules)
+    list_display = ["name", "device", "key", "operator", "threshold", "command", "is_active", "triggered"]
+    list_filter = ["is_active", "triggered"]
+    readonly_fields = ["triggered", "state_changed", "updated"]
+
+
+class DeviceScheduleModelAdmin(admin.ModelAdmin):
+    model = DeviceSchedule
+    # cron-like programs, run by the scheduler (see devices.schedules)
+    list_display = ["name", "group", "device", "cron", "command", "is_active", "next_run_at", "last_run_at"]
+    list_filter = ["is_active"]
+    readonly_fields = ["next_run_at", "last_run_at", "updated"]
+
+
 admin.site.register(DeviceGroup, DeviceGroupModelAdmin)
 admin.site.register(Device, DeviceModelAdmin)
 admin.site.register(DeviceData, DeviceDataModelAdmin)
+admin.site.register(DeviceDataPurge, DeviceDataPurgeModelAdmin)
+admin.site.register(DeviceHeartbeat, DeviceHeartbeatModelAdmin)
+admin.site.register(DeviceCommand, DeviceCommandModelAdmin)
+admin.site.register(DeviceGroupCommand, DeviceGroupCommandModelAdmin)
+admin.site.register(DeviceRule, DeviceRuleModelAdmin)
+admin.site.register(DeviceSchedule, DeviceScheduleModelAdmin)
 
 # admin.site.site_header = "SIA Admin"
 # admin.site.site_title = "SIA Admin Portal"
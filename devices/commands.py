@@ -0,0 +1,350 @@
+"""
+Device commands, queued for devices' actuators and delivered by long polling.
+
+Commands are queued for devices (DeviceCommand rows, see queue_commands),
+and devices wait for them with long-poll requests (see api.v1 device commands
+views): a request with no command to deliver is held until a command is
+queued for its device, or until its timeout expires
+(`DEVICE_COMMANDS_POLL_TIMEOUT`). Waiting requests are woken by an in-process
+notification (CommandNotifier), once the transaction that queued the
+commands commits, so the database is queried when the request starts and
+when it's woken or timed out, it's never polled.
+
+Notifications don't cross processes: a command queued by another process
+is delivered when the device's request times out, or to its next request,
+up to `DEVICE_COMMANDS_POLL_TIMEOUT` seconds after it was queued. That's
+the case of the commands queued by another web worker, by background jobs
+(e.g. device rules, see devices.rules), and by the scheduler process (see
+devices.schedules), whatever the worker the device's request is held by.
+
+Waiting requests of sync views release their thread's database
+connections (to their pool, see common.db.pool, when it's enabled) while
+they wait, unless they're in a transaction, and connect again when
+they're woken.
+
+Commands for a group (DeviceGroupCommand, see queue_group_command) are
+queued as one command per active device of the group, in one insert, and
+their acknowledgement state is aggregated from their devices' commands.
+
+Delivery is at least once: devices get their unacknowledged commands after
+the last command they received (`after`, commands are delivered in order),
+and acknowledge them in batches once they ran them. Commands that were
+delivered and not acknowledged are delivered again to requests without
+`after` (e.g. after the device restarted).
+
+Classes:
+--------
+
+    - CommandNotifier
+
+Functions:
+----------
+
+    - get_command_notifier() -> CommandNotifier
+    - queue_commands(devices: Iterable[Device | int], name: str, payload: Any = None, expires: datetime | None = None, using: str | None = None, group_command: DeviceGroupCommand | None = None) -> List[DeviceCommand]
+    - get_group_device_ids(group: DeviceGroup | int, using: str | None = None) -> List[int]
+    - queue_group_command(group: DeviceGroup | int, name: str, payload: Any = None, expires: datetime | None = None, using: str | None = None) -> DeviceGroupCommand
+    - deliver_commands(device_id: int, after: int | None = None, limit: int | None = None) -> List[DeviceCommand]
+    - wait_for_commands(device_id: int, after: int | None = None, timeout: float | None = None) -> List[DeviceCommand]
+    - await_commands(device_id: int, after: int | None = None, timeout: float | None = None) -> List[DeviceCommand]
+    - acknowledge_commands(device_id: int, command_ids: Iterable[int]) -> int
+
+"""
+
+import asyncio
+import contextlib
+import functools
+import threading
+import time
+from datetime import datetime
+from typing import *
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Device, DeviceCommand, DeviceGroup, DeviceGroupCommand
+
+
+# -----------------------------------------------------------------------------
+# Notifications
+# -----------------------------------------------------------------------------
+class CommandNotifier:
+    """
+    Wakes the requests waiting for a device's commands, in this process.
+
+    Waiting requests subscribe a callback to their device (a threading.Event's
+    `set`, or an asyncio.Event's, scheduled in its event loop), called when
+    commands are queued for the device.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._waiters: Dict[int, Set[Callable[[], None]]] = {}
+
+    @contextlib.contextmanager
+    def subscribe(self, device_id: int, wake: Callable[[], None]) -> Iterator[None]:
+        """Call `wake` when commands are queued for the device, until the block exits"""
+        with self._lock:
+            self._waiters.setdefault(device_id, set()).add(wake)
+        try:
+            yield
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(device_id)
+                waiters.discard(wake)
+                if not waiters:
+                    del self._waiters[device_id]
+
+    def notify(self, device_ids: Iterable[int]) -> None:
+        """Wake the requests waiting for the devices' commands"""
+        with self._lock:
+            wakes = [
+                wake
+                for device_id in set(device_ids)
+                for wake in self._waiters.get(device_id, ())
+            ]
+        for wake in wakes:
+            wake()
+
+    def waiting(self, device_id: int | None = None) -> int:
+        """Number of requests waiting for a device's commands, or for any device's"""
+        with self._lock:
+            if device_id is not None:
+                return len(self._waiters.get(device_id, ()))
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+@functools.lru_cache(maxsize=None)
+def get_command_notifier() -> CommandNotifier:
+    """The process' command notifier"""
+    return CommandNotifier()
+
+
+# -----------------------------------------------------------------------------
+# Commands
+# -----------------------------------------------------------------------------
+def queue_commands(
+    devices: Iterable[Device | int],
+    name: str,
+    payload: Any = None,
+    expires: datetime | None = None,
+    using: str | None = None,
+    group_command: DeviceGroupCommand | None = None,
+) -> List[DeviceCommand]:
+    """
+    Queue a command for devices, in one insert, and wake their waiting
+    requests once the current transaction commits
+
+    :param devices: devices, or device ids
+    :type devices: Iterable[Device | int]
+    :param name: command name
+    :type name: str
+    :param payload: command arguments, default: {}
+    :type payload: Any
+    :param expires: commands not acknowledged by then are dropped
+    :type expires: datetime | None
+    :param using: database alias, default: the router's
+    :type using: str | None
+    :param group_command: the group command the commands are queued for
+    :type group_command: DeviceGroupCommand | None
+    :return: queued commands
+    :rtype: List[DeviceCommand]
+    """
+    device_ids = [device.pk if isinstance(device, Device) else device for device in devices]
+    if not device_ids:
+        return []
+    using = using or router.db_for_write(DeviceCommand)
+    now = timezone.now()
+    commands = DeviceCommand.objects.using(using).bulk_create(
+        DeviceCommand(
+            device_id=device_id,
+            name=name,
+            payload={} if payload is None else payload,
+            created=now,
+            expires=expires,
+            group_command=group_command,
+        )
+        for device_id in device_ids
+    )
+    transaction.on_commit(
+        lambda: get_command_notifier().notify(device_ids), using=using
+    )
+    return commands
+
+
+def get_group_device_ids(group: DeviceGroup | int, using: str | None = None) -> List[int]:
+    """Ids of a group's active devices, in one query"""
+    group_id = group.pk if isinstance(group, DeviceGroup) else group
+    return list(
+        Device.objects.using(using)
+        .filter(group_id=group_id, is_active=True)
+        .values_list("pk", flat=True)
+    )
+
+
+def queue_group_command(
+    group: DeviceGroup | int,
+    name: str,
+    payload: Any = None,
+    expires: datetime | None = None,
+    using: str | None = None,
+) -> DeviceGroupCommand:
+    """
+    Queue a command for every active device of a group: the group command,
+    the group's devices (one query) and their commands (one insert),
+    whatever the number of devices
+
+    :param group: device group, or its id
+    :type group: DeviceGroup | int
+    :param name: command name
+    :type name: str
+    :param payload: command arguments, default: {}
+    :type payload: Any
+    :param expires: devices' commands not acknowledged by then are dropped
+    :type expires: datetime | None
+    :param using: database alias, default: the router's
+    :type using: str | None
+    :return: the group command, with its devices' commands counts (see DeviceGroupCommandQuerySet.with_counts)
+    :rtype: DeviceGroupCommand
+    """
+    using = using or router.db_for_write(DeviceGroupCommand)
+    payload = {} if payload is None else payload
+    with transaction.atomic(using=using):
+        group_command = DeviceGroupCommand.objects.using(using).create(
+            group_id=group.pk if isinstance(group, DeviceGroup) else group,
+            name=name,
+            payload=payload,
+            expires=expires,
+        )
+        device_ids = get_group_device_ids(group, using)
+        queue_commands(device_ids, name, payload, expires, using, group_command=group_command)
+    # the commands were just queued, their counts are known
+    group_command.total = group_command.pending = len(device_ids)
+    group_command.delivered = group_command.acknowledged = group_command.expired = 0
+    return group_command
+
+
+def deliver_commands(
+    device_id: int, after: int | None = None, limit: int | None = None
+) -> List[DeviceCommand]:
+    """
+    Device's unacknowledged commands, oldest first, pending ones are marked
+    delivered
+
+    :param device_id: device id
+    :type device_id: int
+    :param after: only commands after this command id (the last one the device received)
+    :type after: int | None
+    :param limit: max number of commands, default: `DEVICE_COMMANDS_BATCH_SIZE`
+    :type limit: int | None
+    :return: commands to deliver
+    :rtype: List[DeviceCommand]
+    """
+    limit = limit or settings.DEVICE_COMMANDS_BATCH_SIZE
+    commands = DeviceCommand.objects.unacknowledged().filter(device_id=device_id)
+    if after is not None:
+        commands = commands.filter(id__gt=after)
+    commands = list(commands.order_by("id")[:limit])
+
+    pending = [command for command in commands if command.status == DeviceCommand.Status.PENDING]
+    if pending:
+        now = timezone.now()
+        DeviceCommand.objects.filter(
+            id__in=[command.id for command in pending],
+            status=DeviceCommand.Status.PENDING,
+        ).update(status=DeviceCommand.Status.DELIVERED, delivered=now)
+        for command in pending:
+            command.status = DeviceCommand.Status.DELIVERED
+            command.delivered = now
+    return commands
+
+
+def release_connections() -> None:
+    """Close the thread's database connections (or release them to their pool), but in transactions"""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def get_poll_timeout(timeout: float | None) -> float:
+    """Requested long-poll timeout, at most `DEVICE_COMMANDS_POLL_TIMEOUT` seconds"""
+    max_timeout = settings.DEVICE_COMMANDS_POLL_TIMEOUT
+    return max_timeout if timeout is None else max(0.0, min(timeout, max_timeout))
+
+
+def wait_for_commands(
+    device_id: int, after: int | None = None, timeout: float | None = None
+) -> List[DeviceCommand]:
+    """
+    Deliver device's commands, waiting for some to be queued when it has
+    none, blocking the calling thread
+
+    :param device_id: device id
+    :type device_id: int
+    :param after: only commands after this command id
+    :type after: int | None
+    :param timeout: max seconds to wait, at most (and by default) `DEVICE_COMMANDS_POLL_TIMEOUT`
+    :type timeout: float | None
+    :return: delivered commands, empty when none were queued before the timeout
+    :rtype: List[DeviceCommand]
+    """
+    deadline = time.monotonic() + get_poll_timeout(timeout)
+    event = threading.Event()
+    # subscribed before the commands are read, so none is missed
+    with get_command_notifier().subscribe(device_id, event.set):
+        while True:
+            event.clear()
+            commands = deliver_commands(device_id, after)
+            remaining = deadline - time.monotonic()
+            if commands or remaining <= 0:
+                return commands
+            # an idle connection per waiting request would exhaust the database's connections
+            release_connections()
+            event.wait(remaining)
+
+
+async def await_commands(
+    device_id: int, after: int | None = None, timeout: float | None = None
+) -> List[DeviceCommand]:
+    """
+    Deliver device's commands, waiting for some to be queued when it has
+    none, in the event loop (see wait_for_commands)
+    """
+    deadline = time.monotonic() + get_poll_timeout(timeout)
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+
+    def wake() -> None:
+        # the request may have finished, and its loop closed, since it was notified
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(event.set)
+
+    with get_command_notifier().subscribe(device_id, wake):
+        while True:
+            event.clear()
+            commands = await sync_to_async(deliver_commands)(device_id, after)
+            remaining = deadline - time.monotonic()
+            if commands or remaining <= 0:
+                return commands
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(event.wait(), remaining)
+
+
+def acknowledge_commands(device_id: int, command_ids: Iterable[int]) -> int:
+    """
+    Acknowledge device's commands, in one update
+
+    :param device_id: device id
+    :type device_id: int
+    :param command_ids: ids of the commands the device ran
+    :type command_ids: Iterable[int]
+    :return: number of acknowledged commands (unknown, and already acknowledged commands are skipped)
+    :rtype: int
+    """
+    return DeviceCommand.objects.filter(
+        device_id=device_id,
+        id__in=list(command_ids),
+        status__in=[DeviceCommand.Status.PENDING, DeviceCommand.Status.DELIVERED],
+    ).update(status=DeviceCommand.Status.ACKNOWLEDGED, acknowledged=timezone.now())
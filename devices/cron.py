@@ -0,0 +1,140 @@
+"""
+Cron expressions of device schedules (see devices.schedules).
+
+Expressions have the 5 standard fields: minute, hour, day of month, month,
+day of week (0-7, 0 and 7 are sunday), each one a `*`, a value, a range
+(`1-5`), a step (`*/15`, `0-30/10`), or a list of them (`1,3,5`). Names of
+months and days aren't supported. As in cron, when both the day of month and
+the day of week are restricted (not `*`), a day matching either one matches
+(`0 8 1 * 1` runs on the 1st of each month, and on mondays). Expressions that
+never match (`0 0 31 2 *`) are invalid.
+
+Run times are computed in the current time zone (`TIME_ZONE`), by a
+`dateutil.rrule` recurrence (a set of two recurrences, of the days of month
+and of the days of week, when both are restricted), without scanning minutes.
+
+Classes:
+--------
+
+    - CronExpression
+
+Functions:
+----------
+
+    - validate_cron_expression(value: str) -> None
+
+"""
+
+from datetime import datetime, time
+from typing import *
+
+from dateutil import rrule
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# days in each month, in leap years
+MONTH_DAYS: Final[Tuple[int, ...]] = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# (name, min value, max value) of the fields
+FIELDS: Final[Tuple[Tuple[str, int, int], ...]] = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+
+
+class CronExpression:
+    """
+    A parsed cron expression, and its next run times
+    """
+
+    def __init__(self, expression: str) -> None:
+        parts = expression.split()
+        if len(parts) != len(FIELDS):
+            raise ValueError(f"expected {len(FIELDS)} fields, got {len(parts)}")
+        self.expression = expression
+        minutes, hours, days, months, weekdays = (
+            self.parse_field(part, *field) for part, field in zip(parts, FIELDS)
+        )
+        if days is not None and not any(
+            days[0] <= MONTH_DAYS[month - 1] for month in months or range(1, 13)
+        ):
+            if weekdays is None:
+                raise ValueError("the days of month never occur in the months")
+            # only the days of week match
+            days = None
+        # cron's sunday is 0 (or 7), dateutil's is 6
+        if weekdays is not None:
+            weekdays = sorted({(weekday - 1) % 7 for weekday in weekdays})
+        rule_kwargs = dict(
+            freq=rrule.DAILY,
+            byminute=minutes if minutes is not None else range(60),
+            byhour=hours if hours is not None else range(24),
+            bymonth=months,
+            bysecond=0,
+        )
+        # days matching the days of month, or the days of week
+        if days is not None and weekdays is not None:
+            self._rules_kwargs = [
+                dict(rule_kwargs, bymonthday=days),
+                dict(rule_kwargs, byweekday=weekdays),
+            ]
+        else:
+            self._rules_kwargs = [dict(rule_kwargs, bymonthday=days, byweekday=weekdays)]
+
+    def __str__(self) -> str:
+        return self.expression
+
+    @staticmethod
+    def parse_field(value: str, name: str, minimum: int, maximum: int) -> List[int] | None:
+        """Values of a field, None if it's unrestricted (`*`)"""
+        if value == "*":
+            return None
+        values = set()
+        for item in value.split(","):
+            values_range, _, step = item.partition("/")
+            try:
+                step = int(step) if step else 1
+                if values_range == "*":
+                    start, stop = minimum, maximum
+                elif "-" in values_range:
+                    start, stop = (int(bound) for bound in values_range.split("-", 1))
+                else:
+                    start = int(values_range)
+                    # `5/10`: from 5, every 10
+                    stop = maximum if step != 1 else start
+            except ValueError:
+                raise ValueError(f"invalid {name}: {item!r}") from None
+            if not minimum <= start <= stop <= maximum or step < 1:
+                raise ValueError(f"invalid {name}: {item!r}, values are {minimum}-{maximum}")
+            values.update(range(start, stop + 1, step))
+        return sorted(values)
+
+    def next_after(self, after: datetime) -> datetime:
+        """
+        First run time strictly after a date and time
+
+        :param after: aware date and time
+        :type after: datetime
+        :return: next run time (aware)
+        :rtype: datetime
+        """
+        local_after = timezone.localtime(after).replace(tzinfo=None)
+        day_start = datetime.combine(local_after.date(), time())
+        recurrence = rrule.rruleset()
+        for rule_kwargs in self._rules_kwargs:
+            recurrence.rrule(rrule.rrule(dtstart=day_start, **rule_kwargs))
+        return timezone.make_aware(recurrence.after(local_after))
+
+
+def validate_cron_expression(value: str) -> None:
+    """Validate a cron expression"""
+    try:
+        CronExpression(value)
+    except ValueError as error:
+        raise ValidationError(
+            _("Enter a valid cron expression: %(error)s."), code="invalid", params={"error": error}
+        )
@@ -0,0 +1,82 @@
+from typing import *
+
+from django.db import models
+from django.db.models.fields.json import KeyTransform
+
+from common import fastjson
+
+
+class SerializedJSON:
+    """
+    A JSON value paired with its already serialized form.
+
+    Assigning a SerializedJSON to a SerializedJSONField stores `serialized`
+    as is, instead of encoding `value` again. The field replaces it with
+    the plain `value` on save, so the model instance never exposes the wrapper.
+
+    `value` must not be mutated after wrapping, or the stored JSON will not
+    match it.
+    """
+
+    __slots__ = ("value", "serialized")
+
+    def __init__(self, value: Any, serialized: str) -> None:
+        self.value = value
+        self.serialized = serialized
+
+    def __repr__(self) -> str:
+        return f"SerializedJSON({self.serialized!r})"
+
+
+class SerializedJSONField(models.JSONField):
+    """
+    JSONField that skips encoding values that were serialized during
+    validation (see SerializedJSON), and encodes/decodes objects with
+    orjson when it's installed (see common.fastjson).
+    """
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if isinstance(value, SerializedJSON):
+            setattr(model_instance, self.attname, value.value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, SerializedJSON):
+            return value.serialized
+        if not prepared and isinstance(value, (dict, list)):
+            return fastjson.dumps(value, cls=self.encoder)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def from_db_value(self, value, expression, connection):
+        if (
+            self.decoder is not None
+            or not isinstance(value, str)
+            or isinstance(expression, KeyTransform)
+        ):
+            return super().from_db_value(value, expression, connection)
+        try:
+            return fastjson.loads(value)
+        except ValueError:
+            return value
+
+
+class LowercaseSlugField(models.SlugField):
+    """
+    SlugField that stores values in lowercase.
+
+    Values are lowercased when saved, and in exact/in lookups, so that
+    case insensitive lookups (e.g. names from URLs) are plain equality
+    lookups, that can use the field's indexes, instead of iexact.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if isinstance(value, str) and not value.islower():
+            value = value.lower()
+            setattr(model_instance, self.attname, value)
+        return value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        return value.lower() if isinstance(value, str) else value
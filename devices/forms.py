@@ -1,8 +1,8 @@
-from distutils.command import clean
 from typing import *
 
 from django.db.models import TextChoices
-from django.forms import CharField, ChoiceField, Form, ModelChoiceField, ModelForm
+from django.forms import CharField, ChoiceField, Form, ModelChoiceField, ModelForm, TextInput
+from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
 from common.forms.mixins import (
@@ -102,6 +102,14 @@ class DeviceSearchForm(Form):
         max_length=100,
         label=_("Name"),
         required=False,
+        # suggestions of the search bar (see base/js/typeahead.js)
+        widget=TextInput(
+            attrs={
+                "autocomplete": "off",
+                "list": "search-typeahead",
+                "data-typeahead-url": reverse_lazy("devices:typeahead"),
+            }
+        ),
     )
 
     search_for = ChoiceField(
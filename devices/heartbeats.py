@@ -0,0 +1,195 @@
+"""
+Device heartbeats, online and offline devices.
+
+When a device's data is received (DeviceData.save, and bulk_create), the
+time is recorded in the worker's memory (HeartbeatTracker), and flushed to
+the heartbeats table (DeviceHeartbeat, one row per device) every
+`DEVICE_HEARTBEAT_FLUSH_INTERVAL` seconds, by a background thread, in one
+upsert of the devices that reported since the last flush. Data history is
+never scanned for the devices' last report.
+
+A device is online once it reports, and offline when it's silent for longer
+than its expected interval (`Device.heartbeat_interval`, or
+`DEVICE_HEARTBEAT_INTERVAL`), plus the flush interval (heartbeats are
+flushed late). Offline devices are marked by the sweeper, a periodic job
+(see devices.tasks), so lists show devices' status from their heartbeat
+rows only.
+
+Heartbeats of a worker that exits abruptly are lost, their devices are
+online again when they report next. Workers flushing the same device
+concurrently may keep the older heartbeat (by less than the flush interval).
+
+Classes:
+--------
+
+    - HeartbeatTracker
+
+Functions:
+----------
+
+    - get_heartbeat_tracker() -> HeartbeatTracker
+    - record_heartbeats(device_ids: Iterable[int]) -> None
+    - flush_heartbeats(last_seen: Dict[int, datetime]) -> int
+    - sweep_offline_devices(now: datetime | None = None) -> int
+
+"""
+
+import atexit
+import functools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import *
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Device, DeviceHeartbeat
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Heartbeats
+# -----------------------------------------------------------------------------
+def get_offline_after(last_seen: datetime, heartbeat_interval: int | None) -> datetime:
+    """When a device is offline, if it's still silent"""
+    interval = heartbeat_interval or settings.DEVICE_HEARTBEAT_INTERVAL
+    return last_seen + timedelta(seconds=interval + settings.DEVICE_HEARTBEAT_FLUSH_INTERVAL)
+
+
+def flush_heartbeats(last_seen: Dict[int, datetime]) -> int:
+    """
+    Write devices' heartbeats, in one upsert, devices going online again
+    have their status changed
+
+    :param last_seen: devices' last reports, by device id
+    :type last_seen: Dict[int, datetime]
+    :return: number of heartbeats written (deleted devices are skipped)
+    :rtype: int
+    """
+    if not last_seen:
+        return 0
+    now = timezone.now()
+    heartbeats = [
+        DeviceHeartbeat(
+            device_id=device_id,
+            last_seen=last_seen[device_id],
+            offline_after=get_offline_after(last_seen[device_id], heartbeat_interval),
+            online=True,
+            status_changed=status_changed if online else now,
+        )
+        for device_id, heartbeat_interval, online, status_changed in Device.objects.filter(
+            pk__in=last_seen
+        ).values_list("pk", "heartbeat_interval", "heartbeat__online", "heartbeat__status_changed")
+    ]
+    DeviceHeartbeat.objects.bulk_create(
+        heartbeats,
+        update_conflicts=True,
+        unique_fields=["device"],
+        update_fields=["last_seen", "offline_after", "online", "status_changed"],
+    )
+    return len(heartbeats)
+
+
+def sweep_offline_devices(now: datetime | None = None) -> int:
+    """
+    Mark online devices silent for longer than their expected interval offline
+
+    :param now: current time, default: now
+    :type now: datetime | None
+    :return: number of devices gone offline
+    :rtype: int
+    """
+    now = now or timezone.now()
+    offline = DeviceHeartbeat.objects.filter(online=True, offline_after__lt=now).update(
+        online=False, status_changed=now
+    )
+    if offline:
+        logger.info("%s devices went offline", offline)
+    return offline
+
+
+# -----------------------------------------------------------------------------
+# Tracker
+# -----------------------------------------------------------------------------
+class HeartbeatTracker:
+    """
+    Devices' last reports, in memory, flushed periodically by a background
+    thread (started by the first report after a flush), or on each report
+    when the flush interval is 0
+    """
+
+    def __init__(self, flush_interval: float | None = None) -> None:
+        self._flush_interval = flush_interval
+        self._last_seen: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+
+    @property
+    def flush_interval(self) -> float:
+        if self._flush_interval is None:
+            return settings.DEVICE_HEARTBEAT_FLUSH_INTERVAL
+        return self._flush_interval
+
+    def record(self, device_ids: Iterable[int], seen: datetime | None = None) -> None:
+        """Record reports of devices"""
+        seen = seen or timezone.now()
+        with self._lock:
+            for device_id in device_ids:
+                self._last_seen[device_id] = seen
+            if self.flush_interval and self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name="heartbeats-flush", daemon=True)
+                self._flusher.start()
+        if not self.flush_interval:
+            try:
+                self.flush()
+            except Exception:
+                # data is received regardless, heartbeats are flushed with the next report
+                logger.exception("Heartbeats flush failed")
+
+    def flush(self) -> int:
+        """Write recorded reports, return the number of written heartbeats"""
+        with self._lock:
+            last_seen, self._last_seen = self._last_seen, {}
+        try:
+            return flush_heartbeats(last_seen)
+        except Exception:
+            # kept for the next flush, unless newer reports were recorded
+            with self._lock:
+                self._last_seen = {**last_seen, **self._last_seen}
+            raise
+
+    def pending(self) -> int:
+        """Number of devices with recorded reports, not flushed yet"""
+        return len(self._last_seen)
+
+    def _run_flusher(self) -> None:
+        try:
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Heartbeats flush failed")
+                with self._lock:
+                    if not self._last_seen:
+                        self._flusher = None
+                        return
+        finally:
+            connections.close_all()
+
+
+@functools.lru_cache(maxsize=None)
+def get_heartbeat_tracker() -> HeartbeatTracker:
+    """Heartbeat tracker of the worker, flushed when the worker exits"""
+    tracker = HeartbeatTracker()
+    atexit.register(lambda: tracker.pending() and tracker.flush())
+    return tracker
+
+
+def record_heartbeats(device_ids: Iterable[int]) -> None:
+    """Record that devices reported now"""
+    get_heartbeat_tracker().record(device_ids)
@@ -0,0 +1,67 @@
+from typing import *
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from devices.partitions import add_months, apply_retention, get_partitioner
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly partitions of device data (PostgreSQL), or move "
+        "months that ended to their partitions (SQLite), and remove data older "
+        "than the retention period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=None,
+            help="Database alias, the database of device data by default.",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Convert the device data table to a partitioned table first.",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=settings.DEVICE_DATA_PARTITIONS_AHEAD,
+            help="Number of months to create partitions for, after this month.",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.DEVICE_DATA_RETENTION_MONTHS,
+            help="Keep data of this many months (plus this month), 0 keeps all data.",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        now = timezone.now()
+        partitioner = get_partitioner(using)
+        created = []
+
+        if options["convert"]:
+            if partitioner is None:
+                raise CommandError(
+                    "Partitioning is only supported on PostgreSQL and (file) SQLite databases."
+                )
+            if partitioner.is_partitioned():
+                raise CommandError("Device data table is already partitioned.")
+            created = partitioner.convert(options["ahead"])
+
+        # before the update, SQLite partitions of old months aren't created
+        if options["retention_months"] > 0:
+            before = add_months(now, -options["retention_months"])
+            dropped, deleted = apply_retention(before, using=using)
+            for name in dropped:
+                self.stdout.write(f"Dropped partition {name}")
+            self.stdout.write(f"Deleted {deleted} device data older than {before:%Y-%m-%d}")
+
+        if partitioner is not None and partitioner.is_partitioned():
+            created += partitioner.update_partitions(now, options["ahead"])
+        for name in created:
+            self.stdout.write(f"Created partition {name}")
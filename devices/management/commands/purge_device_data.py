@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from devices.models import DeviceDataPurge
+from devices.purge import count_remaining_rows, purge_device_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the data of deleted devices (pending purges, see devices.purge), "
+        "in batches, e.g. from cron, when they're not purged by background jobs "
+        "(DEVICE_DATA_PURGE_IN_BACKGROUND)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Report the progress of pending purges, without running them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows deleted per query (default: DEVICE_DATA_PURGE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=None,
+            help="Seconds between batches (default: DEVICE_DATA_PURGE_BATCH_PAUSE).",
+        )
+
+    def handle(self, *args, **options):
+        purges = DeviceDataPurge.objects.pending().order_by("created")
+        if options["status"]:
+            for purge in purges:
+                self.stdout.write(
+                    f"device {purge.device_id}: {purge.deleted_rows} rows deleted, "
+                    f"{count_remaining_rows(purge)} remaining (since {purge.created:%Y-%m-%d %H:%M:%S})"
+                )
+            self.stdout.write(f"{len(purges)} pending purges")
+            return
+
+        for purge in purges:
+            deleted = purge_device_data(purge, options["batch_size"], options["pause"])
+            self.stdout.write(f"Purged {deleted} rows of device {purge.device_id}")
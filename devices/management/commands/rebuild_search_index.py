@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from devices.search import has_search_tables, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search tables of devices and groups names (SQLite FTS5, "
+        "see devices.search), e.g. after bulk updates that skip signals. "
+        "Databases without search tables (e.g. PostgreSQL, indexed by pg_trgm) "
+        "are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Rebuild the search tables of this database.",
+        )
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        if alias not in connections:
+            raise CommandError(f"Unknown database '{alias}'.")
+
+        rebuild_search_index(alias)
+        if has_search_tables(alias):
+            self.stdout.write(f"Rebuilt search index of {alias}")
+        else:
+            self.stdout.write(f"Database {alias} has no search tables, skipped")
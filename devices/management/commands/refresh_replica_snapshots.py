@@ -0,0 +1,87 @@
+import os
+import sqlite3
+from pathlib import Path
+from typing import *
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from common.db.backends.sqlite3.base import PARTITION_FILE_SUFFIX
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh SQLite snapshot replicas (see DATABASE_REPLICAS) with a copy "
+        "of their primary database, and of its partitions. Other replicas (e.g. "
+        "PostgreSQL standbys) are kept up to date by their database, and are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=None,
+            help="Refresh replicas of this primary database only.",
+        )
+
+    def handle(self, *args, **options):
+        replicas = settings.DATABASE_REPLICAS
+        if options["database"] is not None:
+            if options["database"] not in replicas:
+                raise CommandError(f"Database '{options['database']}' has no replicas.")
+            replicas = {options["database"]: replicas[options["database"]]}
+
+        for primary, aliases in replicas.items():
+            source = connections[primary]
+            if source.vendor != "sqlite":
+                continue
+            for alias in aliases:
+                if connections[alias].vendor != "sqlite":
+                    continue
+                self.refresh_snapshot(source, alias)
+                self.stdout.write(f"Refreshed replica {alias} of {primary}")
+
+    def refresh_snapshot(self, source, alias: str) -> None:
+        """
+        Copy the source database, and its partitions (see
+        common.db.backends.sqlite3), to temporary files, then replace the
+        replica files, so readers never see a partial copy (open connections
+        keep reading the previous snapshot until they are closed)
+        """
+        replica = connections[alias]
+        path = Path(replica.settings_dict["NAME"])
+        partitions = [name for names in source.sync_partitions().values() for name in names]
+        partitions_dir = replica.partitions_dir
+        if partitions and partitions_dir is None:
+            raise CommandError(f"Replica {alias} has no partitions directory.")
+
+        copies = [("main", path)] + [
+            (name, partitions_dir / f"{name}{PARTITION_FILE_SUFFIX}") for name in partitions
+        ]
+        if partitions:
+            partitions_dir.mkdir(parents=True, exist_ok=True)
+        source.ensure_connection()
+        # copies are made in one read transaction, rows moved to partitions
+        # meanwhile are in one of them only
+        source.connection.execute("BEGIN")
+        try:
+            for name, _ in copies:
+                source.connection.execute(f"SELECT count(*) FROM {source.ops.quote_name(name)}.sqlite_master")
+            for name, copy_path in copies:
+                snapshot = sqlite3.connect(f"{copy_path}.tmp")
+                try:
+                    source.connection.backup(snapshot, name=name)
+                finally:
+                    snapshot.close()
+        finally:
+            source.connection.execute("COMMIT")
+
+        # partitions first, new connections may briefly read moved rows twice,
+        # rather than miss them
+        for _, copy_path in reversed(copies):
+            os.replace(f"{copy_path}.tmp", copy_path)
+        if partitions_dir is not None and partitions_dir.is_dir():
+            for stale_path in partitions_dir.glob(f"*{PARTITION_FILE_SUFFIX}"):
+                if stale_path.name[: -len(PARTITION_FILE_SUFFIX)] not in partitions:
+                    stale_path.unlink()
+        replica.close()
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from devices.schedules import run_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run device schedules (see devices.schedules), queuing their commands at "
+        "their run times, until stopped (SIGTERM or SIGINT)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh-interval",
+            type=float,
+            default=None,
+            help="Seconds between loads of changed schedules (default: DEVICE_SCHEDULES_REFRESH_INTERVAL).",
+        )
+        parser.add_argument(
+            "--misfire-grace",
+            type=float,
+            default=None,
+            help="Seconds a run may be late before it's skipped (default: DEVICE_SCHEDULES_MISFIRE_GRACE).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the due schedules, and stop.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Running device scheduler")
+        runs = run_scheduler(
+            refresh_interval=options["refresh_interval"],
+            misfire_grace=options["misfire_grace"],
+            once=options["once"],
+        )
+        self.stdout.write(f"Device scheduler stopped ({runs} runs)")
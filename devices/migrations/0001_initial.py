@@ -39,13 +39,31 @@ class Migration(migrations.Migration):
                 ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.member', verbose_name='device group owner')),
             ],
         ),
-        migrations.CreateModel(
-            name='DeviceData',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('message', models.JSONField(blank=True, default=devices.models.initialize_device_data, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='device data')),
-                ('date', models.DateTimeField(default=datetime.datetime(1900, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc), help_text='when was the data received', verbose_name='last update')),
-                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='devices.device')),
+        # device data may be in another database than devices (see
+        # common.routers), its foreign keys are created without constraints,
+        # the constraints of existing databases are dropped by 0006
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='DeviceData',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('message', models.JSONField(blank=True, default=devices.models.initialize_device_data, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='device data')),
+                        ('date', models.DateTimeField(default=datetime.datetime(1900, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc), help_text='when was the data received', verbose_name='last update')),
+                        ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='devices.device')),
+                    ],
+                ),
+            ],
+            database_operations=[
+                migrations.CreateModel(
+                    name='DeviceData',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('message', models.JSONField(blank=True, default=devices.models.initialize_device_data, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='device data')),
+                        ('date', models.DateTimeField(default=datetime.datetime(1900, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc), help_text='when was the data received', verbose_name='last update')),
+                        ('device', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='devices.device')),
+                    ],
+                ),
             ],
         ),
         migrations.AddField(
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-19 08:43
+
+import devices.fields
+import devices.models
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='device',
+            name='name',
+            field=models.SlugField(error_messages={'invalid': 'Enter a valid device name consisting of letters, numbers, underscores or hyphens.'}, help_text='human friendly device name', max_length=32, verbose_name='device name'),
+        ),
+        migrations.AlterField(
+            model_name='devicedata',
+            name='message',
+            field=devices.fields.SerializedJSONField(blank=True, default=devices.models.initialize_device_data, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='data message'),
+        ),
+        migrations.AlterField(
+            model_name='devicegroup',
+            name='name',
+            field=models.SlugField(error_messages={'invalid': 'Enter a valid device group name consisting of letters, numbers, underscores or hyphens.'}, max_length=32, verbose_name='device group name'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.4 on 2026-10-19 09:03
+
+import devices.fields
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def lowercase_names(apps, schema_editor):
+    """Normalize existing names, before adding the unique constraints"""
+    db_alias = schema_editor.connection.alias
+    for model_name in ("DeviceGroup", "Device"):
+        model = apps.get_model("devices", model_name)
+        model.objects.using(db_alias).update(name=Lower("name"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0002_alter_devicedata_message'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='device',
+            name='name',
+            field=devices.fields.LowercaseSlugField(error_messages={'invalid': 'Enter a valid device name consisting of letters, numbers, underscores or hyphens.'}, help_text='human friendly device name', max_length=32, verbose_name='device name'),
+        ),
+        migrations.AlterField(
+            model_name='device',
+            name='uid',
+            field=models.UUIDField(help_text='a globally unique ID for the device', unique=True, verbose_name='device unique ID'),
+        ),
+        migrations.AlterField(
+            model_name='devicegroup',
+            name='name',
+            field=devices.fields.LowercaseSlugField(error_messages={'invalid': 'Enter a valid device group name consisting of letters, numbers, underscores or hyphens.'}, max_length=32, verbose_name='device group name'),
+        ),
+        migrations.RunPython(
+            lowercase_names, migrations.RunPython.noop, hints={"model_name": "device"}
+        ),
+        migrations.AddConstraint(
+            model_name='device',
+            constraint=models.UniqueConstraint(fields=('group', 'name'), name='unique_device_name_per_group'),
+        ),
+        migrations.AddConstraint(
+            model_name='devicegroup',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='unique_device_group_name_per_owner'),
+        ),
+    ]
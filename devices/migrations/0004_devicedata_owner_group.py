@@ -0,0 +1,103 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def populate_owner_and_group(apps, schema_editor):
+    """Copy group and owner of each data's device"""
+    db_alias = schema_editor.connection.alias
+    Device = apps.get_model("devices", "Device")
+    DeviceData = apps.get_model("devices", "DeviceData")
+    if not DeviceData.objects.using(db_alias).exists():
+        # nothing to copy, e.g. a new telemetry database, without devices
+        return
+    devices = Device.objects.using(db_alias).filter(pk=OuterRef("device_id"))
+    DeviceData.objects.using(db_alias).update(
+        group_id=Subquery(devices.values("group_id")[:1]),
+        owner_id=Subquery(devices.values("group__owner_id")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('devices', '0003_normalized_names_and_unique_indexes'),
+    ]
+
+    operations = [
+        # without constraints in the database, as in 0001
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='devicedata',
+                    name='group',
+                    field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='devices.devicegroup'),
+                ),
+            ],
+            database_operations=[
+                migrations.AddField(
+                    model_name='devicedata',
+                    name='group',
+                    field=models.ForeignKey(db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='devices.devicegroup'),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='devicedata',
+                    name='owner',
+                    field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.member'),
+                ),
+            ],
+            database_operations=[
+                migrations.AddField(
+                    model_name='devicedata',
+                    name='owner',
+                    field=models.ForeignKey(db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.member'),
+                ),
+            ],
+        ),
+        migrations.RunPython(
+            populate_owner_and_group,
+            migrations.RunPython.noop,
+            hints={"model_name": "devicedata"},
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='devicedata',
+                    name='group',
+                    field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='devices.devicegroup'),
+                ),
+            ],
+            database_operations=[
+                migrations.AlterField(
+                    model_name='devicedata',
+                    name='group',
+                    field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='devices.devicegroup'),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='devicedata',
+                    name='owner',
+                    field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.member'),
+                ),
+            ],
+            database_operations=[
+                migrations.AlterField(
+                    model_name='devicedata',
+                    name='owner',
+                    field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.member'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='devicedata',
+            index=models.Index(fields=['owner', '-date'], name='devicedata_owner_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0004_devicedata_owner_group'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='devicedata',
+            index=models.Index(fields=['date'], name='devicedata_date_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.4 on 2026-10-19 09:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('devices', '0005_devicedata_date_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='devicedata',
+            name='device',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='devices.device'),
+        ),
+        migrations.AlterField(
+            model_name='devicedata',
+            name='group',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, to='devices.devicegroup'),
+        ),
+        migrations.AlterField(
+            model_name='devicedata',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, to='accounts.member'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+# search tables and indexes of names, per model (see devices.search)
+SEARCH_TABLES = {
+    "devices_device": ("devices_device_search", "devices_device_name_trgm_idx"),
+    "devices_devicegroup": ("devices_devicegroup_search", "devices_devicegroup_name_trgm_idx"),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    """FTS5 (trigram) tables on SQLite, pg_trgm indexes on PostgreSQL"""
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table, (_, index) in SEARCH_TABLES.items():
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {index} ON {table} "
+                f"USING gin (name gin_trgm_ops)"
+            )
+        return
+
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+            # searched by the ORM
+            return
+        for search_table, _ in SEARCH_TABLES.values():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {search_table} "
+                f"USING fts5(name, owner, tokenize='trigram')"
+            )
+
+    db_alias = connection.alias
+    Device = apps.get_model("devices", "Device")
+    DeviceGroup = apps.get_model("devices", "DeviceGroup")
+    rows = {
+        "devices_device_search": Device.objects.using(db_alias).values_list(
+            "pk", "name", "group__owner_id"
+        ),
+        "devices_devicegroup_search": DeviceGroup.objects.using(db_alias).values_list(
+            "pk", "name", "owner_id"
+        ),
+    }
+    with connection.cursor() as cursor:
+        for search_table, values in rows.items():
+            cursor.executemany(
+                f"INSERT INTO {search_table} (rowid, name, owner) VALUES (%s, %s, %s)",
+                [(pk, name, f"#{owner_id}#") for pk, name, owner_id in values],
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    for search_table, index in SEARCH_TABLES.values():
+        if connection.vendor == "postgresql":
+            schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+        elif connection.vendor == "sqlite":
+            schema_editor.execute(f"DROP TABLE IF EXISTS {search_table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0006_devicedata_delete_with_device'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_search_indexes,
+            drop_search_indexes,
+            hints={"model_name": "device"},
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.4 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceDataPurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.BigIntegerField(verbose_name='device id')),
+                ('owner_id', models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='owner id')),
+                ('deleted_rows', models.PositiveBigIntegerField(default=0, verbose_name='deleted rows')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-19 11:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0008_devicedatapurge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='heartbeat_interval',
+            field=models.PositiveIntegerField(blank=True, help_text="seconds between the device's reports, the device is offline when it's silent for longer", null=True, verbose_name='expected report interval'),
+        ),
+        migrations.CreateModel(
+            name='DeviceHeartbeat',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='heartbeat', serialize=False, to='devices.device', verbose_name='device')),
+                ('last_seen', models.DateTimeField(verbose_name='last seen')),
+                ('offline_after', models.DateTimeField(verbose_name='offline after')),
+                ('online', models.BooleanField(default=True, verbose_name='online')),
+                ('status_changed', models.DateTimeField(default=django.utils.timezone.now, verbose_name='status changed')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['online', 'offline_after'], name='heartbeat_offline_idx')],
+            },
+        ),
+    ]
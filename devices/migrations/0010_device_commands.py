@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-19 11:20
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0009_device_heartbeats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='command name')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='payload')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('delivered', 'delivered'), ('acknowledged', 'acknowledged')], default='pending', max_length=16, verbose_name='status')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created')),
+                ('delivered', models.DateTimeField(blank=True, null=True, verbose_name='delivered')),
+                ('acknowledged', models.DateTimeField(blank=True, null=True, verbose_name='acknowledged')),
+                ('expires', models.DateTimeField(blank=True, null=True, verbose_name='expires')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commands', to='devices.device', verbose_name='device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device', 'status', 'id'], name='command_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.4 on 2026-10-19 11:28
+
+import django.core.serializers.json
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0010_device_commands'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='rule name')),
+                ('key', models.CharField(help_text="key of the device's messages compared to the threshold", max_length=64, verbose_name='message key')),
+                ('operator', models.CharField(choices=[('lt', '<'), ('lte', '<='), ('gt', '>'), ('gte', '>='), ('eq', '=='), ('ne', '!=')], max_length=3, verbose_name='operator')),
+                ('threshold', models.FloatField(verbose_name='threshold')),
+                ('hysteresis', models.FloatField(default=0.0, help_text='margin past the threshold before a triggered rule clears', validators=[django.core.validators.MinValueValidator(0.0)], verbose_name='hysteresis')),
+                ('debounce', models.PositiveIntegerField(default=0, help_text='seconds the condition must hold before the rule triggers, or clears', verbose_name='debounce')),
+                ('command', models.CharField(max_length=64, verbose_name='command')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='payload')),
+                ('clear_command', models.CharField(blank=True, max_length=64, verbose_name='clear command')),
+                ('clear_payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='clear payload')),
+                ('is_active', models.BooleanField(default=True, verbose_name='is rule active')),
+                ('triggered', models.BooleanField(default=False, editable=False, verbose_name='triggered')),
+                ('state_changed', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='state changed')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='updated')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules', to='devices.device', verbose_name='device')),
+                ('target', models.ForeignKey(blank=True, help_text="device that runs the commands, the rule's device when not set", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='targeted_rules', to='devices.device', verbose_name='target device')),
+            ],
+        ),
+    ]
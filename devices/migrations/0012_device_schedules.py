@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-19 11:37
+
+import devices.cron
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0011_device_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='schedule name')),
+                ('cron', models.CharField(help_text='minute hour day-of-month month day-of-week, e.g. 0 6 * * 1,3,5', max_length=128, validators=[devices.cron.validate_cron_expression], verbose_name='cron expression')),
+                ('command', models.CharField(max_length=64, verbose_name='command')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='payload')),
+                ('command_ttl', models.PositiveIntegerField(blank=True, help_text='seconds the command waits for its devices before it expires', null=True, verbose_name='command time to live')),
+                ('is_active', models.BooleanField(default=True, verbose_name='is schedule active')),
+                ('next_run_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='next run at')),
+                ('last_run_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last run at')),
+                ('updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated')),
+                ('device', models.ForeignKey(blank=True, help_text="the device that runs the command, when the schedule isn't a group's", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='devices.device', verbose_name='device')),
+                ('group', models.ForeignKey(blank=True, help_text='the group whose active devices run the command', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='devices.devicegroup', verbose_name='device group')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='deviceschedule',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('device__isnull', True), ('group__isnull', False)), models.Q(('device__isnull', False), ('group__isnull', True)), _connector='OR'), name='schedule_group_or_device'),
+        ),
+    ]
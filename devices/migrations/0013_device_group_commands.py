@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-19 11:45
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0012_device_schedules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceGroupCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='command name')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='payload')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created')),
+                ('expires', models.DateTimeField(blank=True, null=True, verbose_name='expires')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commands', to='devices.devicegroup', verbose_name='device group')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='devicecommand',
+            name='group_command',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='device_commands', to='devices.devicegroupcommand', verbose_name='group command'),
+        ),
+    ]
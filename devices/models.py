@@ -1,13 +1,18 @@
 import uuid
 
+from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from accounts.models import Member
 
+from .cron import CronExpression, validate_cron_expression
+from .fields import LowercaseSlugField, SerializedJSONField
+
 # Create your models here.
 
 
@@ -38,19 +43,22 @@ class DeviceGroup(models.Model):
 
     fields:
         - name: human readable name for the group,
-        must be a non empty string and can contain spaces.
+        must be a non empty string and can contain spaces. Stored in
+        lowercase, unique per owner.
         - creation_date: date and time when was the group is created
         - owner: the user that created the group. Each group has one owner.
         The group can be modified only by the owner, or the system admin.
 
     A device group is used to interact devices in bulk. Any interaction that
     is applied to a device group, is applied to all devices within the group.
+    Commands for a group are queued for all its active devices at once (see
+    DeviceGroupCommand).
     A device group can have 0 or more devices. Each device can join
     at most one group at any given time.
 
     """
 
-    name = models.SlugField(
+    name = LowercaseSlugField(
         max_length=32,
         unique=False,
         null=False,
@@ -83,6 +91,30 @@ class DeviceGroup(models.Model):
         verbose_name=_("device group owner"),
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "name"], name="unique_device_group_name_per_owner"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get("owner_id")
+        instance._loaded_name = instance.__dict__.get("name")
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """Save group, and move its devices' data to the new owner if it changed"""
+        loaded_owner_id = getattr(self, "_loaded_owner_id", None)
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if loaded_owner_id is not None and loaded_owner_id != self.owner_id:
+                DeviceData.objects.filter(group=self).update(owner_id=self.owner_id)
+        self._loaded_owner_id = self.owner_id
+        self._loaded_name = self.name
+
     def get_absolute_url(self):
         return reverse_lazy("devices:group_details", kwargs={"group_name": self.name})
 
@@ -109,13 +141,17 @@ class Device(models.Model):
     +---------------------------------+
 
     fields:
-        - name: human readable name for the device.
+        - name: human readable name for the device. Stored in lowercase,
+        unique per group.
         - uid: globally unique ID for the device, automatically generated
         from the device name using uuid.UUID5(uuid.NAMESPACE_X500, device_name)
         - is_active: is the device enabled, True by default and set to False when
         the device is disabled.
         - date_added: when was the device added to the system.
         - group: device group the device belongs to.
+        - heartbeat_interval: expected seconds between the device's reports,
+        the device is offline when it's silent for longer (see devices.heartbeats),
+        `DEVICE_HEARTBEAT_INTERVAL` when not set.
 
     A device is a physical device that is connected to the system.
     It can be a sensor, a camera, a robot, or any other device that sends data,
@@ -125,11 +161,12 @@ class Device(models.Model):
 
     # device properties
     uid = models.UUIDField(
+        unique=True,
         verbose_name="device unique ID",
         help_text="a globally unique ID for the device",
     )
 
-    name = models.SlugField(
+    name = LowercaseSlugField(
         max_length=32,
         verbose_name=_("device name"),
         help_text=_("human friendly device name"),
@@ -152,14 +189,47 @@ class Device(models.Model):
         help_text=_("when was the device added to the system"),
     )
 
+    heartbeat_interval = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("expected report interval"),
+        help_text=_("seconds between the device's reports, the device is offline when it's silent for longer"),
+    )
+
     # relations
     group = models.ForeignKey(
         DeviceGroup, on_delete=models.CASCADE, verbose_name=_("device group")
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["group", "name"], name="unique_device_name_per_group"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name}[{self.uid}]"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get("group_id")
+        instance._loaded_name = instance.__dict__.get("name")
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """Save device, and move its data to the new group if it changed"""
+        loaded_group_id = getattr(self, "_loaded_group_id", None)
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if loaded_group_id is not None and loaded_group_id != self.group_id:
+                self.devicedata_set.update(
+                    group_id=self.group_id, owner_id=self.group.owner_id
+                )
+        self._loaded_group_id = self.group_id
+        self._loaded_name = self.name
+
     @classmethod
     def generate_device_uid(cls, name: str) -> uuid.UUID:
         """Generate a device UID from the device name
@@ -174,6 +244,45 @@ class Device(models.Model):
     def get_absolute_url(self):
         return reverse_lazy("devices:device_details", kwargs={"device_uid": self.uid})
 
+    def get_heartbeat(self) -> "DeviceHeartbeat | None":
+        """Device heartbeat, None if the device never reported (select_related("heartbeat") in lists)"""
+        try:
+            return self.heartbeat
+        except DeviceHeartbeat.DoesNotExist:
+            return None
+
+    @property
+    def is_online(self) -> bool:
+        heartbeat = self.get_heartbeat()
+        return heartbeat is not None and heartbeat.online
+
+    @property
+    def last_seen(self) -> "timezone.datetime | None":
+        heartbeat = self.get_heartbeat()
+        return heartbeat and heartbeat.last_seen
+
+
+class DeviceDataQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Bulk insert device data, with group and owner set from the devices"""
+        objs = list(objs)
+        devices = {
+            device_id: (group_id, owner_id)
+            for device_id, group_id, owner_id in Device.objects.filter(
+                pk__in={obj.device_id for obj in objs}
+            ).values_list("pk", "group_id", "group__owner_id")
+        }
+        for obj in objs:
+            obj.group_id, obj.owner_id = devices[obj.device_id]
+        created = super().bulk_create(objs, *args, **kwargs)
+
+        from .heartbeats import record_heartbeats
+        from .rules import evaluate_rules
+
+        record_heartbeats(devices)
+        evaluate_rules(objs)
+        return created
+
 
 class DeviceData(models.Model):
     """
@@ -188,11 +297,36 @@ class DeviceData(models.Model):
     +----------------------------+
     | + date: ForeignKey(Device) |
     +----------------------------+
+    | + group: ForeignKey(Group) |
+    +----------------------------+
+    | + owner: ForeignKey(User)  |
+    +----------------------------+
 
     fields:
         - message: device data, JSON object that can contain any type of data.
         - date: when was the data received.
         - device: the device this data is associated with
+        - group: the device's group, denormalized from device
+        - owner: the group's owner, denormalized from device
+
+    group and owner are set from the device when the data is saved (or
+    bulk created), and updated when the device moves to another group
+    (Device.save), or the group to another owner (DeviceGroup.save).
+    Queryset updates of Device.group and DeviceGroup.owner bypass save(),
+    and must update the device data explicitly.
+
+    Saving (or bulk creating) data records its device's heartbeat, when it
+    last reported (see devices.heartbeats), and evaluates the device's rules
+    (see devices.rules).
+
+    Device data may be stored in a separate (telemetry) database, see
+    common.routers. Its foreign keys have no database constraints, and
+    no cascades: when a device is deleted, a post_delete signal handler
+    (devices.signals) records a DeviceDataPurge, and its data is deleted in
+    the background, in batches (see devices.purge). Queryset deletes of
+    devices bypass it.
+    With a separate database, updating device data in Device.save and
+    DeviceGroup.save is not atomic with the device/group update.
 
     """
 
@@ -206,7 +340,7 @@ class DeviceData(models.Model):
         tzinfo=timezone.get_default_timezone(),
     )
 
-    message = models.JSONField(
+    message = SerializedJSONField(
         encoder=DjangoJSONEncoder,
         verbose_name=_("data message"),
         default=initialize_device_data,
@@ -220,7 +354,468 @@ class DeviceData(models.Model):
         help_text=_("when was the data received"),
     )
 
+    # device data may be stored in a separate database (see common.routers),
+    # related objects are referenced by id only, without database constraints,
+    # device data is purged after its device is deleted (see devices.purge)
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+
+    objects = DeviceDataQuerySet.as_manager()
+
+    # denormalized from device, for member-wide feeds
+    group = models.ForeignKey(
+        DeviceGroup,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        editable=False,
+    )
+
+    owner = models.ForeignKey(
+        Member,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        editable=False,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "-date"], name="devicedata_owner_date_idx"),
+            # date range queries and retention (see devices.partitions)
+            models.Index(fields=["date"], name="devicedata_date_idx"),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        device = self.device
+        self.group_id = device.group_id
+        self.owner_id = device.group.owner_id
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .heartbeats import record_heartbeats
+            from .rules import evaluate_rules
+
+            record_heartbeats([self.device_id])
+            evaluate_rules([self])
+
+
+class DeviceDataPurgeQuerySet(models.QuerySet):
+    def pending(self):
+        """Purges not finished yet"""
+        return self.filter(finished=None)
+
+    def pending_device_ids(self, owner_id: int) -> list[int]:
+        """Ids of a member's deleted devices, whose data isn't purged yet"""
+        return list(self.pending().filter(owner_id=owner_id).values_list("device_id", flat=True))
+
+
+class DeviceDataPurge(models.Model):
+    """
+    Deleted device, whose data is being purged (see devices.purge).
+
+    fields:
+        - device_id: id of the deleted device
+        - owner_id: id of the device's owner, when it was deleted (if known)
+        - deleted_rows: number of device data rows deleted so far
+        - created: when the device was deleted
+        - finished: when all device data was deleted, null until then
+
+    Devices are referenced by id only, as they are deleted. Device data of
+    pending purges is hidden from members' data lists.
+    """
+
+    device_id = models.BigIntegerField(verbose_name=_("device id"))
+    owner_id = models.BigIntegerField(
+        verbose_name=_("owner id"), db_index=True, null=True, blank=True
+    )
+    deleted_rows = models.PositiveBigIntegerField(verbose_name=_("deleted rows"), default=0)
+    created = models.DateTimeField(verbose_name=_("created"), auto_now_add=True)
+    finished = models.DateTimeField(verbose_name=_("finished"), null=True, blank=True)
+
+    objects = DeviceDataPurgeQuerySet.as_manager()
+
+    def __str__(self):
+        return f"purge of device {self.device_id} data ({self.deleted_rows} deleted)"
+
+
+class DeviceHeartbeat(models.Model):
+    """
+    Device heartbeat, when the device last reported, and whether it's online
+    (see devices.heartbeats).
+
+    fields:
+        - device: the reporting device
+        - last_seen: when the device's data was last received (flushed
+        periodically, it may lag by up to `DEVICE_HEARTBEAT_FLUSH_INTERVAL`)
+        - offline_after: when the device is offline, if it's still silent
+        - online: is the device online, set when it reports, and cleared by
+        the sweeper after `offline_after`
+        - status_changed: when the device went online or offline
+    """
+
+    device = models.OneToOneField(
+        Device,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="heartbeat",
+        verbose_name=_("device"),
+    )
+    last_seen = models.DateTimeField(verbose_name=_("last seen"))
+    offline_after = models.DateTimeField(verbose_name=_("offline after"))
+    online = models.BooleanField(verbose_name=_("online"), default=True)
+    status_changed = models.DateTimeField(verbose_name=_("status changed"), default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # online devices, silent for too long (see devices.heartbeats.sweep_offline_devices)
+            models.Index(fields=["online", "offline_after"], name="heartbeat_offline_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id} ({'online' if self.online else 'offline'}, last seen {self.last_seen})"
+
+
+class DeviceGroupCommandQuerySet(models.QuerySet):
+    def with_counts(self, now: "timezone.datetime | None" = None):
+        """
+        Annotate group commands with the number of their devices' commands
+        (`total`), by state (`pending`, `delivered`, `acknowledged`, and
+        `expired`, not acknowledged before they expired), in the same query
+        """
+        now = now or timezone.now()
+        expired = models.Q(device_commands__expires__lte=now)
+        return self.annotate(
+            total=models.Count("device_commands"),
+            pending=models.Count(
+                "device_commands",
+                filter=models.Q(device_commands__status=DeviceCommand.Status.PENDING) & ~expired,
+            ),
+            delivered=models.Count(
+                "device_commands",
+                filter=models.Q(device_commands__status=DeviceCommand.Status.DELIVERED) & ~expired,
+            ),
+            acknowledged=models.Count(
+                "device_commands",
+                filter=models.Q(device_commands__status=DeviceCommand.Status.ACKNOWLEDGED),
+            ),
+            expired=models.Count(
+                "device_commands",
+                filter=~models.Q(device_commands__status=DeviceCommand.Status.ACKNOWLEDGED) & expired,
+            ),
+        )
+
+
+class DeviceGroupCommand(models.Model):
+    """
+    Command queued for every active device of a group, as one command per
+    device (DeviceCommand), queued in one insert (see
+    devices.commands.queue_group_command). Its acknowledgement state is
+    aggregated from its devices' commands (see DeviceGroupCommandQuerySet.with_counts).
+
+    fields:
+        - group: the group whose devices run the command
+        - name: command name, e.g. "open_valve"
+        - payload: command arguments, any JSON value
+        - created: when the command was queued
+        - expires: devices' commands not acknowledged by then are dropped,
+        never expire when not set
+    """
+
+    group = models.ForeignKey(
+        DeviceGroup,
+        on_delete=models.CASCADE,
+        related_name="commands",
+        verbose_name=_("device group"),
+    )
+    name = models.CharField(max_length=64, verbose_name=_("command name"))
+    payload = models.JSONField(
+        verbose_name=_("payload"), default=dict, blank=True, encoder=DjangoJSONEncoder
+    )
+    created = models.DateTimeField(verbose_name=_("created"), default=timezone.now)
+    expires = models.DateTimeField(verbose_name=_("expires"), null=True, blank=True)
+
+    objects = DeviceGroupCommandQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.name} for group {self.group_id}"
+
+
+class DeviceCommandQuerySet(models.QuerySet):
+    def unacknowledged(self, now: "timezone.datetime | None" = None):
+        """Commands not acknowledged by their device yet, and not expired"""
+        now = now or timezone.now()
+        return self.filter(
+            models.Q(expires=None) | models.Q(expires__gt=now),
+            status__in=[DeviceCommand.Status.PENDING, DeviceCommand.Status.DELIVERED],
+        )
+
+
+class DeviceCommand(models.Model):
+    """
+    Command queued for a device's actuators (valves, pumps, motors), delivered
+    to the device by long polling (see devices.commands).
+
+    fields:
+        - device: the device that runs the command
+        - name: command name, e.g. "open_valve"
+        - payload: command arguments, any JSON value
+        - status: pending until the device receives it, delivered until the
+        device acknowledges it (it's delivered again until then)
+        - created: when the command was queued
+        - delivered: when the command was first delivered to the device
+        - acknowledged: when the device acknowledged the command
+        - expires: commands not acknowledged by then are dropped, never
+        expire when not set
+        - group_command: the group command the command was queued for, if any
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("pending")
+        DELIVERED = "delivered", _("delivered")
+        ACKNOWLEDGED = "acknowledged", _("acknowledged")
+
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        related_name="commands",
+        verbose_name=_("device"),
+    )
+    name = models.CharField(max_length=64, verbose_name=_("command name"))
+    payload = models.JSONField(
+        verbose_name=_("payload"), default=dict, blank=True, encoder=DjangoJSONEncoder
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name=_("status"),
+    )
+    created = models.DateTimeField(verbose_name=_("created"), default=timezone.now)
+    delivered = models.DateTimeField(verbose_name=_("delivered"), null=True, blank=True)
+    acknowledged = models.DateTimeField(verbose_name=_("acknowledged"), null=True, blank=True)
+    expires = models.DateTimeField(verbose_name=_("expires"), null=True, blank=True)
+    group_command = models.ForeignKey(
+        DeviceGroupCommand,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="device_commands",
+        verbose_name=_("group command"),
+    )
+
+    objects = DeviceCommandQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # device's unacknowledged commands, in order (see devices.commands)
+            models.Index(fields=["device", "status", "id"], name="command_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} for device {self.device_id} ({self.status})"
+
+
+class DeviceRule(models.Model):
+    """
+    Condition/action rule, evaluated on a device's data as it's received
+    (see devices.rules).
+
+    fields:
+        - name: human readable name of the rule
+        - device: the device whose data is evaluated
+        - key: key of the device's messages compared to the threshold, e.g. "moisture"
+        - operator: comparison of the key's value to the threshold
+        - threshold: the rule triggers when `value <operator> threshold`
+        - hysteresis: a triggered rule clears when its condition fails by
+        more than this margin (`moisture < 25`, with 5: clears when moisture >= 30)
+        - debounce: seconds the condition must hold (or fail) before the
+        rule triggers (or clears)
+        - target: the device that runs the commands, the rule's device when not set
+        - command: command queued for the target when the rule triggers, e.g. "open_valve"
+        - payload: the command's arguments
+        - clear_command: command queued when the rule clears (e.g. "close_valve"), none if blank
+        - clear_payload: the clear command's arguments
+        - is_active: inactive rules are never evaluated
+        - triggered: is the rule triggered, set by its actions (see devices.rules.fire_rule)
+        - state_changed: when the last transition was observed
+        - updated: when the rule was last saved, evaluators reload changed rules
+
+    Rules are evaluated in memory, changes to rules by queryset updates (that
+    don't set `updated`) are not seen until the evaluators reload the rules.
+    """
+
+    class Operator(models.TextChoices):
+        LT = "lt", "<"
+        LTE = "lte", "<="
+        GT = "gt", ">"
+        GTE = "gte", ">="
+        EQ = "eq", "=="
+        NE = "ne", "!="
+
+    name = models.CharField(max_length=64, verbose_name=_("rule name"))
     device = models.ForeignKey(
         Device,
         on_delete=models.CASCADE,
+        related_name="rules",
+        verbose_name=_("device"),
+    )
+    key = models.CharField(
+        max_length=64,
+        verbose_name=_("message key"),
+        help_text=_("key of the device's messages compared to the threshold"),
+    )
+    operator = models.CharField(max_length=3, choices=Operator.choices, verbose_name=_("operator"))
+    threshold = models.FloatField(verbose_name=_("threshold"))
+    hysteresis = models.FloatField(
+        verbose_name=_("hysteresis"),
+        default=0.0,
+        validators=[MinValueValidator(0.0)],
+        help_text=_("margin past the threshold before a triggered rule clears"),
+    )
+    debounce = models.PositiveIntegerField(
+        verbose_name=_("debounce"),
+        default=0,
+        help_text=_("seconds the condition must hold before the rule triggers, or clears"),
     )
+    target = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="targeted_rules",
+        verbose_name=_("target device"),
+        help_text=_("device that runs the commands, the rule's device when not set"),
+    )
+    command = models.CharField(max_length=64, verbose_name=_("command"))
+    payload = models.JSONField(
+        verbose_name=_("payload"), default=dict, blank=True, encoder=DjangoJSONEncoder
+    )
+    clear_command = models.CharField(max_length=64, blank=True, verbose_name=_("clear command"))
+    clear_payload = models.JSONField(
+        verbose_name=_("clear payload"), default=dict, blank=True, encoder=DjangoJSONEncoder
+    )
+    is_active = models.BooleanField(default=True, verbose_name=_("is rule active"))
+    triggered = models.BooleanField(default=False, editable=False, verbose_name=_("triggered"))
+    state_changed = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name=_("state changed")
+    )
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("updated"))
+
+    def __str__(self):
+        return f"{self.name} ({self.key} {self.get_operator_display()} {self.threshold})"
+
+    def clean(self) -> None:
+        if self.target_id is not None and self.device_id is not None:
+            owners = set(
+                Device.objects.filter(pk__in=[self.device_id, self.target_id]).values_list(
+                    "group__owner_id", flat=True
+                )
+            )
+            if len(owners) > 1:
+                raise ValidationError(
+                    {"target": _("The target device must belong to the rule device's owner.")}
+                )
+
+
+class DeviceSchedule(models.Model):
+    """
+    Cron-like program (e.g. irrigation), queuing a command for a device, or
+    for every active device of a group, at each of its run times (see
+    devices.schedules).
+
+    fields:
+        - name: human readable name of the schedule
+        - group: the group whose active devices run the command
+        - device: the device that runs the command, when the schedule isn't a group's
+        - cron: cron expression of the run times, in the current time zone
+        (see devices.cron), e.g. "0 6 * * 1,3,5"
+        - command: command queued at each run, e.g. "open_valve"
+        - payload: the command's arguments
+        - command_ttl: seconds the command waits for its devices before it
+        expires, never expires when not set
+        - is_active: inactive schedules never run
+        - next_run_at: next run time, computed when the schedule is saved,
+        and advanced by the scheduler at each run, persisted so the
+        scheduler resumes where it stopped
+        - last_run_at: last run time
+        - updated: when the schedule was last saved, schedulers reload changed schedules
+
+    Schedules run in the scheduler process, changes by queryset updates (that
+    don't set `updated`) aren't seen until the scheduler restarts.
+    """
+
+    name = models.CharField(max_length=64, verbose_name=_("schedule name"))
+    group = models.ForeignKey(
+        DeviceGroup,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="schedules",
+        verbose_name=_("device group"),
+        help_text=_("the group whose active devices run the command"),
+    )
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="schedules",
+        verbose_name=_("device"),
+        help_text=_("the device that runs the command, when the schedule isn't a group's"),
+    )
+    cron = models.CharField(
+        max_length=128,
+        validators=[validate_cron_expression],
+        verbose_name=_("cron expression"),
+        help_text=_("minute hour day-of-month month day-of-week, e.g. 0 6 * * 1,3,5"),
+    )
+    command = models.CharField(max_length=64, verbose_name=_("command"))
+    payload = models.JSONField(
+        verbose_name=_("payload"), default=dict, blank=True, encoder=DjangoJSONEncoder
+    )
+    command_ttl = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("command time to live"),
+        help_text=_("seconds the command waits for its devices before it expires"),
+    )
+    is_active = models.BooleanField(default=True, verbose_name=_("is schedule active"))
+    next_run_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name=_("next run at")
+    )
+    last_run_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name=_("last run at")
+    )
+    updated = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("updated"))
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(group__isnull=False, device__isnull=True)
+                    | models.Q(group__isnull=True, device__isnull=False)
+                ),
+                name="schedule_group_or_device",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.cron})"
+
+    def clean(self) -> None:
+        if (self.group_id is None) == (self.device_id is None):
+            raise ValidationError(_("Set either the schedule's device group, or its device."))
+
+    def get_next_run_at(self, after: "timezone.datetime | None" = None) -> "timezone.datetime":
+        """First run time after a date and time (now, by default)"""
+        return CronExpression(self.cron).next_after(after or timezone.now())
+
+    def save(self, *args, **kwargs) -> None:
+        """Save schedule, with its next run time from now"""
+        self.next_run_at = self.get_next_run_at() if self.is_active else None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "next_run_at", "updated"}
+        super().save(*args, **kwargs)
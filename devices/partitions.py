@@ -0,0 +1,502 @@
+"""
+Monthly partitioning of DeviceData.
+
+On PostgreSQL, the device data table can be converted to a declarative
+partitioned table (PARTITION BY RANGE (date)), with one partition per
+month, and a default partition for rows outside of all monthly ranges.
+The DeviceData model API does not change: inserts are routed to their
+partition by the database, and queries filtering on a date range only
+scan the partitions of that range (partition pruning). Retention drops
+whole partitions instead of deleting rows.
+
+On SQLite (file databases), partitions are database files attached to
+the connections (see common.db.backends.sqlite3): new data is received in
+the device data table, and each month that ended is moved to its own file,
+`devices_devicedata_pYYYY_MM.sqlite3` of the database's partitions
+directory. Queries read the table and its partitions (each one searched
+with its own indexes), and retention deletes whole files. At most
+`SQLITE_LIMIT_ATTACHED` (10 by default) months are partitioned, later
+months stay in the table until retention drops older partitions. Schema
+changes of the table (migrations) aren't applied to existing partitions.
+SQLite snapshot replicas get a copy of the partitions with each refresh
+(see the `refresh_replica_snapshots` command).
+
+Other databases keep the single table, retention deletes old rows in
+batches, using the date index of the model.
+
+Run `manage.py device_data_partitions` periodically (e.g. daily) to create
+upcoming partitions (PostgreSQL, partitions must exist before data for their
+month arrives, or it lands in the default partition), or move the months
+that ended to their partitions (SQLite), and apply retention.
+
+Functions:
+----------
+
+    - month_start(value: datetime) -> datetime
+    - add_months(value: datetime, months: int) -> datetime
+    - get_partitioner(using: str | None = None) -> PostgresPartitioner | SQLitePartitioner | None
+    - apply_retention(before: datetime, using: str | None = None, batch_size: int = 1000) -> Tuple[List[str], int]
+
+"""
+
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import *
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from common.db.backends.sqlite3.base import PARTITION_FILE_SUFFIX
+
+from .models import DeviceData
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Helper functions
+# -----------------------------------------------------------------------------
+def month_start(value: datetime) -> datetime:
+    """Get start (UTC) of the month of value"""
+    if value.tzinfo is not None:
+        value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Get start of the month, `months` months after the month of value"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+# -----------------------------------------------------------------------------
+# PostgreSQL partitions
+# -----------------------------------------------------------------------------
+class PostgresPartitioner:
+    """
+    Manage monthly partitions of a model's table on PostgreSQL.
+
+    Partitions are named '<table>_pYYYY_MM', and cover
+    [start of month, start of next month) in UTC.
+    """
+
+    def __init__(self, connection, model=DeviceData) -> None:
+        self.connection = connection
+        self.model = model
+        self.table = model._meta.db_table
+        self.default_partition = f"{self.table}_default"
+        self.partition_re = re.compile(rf"^{re.escape(self.table)}_p(\d{{4}})_(\d{{2}})$")
+
+    def quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def partition_name(self, month: datetime) -> str:
+        return f"{self.table}_p{month.year:04d}_{month.month:02d}"
+
+    def is_partitioned(self) -> bool:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+                [self.table],
+            )
+            row = cursor.fetchone()
+        return row is not None and row[0] == "p"
+
+    def partitions(self) -> Dict[datetime, str]:
+        """Get monthly partitions, by month"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(%s)",
+                [self.table],
+            )
+            names = [name for name, in cursor.fetchall()]
+
+        partitions = {}
+        for name in names:
+            match = self.partition_re.match(name)
+            if match:
+                year, month = map(int, match.groups())
+                partitions[datetime(year, month, 1, tzinfo=dt_timezone.utc)] = name
+        return partitions
+
+    def create_partition_sql(self, month: datetime) -> str:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.quote(self.partition_name(month))} "
+            f"PARTITION OF {self.quote(self.table)} "
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{add_months(month, 1).isoformat()}')"
+        )
+
+    def create_partitions(self, start: datetime, end: datetime) -> List[str]:
+        """
+        Create missing partitions for all months from start to end
+
+        :return: names of created partitions
+        :rtype: List[str]
+        """
+        existing = self.partitions()
+        created = []
+        month = month_start(start)
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                while month <= end:
+                    if month not in existing:
+                        cursor.execute(self.create_partition_sql(month))
+                        created.append(self.partition_name(month))
+                    month = add_months(month, 1)
+        return created
+
+    def drop_partitions(self, before: datetime) -> List[str]:
+        """
+        Drop partitions of months that end before `before`
+
+        :return: names of dropped partitions
+        :rtype: List[str]
+        """
+        dropped = []
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                for month, name in sorted(self.partitions().items()):
+                    if add_months(month, 1) <= before:
+                        cursor.execute(f"DROP TABLE {self.quote(name)}")
+                        dropped.append(name)
+        return dropped
+
+    def update_partitions(self, now: datetime, months_ahead: int) -> List[str]:
+        """
+        Create missing partitions of this month, and of `months_ahead` months after it
+
+        :return: names of created partitions
+        :rtype: List[str]
+        """
+        return self.create_partitions(now, add_months(now, months_ahead))
+
+    def convert(self, months_ahead: int) -> List[str]:
+        """
+        Convert the (regular) table to a partitioned table, with partitions
+        for all months from the oldest row to `months_ahead` months from now,
+        and a default partition. Rows are copied to the new table.
+
+        Blocks writes to the table while running.
+
+        :return: names of created partitions
+        :rtype: List[str]
+        """
+        table = self.quote(self.table)
+        old_table = self.quote(f"{self.table}_unpartitioned")
+        # not '<table>_id_seq', the name of the old table's identity sequence
+        sequence_name = f"{self.table}_pk_seq"
+        sequence = self.quote(sequence_name)
+        pk = self.model._meta.pk.column
+
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+                # rows with the default date go to the default partition
+                cursor.execute(
+                    f"SELECT min(date) FILTER (WHERE date > %s), max({self.quote(pk)}) "
+                    f"FROM {table}",
+                    [DeviceData.DEFAULT_UPDATE_DATETIME],
+                )
+                oldest, max_id = cursor.fetchone()
+
+                cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+                cursor.execute(
+                    f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS) "
+                    f"PARTITION BY RANGE (date)"
+                )
+                # a sequence, instead of the old table's identity column
+                cursor.execute(f"CREATE SEQUENCE {sequence}")
+                cursor.execute(
+                    "SELECT setval(%s, %s, false)", [sequence_name, (max_id or 0) + 1]
+                )
+                cursor.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN {self.quote(pk)} "
+                    f"SET DEFAULT nextval('{sequence_name}')"
+                )
+                cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{self.quote(pk)}")
+                cursor.execute(
+                    f"CREATE TABLE {self.quote(self.default_partition)} "
+                    f"PARTITION OF {table} DEFAULT"
+                )
+
+            now = timezone.now()
+            created = self.create_partitions(
+                oldest or now,
+                add_months(now, months_ahead),
+            )
+
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+                cursor.execute(f"DROP TABLE {old_table}")
+                # unique constraints must include the partition key
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD PRIMARY KEY ({self.quote(pk)}, date)"
+                )
+
+            # indexes and foreign keys of the model, now that the old ones
+            # were dropped with the old table
+            with self.connection.schema_editor(atomic=False) as schema_editor:
+                for statement in schema_editor._model_indexes_sql(self.model):
+                    schema_editor.execute(statement)
+                for field in self.model._meta.local_fields:
+                    if field.remote_field and field.db_constraint:
+                        schema_editor.execute(
+                            schema_editor._create_fk_sql(
+                                self.model, field, "_fk_%(to_table)s_%(to_column)s"
+                            )
+                        )
+        return created
+
+
+# -----------------------------------------------------------------------------
+# SQLite partitions
+# -----------------------------------------------------------------------------
+class SQLitePartitioner:
+    """
+    Manage monthly partitions of a model's table on SQLite, in database files
+    of the database's partitions directory (attached to the connections by
+    common.db.backends.sqlite3).
+
+    Partitions are named '<table>_pYYYY_MM' (their files
+    '<table>_pYYYY_MM.sqlite3'), and hold the table's rows of
+    [start of month, start of next month) in UTC, moved from the table once
+    the month ended.
+    """
+
+    def __init__(self, connection, model=DeviceData) -> None:
+        self.connection = connection
+        self.model = model
+        self.table = model._meta.db_table
+        self.directory: Path = connection.partitions_dir
+        self.partition_re = re.compile(
+            rf"^{re.escape(self.table)}_p(\d{{4}})_(\d{{2}}){re.escape(PARTITION_FILE_SUFFIX)}$"
+        )
+
+    def quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def partition_name(self, month: datetime) -> str:
+        return f"{self.table}_p{month.year:04d}_{month.month:02d}"
+
+    def partition_path(self, month: datetime) -> Path:
+        return self.directory / f"{self.partition_name(month)}{PARTITION_FILE_SUFFIX}"
+
+    def is_partitioned(self) -> bool:
+        return self.directory.is_dir()
+
+    def partitions(self) -> Dict[datetime, str]:
+        """Get monthly partitions, by month"""
+        if not self.is_partitioned():
+            return {}
+        partitions = {}
+        for path in self.directory.iterdir():
+            match = self.partition_re.match(path.name)
+            if match:
+                year, month = map(int, match.groups())
+                partitions[datetime(year, month, 1, tzinfo=dt_timezone.utc)] = path.name[
+                    : -len(PARTITION_FILE_SUFFIX)
+                ]
+        return partitions
+
+    def create_partition(self, month: datetime) -> str:
+        """
+        Create the (empty) partition of a month, with the table's schema and
+        indexes, and attach it
+
+        :return: name of the partition
+        :rtype: str
+        """
+        path = self.partition_path(month)
+        # the partition is attached once it's complete
+        temporary_path = path.with_name(f"{path.name}.tmp")
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT sql FROM main.sqlite_master WHERE tbl_name = %s AND sql IS NOT NULL "
+                "ORDER BY type DESC",
+                [self.table],
+            )
+            statements = [sql for sql, in cursor.fetchall()]
+            cursor.execute("PRAGMA main.journal_mode")
+            journal_mode = cursor.fetchone()[0]
+
+        temporary_path.unlink(missing_ok=True)
+        partition = sqlite3.connect(temporary_path)
+        try:
+            partition.execute(f"PRAGMA journal_mode = {journal_mode}")
+            for statement in statements:
+                partition.execute(statement)
+            partition.commit()
+        finally:
+            partition.close()
+        os.replace(temporary_path, path)
+        self.connection.sync_partitions()
+        return self.partition_name(month)
+
+    def move_month(self, month: datetime, batch_size: int = 10000) -> int:
+        """
+        Move the table's rows of a month to its partition, in batches (a
+        transaction each)
+
+        :return: number of moved rows
+        :rtype: int
+        """
+        name = self.partition_name(month)
+        if name not in self.connection.sync_partitions().get(self.table, []):
+            raise RuntimeError(f"Partition {name} isn't attached")
+        table = f"main.{self.quote(self.table)}"
+        partition = f"{self.quote(name)}.{self.quote(self.table)}"
+        pk = self.quote(self.model._meta.pk.column)
+        month_range = "date >= %s AND date < %s"
+        params = [
+            self.connection.ops.adapt_datetimefield_value(month),
+            self.connection.ops.adapt_datetimefield_value(add_months(month, 1)),
+        ]
+        moved = 0
+        while True:
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT max({pk}) FROM (SELECT {pk} FROM {table} "
+                        f"WHERE {month_range} ORDER BY {pk} LIMIT %s)",
+                        [*params, batch_size],
+                    )
+                    last_id = cursor.fetchone()[0]
+                    if last_id is None:
+                        return moved
+                    cursor.execute(
+                        f"INSERT INTO {partition} SELECT * FROM {table} "
+                        f"WHERE {month_range} AND {pk} <= %s",
+                        [*params, last_id],
+                    )
+                    cursor.execute(
+                        f"DELETE FROM {table} WHERE {month_range} AND {pk} <= %s",
+                        [*params, last_id],
+                    )
+                    moved += cursor.rowcount
+
+    def update_partitions(self, now: datetime, months_ahead: int = 0) -> List[str]:
+        """
+        Move the rows of months that ended before this month to their
+        partitions, created if they're missing (`months_ahead` is unused, rows
+        are moved once their month ended)
+
+        :return: names of created partitions
+        :rtype: List[str]
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT DISTINCT substr(date, 1, 7) FROM main.{self.quote(self.table)} "
+                f"WHERE date > %s AND date < %s",
+                [
+                    self.connection.ops.adapt_datetimefield_value(DeviceData.DEFAULT_UPDATE_DATETIME),
+                    self.connection.ops.adapt_datetimefield_value(month_start(now)),
+                ],
+            )
+            months = sorted(
+                datetime(int(value[:4]), int(value[5:7]), 1, tzinfo=dt_timezone.utc)
+                for value, in cursor.fetchall()
+            )
+
+        existing = self.partitions()
+        limit = self.connection.get_attached_limit()
+        created = []
+        for month in months:
+            if month not in existing:
+                if len(existing) >= limit:
+                    logger.warning(
+                        "Can't create partition %s, %s partitions are attached at most",
+                        self.partition_name(month),
+                        limit,
+                    )
+                    break
+                existing[month] = self.create_partition(month)
+                created.append(existing[month])
+            self.move_month(month)
+        return created
+
+    def drop_partitions(self, before: datetime) -> List[str]:
+        """
+        Drop (delete the files of) partitions of months that end before `before`
+
+        :return: names of dropped partitions
+        :rtype: List[str]
+        """
+        dropped = []
+        for month, name in sorted(self.partitions().items()):
+            if add_months(month, 1) <= before:
+                path = self.partition_path(month)
+                for suffix in ("-wal", "-shm", "-journal"):
+                    path.with_name(f"{path.name}{suffix}").unlink(missing_ok=True)
+                path.unlink()
+                dropped.append(name)
+        if dropped:
+            self.connection.sync_partitions()
+        return dropped
+
+    def convert(self, months_ahead: int = 0) -> List[str]:
+        """
+        Partition the table: create the partitions directory, the rows of
+        months that ended are moved to their partitions by update_partitions
+
+        :return: names of created partitions (none)
+        :rtype: List[str]
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return []
+
+
+def get_partitioner(
+    using: str | None = None,
+) -> PostgresPartitioner | SQLitePartitioner | None:
+    """
+    Get partitioner of database `using` (device data's database by default),
+    None if partitioning is not supported (e.g. in-memory SQLite databases)
+    """
+    connection = connections[using or router.db_for_write(DeviceData)]
+    if connection.vendor == "postgresql":
+        return PostgresPartitioner(connection)
+    if getattr(connection, "partitions_dir", None) is not None:
+        return SQLitePartitioner(connection)
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Retention
+# -----------------------------------------------------------------------------
+def apply_retention(
+    before: datetime, using: str | None = None, batch_size: int = 1000
+) -> Tuple[List[str], int]:
+    """
+    Remove device data older than `before`: drop partitions of months that
+    ended before it (if the table is partitioned), then delete remaining
+    older rows (default partition, or regular table) in batches.
+
+    :param before: remove data received before this date
+    :type before: datetime
+    :param using: database alias, device data's database by default
+    :type using: str | None
+    :param batch_size: max rows deleted per query
+    :type batch_size: int
+    :return: dropped partitions, and number of deleted rows
+    :rtype: Tuple[List[str], int]
+    """
+    using = using or router.db_for_write(DeviceData)
+    dropped = []
+    partitioner = get_partitioner(using)
+    if partitioner is not None and partitioner.is_partitioned():
+        dropped = partitioner.drop_partitions(before)
+
+    deleted = 0
+    queryset = DeviceData.objects.using(using).filter(date__lt=before)
+    while True:
+        batch = list(queryset.order_by("date").values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            break
+        deleted += DeviceData.objects.using(using).filter(pk__in=batch).delete()[0]
+    return dropped, deleted
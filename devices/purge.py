@@ -0,0 +1,145 @@
+"""
+Deferred purge of deleted devices' data.
+
+Deleting a device (or its group, or its owner) removes the device row only.
+Its data, possibly millions of rows in another database (see
+common.routers), is recorded as a pending DeviceDataPurge (by a post_delete
+signal handler, see devices.signals), hidden from members' data lists, and
+deleted afterwards in bounded batches (a `DELETE` of the ids of up to
+`DEVICE_DATA_PURGE_BATCH_SIZE` rows, in the table and in its partitions),
+each one in its own transaction, pausing between batches so that writers
+(e.g. data ingestion, on SQLite) are never locked out for long.
+
+Purges are run by background jobs (see devices.tasks), enqueued with the
+deletion (`DEVICE_DATA_PURGE_IN_BACKGROUND`), and by
+`manage.py purge_device_data`, which also reports their progress
+(`--status`).
+
+Functions:
+----------
+
+    - schedule_purge(device: Device, using: str) -> DeviceDataPurge
+    - purge_device_data(purge: DeviceDataPurge, batch_size: int | None = None, pause: float | None = None) -> int
+    - purge_pending_device_data(batch_size: int | None = None, pause: float | None = None) -> int
+    - count_remaining_rows(purge: DeviceDataPurge) -> int
+
+"""
+
+import time
+from typing import *
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.tasks import enqueue
+
+from .models import Device, DeviceData, DeviceDataPurge, DeviceGroup
+
+
+# -----------------------------------------------------------------------------
+# Purges
+# -----------------------------------------------------------------------------
+def schedule_purge(device: Device, using: str) -> DeviceDataPurge:
+    """
+    Record the purge of a deleted device's data, and enqueue its job (see
+    `DEVICE_DATA_PURGE_IN_BACKGROUND`), run once the deletion is committed
+
+    :param device: deleted device
+    :type device: Device
+    :param using: database alias of the deleted device
+    :type using: str
+    :return: pending purge
+    :rtype: DeviceDataPurge
+    """
+    purge = DeviceDataPurge.objects.create(
+        device_id=device.pk, owner_id=_get_owner_id(device, using)
+    )
+    if settings.DEVICE_DATA_PURGE_IN_BACKGROUND:
+        enqueue("devices.purge_device_data", [purge.pk])
+    return purge
+
+
+def _get_owner_id(device: Device, using: str) -> int | None:
+    """Owner of a deleted device (its group is deleted after it, with a cascade)"""
+    if Device.group.is_cached(device):
+        return device.group.owner_id
+    return (
+        DeviceGroup.objects.using(using)
+        .filter(pk=device.group_id)
+        .values_list("owner_id", flat=True)
+        .first()
+    )
+
+
+def _delete_batch(device_id: int, batch_size: int, using: str) -> int:
+    """Delete up to `batch_size` data rows of a device, return the number of deleted rows"""
+    data = DeviceData.objects.using(using)
+    with transaction.atomic(using=using):
+        # ids are selected first, the delete (a fast delete, data has no
+        # cascades nor signals) runs on each SQLite partition (see
+        # common.db.backends.sqlite3.compiler), a LIMIT subquery would be
+        # evaluated again for each of them
+        ids = list(data.filter(device_id=device_id).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return 0
+        deleted, _ = data.filter(pk__in=ids).delete()
+        return deleted
+
+
+def purge_device_data(
+    purge: DeviceDataPurge, batch_size: int | None = None, pause: float | None = None
+) -> int:
+    """
+    Delete a deleted device's data in batches, recording the progress of the
+    purge after each batch, and mark the purge finished
+
+    :param purge: pending purge
+    :type purge: DeviceDataPurge
+    :param batch_size: max rows deleted per query, default: `DEVICE_DATA_PURGE_BATCH_SIZE`
+    :type batch_size: int | None
+    :param pause: seconds between batches, default: `DEVICE_DATA_PURGE_BATCH_PAUSE`
+    :type pause: float | None
+    :return: number of deleted rows
+    :rtype: int
+    """
+    batch_size = batch_size or settings.DEVICE_DATA_PURGE_BATCH_SIZE
+    pause = settings.DEVICE_DATA_PURGE_BATCH_PAUSE if pause is None else pause
+    using = router.db_for_write(DeviceData)
+    purges = DeviceDataPurge.objects.filter(pk=purge.pk)
+
+    deleted = 0
+    while True:
+        rows = _delete_batch(purge.device_id, batch_size, using)
+        deleted += rows
+        if rows:
+            purges.update(deleted_rows=F("deleted_rows") + rows)
+        if rows < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    purges.update(finished=timezone.now())
+    return deleted
+
+
+def purge_pending_device_data(
+    batch_size: int | None = None, pause: float | None = None
+) -> int:
+    """
+    Run all pending purges, oldest first
+
+    :return: number of deleted rows
+    :rtype: int
+    """
+    deleted = 0
+    for purge in DeviceDataPurge.objects.pending().order_by("created"):
+        deleted += purge_device_data(purge, batch_size, pause)
+    return deleted
+
+
+def count_remaining_rows(purge: DeviceDataPurge) -> int:
+    """Number of data rows of a purge's device, not deleted yet"""
+    return DeviceData.objects.filter(device_id=purge.device_id).count()
+
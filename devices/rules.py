@@ -0,0 +1,323 @@
+"""
+Condition/action rules, evaluated on devices' data as it's received.
+
+A rule (DeviceRule) compares a key of a device's messages to a threshold
+(`moisture < 25`), and queues a command for a device when its condition is
+met ("open_valve"), and optionally another one when it clears
+("close_valve"), see devices.commands.
+
+Active rules are compiled into an in-memory index of the process
+(RuleIndex), by device and message key: each received message
+(DeviceData.save, and bulk_create) is compared to the rules of its own keys
+only, whatever the number of rules.
+
+Rules are stateful:
+
+    - hysteresis: a triggered rule clears when its condition fails by more
+      than its hysteresis (`moisture < 25`, with 5: when moisture >= 30), so
+      a value hovering around the threshold doesn't toggle the valve
+    - debounce: the condition must hold (or fail) for `debounce` seconds of
+      received data before the rule triggers (or clears)
+
+Evaluation states are kept in memory, and transitions are dispatched to
+background jobs (`devices.fire_rule`, see devices.tasks), ingestion never
+waits for actions. The job records the transition in the rule's row with a
+conditional update, and queues its command only when it changed the rule's
+state, so a transition observed by several workers (each with its own
+evaluation state) runs its action once, and late transitions are dropped.
+
+Indexes are reloaded when rules change: at once in the process that saved
+or deleted a rule (see devices.signals), and within
+`DEVICE_RULES_REFRESH_INTERVAL` seconds in other processes, which compare
+the number of rules, and their last update and transition, in one query.
+Reloaded states follow the rules' rows, evaluation states of unchanged
+rules are kept.
+
+Classes:
+--------
+
+    - CompiledRule
+    - RuleState
+    - RuleIndex
+
+Functions:
+----------
+
+    - get_rule_index() -> RuleIndex
+    - evaluate_rules(data_list: Iterable[DeviceData]) -> int
+    - fire_rule(rule_id: int, triggered: bool, observed: datetime) -> bool
+
+"""
+
+import functools
+import logging
+import operator
+import threading
+import time
+from datetime import datetime
+from typing import *
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from jobs.tasks import enqueue
+
+from .commands import queue_commands
+from .fields import SerializedJSON
+from .models import DeviceData, DeviceRule
+
+logger = logging.getLogger(__name__)
+
+# background job of rules' transitions (see devices.tasks)
+FIRE_RULE_TASK: Final[str] = "devices.fire_rule"
+
+OPERATORS: Final[Dict[str, Callable[[Any, float], bool]]] = {
+    DeviceRule.Operator.LT: operator.lt,
+    DeviceRule.Operator.LTE: operator.le,
+    DeviceRule.Operator.GT: operator.gt,
+    DeviceRule.Operator.GTE: operator.ge,
+    DeviceRule.Operator.EQ: operator.eq,
+    DeviceRule.Operator.NE: operator.ne,
+}
+
+# rules version: number of rules, last update, last transition
+RulesVersion = Tuple[int, datetime | None, datetime | None]
+
+
+# -----------------------------------------------------------------------------
+# Rule index
+# -----------------------------------------------------------------------------
+class CompiledRule(NamedTuple):
+    """A rule's condition, ready to be evaluated"""
+
+    id: int
+    updated: datetime
+    test: Callable[[Any, float], bool]
+    threshold: float
+    # a triggered rule clears when `test(value, release)` fails
+    release: float
+    debounce: float
+
+    @classmethod
+    def compile(
+        cls,
+        rule_id: int,
+        updated: datetime,
+        op: str,
+        threshold: float,
+        hysteresis: float,
+        debounce: int,
+    ) -> "CompiledRule":
+        if op in (DeviceRule.Operator.LT, DeviceRule.Operator.LTE):
+            release = threshold + hysteresis
+        elif op in (DeviceRule.Operator.GT, DeviceRule.Operator.GTE):
+            release = threshold - hysteresis
+        else:
+            release = threshold
+        return cls(rule_id, updated, OPERATORS[op], threshold, release, float(debounce))
+
+
+class RuleState:
+    """Evaluation state of a rule: is it triggered, and since when its transition is pending"""
+
+    __slots__ = ("triggered", "since")
+
+    def __init__(self, triggered: bool) -> None:
+        self.triggered = triggered
+        # timestamp of the first value of a pending transition (debounce)
+        self.since: float | None = None
+
+    def step(self, rule: CompiledRule, value: Any, now: float) -> bool:
+        """Evaluate a value, return whether the rule triggered, or cleared"""
+        if self.triggered:
+            holds = not rule.test(value, rule.release)
+        else:
+            holds = rule.test(value, rule.threshold)
+        if not holds:
+            self.since = None
+            return False
+        if self.since is None:
+            self.since = now
+        if now - self.since < rule.debounce:
+            return False
+        self.triggered = not self.triggered
+        self.since = None
+        return True
+
+
+class RuleIndex:
+    """
+    Active rules of all devices, by (device id, message key), and their
+    evaluation states, thread safe
+    """
+
+    def __init__(self, refresh_interval: float) -> None:
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._rules: Dict[Tuple[int, str], List[CompiledRule]] | None = None
+        self._device_ids: FrozenSet[int] = frozenset()
+        self._states: Dict[int, RuleState] = {}
+        # last update of the loaded rules, by rule id
+        self._updated: Dict[int, datetime] = {}
+        self._version: RulesVersion | None = None
+        self._checked = 0.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
+
+    @staticmethod
+    def get_version() -> RulesVersion:
+        """Version of the rules table, changed by saves, deletes and transitions"""
+        version = DeviceRule.objects.aggregate(
+            count=Count("pk"), updated=Max("updated"), state_changed=Max("state_changed")
+        )
+        return version["count"], version["updated"], version["state_changed"]
+
+    def _load(self, version: RulesVersion) -> None:
+        rules: Dict[Tuple[int, str], List[CompiledRule]] = {}
+        states: Dict[int, RuleState] = {}
+        rows = DeviceRule.objects.filter(is_active=True).values_list(
+            "pk", "updated", "device_id", "key", "operator", "threshold", "hysteresis", "debounce",
+            "triggered",
+        )
+        for rule_id, updated, device_id, key, op, threshold, hysteresis, debounce, triggered in rows:
+            rule = CompiledRule.compile(rule_id, updated, op, threshold, hysteresis, debounce)
+            rules.setdefault((device_id, key), []).append(rule)
+            state = self._states.get(rule_id)
+            # pending transitions of unchanged rules are kept
+            if state is None or state.triggered != triggered or self._updated.get(rule_id) != updated:
+                state = RuleState(triggered)
+            states[rule_id] = state
+        self._rules = rules
+        self._device_ids = frozenset(device_id for device_id, _ in rules)
+        self._states = states
+        self._updated = {rule.id: rule.updated for compiled in rules.values() for rule in compiled}
+        self._version = version
+
+    def _get_rules(self) -> Dict[Tuple[int, str], List[CompiledRule]]:
+        now = time.monotonic()
+        if self._rules is None or now - self._checked >= self.refresh_interval:
+            version = self.get_version()
+            if self._rules is None or version != self._version:
+                self._load(version)
+            self._checked = now
+        return self._rules
+
+    def evaluate(self, messages: Iterable[Tuple[int, Any]], now: float) -> List[Tuple[int, bool]]:
+        """
+        Evaluate devices' messages with their rules
+
+        :param messages: (device id, message) pairs, in the order they were received
+        :type messages: Iterable[Tuple[int, Any]]
+        :param now: timestamp of the messages
+        :type now: float
+        :return: transitions, (rule id, is the rule triggered) pairs
+        :rtype: List[Tuple[int, bool]]
+        """
+        transitions = []
+        with self._lock:
+            rules = self._get_rules()
+            if not rules:
+                return transitions
+            for device_id, message in messages:
+                if device_id not in self._device_ids or not isinstance(message, dict):
+                    continue
+                for key, value in message.items():
+                    compiled = rules.get((device_id, key))
+                    if compiled is None or not isinstance(value, (int, float)):
+                        continue
+                    for rule in compiled:
+                        state = self._states[rule.id]
+                        if state.step(rule, value, now):
+                            transitions.append((rule.id, state.triggered))
+        return transitions
+
+    def invalidate(self) -> None:
+        """Reload the rules on the next evaluation"""
+        with self._lock:
+            self._rules = None
+
+    def clear(self) -> None:
+        """Drop the rules and their evaluation states"""
+        with self._lock:
+            self._rules = None
+            self._device_ids = frozenset()
+            self._states = {}
+            self._updated = {}
+            self._version = None
+
+
+@functools.lru_cache(maxsize=None)
+def get_rule_index() -> RuleIndex:
+    """The process' rule index"""
+    return RuleIndex(refresh_interval=settings.DEVICE_RULES_REFRESH_INTERVAL)
+
+
+# -----------------------------------------------------------------------------
+# Evaluation and actions
+# -----------------------------------------------------------------------------
+def evaluate_rules(data_list: Iterable[DeviceData]) -> int:
+    """
+    Evaluate the rules of received device data, and dispatch their
+    transitions to background jobs. Failures are logged, ingestion never
+    fails because of rules.
+
+    :param data_list: received device data, in the order it was received
+    :type data_list: Iterable[DeviceData]
+    :return: number of transitions
+    :rtype: int
+    """
+    now = timezone.now()
+    try:
+        transitions = get_rule_index().evaluate(
+            (
+                (
+                    data.device_id,
+                    data.message.value if isinstance(data.message, SerializedJSON) else data.message,
+                )
+                for data in data_list
+            ),
+            now.timestamp(),
+        )
+        for rule_id, triggered in transitions:
+            enqueue(FIRE_RULE_TASK, [rule_id, triggered, now.isoformat()])
+    except Exception:
+        logger.exception("Failed to evaluate device rules")
+        return 0
+    return len(transitions)
+
+
+def fire_rule(rule_id: int, triggered: bool, observed: datetime) -> bool:
+    """
+    Record a rule's transition, and queue its command (or clear command),
+    unless the rule is already in that state, or a later transition was
+    recorded
+
+    :param rule_id: rule id
+    :type rule_id: int
+    :param triggered: did the rule trigger, or clear
+    :type triggered: bool
+    :param observed: when the transition was observed
+    :type observed: datetime
+    :return: whether the rule's state changed
+    :rtype: bool
+    """
+    rules = DeviceRule.objects.filter(
+        Q(state_changed=None) | Q(state_changed__lt=observed), pk=rule_id, is_active=True
+    )
+    with transaction.atomic():
+        if not rules.filter(triggered=not triggered).update(triggered=triggered, state_changed=observed):
+            rules.update(state_changed=observed)
+            return False
+        device_id, target_id, command, payload = DeviceRule.objects.values_list(
+            "device_id",
+            "target_id",
+            "command" if triggered else "clear_command",
+            "payload" if triggered else "clear_payload",
+        ).get(pk=rule_id)
+        if command:
+            queue_commands([target_id or device_id], command, payload)
+    return True
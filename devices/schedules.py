@@ -0,0 +1,263 @@
+"""
+Cron-like programs (e.g. irrigation), queuing commands for a device, or for
+every active device of a group, at their run times.
+
+Schedules (DeviceSchedule) persist their next run time (`next_run_at`),
+computed from their cron expression (see devices.cron) when they're saved,
+and advanced at each run. The scheduler process (`run_scheduler` management
+command) keeps the next run times of active schedules in a heap, and sleeps
+until the earliest one, the schedules table is never scanned:
+
+    - on start, it loads the active schedules' next run times, a scheduler
+      that was stopped resumes where it stopped
+    - every `DEVICE_SCHEDULES_REFRESH_INTERVAL` seconds, it loads the
+      schedules saved since its last load (an indexed range query, usually
+      empty), and drops heap entries of changed schedules
+    - at a run time, the schedule's run is recorded with a conditional
+      update of its next run time, and its command is queued for its
+      device, or as a group command (see devices.commands), in the same
+      transaction (see Scheduler.fire), so a run is
+      never recorded without its commands, and runs once, even when several
+      schedulers run
+
+Runs more than `DEVICE_SCHEDULES_MISFIRE_GRACE` seconds late (the scheduler
+was stopped) are skipped, and the schedule resumes at its next run time,
+a stopped scheduler doesn't open all valves at once when it restarts.
+
+Classes:
+--------
+
+    - Scheduler
+
+Functions:
+----------
+
+    - run_scheduler(refresh_interval: float | None = None, misfire_grace: float | None = None, once: bool = False) -> int
+
+"""
+
+import heapq
+import logging
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import *
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .commands import queue_commands, queue_group_command
+from .models import DeviceSchedule
+
+logger = logging.getLogger(__name__)
+
+# schedules saved this long before the last load are loaded again, so the
+# saves of transactions that committed late (or of servers whose clocks lag)
+# aren't missed
+LOAD_LOOKBACK: Final[timedelta] = timedelta(seconds=60)
+
+
+class Scheduler:
+    """
+    Runs due schedules, keeps the next run times of active schedules in a
+    heap (not thread safe, a scheduler runs in one thread)
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float | None = None,
+        misfire_grace: float | None = None,
+        stop_event: threading.Event | None = None,
+    ) -> None:
+        self.refresh_interval = (
+            settings.DEVICE_SCHEDULES_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        )
+        self.misfire_grace = timedelta(
+            seconds=settings.DEVICE_SCHEDULES_MISFIRE_GRACE if misfire_grace is None else misfire_grace
+        )
+        self.stop_event = stop_event or threading.Event()
+        # (next run time, schedule id), entries of changed schedules are
+        # skipped when they're popped (they don't match `_next_runs`)
+        self._heap: List[Tuple[datetime, int]] = []
+        # next run time, by schedule id
+        self._next_runs: Dict[int, datetime] = {}
+        # when the last load started
+        self._loaded_at: datetime | None = None
+        self._refreshed = 0.0
+
+    def __len__(self) -> int:
+        return len(self._next_runs)
+
+    def _push(self, schedule_id: int, next_run_at: datetime | None) -> None:
+        if next_run_at is None:
+            self._next_runs.pop(schedule_id, None)
+        elif self._next_runs.get(schedule_id) != next_run_at:
+            self._next_runs[schedule_id] = next_run_at
+            heapq.heappush(self._heap, (next_run_at, schedule_id))
+
+    def load(self) -> int:
+        """
+        Load the next run times of the schedules saved since the last load
+        (of all active schedules, on the first load)
+
+        :return: number of loaded schedules
+        :rtype: int
+        """
+        started = timezone.now()
+        schedules = DeviceSchedule.objects.all()
+        if self._loaded_at is None:
+            schedules = schedules.filter(is_active=True)
+        else:
+            schedules = schedules.filter(updated__gte=self._loaded_at - LOAD_LOOKBACK)
+        loaded = 0
+        for schedule_id, is_active, next_run_at in schedules.values_list(
+            "pk", "is_active", "next_run_at"
+        ):
+            self._push(schedule_id, next_run_at if is_active else None)
+            loaded += 1
+        self._loaded_at = started
+        self._refreshed = time.monotonic()
+        # heap entries of changed schedules are dropped when they're popped,
+        # the heap is rebuilt when they outnumber the schedules
+        if len(self._heap) > 2 * len(self._next_runs) + 64:
+            self._heap = [(next_run_at, pk) for pk, next_run_at in self._next_runs.items()]
+            heapq.heapify(self._heap)
+        return loaded
+
+    def fire(self, schedule_id: int, run_at: datetime, now: datetime) -> Tuple[bool, datetime | None]:
+        """
+        Run a due schedule: advance its next run time, and queue its command
+        for its devices (unless the run is later than the misfire grace), in
+        one transaction
+
+        :param schedule_id: schedule id
+        :type schedule_id: int
+        :param run_at: the run time
+        :type run_at: datetime
+        :param now: current time, the next run time is after it
+        :type now: datetime
+        :return: did the schedule run, and its next run time (None if it was deleted or deactivated)
+        :rtype: Tuple[bool, datetime | None]
+        """
+        schedule = DeviceSchedule.objects.filter(pk=schedule_id, is_active=True).first()
+        if schedule is None or schedule.next_run_at != run_at:
+            # changed, or run by another scheduler
+            return False, schedule and schedule.next_run_at
+        # runs missed while the scheduler was stopped are skipped
+        next_run_at = schedule.get_next_run_at(max(now, run_at))
+        misfired = now - run_at > self.misfire_grace
+        with transaction.atomic():
+            updated = DeviceSchedule.objects.filter(pk=schedule_id, next_run_at=run_at).update(
+                next_run_at=next_run_at, **({} if misfired else {"last_run_at": run_at})
+            )
+            if not updated:
+                return False, (
+                    DeviceSchedule.objects.filter(pk=schedule_id, is_active=True)
+                    .values_list("next_run_at", flat=True)
+                    .first()
+                )
+            if misfired:
+                logger.warning("Skipped run of schedule %s at %s (missed)", schedule_id, run_at)
+                return False, next_run_at
+            expires = (
+                run_at + timedelta(seconds=schedule.command_ttl)
+                if schedule.command_ttl is not None
+                else None
+            )
+            if schedule.group_id is not None:
+                queue_group_command(schedule.group_id, schedule.command, schedule.payload, expires)
+            else:
+                queue_commands([schedule.device_id], schedule.command, schedule.payload, expires)
+        return True, next_run_at
+
+    def run_once(self, now: datetime | None = None) -> Tuple[int, float]:
+        """
+        Run due schedules, reload changed schedules when the refresh interval elapsed
+
+        :param now: current time, default: now
+        :type now: datetime | None
+        :return: number of runs, and seconds until the next run time (or the next refresh)
+        :rtype: Tuple[int, float]
+        """
+        if self._loaded_at is None or time.monotonic() - self._refreshed >= self.refresh_interval:
+            self.load()
+        now = now or timezone.now()
+        runs = 0
+        while self._heap and self._heap[0][0] <= now:
+            run_at, schedule_id = heapq.heappop(self._heap)
+            if self._next_runs.get(schedule_id) != run_at:
+                continue
+            del self._next_runs[schedule_id]
+            try:
+                ran, next_run_at = self.fire(schedule_id, run_at, now)
+            except Exception:
+                # e.g. the database is unavailable, retried after a refresh interval
+                logger.exception("Failed to run schedule %s", schedule_id)
+                self._push(schedule_id, run_at)
+                return runs, self.refresh_interval
+            runs += ran
+            self._push(schedule_id, next_run_at)
+        # drop entries of changed schedules, they'd wake the scheduler for nothing
+        while self._heap and self._next_runs.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        timeout = max(0.0, self.refresh_interval - (time.monotonic() - self._refreshed))
+        if self._heap:
+            timeout = min(timeout, max(0.0, (self._heap[0][0] - timezone.now()).total_seconds()))
+        return runs, timeout
+
+    def run(self, once: bool = False) -> int:
+        """
+        Run schedules until stopped (or run the due schedules once)
+
+        :return: number of runs
+        :rtype: int
+        """
+        runs = 0
+        while not self.stop_event.is_set():
+            try:
+                ran, timeout = self.run_once()
+            except Exception:
+                # e.g. the database is unavailable, retried after a refresh interval
+                logger.exception("Scheduler failed to load schedules")
+                self.stop_event.wait(self.refresh_interval)
+                continue
+            runs += ran
+            if once:
+                break
+            self.stop_event.wait(timeout)
+        return runs
+
+
+def run_scheduler(
+    refresh_interval: float | None = None,
+    misfire_grace: float | None = None,
+    once: bool = False,
+) -> int:
+    """
+    Run the scheduler until SIGTERM or SIGINT (or run the due schedules once)
+
+    :param refresh_interval: seconds between loads of changed schedules, default: DEVICE_SCHEDULES_REFRESH_INTERVAL
+    :type refresh_interval: float | None
+    :param misfire_grace: seconds a run may be late, default: DEVICE_SCHEDULES_MISFIRE_GRACE
+    :type misfire_grace: float | None
+    :param once: run the due schedules, and return
+    :type once: bool
+    :return: number of runs
+    :rtype: int
+    """
+    scheduler = Scheduler(refresh_interval, misfire_grace)
+
+    def stop(*_: Any) -> None:
+        scheduler.stop_event.set()
+
+    previous_handlers = {
+        signal_number: signal.signal(signal_number, stop)
+        for signal_number in (signal.SIGTERM, signal.SIGINT)
+    }
+    try:
+        return scheduler.run(once=once)
+    finally:
+        for signal_number, handler in previous_handlers.items():
+            signal.signal(signal_number, handler)
@@ -0,0 +1,225 @@
+"""
+Indexed search of devices and device groups, by name.
+
+Names are searched by substring, case-insensitively (names are stored in
+lowercase). Results are ranked: exact name first, then names starting with
+the query, then other matches, by name, and paginated from the index with
+a single COUNT query.
+
+Backends, by database vendor:
+
+    - SQLite: an FTS5 table per model, with the trigram tokenizer (see
+      migration 0007), whose rows (rowid = object id) hold the name and an
+      owner token, so that the index finds a member's matches. Tables are
+      kept in sync by signals (see devices.signals). Queries shorter than a
+      trigram are served by the ORM (member's rows only).
+    - PostgreSQL: pg_trgm GIN indexes of names (see migration 0007), used
+      by the ORM's LIKE queries, nothing to keep in sync.
+    - other databases: ORM queries (full scan of the member's rows).
+
+Updates that skip signals (bulk_create, QuerySet.update, raw SQL) must be
+followed by `manage.py rebuild_search_index`.
+
+Classes:
+--------
+
+    - SearchIndex
+    - SearchResults
+
+Functions:
+----------
+
+    - get_search_index(model: Type[Model]) -> SearchIndex
+    - has_search_tables(alias: str) -> bool
+    - search(model: Type[Model], owner: Member, query: str) -> SearchResults | QuerySet
+    - rebuild_search_index(using: str = DEFAULT_DB_ALIAS) -> None
+
+"""
+
+from functools import cached_property
+from typing import *
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Case, IntegerField, Model, QuerySet, Value, When
+
+from accounts.models import Member
+
+from .models import Device, DeviceGroup
+
+# trigram tokenizer matches substrings of at least 3 characters
+MIN_INDEXED_QUERY_LENGTH: Final[int] = 3
+
+
+class SearchIndex:
+    """
+    Full-text (FTS5, trigram) index of a model's names, in SQLite databases
+    """
+
+    def __init__(self, model: Type[Model], table: str, owner_field: str) -> None:
+        self.model = model
+        self.table = table
+        # lookup of the owner's id, from the model
+        self.owner_field = owner_field
+
+    @staticmethod
+    def owner_token(owner_id: int) -> str:
+        """Owner column value, a phrase no other owner's token contains"""
+        return f"#{owner_id}#"
+
+    @staticmethod
+    def phrase(text: str) -> str:
+        """FTS5 phrase matching `text` (as a substring)"""
+        return '"{}"'.format(text.replace('"', '""'))
+
+    def get_owner_id(self, instance: Model) -> int:
+        """Owner's id, following `owner_field` (e.g. 'group__owner_id')"""
+        value = instance
+        for name in self.owner_field.split("__"):
+            value = getattr(value, name)
+        return value
+
+    def add(self, instance: Model, using: str) -> None:
+        """Add (or update) an object's row"""
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {self.table} (rowid, name, owner) VALUES (%s, %s, %s)",
+                [instance.pk, instance.name, self.owner_token(self.get_owner_id(instance))],
+            )
+
+    def remove(self, pk: int, using: str) -> None:
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [pk])
+
+    def rebuild(self, using: str) -> None:
+        """Replace all rows, with the model's current rows"""
+        rows = self.model.objects.using(using).values_list("pk", "name", self.owner_field)
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, name, owner) VALUES (%s, %s, %s)",
+                [(pk, name, self.owner_token(owner_id)) for pk, name, owner_id in rows],
+            )
+
+    def match_expression(self, owner_id: int, query: str) -> str:
+        return (
+            f"owner : {self.phrase(self.owner_token(owner_id))} "
+            f"AND name : {self.phrase(query)}"
+        )
+
+
+SEARCH_INDEXES: Final[Dict[Type[Model], SearchIndex]] = {
+    Device: SearchIndex(Device, "devices_device_search", "group__owner_id"),
+    DeviceGroup: SearchIndex(DeviceGroup, "devices_devicegroup_search", "owner_id"),
+}
+
+
+class SearchResults:
+    """
+    Ranked search results of an FTS5 index, a lazy sequence of model
+    instances, that can be paginated (counted once, sliced by page)
+    """
+
+    def __init__(self, index: SearchIndex, owner_id: int, query: str, using: str) -> None:
+        self.index = index
+        self.owner_id = owner_id
+        self.query = query
+        self.using = using
+
+    @cached_property
+    def _match(self) -> str:
+        return self.index.match_expression(self.owner_id, self.query)
+
+    def count(self) -> int:
+        return self._count
+
+    @cached_property
+    def _count(self) -> int:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {self.index.table} WHERE {self.index.table} MATCH %s",
+                [self._match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice) -> List[Model]:
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("SearchResults supports slices (without step) only")
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.index.table} WHERE {self.index.table} MATCH %s "
+                f"ORDER BY CASE WHEN name = %s THEN 0 WHEN substr(name, 1, %s) = %s "
+                f"THEN 1 ELSE 2 END, name LIMIT %s OFFSET %s",
+                [self._match, self.query, len(self.query), self.query, limit, start],
+            )
+            pks = [row[0] for row in cursor.fetchall()]
+        objects = self.index.model.objects.using(self.using).in_bulk(pks)
+        return [objects[pk] for pk in pks if pk in objects]
+
+    def __iter__(self) -> Iterator[Model]:
+        return iter(self[:])
+
+
+def get_search_index(model: Type[Model]) -> SearchIndex:
+    return SEARCH_INDEXES[model]
+
+
+_search_tables: Dict[str, bool] = {}
+
+
+def has_search_tables(alias: str) -> bool:
+    """Whether database `alias` has the FTS5 search tables (see migration 0007)"""
+    if alias not in _search_tables:
+        connection = connections[alias]
+        _search_tables[alias] = connection.vendor == "sqlite" and all(
+            index.table in connection.introspection.table_names()
+            for index in SEARCH_INDEXES.values()
+        )
+    return _search_tables[alias]
+
+
+def search(model: Type[Model], owner: Member, query: str) -> SearchResults | QuerySet:
+    """
+    Search a member's devices or device groups (model) by name
+
+    :param model: Device or DeviceGroup
+    :type model: Type[Model]
+    :param owner: member whose objects are searched
+    :type owner: Member
+    :param query: substring of the names to search for
+    :type query: str
+    :return: ranked results, that can be counted and sliced
+    :rtype: SearchResults | QuerySet
+    """
+    index = get_search_index(model)
+    query = query.strip().lower()
+    using = router.db_for_read(model)
+    if len(query) >= MIN_INDEXED_QUERY_LENGTH and has_search_tables(using):
+        return SearchResults(index, owner.pk, query, using)
+
+    # pg_trgm index (PostgreSQL), or a scan of the member's rows
+    return (
+        model.objects.filter(**{index.owner_field: owner.pk, "name__contains": query})
+        .annotate(
+            search_rank=Case(
+                When(name=query, then=Value(0)),
+                When(name__startswith=query, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("search_rank", "name")
+    )
+
+
+def rebuild_search_index(using: str = DEFAULT_DB_ALIAS) -> None:
+    """Rebuild the search tables of database `using`, if it has them"""
+    _search_tables.pop(using, None)
+    if not has_search_tables(using):
+        return
+    for index in SEARCH_INDEXES.values():
+        index.rebuild(using)
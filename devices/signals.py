@@ -0,0 +1,109 @@
+"""
+Signal handlers of the devices app.
+
+Device data refers to its device without a database constraint (it may be
+stored in another database, see common.routers), so it's purged after its
+device is deleted (see devices.purge), instead of by a cascade.
+
+Search tables (SQLite FTS5, see devices.search) are kept in sync with
+devices and groups names and owners, and typeahead indexes of their members
+(see devices.typeahead) are dropped.
+
+Handlers:
+---------
+
+    - schedule_device_data_purge: schedule the purge of a deleted device's data
+    - index_device: add (or update) a new, renamed or moved device in the search index
+    - index_device_group: add (or update) a new, renamed or moved group, and its devices, in the search index
+    - unindex_device: remove a deleted device from the search index
+    - unindex_device_group: remove a deleted group from the search index
+    - invalidate_device_typeahead: drop the typeahead index of a saved or deleted device's member
+    - invalidate_group_typeahead: drop the typeahead index of a saved or deleted group's member
+    - invalidate_rule_index: reload the rule index after a rule is saved or deleted
+
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Device, DeviceGroup, DeviceRule
+from .purge import schedule_purge
+from .rules import get_rule_index
+from .search import get_search_index, has_search_tables
+from .typeahead import get_typeahead_store
+
+
+@receiver(post_delete, sender=Device, dispatch_uid="devices.schedule_device_data_purge")
+def schedule_device_data_purge(sender, instance: Device, using: str, **kwargs) -> None:
+    """Schedule the purge of a deleted device's data"""
+    schedule_purge(instance, using)
+
+
+@receiver(post_save, sender=Device, dispatch_uid="devices.index_device")
+def index_device(sender, instance: Device, using: str, created: bool, **kwargs) -> None:
+    """Add (or update) a saved device in the search index, if it's new, renamed or moved"""
+    if not created and (
+        instance.name == getattr(instance, "_loaded_name", None)
+        and instance.group_id == getattr(instance, "_loaded_group_id", None)
+    ):
+        return
+    if has_search_tables(using):
+        get_search_index(Device).add(instance, using)
+
+
+@receiver(post_save, sender=DeviceGroup, dispatch_uid="devices.index_device_group")
+def index_device_group(sender, instance: DeviceGroup, using: str, created: bool, **kwargs) -> None:
+    """
+    Add (or update) a saved group in the search index, if it's new, renamed or
+    given to another owner, and its devices, if given to another owner
+    """
+    owner_changed = instance.owner_id != getattr(instance, "_loaded_owner_id", None)
+    renamed = instance.name != getattr(instance, "_loaded_name", None)
+    if not (created or owner_changed or renamed) or not has_search_tables(using):
+        return
+    get_search_index(DeviceGroup).add(instance, using)
+    if not created and owner_changed:
+        device_index = get_search_index(Device)
+        for device in instance.device_set.using(using).select_related("group"):
+            device_index.add(device, using)
+
+
+@receiver(post_delete, sender=Device, dispatch_uid="devices.unindex_device")
+def unindex_device(sender, instance: Device, using: str, **kwargs) -> None:
+    """Remove a deleted device from the search index"""
+    if has_search_tables(using):
+        get_search_index(Device).remove(instance.pk, using)
+
+
+@receiver(post_delete, sender=DeviceGroup, dispatch_uid="devices.unindex_device_group")
+def unindex_device_group(sender, instance: DeviceGroup, using: str, **kwargs) -> None:
+    """Remove a deleted group from the search index"""
+    if has_search_tables(using):
+        get_search_index(DeviceGroup).remove(instance.pk, using)
+
+
+@receiver(post_save, sender=Device, dispatch_uid="devices.invalidate_device_typeahead_on_save")
+@receiver(post_delete, sender=Device, dispatch_uid="devices.invalidate_device_typeahead_on_delete")
+def invalidate_device_typeahead(sender, instance: Device, **kwargs) -> None:
+    """Drop the typeahead index of a saved or deleted device's member (both, if it moved)"""
+    store = get_typeahead_store()
+    group_ids = {instance.group_id, getattr(instance, "_loaded_group_id", None)}
+    store.invalidate(
+        *(store.get_group_owner(group_id) for group_id in group_ids if group_id is not None)
+    )
+
+
+@receiver(post_save, sender=DeviceGroup, dispatch_uid="devices.invalidate_group_typeahead_on_save")
+@receiver(post_delete, sender=DeviceGroup, dispatch_uid="devices.invalidate_group_typeahead_on_delete")
+def invalidate_group_typeahead(sender, instance: DeviceGroup, **kwargs) -> None:
+    """Drop the typeahead index of a saved or deleted group's member (both, if it moved)"""
+    get_typeahead_store().invalidate(
+        instance.owner_id, getattr(instance, "_loaded_owner_id", None)
+    )
+
+
+@receiver(post_save, sender=DeviceRule, dispatch_uid="devices.invalidate_rule_index_on_save")
+@receiver(post_delete, sender=DeviceRule, dispatch_uid="devices.invalidate_rule_index_on_delete")
+def invalidate_rule_index(sender, instance: DeviceRule, **kwargs) -> None:
+    """Reload the rule index after a rule is saved or deleted (other processes reload it periodically)"""
+    get_rule_index().invalidate()
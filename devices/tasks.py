@@ -0,0 +1,64 @@
+"""
+Background tasks of devices (see jobs.tasks).
+
+Functions:
+----------
+
+    - purge_device_data_task(purge_id: int) -> None
+    - sweep_offline_devices_task() -> int
+    - fire_rule_task(rule_id: int, triggered: bool, observed: str) -> bool
+
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from jobs.tasks import task
+
+from .heartbeats import sweep_offline_devices
+from .models import DeviceDataPurge
+from .purge import purge_device_data
+from .rules import FIRE_RULE_TASK, fire_rule
+
+
+@task(name="devices.purge_device_data", lease=timedelta(hours=1))
+def purge_device_data_task(purge_id: int) -> None:
+    """
+    Purge a deleted device's data (see devices.purge.schedule_purge), a
+    purge interrupted by a worker's restart is resumed when its job is run
+    again
+
+    :param purge_id: pending purge
+    :type purge_id: int
+    """
+    purge = DeviceDataPurge.objects.pending().filter(pk=purge_id).first()
+    if purge is not None:
+        purge_device_data(purge)
+
+
+@task(
+    name="devices.sweep_offline_devices",
+    priority=5,
+    every=timedelta(seconds=settings.DEVICE_HEARTBEAT_SWEEP_INTERVAL),
+)
+def sweep_offline_devices_task() -> int:
+    """Mark devices silent for too long offline (see devices.heartbeats)"""
+    return sweep_offline_devices()
+
+
+@task(name=FIRE_RULE_TASK, priority=20)
+def fire_rule_task(rule_id: int, triggered: bool, observed: str) -> bool:
+    """
+    Run a rule's action, after its transition (see devices.rules)
+
+    :param rule_id: rule id
+    :type rule_id: int
+    :param triggered: did the rule trigger, or clear
+    :type triggered: bool
+    :param observed: when the transition was observed (ISO 8601)
+    :type observed: str
+    :return: whether the rule's state changed
+    :rtype: bool
+    """
+    return fire_rule(rule_id, triggered, datetime.fromisoformat(observed))
@@ -0,0 +1,74 @@
+from typing import *
+
+from django.test import TestCase
+
+from devices.models import Device, DeviceData
+from test.utils.helpers import create_member
+
+FIRST_MEMBER: Final[Dict[str, str]] = dict(
+    username="first_member",
+    password="first_password",
+)
+
+SECOND_MEMBER: Final[Dict[str, str]] = dict(
+    username="second_member",
+    password="second_password",
+)
+
+
+class TestDeviceDataOwner(TestCase):
+    def setUp(self) -> None:
+        self.first_member = create_member(**FIRST_MEMBER)
+        self.second_member = create_member(**SECOND_MEMBER)
+        self.first_group = self.first_member.devicegroup_set.create(name="first_group")
+        self.second_group = self.first_member.devicegroup_set.create(
+            name="second_group"
+        )
+        self.device = self.first_group.device_set.create(
+            name="test_device", uid=Device.generate_device_uid("test_device")
+        )
+
+    def assertDataLocation(self, group, owner) -> None:
+        for device_data in DeviceData.objects.filter(device=self.device):
+            self.assertEqual(device_data.group_id, group.id)
+            self.assertEqual(device_data.owner_id, owner.id)
+
+    def test_device_data_owner_is_set_on_create(self):
+        device_data = DeviceData.objects.create(device=self.device, message={})
+
+        self.assertEqual(device_data.group, self.first_group)
+        self.assertEqual(device_data.owner, self.first_member)
+
+    def test_device_data_owner_is_set_on_bulk_create(self):
+        DeviceData.objects.bulk_create(
+            DeviceData(device_id=self.device.id, message={"index": index})
+            for index in range(3)
+        )
+
+        self.assertEqual(DeviceData.objects.filter(owner=self.first_member).count(), 3)
+        self.assertDataLocation(self.first_group, self.first_member)
+
+    def test_device_data_follows_device_to_another_group(self):
+        DeviceData.objects.create(device=self.device, message={})
+        device = Device.objects.get(pk=self.device.pk)
+        device.group = self.second_group
+        device.save()
+
+        self.assertDataLocation(self.second_group, self.first_member)
+
+    def test_device_data_follows_group_to_another_owner(self):
+        DeviceData.objects.create(device=self.device, message={})
+        self.first_group.refresh_from_db()
+        self.first_group.owner = self.second_member
+        self.first_group.save()
+
+        self.assertDataLocation(self.first_group, self.second_member)
+
+    def test_device_save_without_moving_does_not_update_data(self):
+        DeviceData.objects.create(device=self.device, message={})
+        device = Device.objects.get(pk=self.device.pk)
+        device.is_active = False
+
+        # savepoint, device update, release savepoint: no device data update
+        with self.assertNumQueries(3):
+            device.save()
@@ -0,0 +1,288 @@
+import shutil
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from typing import *
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router, transaction
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from devices.models import Device, DeviceData
+from devices.partitions import (
+    PostgresPartitioner,
+    SQLitePartitioner,
+    add_months,
+    apply_retention,
+    get_partitioner,
+    month_start,
+)
+from test.utils.helpers import create_member
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def get_device_data_connection():
+    return connections[router.db_for_write(DeviceData)]
+
+
+class TestPartitionMonths(SimpleTestCase):
+    def test_month_start(self):
+        self.assertEqual(month_start(utc(2023, 7, 17, 16, 28)), utc(2023, 7, 1))
+
+    def test_month_start_converts_to_utc(self):
+        value = datetime(2023, 8, 1, 1, 0, tzinfo=dt_timezone(timezone.timedelta(hours=3)))
+
+        self.assertEqual(month_start(value), utc(2023, 7, 1))
+
+    def test_add_months(self):
+        self.assertEqual(add_months(utc(2023, 7, 17), 1), utc(2023, 8, 1))
+        self.assertEqual(add_months(utc(2023, 11, 1), 3), utc(2024, 2, 1))
+        self.assertEqual(add_months(utc(2023, 1, 31), -1), utc(2022, 12, 1))
+
+    def test_partition_sql(self):
+        partitioner = PostgresPartitioner(connection)
+
+        self.assertEqual(
+            partitioner.partition_name(utc(2023, 12, 1)), "devices_devicedata_p2023_12"
+        )
+        self.assertEqual(
+            partitioner.create_partition_sql(utc(2023, 12, 1)),
+            'CREATE TABLE IF NOT EXISTS "devices_devicedata_p2023_12" '
+            'PARTITION OF "devices_devicedata" '
+            "FOR VALUES FROM ('2023-12-01T00:00:00+00:00') "
+            "TO ('2024-01-01T00:00:00+00:00')",
+        )
+
+    def test_partitioning_is_not_supported_on_in_memory_sqlite(self):
+        self.assertIsNone(get_partitioner())
+
+
+class TestDeviceDataRetention(TestCase):
+    def setUp(self) -> None:
+        member = create_member(**MEMBER)
+        group = member.devicegroup_set.create(name="test_group")
+        self.device = group.device_set.create(
+            name="test_device", uid=Device.generate_device_uid("test_device")
+        )
+        now = timezone.now()
+        self.old_data = DeviceData.objects.bulk_create(
+            DeviceData(device=self.device, date=add_months(now, -3), message={})
+            for _ in range(5)
+        )
+        self.new_data = DeviceData.objects.create(device=self.device, date=now)
+
+    def test_apply_retention_deletes_old_data_in_batches(self):
+        dropped, deleted = apply_retention(
+            add_months(timezone.now(), -1), batch_size=2
+        )
+
+        self.assertEqual(dropped, [])
+        self.assertEqual(deleted, 5)
+        self.assertQuerySetEqual(DeviceData.objects.all(), [self.new_data])
+
+    def test_partitions_command_retention(self):
+        out = StringIO()
+        call_command("device_data_partitions", retention_months=1, stdout=out)
+
+        self.assertIn("Deleted 5 device data", out.getvalue())
+        self.assertEqual(DeviceData.objects.count(), 1)
+
+    def test_partitions_command_no_retention_keeps_data(self):
+        call_command("device_data_partitions", retention_months=0, stdout=StringIO())
+
+        self.assertEqual(DeviceData.objects.count(), 6)
+
+    def test_partitions_command_convert_requires_partitioning_support(self):
+        with self.assertRaises(CommandError):
+            call_command("device_data_partitions", convert=True, stdout=StringIO())
+
+
+@skipUnless(get_device_data_connection().vendor == "sqlite", "SQLite partitions")
+class TestSQLitePartitions(TransactionTestCase):
+    def setUp(self) -> None:
+        self.connection = get_device_data_connection()
+        directory = tempfile.mkdtemp()
+        self.partitions_dir = Path(directory) / "partitions"
+        patcher = mock.patch.dict(self.connection.settings_dict, PARTITIONS_DIR=str(self.partitions_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # detach the removed partitions
+        self.addCleanup(self.connection.sync_partitions)
+        self.addCleanup(shutil.rmtree, directory)
+
+        member = create_member(**MEMBER)
+        group = member.devicegroup_set.create(name="test_group")
+        self.device = group.device_set.create(
+            name="test_device", uid=Device.generate_device_uid("test_device")
+        )
+        self.now = timezone.now()
+        self.months = [add_months(self.now, months) for months in (-2, -1)]
+        for month in self.months:
+            DeviceData.objects.bulk_create(
+                DeviceData(device=self.device, date=month.replace(day=index + 1), message={"index": index})
+                for index in range(3)
+            )
+        DeviceData.objects.create(device=self.device, date=self.now)
+
+    def partition(self, convert: bool = True) -> List[str]:
+        out = StringIO()
+        call_command("device_data_partitions", convert=convert, retention_months=0, stdout=out)
+        return out.getvalue().splitlines()
+
+    def count_table_rows(self) -> int:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM main.devices_devicedata")
+            return cursor.fetchone()[0]
+
+    def test_months_that_ended_are_moved_to_their_partitions(self):
+        partitioner = get_partitioner()
+        names = [partitioner.partition_name(month) for month in self.months]
+
+        self.assertEqual(self.partition(), [f"Created partition {name}" for name in names])
+
+        self.assertIsInstance(partitioner, SQLitePartitioner)
+        self.assertEqual(sorted(partitioner.partitions().values()), names)
+        self.assertEqual(self.count_table_rows(), 1)
+        self.assertEqual(DeviceData.objects.count(), 7)
+        self.assertEqual(
+            DeviceData.objects.filter(date__gte=self.months[0], date__lt=self.months[1]).count(), 3
+        )
+        self.assertEqual(
+            [data.message for data in DeviceData.objects.filter(device=self.device).order_by("date")[:2]],
+            [{"index": 0}, {"index": 1}],
+        )
+        # joins read the partitions too
+        self.assertEqual(
+            Device.objects.annotate(data_count=Count("devicedata")).get(pk=self.device.pk).data_count, 7
+        )
+        # data received later is moved by the next update
+        DeviceData.objects.create(device=self.device, date=self.months[0].replace(day=20))
+        self.assertEqual(self.partition(convert=False), [])
+        self.assertEqual(self.count_table_rows(), 1)
+        self.assertEqual(DeviceData.objects.count(), 8)
+
+    def test_date_range_queries_search_partitions_indexes(self):
+        self.partition()
+
+        plan = DeviceData.objects.filter(date__gte=self.months[1], date__lt=self.now).explain()
+
+        for month in self.months:
+            name = get_partitioner().partition_name(month)
+            self.assertRegex(plan, rf"SEARCH {name}\.devices_devicedata USING (COVERING )?INDEX")
+
+    def test_updates_and_deletes_run_on_partitions(self):
+        self.partition()
+
+        self.assertEqual(DeviceData.objects.filter(date__lt=self.months[1]).update(message={}), 3)
+        data = DeviceData.objects.filter(date__gte=self.months[1]).order_by("date").first()
+        data.message = {"index": 10}
+        data.save()
+
+        self.assertEqual(DeviceData.objects.count(), 7)
+        self.assertEqual(DeviceData.objects.get(pk=data.pk).message, {"index": 10})
+        self.assertEqual(DeviceData.objects.filter(message={}).count(), 3)
+        self.assertEqual(DeviceData.objects.filter(date__lt=self.now).delete()[0], 6)
+        self.assertEqual(DeviceData.objects.count(), 1)
+
+    def test_partitions_are_synced_by_partitioned_tables_queries_only(self):
+        self.partition()
+
+        with mock.patch.object(
+            self.connection, "sync_partitions", wraps=self.connection.sync_partitions
+        ) as sync_partitions:
+            self.assertEqual(Device.objects.count(), 1)
+            sync_partitions.assert_not_called()
+            self.assertEqual(DeviceData.objects.count(), 7)
+            sync_partitions.assert_called_once()
+
+        # tables of databases that don't store telemetry models aren't partitioned
+        with mock.patch("common.db.backends.sqlite3.base.get_telemetry_db_alias", return_value="telemetry"):
+            self.assertEqual(self.connection.partitioned_tables, frozenset())
+            self.assertIsNone(self.connection.partitions_dir)
+
+    def test_partitions_are_not_attached_in_transactions(self):
+        self.assertEqual(self.connection.sync_partitions(), {})
+        get_partitioner().convert()
+        # a file added by another process
+        get_partitioner().create_partition(self.months[0])
+        self.connection.sync_partitions()
+        shutil.copy(
+            get_partitioner().partition_path(self.months[0]),
+            get_partitioner().partition_path(self.months[1]),
+        )
+
+        with transaction.atomic(using=self.connection.alias):
+            self.assertEqual(DeviceData.objects.count(), 7)
+            self.assertEqual(len(self.connection.sync_partitions()["devices_devicedata"]), 1)
+
+        self.assertEqual(len(self.connection.sync_partitions()["devices_devicedata"]), 2)
+
+    def test_retention_drops_partitions(self):
+        self.partition()
+        name = get_partitioner().partition_name(self.months[0])
+
+        out = StringIO()
+        call_command("device_data_partitions", retention_months=1, stdout=out)
+
+        self.assertIn(f"Dropped partition {name}", out.getvalue())
+        self.assertIn("Deleted 0 device data", out.getvalue())
+        self.assertFalse(get_partitioner().partition_path(self.months[0]).exists())
+        self.assertEqual(DeviceData.objects.count(), 4)
+
+
+@skipUnless(
+    get_device_data_connection().vendor == "postgresql",
+    "PostgreSQL partitions, device data must be in a PostgreSQL database (e.g. TELEMETRY_DATABASE_URL)",
+)
+class TestPostgresPartitions(TestCase):
+    databases = "__all__"
+
+    def setUp(self) -> None:
+        member = create_member(**MEMBER)
+        group = member.devicegroup_set.create(name="test_group")
+        self.device = group.device_set.create(
+            name="test_device", uid=Device.generate_device_uid("test_device")
+        )
+        self.now = timezone.now()
+        self.months = [add_months(self.now, months) for months in (-2, -1, 0)]
+        for month in self.months:
+            DeviceData.objects.bulk_create(
+                DeviceData(device=self.device, date=month.replace(day=index + 1), message={})
+                for index in range(3)
+            )
+
+    def test_convert_and_retention(self):
+        partitioner = get_partitioner()
+        self.assertIsInstance(partitioner, PostgresPartitioner)
+
+        created = partitioner.convert(months_ahead=1)
+
+        self.assertTrue(partitioner.is_partitioned())
+        self.assertEqual(
+            created, [partitioner.partition_name(month) for month in [*self.months, add_months(self.now, 1)]]
+        )
+        self.assertEqual(DeviceData.objects.count(), 9)
+        # new rows get ids from the partitioned table's sequence
+        data = DeviceData.objects.create(device=self.device, date=self.now)
+        self.assertGreater(data.pk, max(DeviceData.objects.exclude(pk=data.pk).values_list("pk", flat=True)))
+        plan = DeviceData.objects.filter(date__gte=self.months[1], date__lt=self.months[2]).explain()
+        self.assertIn(partitioner.partition_name(self.months[1]), plan)
+        self.assertNotIn(partitioner.partition_name(self.months[0]), plan)
+
+        dropped, deleted = apply_retention(self.months[1])
+
+        self.assertEqual(dropped, [partitioner.partition_name(self.months[0])])
+        self.assertEqual(deleted, 0)
+        self.assertEqual(DeviceData.objects.count(), 7)
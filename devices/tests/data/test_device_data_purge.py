@@ -0,0 +1,171 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from test.utils.helpers import client_login, create_member
+from typing import *
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from devices import purge as purge_module
+from devices.models import Device, DeviceData, DeviceDataPurge
+from devices.partitions import add_months
+from devices.purge import (
+    count_remaining_rows,
+    purge_device_data,
+    purge_pending_device_data,
+)
+from jobs.models import Job
+from jobs.runner import run_pending_jobs
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+DATA_ROWS: Final[int] = 25
+
+
+class TestDeviceDataPurge(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="test_group")
+        self.devices = [
+            self.group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+            for name in ("first_device", "second_device")
+        ]
+        for device in self.devices:
+            DeviceData.objects.bulk_create(
+                DeviceData(device=device, message={"index": index}) for index in range(DATA_ROWS)
+            )
+        return super().setUp()
+
+    def test_device_deletion_schedules_purge(self):
+        device = Device.objects.get(pk=self.devices[0].pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            device.delete()
+
+        # data is neither loaded, nor deleted
+        self.assertFalse([query for query in queries if "devices_devicedata\"" in query["sql"]])
+
+        purge = DeviceDataPurge.objects.get()
+        self.assertEqual(purge.device_id, self.devices[0].pk)
+        self.assertEqual(purge.owner_id, self.member.pk)
+        self.assertIsNone(purge.finished)
+        # data is left for the purge
+        self.assertEqual(count_remaining_rows(purge), DATA_ROWS)
+
+    def test_purge_deletes_data_in_batches(self):
+        self.devices[0].delete()
+        purge = DeviceDataPurge.objects.get()
+
+        with mock.patch.object(purge_module, "_delete_batch", wraps=purge_module._delete_batch) as delete_batch:
+            deleted = purge_device_data(purge, batch_size=10, pause=0)
+
+        self.assertEqual(deleted, DATA_ROWS)
+        self.assertEqual(delete_batch.call_count, 3)
+        purge.refresh_from_db()
+        self.assertEqual(purge.deleted_rows, DATA_ROWS)
+        self.assertIsNotNone(purge.finished)
+        self.assertFalse(DeviceData.objects.filter(device_id=purge.device_id).exists())
+        self.assertEqual(DeviceData.objects.filter(device=self.devices[1]).count(), DATA_ROWS)
+
+    def test_group_deletion_purges_its_devices_data(self):
+        self.group.delete()
+
+        self.assertEqual(DeviceDataPurge.objects.pending().count(), 2)
+        self.assertEqual(purge_pending_device_data(batch_size=10, pause=0), 2 * DATA_ROWS)
+        self.assertFalse(DeviceDataPurge.objects.pending().exists())
+        self.assertFalse(DeviceData.objects.exists())
+
+    def test_deleted_devices_data_is_hidden_until_purged(self):
+        client_login(self.client, MEMBER)
+        url = reverse("devices:data_list")
+        data = DeviceData.objects.filter(device=self.devices[0]).first()
+
+        self.devices[0].delete()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["paginator"].count, DATA_ROWS)
+        response = self.client.get(reverse("devices:data_details", kwargs=dict(pk=data.pk)))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(DEVICE_DATA_PURGE_IN_BACKGROUND=True)
+    def test_purge_is_run_by_a_background_job(self):
+        self.devices[0].delete()
+        purge = DeviceDataPurge.objects.get()
+        job = Job.objects.get(task="devices.purge_device_data")
+        self.assertEqual(job.args, [purge.pk])
+
+        run_pending_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertFalse(DeviceDataPurge.objects.pending().exists())
+        self.assertFalse(DeviceData.objects.filter(device_id=purge.device_id).exists())
+
+    @override_settings(DEVICE_DATA_PURGE_IN_BACKGROUND=False)
+    def test_purge_command(self):
+        device_id = self.devices[0].pk
+        self.devices[0].delete()
+
+        stdout = StringIO()
+        call_command("purge_device_data", "--status", stdout=stdout)
+        self.assertIn(f"device {device_id}: 0 rows deleted, {DATA_ROWS} remaining", stdout.getvalue())
+
+        call_command("purge_device_data", "--pause", "0", stdout=StringIO())
+        self.assertFalse(DeviceDataPurge.objects.pending().exists())
+        self.assertFalse(DeviceData.objects.filter(device_id=device_id).exists())
+
+
+@skipUnless(connections[router.db_for_write(DeviceData)].vendor == "sqlite", "SQLite partitions")
+class TestPartitionedDeviceDataPurge(TransactionTestCase):
+    def setUp(self) -> None:
+        connection = connections[router.db_for_write(DeviceData)]
+        directory = tempfile.mkdtemp()
+        patcher = mock.patch.dict(
+            connection.settings_dict, PARTITIONS_DIR=str(Path(directory) / "partitions")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # detach the removed partitions
+        self.addCleanup(connection.sync_partitions)
+        self.addCleanup(shutil.rmtree, directory)
+
+        self.member = create_member(**MEMBER)
+        group = self.member.devicegroup_set.create(name="test_group")
+        self.devices = [
+            group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+            for name in ("first_device", "second_device")
+        ]
+        now = timezone.now()
+        for device in self.devices:
+            DeviceData.objects.bulk_create(
+                DeviceData(device=device, date=add_months(now, -(index % 3)), message={"index": index})
+                for index in range(DATA_ROWS)
+            )
+        call_command("device_data_partitions", convert=True, retention_months=0, stdout=StringIO())
+
+    def test_purge_deletes_partitions_data(self):
+        with connections[router.db_for_write(DeviceData)].cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM main.devices_devicedata")
+            self.assertLess(cursor.fetchone()[0], DATA_ROWS)
+        self.devices[0].delete()
+
+        self.assertEqual(purge_pending_device_data(batch_size=10, pause=0), DATA_ROWS)
+
+        purge = DeviceDataPurge.objects.get()
+        self.assertEqual(purge.deleted_rows, DATA_ROWS)
+        self.assertIsNotNone(purge.finished)
+        self.assertFalse(DeviceData.objects.filter(device_id=purge.device_id).exists())
+        self.assertEqual(DeviceData.objects.filter(device=self.devices[1]).count(), DATA_ROWS)
+        # no data of the deleted device is left to its owner
+        self.assertEqual(DeviceData.objects.filter(owner=self.member).count(), DATA_ROWS)
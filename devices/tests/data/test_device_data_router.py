@@ -0,0 +1,161 @@
+from typing import *
+from unittest import mock, skipUnless
+
+from django.db import connections, migrations, models, router
+from django.db.migrations.loader import MigrationLoader
+from django.test import SimpleTestCase, TestCase
+
+from accounts.models import Member
+from common.routers import TelemetryRouter
+from devices.models import Device, DeviceData, DeviceGroup
+from devices.purge import purge_pending_device_data
+from test.utils.helpers import create_member
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+# a configured (or not configured) telemetry database
+with_telemetry_db = mock.patch(
+    "common.routers.get_telemetry_db_alias", new=lambda: "telemetry"
+)
+without_telemetry_db = mock.patch(
+    "common.routers.get_telemetry_db_alias", new=lambda: None
+)
+
+
+class TestTelemetryRouter(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router = TelemetryRouter()
+
+    @without_telemetry_db
+    def test_router_without_telemetry_database_uses_default(self):
+        self.assertIsNone(self.router.db_for_read(DeviceData))
+        self.assertIsNone(self.router.db_for_write(DeviceData))
+        self.assertIsNone(self.router.allow_migrate("telemetry", "devices", "devicedata"))
+
+    @with_telemetry_db
+    def test_router_routes_device_data_to_telemetry(self):
+        self.assertEqual(self.router.db_for_read(DeviceData), "telemetry")
+        self.assertEqual(self.router.db_for_write(DeviceData), "telemetry")
+
+    @with_telemetry_db
+    def test_router_keeps_metadata_in_default(self):
+        for model in (Member, DeviceGroup, Device):
+            self.assertEqual(self.router.db_for_read(model), "default")
+            self.assertEqual(self.router.db_for_write(model), "default")
+
+    @with_telemetry_db
+    def test_router_allows_device_data_relations(self):
+        device = Device(id=1)
+        self.assertTrue(self.router.allow_relation(DeviceData(), device))
+        self.assertTrue(self.router.allow_relation(device, DeviceData()))
+        self.assertIsNone(self.router.allow_relation(device, DeviceGroup(id=1)))
+
+    @with_telemetry_db
+    def test_router_migrates_models_to_their_database(self):
+        self.assertTrue(self.router.allow_migrate("telemetry", "devices", "devicedata"))
+        self.assertFalse(self.router.allow_migrate("default", "devices", "devicedata"))
+        self.assertTrue(self.router.allow_migrate("default", "devices", "device"))
+        self.assertFalse(self.router.allow_migrate("telemetry", "devices", "device"))
+        self.assertFalse(self.router.allow_migrate("telemetry", "devices"))
+
+
+class TestDeviceDataSchema(TestCase):
+    def test_device_data_foreign_keys_have_no_constraints(self):
+        connection = connections[router.db_for_write(DeviceData)]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, DeviceData._meta.db_table)
+
+        self.assertEqual(
+            [name for name, constraint in constraints.items() if constraint["foreign_key"]], []
+        )
+
+
+class TestDeviceDataMigrations(SimpleTestCase):
+    def get_database_operations(self, operations: List[migrations.operations.base.Operation]):
+        for operation in operations:
+            if isinstance(operation, migrations.SeparateDatabaseAndState):
+                yield from self.get_database_operations(operation.database_operations)
+            else:
+                yield operation
+
+    def test_device_data_foreign_keys_are_created_without_constraints(self):
+        # device data may be migrated in a database without the related tables
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        fields = []
+        for key, migration in sorted(loader.disk_migrations.items()):
+            if key[0] != "devices":
+                continue
+            for operation in self.get_database_operations(migration.operations):
+                if isinstance(operation, migrations.CreateModel) and operation.name_lower == "devicedata":
+                    fields.extend((key[1], field) for _, field in operation.fields)
+                elif (
+                    isinstance(operation, (migrations.AddField, migrations.AlterField))
+                    and operation.model_name_lower == "devicedata"
+                ):
+                    fields.append((key[1], operation.field))
+
+        foreign_keys = [(name, field) for name, field in fields if isinstance(field, models.ForeignKey)]
+        self.assertTrue(foreign_keys)
+        for name, field in foreign_keys:
+            with self.subTest(migration=name, field=field.remote_field.model):
+                self.assertFalse(field.db_constraint)
+
+
+@skipUnless(
+    "telemetry" in connections and connections["telemetry"].vendor == "postgresql",
+    "a PostgreSQL telemetry database (TELEMETRY_DATABASE_URL)",
+)
+class TestPostgresTelemetryDatabase(TestCase):
+    databases = "__all__"
+
+    def test_telemetry_database_has_device_data_only(self):
+        # the test telemetry database was migrated
+        connection = connections["telemetry"]
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+            constraints = connection.introspection.get_constraints(cursor, DeviceData._meta.db_table)
+
+        self.assertIn(DeviceData._meta.db_table, tables)
+        self.assertNotIn(Device._meta.db_table, tables)
+        self.assertNotIn(Member._meta.db_table, tables)
+        self.assertEqual(
+            [name for name, constraint in constraints.items() if constraint["foreign_key"]], []
+        )
+
+
+class TestDeviceDataDeletion(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="test_group")
+        self.devices = [
+            self.group.device_set.create(
+                name=name, uid=Device.generate_device_uid(name)
+            )
+            for name in ("first_device", "second_device")
+        ]
+        for device in self.devices:
+            DeviceData.objects.bulk_create(
+                DeviceData(device=device, message={"index": index}) for index in range(3)
+            )
+
+    def test_device_data_is_deleted_with_device(self):
+        self.devices[0].delete()
+        purge_pending_device_data(pause=0)
+
+        self.assertFalse(DeviceData.objects.filter(device_id=self.devices[0].id).exists())
+        self.assertEqual(DeviceData.objects.filter(device=self.devices[1]).count(), 3)
+
+    def test_device_data_is_deleted_with_group(self):
+        self.group.delete()
+        purge_pending_device_data(pause=0)
+
+        self.assertFalse(DeviceData.objects.exists())
+
+    def test_device_data_is_deleted_with_member(self):
+        self.member.delete()
+        purge_pending_device_data(pause=0)
+
+        self.assertFalse(DeviceData.objects.exists())
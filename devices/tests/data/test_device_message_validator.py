@@ -0,0 +1,128 @@
+import json
+from typing import *
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+
+from devices.fields import SerializedJSON
+from devices.models import Device, DeviceData
+from devices.validators import DeviceMessageValidator
+from test.utils.helpers import create_member
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+
+class TestDeviceMessageValidator(TestCase):
+    def setUp(self) -> None:
+        self.validator = DeviceMessageValidator(max_bytes=64, max_depth=3, max_keys=4)
+
+    def assertInvalid(self, value: Any, code: str) -> None:
+        with self.assertRaises(ValidationError) as context:
+            self.validator(value)
+        self.assertEqual(context.exception.code, code)
+
+    def test_message_validator_accepts_dict(self):
+        message = self.validator({"foo": "bar"})
+
+        self.assertIsInstance(message, SerializedJSON)
+        self.assertEqual(message.value, {"foo": "bar"})
+        self.assertEqual(json.loads(message.serialized), {"foo": "bar"})
+
+    def test_message_validator_accepts_list(self):
+        message = self.validator([1, 2.5, None, True, "foo"])
+
+        self.assertEqual(message.value, [1, 2.5, None, True, "foo"])
+
+    def test_message_validator_json_string_is_not_encoded_again(self):
+        serialized = '{"foo":  "bar"}'
+        message = self.validator(serialized)
+
+        self.assertEqual(message.value, {"foo": "bar"})
+        self.assertIs(message.serialized, serialized)
+
+    def test_message_validator_invalid_types(self):
+        self.assertInvalid(None, "invalid_json")
+        self.assertInvalid(1, "invalid_json")
+        self.assertInvalid({"foo": b"bar"}, "invalid_json")
+        self.assertInvalid({"foo": {1, 2}}, "invalid_json")
+
+    def test_message_validator_non_finite_floats_are_not_serialized(self):
+        self.assertInvalid({"foo": float("nan")}, "invalid_json")
+        self.assertInvalid({"foo": [1.0, float("inf")]}, "invalid_json")
+        self.assertInvalid([None, {"foo": [-float("inf")]}], "invalid_json")
+
+        self.assertEqual(self.validator({"foo": None, "bar": [1.5]}).value, {"foo": None, "bar": [1.5]})
+
+    def test_message_validator_invalid_json_strings(self):
+        self.assertInvalid("", "invalid_json")
+        self.assertInvalid('{"foo": "bar"', "invalid_json")
+        self.assertInvalid('{"foo": NaN}', "invalid_json")
+        self.assertInvalid('"\ud800"', "invalid_json")
+
+    def test_message_validator_max_bytes(self):
+        self.validator({"foo": "x" * 50})
+        self.assertInvalid({"foo": "x" * 60}, "max_bytes")
+        self.assertInvalid(json.dumps({"foo": "x" * 60}), "max_bytes")
+
+    def test_message_validator_max_bytes_counts_utf8_bytes(self):
+        self.assertInvalid('{"foo": "' + "é" * 30 + '"}', "max_bytes")
+
+    def test_message_validator_max_depth(self):
+        self.validator({"a": {"b": [1]}})
+        self.assertInvalid({"a": {"b": [[1]]}}, "max_depth")
+        self.assertInvalid('[[[["deep"]]]]', "max_depth")
+
+    def test_message_validator_max_keys(self):
+        self.validator({"a": 1, "b": {"c": 1, "d": 2}})
+        self.assertInvalid({"a": 1, "b": {"c": 1, "d": 2, "e": 3}}, "max_keys")
+
+    @override_settings(
+        DEVICE_MESSAGE_MAX_BYTES=8,
+        DEVICE_MESSAGE_MAX_DEPTH=1,
+        DEVICE_MESSAGE_MAX_KEYS=1,
+    )
+    def test_message_validator_limits_from_settings(self):
+        validator = DeviceMessageValidator()
+
+        self.assertEqual(validator.max_bytes, 8)
+        self.assertEqual(validator.max_depth, 1)
+        self.assertEqual(validator.max_keys, 1)
+
+
+class TestSerializedJSONField(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.device_group = self.member.devicegroup_set.create(name="test_group")
+        self.device = self.device_group.device_set.create(
+            name="test_device", uid=Device.generate_device_uid("test_device")
+        )
+
+    def test_serialized_message_is_stored_as_is(self):
+        message = SerializedJSON({"foo": "bar"}, '{"foo": "stored"}')
+        device_data = DeviceData.objects.create(device=self.device, message=message)
+
+        self.assertEqual(device_data.message, {"foo": "bar"})
+        device_data.refresh_from_db()
+        self.assertEqual(device_data.message, {"foo": "stored"})
+
+    def test_serialized_message_update(self):
+        device_data = DeviceData.objects.create(
+            device=self.device, message={"foo": "bar"}
+        )
+        device_data.message = SerializedJSON({"foo": "baz"}, '{"foo": "baz"}')
+        device_data.save()
+
+        self.assertEqual(device_data.message, {"foo": "baz"})
+        device_data.refresh_from_db()
+        self.assertEqual(device_data.message, {"foo": "baz"})
+
+    def test_plain_message_is_encoded(self):
+        device_data = DeviceData.objects.create(
+            device=self.device, message={"foo": "bar"}
+        )
+        device_data.refresh_from_db()
+
+        self.assertEqual(device_data.message, {"foo": "bar"})
@@ -0,0 +1,146 @@
+from datetime import timedelta
+from test.utils.helpers import client_login, create_member
+from typing import *
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from devices.heartbeats import HeartbeatTracker, flush_heartbeats, sweep_offline_devices
+from devices.models import Device, DeviceData, DeviceHeartbeat
+from jobs.runner import run_pending_jobs
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+
+@override_settings(DEVICE_HEARTBEAT_INTERVAL=300, DEVICE_HEARTBEAT_FLUSH_INTERVAL=0)
+class TestDeviceHeartbeat(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="test_group")
+        self.devices = [
+            self.group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+            for name in ("first_device", "second_device", "third_device")
+        ]
+        return super().setUp()
+
+    def test_reports_set_devices_online(self):
+        device = self.devices[0]
+        self.assertIsNone(device.get_heartbeat())
+        self.assertFalse(device.is_online)
+
+        before = timezone.now()
+        DeviceData.objects.create(device=device, message={"value": 1})
+
+        heartbeat = DeviceHeartbeat.objects.get(device=device)
+        self.assertTrue(heartbeat.online)
+        self.assertGreaterEqual(heartbeat.last_seen, before)
+        self.assertEqual(heartbeat.offline_after, heartbeat.last_seen + timedelta(seconds=300))
+        device = Device.objects.select_related("heartbeat").get(pk=device.pk)
+        self.assertTrue(device.is_online)
+        self.assertEqual(device.last_seen, heartbeat.last_seen)
+
+    def test_devices_expected_interval(self):
+        device = self.devices[0]
+        device.heartbeat_interval = 60
+        device.save()
+
+        DeviceData.objects.create(device=device, message={"value": 1})
+
+        heartbeat = DeviceHeartbeat.objects.get(device=device)
+        self.assertEqual(heartbeat.offline_after, heartbeat.last_seen + timedelta(seconds=60))
+
+    def test_bulk_reports_are_flushed_in_one_upsert(self):
+        with CaptureQueriesContext(connection) as queries:
+            DeviceData.objects.bulk_create(
+                DeviceData(device=device, message={"value": index})
+                for index, device in enumerate(self.devices * 10)
+            )
+
+        self.assertEqual(DeviceHeartbeat.objects.filter(online=True).count(), 3)
+        heartbeat_queries = [query for query in queries if "devices_deviceheartbeat" in query["sql"]]
+        # devices' intervals and status, and the upsert
+        self.assertEqual(len(heartbeat_queries), 2)
+
+    def test_tracker_keeps_reports_in_memory_until_flushed(self):
+        tracker = HeartbeatTracker(flush_interval=10)
+
+        with mock.patch.object(HeartbeatTracker, "_run_flusher") as flusher:
+            with CaptureQueriesContext(connection) as queries:
+                tracker.record([device.pk for device in self.devices])
+                tracker.record([self.devices[0].pk])
+
+        self.assertEqual(len(queries), 0)
+        flusher.assert_called_once_with()
+        self.assertEqual(tracker.pending(), 3)
+        self.assertEqual(tracker.flush(), 3)
+        self.assertEqual(tracker.pending(), 0)
+        self.assertEqual(DeviceHeartbeat.objects.count(), 3)
+
+    def test_deleted_devices_are_not_flushed(self):
+        device_id = self.devices[0].pk
+        self.devices[0].delete()
+
+        self.assertEqual(flush_heartbeats({device_id: timezone.now(), self.devices[1].pk: timezone.now()}), 1)
+        self.assertEqual(list(DeviceHeartbeat.objects.values_list("device_id", flat=True)), [self.devices[1].pk])
+
+    def test_silent_devices_go_offline(self):
+        now = timezone.now()
+        flush_heartbeats({self.devices[0].pk: now - timedelta(seconds=301), self.devices[1].pk: now})
+
+        self.assertEqual(sweep_offline_devices(now), 1)
+
+        offline = DeviceHeartbeat.objects.get(device=self.devices[0])
+        self.assertFalse(offline.online)
+        self.assertEqual(offline.status_changed, now)
+        self.assertTrue(DeviceHeartbeat.objects.get(device=self.devices[1]).online)
+        self.assertEqual(sweep_offline_devices(now), 0)
+
+        # online again, when it reports
+        DeviceData.objects.create(device=self.devices[0], message={"value": 1})
+        online = DeviceHeartbeat.objects.get(device=self.devices[0])
+        self.assertTrue(online.online)
+        self.assertGreater(online.status_changed, now)
+
+    def test_sweeper_is_a_periodic_job(self):
+        flush_heartbeats({self.devices[0].pk: timezone.now() - timedelta(hours=1)})
+
+        run_pending_jobs()
+
+        self.assertFalse(DeviceHeartbeat.objects.get(device=self.devices[0]).online)
+
+    def test_pages_show_status_without_data_queries(self):
+        DeviceData.objects.bulk_create(DeviceData(device=self.devices[0], message={"value": index}) for index in range(50))
+        client_login(self.client, MEMBER)
+
+        for url in (
+            reverse("devices:device_list"),
+            reverse("devices:group_details", kwargs=dict(group_name=self.group.name)),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+
+            content = response.content.decode()
+            self.assertEqual(content.count("<small>online</small>"), 1)
+            self.assertEqual(content.count("<small>offline</small>"), 2)
+            self.assertFalse([query for query in queries if "devices_devicedata" in query["sql"]])
+
+    def test_api_shows_status(self):
+        DeviceData.objects.create(device=self.devices[0], message={"value": 1})
+        self.client.force_login(self.member)
+        url = reverse(
+            "api:v1:devices_list", kwargs=dict(username=self.member.username, group_name=self.group.name)
+        )
+
+        response = self.client.get(url)
+
+        statuses = {device["name"]: (device["is_online"], device["last_seen"]) for device in response.json()}
+        self.assertTrue(statuses["first_device"][0])
+        self.assertIsNotNone(statuses["first_device"][1])
+        self.assertEqual(statuses["second_device"], (False, None))
@@ -0,0 +1,90 @@
+import html
+import re
+from test.utils.helpers import client_login, create_member
+from typing import *
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from devices.models import Device, DeviceData
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="first_member",
+    password="test_password",
+)
+
+JINJA2_VIEWS: Final[List[str]] = [
+    "DeviceListView",
+    "DeviceDataListView",
+    "DeviceDataHistoryView",
+]
+
+
+def page_body(content: bytes) -> str:
+    """Page body, unescaped, with normalized white space"""
+    body = re.search(r"<body>(.*)</body>", content.decode(), re.DOTALL).group(1)
+    return " ".join(html.unescape(body).split())
+
+
+class TestJinja2Pages(TestCase):
+    def setUp(self) -> None:
+        member = create_member(**MEMBER)
+        group = member.devicegroup_set.create(name="first_device_group")
+        self.device = group.device_set.create(
+            name="first_device",
+            uid=Device.generate_device_uid(f"{member.username}-{group.name}-first_device"),
+        )
+        now = timezone.now()
+        DeviceData.objects.bulk_create(
+            DeviceData(
+                device=self.device,
+                date=now - timezone.timedelta(minutes=index),
+                message={"temperature": 20 + index, "valves": [True, False], "note": "<b>"},
+            )
+            for index in range(15)
+        )
+        client_login(self.client, MEMBER)
+        self.urls = {
+            "devices/device/list.html": reverse("devices:device_list"),
+            "devices/data/list.html": reverse("devices:data_list"),
+            "devices/device/data_history.html": reverse(
+                "devices:device_data_list", kwargs=dict(device_uid=self.device.uid)
+            ),
+        }
+        return super().setUp()
+
+    def test_jinja2_pages_are_rendered_with_jinja2_templates(self):
+        for template_name, url in self.urls.items():
+            with self.subTest(url=url), override_settings(JINJA2_VIEWS=JINJA2_VIEWS):
+                response = self.client.get(url)
+
+                self.assertEqual(response.status_code, 200)
+                # test client records django templates only
+                self.assertNotIn(template_name, [t.name for t in response.templates])
+
+    def test_jinja2_pages_match_django_pages(self):
+        for url in self.urls.values():
+            for page in (1, 2):
+                with self.subTest(url=url, page=page):
+                    django_response = self.client.get(url, dict(page=page))
+                    with override_settings(JINJA2_VIEWS=JINJA2_VIEWS):
+                        jinja2_response = self.client.get(url, dict(page=page))
+
+                    self.assertEqual(
+                        page_body(jinja2_response.content),
+                        page_body(django_response.content),
+                    )
+
+    def test_jinja2_page_escapes_message(self):
+        with override_settings(JINJA2_VIEWS=JINJA2_VIEWS):
+            response = self.client.get(self.urls["devices/data/list.html"])
+
+        self.assertNotContains(response, "<b>")
+        self.assertContains(response, "&lt;b&gt;")
+
+    def test_views_not_selected_are_rendered_with_django_templates(self):
+        with override_settings(JINJA2_VIEWS=["DeviceListView"]):
+            response = self.client.get(self.urls["devices/data/list.html"])
+
+        self.assertTemplateUsed(response, "devices/data/list.html")
@@ -0,0 +1,61 @@
+from typing import *
+
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from devices.models import Device, DeviceGroup
+from test.utils.helpers import create_member
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+
+class TestDeviceLookupKeys(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.device_group = self.member.devicegroup_set.create(name="Test_Group")
+        self.device = self.device_group.device_set.create(
+            name="Test_Device", uid=Device.generate_device_uid("test_device")
+        )
+
+    def test_names_are_stored_in_lowercase(self):
+        self.assertEqual(self.device_group.name, "test_group")
+        self.assertEqual(self.device.name, "test_device")
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.name, "test_device")
+
+    def test_name_lookups_are_case_insensitive(self):
+        self.assertEqual(
+            DeviceGroup.objects.get(owner=self.member, name="TEST_GROUP"),
+            self.device_group,
+        )
+        self.assertEqual(
+            Device.objects.get(group__name="Test_Group", name="TEST_device"),
+            self.device,
+        )
+
+    def test_device_group_name_is_unique_per_owner(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.member.devicegroup_set.create(name="TEST_GROUP")
+
+        other_member = create_member(username="other_member", password="password")
+        other_member.devicegroup_set.create(name="test_group")
+
+    def test_device_name_is_unique_per_group(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.device_group.device_set.create(
+                name="test_device", uid=Device.generate_device_uid("other_device")
+            )
+
+        other_group = self.member.devicegroup_set.create(name="other_group")
+        other_group.device_set.create(
+            name="test_device", uid=Device.generate_device_uid("other_device")
+        )
+
+    def test_device_uid_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.device_group.device_set.create(
+                name="other_device", uid=self.device.uid
+            )
@@ -0,0 +1,165 @@
+from datetime import timedelta
+from test.utils.helpers import create_member
+from typing import *
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from devices.models import Device, DeviceCommand, DeviceData, DeviceRule
+from devices.rules import FIRE_RULE_TASK, RuleIndex, fire_rule, get_rule_index
+from jobs.models import Job
+from jobs.runner import run_pending_jobs
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+
+class TestDeviceRules(TestCase):
+    def setUp(self) -> None:
+        get_rule_index().clear()
+        self.addCleanup(get_rule_index().clear)
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="test_group")
+        self.sensor, self.valve = [
+            self.group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+            for name in ("sensor", "valve")
+        ]
+        self.rule = DeviceRule.objects.create(
+            name="irrigate",
+            device=self.sensor,
+            key="moisture",
+            operator=DeviceRule.Operator.LT,
+            threshold=25,
+            hysteresis=5,
+            target=self.valve,
+            command="open_valve",
+            payload={"valve": 1},
+            clear_command="close_valve",
+        )
+        return super().setUp()
+
+    def report(self, **message: Any) -> None:
+        DeviceData.objects.create(device=self.sensor, message=message)
+
+    def fired_jobs(self) -> List[List[Any]]:
+        return [job.args[:2] for job in Job.objects.filter(task=FIRE_RULE_TASK).order_by("pk")]
+
+    def test_rule_triggers_and_runs_its_command_in_background(self):
+        self.report(moisture=20)
+
+        self.assertEqual(self.fired_jobs(), [[self.rule.pk, True]])
+        self.assertFalse(DeviceCommand.objects.exists())
+
+        run_pending_jobs()
+
+        command = DeviceCommand.objects.get()
+        self.assertEqual((command.device, command.name, command.payload), (self.valve, "open_valve", {"valve": 1}))
+        self.rule.refresh_from_db()
+        self.assertTrue(self.rule.triggered)
+
+    def test_hysteresis(self):
+        for moisture in (20, 18, 26, 29, 24, 31, 28, 26):
+            self.report(moisture=moisture)
+
+        # triggered below 25, cleared at 30 and above only
+        self.assertEqual(self.fired_jobs(), [[self.rule.pk, True], [self.rule.pk, False]])
+        run_pending_jobs()
+        self.assertEqual(
+            list(DeviceCommand.objects.order_by("pk").values_list("name", flat=True)),
+            ["open_valve", "close_valve"],
+        )
+
+    def test_debounce(self):
+        self.rule.debounce = 60
+        self.rule.save()
+        index = RuleIndex(refresh_interval=60)
+
+        self.assertEqual(index.evaluate([(self.sensor.pk, {"moisture": 20})], now=0.0), [])
+        self.assertEqual(index.evaluate([(self.sensor.pk, {"moisture": 20})], now=30.0), [])
+        # the condition failed, debounce starts again
+        self.assertEqual(index.evaluate([(self.sensor.pk, {"moisture": 26})], now=40.0), [])
+        self.assertEqual(index.evaluate([(self.sensor.pk, {"moisture": 20})], now=50.0), [])
+        self.assertEqual(index.evaluate([(self.sensor.pk, {"moisture": 20})], now=100.0), [])
+        self.assertEqual(
+            index.evaluate([(self.sensor.pk, {"moisture": 20})], now=110.0), [(self.rule.pk, True)]
+        )
+
+    def test_only_the_rules_of_received_keys_are_evaluated(self):
+        self.report(temperature=20, moisture="dry")
+        DeviceData.objects.create(device=self.valve, message={"moisture": 20})
+
+        self.assertEqual(self.fired_jobs(), [])
+
+    def test_loaded_index_evaluates_without_queries(self):
+        self.report(moisture=50)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.report(moisture=60)
+
+        self.assertFalse([query for query in queries if "devices_devicerule" in query["sql"]])
+
+    def test_bulk_created_data_is_evaluated(self):
+        DeviceData.objects.bulk_create(
+            DeviceData(device=self.sensor, message={"moisture": moisture}) for moisture in (40, 20, 19)
+        )
+
+        self.assertEqual(self.fired_jobs(), [[self.rule.pk, True]])
+
+    def test_saved_rules_are_evaluated_at_once(self):
+        self.report(moisture=50)
+        drain = DeviceRule.objects.create(
+            name="drain",
+            device=self.sensor,
+            key="moisture",
+            operator=DeviceRule.Operator.GT,
+            threshold=45,
+            command="open_drain",
+        )
+        self.rule.is_active = False
+        self.rule.save()
+
+        self.report(moisture=50)
+        self.report(moisture=20)
+
+        # the drain rule triggered and cleared, the inactive rule never triggered
+        self.assertEqual(self.fired_jobs(), [[drain.pk, True], [drain.pk, False]])
+        self.assertEqual(len(get_rule_index()), 1)
+
+    def test_other_processes_changes_are_reloaded(self):
+        index = RuleIndex(refresh_interval=0)
+        index.evaluate([(self.sensor.pk, {"moisture": 50})], now=0.0)
+
+        # triggered by another process
+        DeviceRule.objects.filter(pk=self.rule.pk).update(triggered=True, state_changed=timezone.now())
+
+        self.assertEqual(
+            index.evaluate([(self.sensor.pk, {"moisture": 40})], now=1.0), [(self.rule.pk, False)]
+        )
+
+    def test_fire_rule_runs_each_transition_once(self):
+        now = timezone.now()
+
+        self.assertTrue(fire_rule(self.rule.pk, True, now))
+        # the same transition, observed by another worker
+        self.assertFalse(fire_rule(self.rule.pk, True, now + timedelta(seconds=1)))
+        # a late clear, observed before the transition
+        self.assertFalse(fire_rule(self.rule.pk, False, now - timedelta(seconds=1)))
+
+        self.rule.refresh_from_db()
+        self.assertTrue(self.rule.triggered)
+        self.assertEqual(list(DeviceCommand.objects.values_list("name", flat=True)), ["open_valve"])
+
+    def test_target_must_belong_to_the_same_member(self):
+        other_member = create_member(username="other_member", password="test_password")
+        other_device = other_member.devicegroup_set.create(name="other_group").device_set.create(
+            name="other_device", uid=Device.generate_device_uid("other_device")
+        )
+        self.rule.target = other_device
+
+        with self.assertRaises(ValidationError):
+            self.rule.full_clean()
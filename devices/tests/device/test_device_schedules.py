@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from test.utils.helpers import create_member
+from typing import *
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from devices.cron import CronExpression
+from devices.models import Device, DeviceCommand, DeviceSchedule
+from devices.schedules import Scheduler
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="test_member",
+    password="test_password",
+)
+
+
+def utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class TestCronExpression(TestCase):
+    def test_next_run_times(self):
+        # monday 2026-10-19, 11:20
+        now = utc(2026, 10, 19, 11, 20)
+        for expression, next_run in (
+            ("0 6 * * 1,3,5", utc(2026, 10, 21, 6)),
+            ("*/15 * * * *", utc(2026, 10, 19, 11, 30)),
+            ("20 11 * * *", utc(2026, 10, 20, 11, 20)),
+            ("30 5 1 * *", utc(2026, 11, 1, 5, 30)),
+            ("0 6 * * 0", utc(2026, 10, 25, 6)),
+            ("0 6 * * 7", utc(2026, 10, 25, 6)),
+            ("0 0 29 2 *", utc(2028, 2, 29)),
+            ("0 0 31 2 3", utc(2027, 2, 3)),
+        ):
+            with self.subTest(expression=expression):
+                self.assertEqual(CronExpression(expression).next_after(now), next_run)
+
+    def test_days_of_month_or_days_of_week(self):
+        # mondays, and the 1st of each month
+        expression = CronExpression("0 8 1 * 1")
+        run_times = [utc(2026, 10, 19, 11, 20)]
+        for _ in range(4):
+            run_times.append(expression.next_after(run_times[-1]))
+
+        self.assertEqual(
+            run_times[1:],
+            [utc(2026, 10, 26, 8), utc(2026, 11, 1, 8), utc(2026, 11, 2, 8), utc(2026, 11, 9, 8)],
+        )
+
+    def test_invalid_expressions(self):
+        for expression in ("* * * *", "60 * * * *", "a * * * *", "5-1 * * * *", "*/0 * * * *", "0 0 31 2 *"):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                CronExpression(expression)
+
+
+class TestDeviceSchedules(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="test_group")
+        self.valves = [
+            self.group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+            for name in ("valve_1", "valve_2", "valve_3")
+        ]
+        self.valves[2].is_active = False
+        self.valves[2].save()
+        self.schedule = DeviceSchedule.objects.create(
+            name="morning",
+            group=self.group,
+            cron="0 6 * * *",
+            command="open_valve",
+            payload={"minutes": 20},
+            command_ttl=600,
+        )
+        self.run_at = self.schedule.next_run_at
+        return super().setUp()
+
+    def test_next_run_time_is_computed_when_saved(self):
+        self.assertEqual(self.run_at, CronExpression("0 6 * * *").next_after(timezone.now()))
+
+        self.schedule.is_active = False
+        self.schedule.save()
+
+        self.assertIsNone(self.schedule.next_run_at)
+
+    def test_schedule_runs_for_the_group_active_devices(self):
+        scheduler = Scheduler(refresh_interval=60, misfire_grace=60)
+
+        runs, _ = scheduler.run_once(now=self.run_at - timedelta(seconds=1))
+        self.assertEqual(runs, 0)
+        self.assertFalse(DeviceCommand.objects.exists())
+
+        runs, _ = scheduler.run_once(now=self.run_at + timedelta(seconds=1))
+
+        self.assertEqual(runs, 1)
+        commands = DeviceCommand.objects.order_by("device_id")
+        self.assertEqual([command.device for command in commands], self.valves[:2])
+        self.assertEqual(
+            {(command.name, command.expires) for command in commands},
+            {("open_valve", self.run_at + timedelta(seconds=600))},
+        )
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.last_run_at, self.run_at)
+        self.assertEqual(self.schedule.next_run_at, self.run_at + timedelta(days=1))
+
+    def test_scheduler_sleeps_until_the_next_run_time(self):
+        soon = timezone.now() + timedelta(seconds=5)
+        DeviceSchedule.objects.filter(pk=self.schedule.pk).update(next_run_at=soon)
+        scheduler = Scheduler(refresh_interval=60)
+
+        _, timeout = scheduler.run_once()
+
+        self.assertAlmostEqual(timeout, 5, delta=1)
+
+    def test_run_costs_constant_queries(self):
+        scheduler = Scheduler(refresh_interval=60)
+        scheduler.load()
+        for index in range(20):
+            name = f"valve_{index + 4}"
+            self.group.device_set.create(name=name, uid=Device.generate_device_uid(name))
+
+        with CaptureQueriesContext(connection) as queries:
+            scheduler.run_once(now=self.run_at)
+
+        self.assertEqual(DeviceCommand.objects.count(), 22)
+        # schedule, run update, group command, group devices, commands insert (and savepoints)
+        self.assertLessEqual(len([query for query in queries if "SAVEPOINT" not in query["sql"]]), 5)
+
+    def test_restarted_scheduler_resumes_and_runs_once(self):
+        scheduler = Scheduler(refresh_interval=60, misfire_grace=60)
+        scheduler.load()
+        scheduler.run_once(now=self.run_at)
+
+        # a new scheduler loads the persisted next run time
+        restarted = Scheduler(refresh_interval=60, misfire_grace=60)
+        self.assertEqual(restarted.run_once(now=self.run_at)[0], 0)
+        # a scheduler that missed the run doesn't run it again
+        self.assertEqual(
+            scheduler.fire(self.schedule.pk, self.run_at, self.run_at),
+            (False, self.run_at + timedelta(days=1)),
+        )
+        self.assertEqual(restarted.run_once(now=self.run_at + timedelta(days=1))[0], 1)
+
+        self.assertEqual(DeviceCommand.objects.count(), 4)
+
+    def test_missed_runs_are_skipped(self):
+        scheduler = Scheduler(refresh_interval=60, misfire_grace=60)
+
+        runs, _ = scheduler.run_once(now=self.run_at + timedelta(days=2, hours=1))
+
+        self.assertEqual(runs, 0)
+        self.assertFalse(DeviceCommand.objects.exists())
+        self.schedule.refresh_from_db()
+        self.assertIsNone(self.schedule.last_run_at)
+        self.assertEqual(self.schedule.next_run_at, self.run_at + timedelta(days=3))
+
+    def test_changed_schedules_are_reloaded(self):
+        scheduler = Scheduler(refresh_interval=0)
+        scheduler.load()
+        later = DeviceSchedule.objects.create(
+            name="later", device=self.valves[0], cron="30 6 * * *", command="open_valve"
+        )
+        self.schedule.cron = "30 6 * * *"
+        self.schedule.save()
+
+        # the previous run time of the changed schedule is dropped
+        self.assertEqual(scheduler.run_once(now=self.run_at)[0], 0)
+        self.assertEqual(len(scheduler), 2)
+
+        runs, _ = scheduler.run_once(now=later.next_run_at)
+
+        self.assertEqual(runs, 2)
+        self.assertEqual(
+            sorted(DeviceCommand.objects.values_list("device_id", flat=True)),
+            sorted([self.valves[0].pk, self.valves[0].pk, self.valves[1].pk]),
+        )
+        later.delete()
+        self.schedule.is_active = False
+        self.schedule.save()
+        scheduler.run_once(now=later.next_run_at + timedelta(days=1))
+        self.assertEqual(len(scheduler), 0)
+
+    def test_schedule_has_a_group_or_a_device(self):
+        self.schedule.device = self.valves[0]
+        with self.assertRaises(ValidationError):
+            self.schedule.full_clean()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.schedule.save()
+
+    def test_invalid_cron_expression(self):
+        self.schedule.cron = "0 6 31 2 *"
+
+        with self.assertRaises(ValidationError):
+            self.schedule.full_clean()
+
+    def test_run_scheduler_command(self):
+        DeviceSchedule.objects.filter(pk=self.schedule.pk).update(next_run_at=timezone.now())
+        stdout = StringIO()
+
+        call_command("run_scheduler", "--once", stdout=stdout)
+
+        self.assertIn("(1 runs)", stdout.getvalue())
+        self.assertEqual(DeviceCommand.objects.count(), 2)
@@ -0,0 +1,159 @@
+from io import StringIO
+from test.utils.helpers import client_login, create_member
+from typing import *
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from devices.models import Device, DeviceGroup
+from devices.search import SearchResults, has_search_tables, search
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="first_member",
+    password="test_password",
+)
+
+OTHER_MEMBER: Final[Dict[str, str]] = dict(
+    username="second_member",
+    password="test_password",
+)
+
+DEVICE_NAMES: Final[List[str]] = [
+    "greenhouse_pump",
+    "pump",
+    "pump_north",
+    "pump_south",
+    "valve",
+]
+
+
+def result_names(results: Iterable[Device | DeviceGroup]) -> List[str]:
+    return [result.name for result in results]
+
+
+class TestDeviceSearchIndex(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="pumps_group")
+        for name in DEVICE_NAMES:
+            self.create_device(self.group, name)
+
+        self.other_member = create_member(**OTHER_MEMBER)
+        self.other_group = self.other_member.devicegroup_set.create(name="other_pumps")
+        self.create_device(self.other_group, "other_pump")
+        return super().setUp()
+
+    def create_device(self, group: DeviceGroup, name: str) -> Device:
+        return group.device_set.create(
+            name=name,
+            uid=Device.generate_device_uid(f"{group.owner.username}-{group.name}-{name}"),
+        )
+
+    def test_search_tables_exist(self):
+        self.assertTrue(has_search_tables(DEFAULT_DB_ALIAS))
+        self.assertIsInstance(search(Device, self.member, "pump"), SearchResults)
+
+    def test_results_are_ranked_exact_prefix_substring(self):
+        results = search(Device, self.member, "pump")
+
+        self.assertEqual(
+            result_names(results),
+            ["pump", "pump_north", "pump_south", "greenhouse_pump"],
+        )
+
+    def test_query_is_case_insensitive(self):
+        self.assertEqual(
+            result_names(search(Device, self.member, " PUMP_N ")),
+            ["pump_north"],
+        )
+
+    def test_other_members_objects_are_not_found(self):
+        self.assertNotIn("other_pump", result_names(search(Device, self.member, "pump")))
+        self.assertEqual(
+            result_names(search(DeviceGroup, self.member, "pump")),
+            ["pumps_group"],
+        )
+
+    def test_short_queries_are_ranked_by_orm(self):
+        results = search(Device, self.member, "pu")
+
+        self.assertNotIsInstance(results, SearchResults)
+        self.assertEqual(
+            result_names(results),
+            ["pump", "pump_north", "pump_south", "greenhouse_pump"],
+        )
+
+    def test_query_quotes_are_searched_as_text(self):
+        self.assertEqual(result_names(search(Device, self.member, 'pump" OR "valve')), [])
+
+    def test_renamed_device_is_reindexed(self):
+        device = Device.objects.get(name="valve")
+        device.name = "pump_east"
+        device.save()
+
+        self.assertIn("pump_east", result_names(search(Device, self.member, "pump")))
+        self.assertEqual(result_names(search(Device, self.member, "valve")), [])
+
+    def test_deleted_objects_are_unindexed(self):
+        Device.objects.get(name="pump").delete()
+        self.assertNotIn("pump", result_names(search(Device, self.member, "pump")))
+
+        self.group.delete()
+        self.assertEqual(result_names(search(Device, self.member, "pump")), [])
+        self.assertEqual(result_names(search(DeviceGroup, self.member, "pump")), [])
+
+    def test_group_owner_change_moves_devices_index(self):
+        self.group.owner = self.other_member
+        self.group.save()
+
+        self.assertEqual(result_names(search(Device, self.member, "pump")), [])
+        self.assertEqual(len(search(Device, self.other_member, "pump")), 5)
+
+    def test_rebuild_search_index(self):
+        # bulk updates skip signals
+        Device.objects.filter(name="valve").update(name="pump_west")
+        self.assertEqual(len(search(Device, self.member, "pump")), 4)
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual(len(search(Device, self.member, "pump")), 5)
+
+    def test_results_are_counted_once_and_sliced(self):
+        results = search(Device, self.member, "pump")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(results.count(), 4)
+            self.assertEqual(len(results), 4)
+            self.assertEqual(result_names(results[1:3]), ["pump_north", "pump_south"])
+
+        # count, page of ids, page of devices
+        self.assertEqual(len(queries), 3)
+
+
+class TestDeviceSearchResultsPagination(TestCase):
+    def setUp(self) -> None:
+        member = create_member(**MEMBER)
+        group = member.devicegroup_set.create(name="device_group")
+        for index in range(25):
+            group.device_set.create(
+                name=f"device_{index:02}",
+                uid=Device.generate_device_uid(f"{member.username}-{group.name}-{index}"),
+            )
+        client_login(self.client, MEMBER)
+        self.url = reverse("devices:search")
+        return super().setUp()
+
+    def test_results_are_counted_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, dict(search_for="device", name="device", page=2))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            result_names(response.context["search_results"]),
+            [f"device_{index:02}" for index in range(10, 20)],
+        )
+        counts = [query for query in queries if "COUNT(" in query["sql"].upper()]
+        self.assertEqual(len(counts), 1)
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from pathlib import Path
+from test.pages.common import DeviceList
+from test.utils.helpers import client_login, create_member
+from typing import *
+from unittest import mock
+
+from django.template import engines
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import TestCase, override_settings
+
+from common.warmup import get_template_engines, get_template_names, warm_up_templates
+from devices.models import Device
+from sia import settings_production
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="first_member",
+    password="test_password",
+)
+
+
+@override_settings(
+    INSTALLED_APPS=settings_production.INSTALLED_APPS,
+    MIDDLEWARE=settings_production.MIDDLEWARE,
+    TEMPLATES=settings_production.TEMPLATES,
+)
+class TestTemplatesWarmup(TestCase):
+    def setUp(self) -> None:
+        member = create_member(**MEMBER)
+        group = member.devicegroup_set.create(name="first_device_group")
+        group.device_set.create(
+            name="first_device",
+            uid=Device.generate_device_uid(f"{member.username}-{group.name}-first_device"),
+        )
+        client_login(self.client, MEMBER)
+        return super().setUp()
+
+    def test_warmup_compiles_all_templates(self):
+        names = get_template_names(engines["django"])
+        templates_count = sum(
+            len(get_template_names(engine, prefix))
+            for engine, prefix in get_template_engines()
+        )
+
+        self.assertIn("devices/device/list.html", names)
+        self.assertIn("base/base_page.html", names)
+        self.assertEqual(warm_up_templates(), templates_count)
+
+    def test_pages_render_compiled_templates_after_warmup(self):
+        warm_up_templates()
+
+        with mock.patch.object(
+            FilesystemLoader,
+            "get_contents",
+            autospec=True,
+            side_effect=FilesystemLoader.get_contents,
+        ) as get_contents:
+            response = self.client.get(DeviceList.get_url())
+
+        self.assertEqual(response.status_code, 200)
+        get_contents.assert_not_called()
+
+    def test_warmup_skips_invalid_templates(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        templates = [
+            dict(settings_production.TEMPLATES[0], DIRS=[directory]),
+        ]
+        with override_settings(TEMPLATES=templates):
+            templates_count = warm_up_templates()
+
+        Path(directory, "invalid.html").write_text("{% if %}")
+        with override_settings(TEMPLATES=templates):
+            self.assertEqual(warm_up_templates(), templates_count)
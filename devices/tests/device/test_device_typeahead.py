@@ -0,0 +1,235 @@
+import time
+from test.utils.helpers import client_login, create_member
+from typing import *
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from common.routers import replica_reads
+from devices.models import Device, DeviceGroup
+from devices.typeahead import (
+    TypeaheadEntry,
+    TypeaheadIndex,
+    TypeaheadIndexStore,
+    get_typeahead_store,
+)
+
+MEMBER: Final[Dict[str, str]] = dict(
+    username="first_member",
+    password="test_password",
+)
+
+OTHER_MEMBER: Final[Dict[str, str]] = dict(
+    username="second_member",
+    password="test_password",
+)
+
+# top-k lookups of a large index, in seconds
+LOOKUP_BUDGET: Final[float] = 0.001
+
+
+class TestTypeaheadIndex(TestCase):
+    def setUp(self) -> None:
+        self.index = TypeaheadIndex(
+            [
+                TypeaheadEntry("pump_south", "device", "uid_1"),
+                TypeaheadEntry("pump", "device", "uid_2"),
+                TypeaheadEntry("valve", "device", "uid_3"),
+                TypeaheadEntry("pumps", "group", "pumps"),
+                TypeaheadEntry("greenhouse_pump", "device", "uid_4"),
+            ],
+            group_ids=[1],
+        )
+        return super().setUp()
+
+    def test_top_names_starting_with_prefix(self):
+        self.assertEqual(
+            [entry.name for entry in self.index.top("pump", 10)],
+            ["pump", "pump_south", "pumps"],
+        )
+
+    def test_top_is_limited(self):
+        self.assertEqual([entry.name for entry in self.index.top("p", 2)], ["pump", "pump_south"])
+
+    def test_top_of_a_kind(self):
+        self.assertEqual(self.index.top("pump", 10, "group"), [TypeaheadEntry("pumps", "group", "pumps")])
+
+    def test_top_without_matches(self):
+        self.assertEqual(self.index.top("sprinkler", 10), [])
+        self.assertEqual(self.index.top("pumpz", 10), [])
+
+    def test_top_is_fast_on_large_indexes(self):
+        index = TypeaheadIndex(
+            (
+                TypeaheadEntry(f"device_{number:06}", "device", str(number))
+                for number in range(100_000)
+            ),
+            group_ids=[],
+        )
+        lookups = 1000
+        start = time.process_time()
+        for number in range(lookups):
+            index.top(f"device_{number % 1000:04}", 10)
+        self.assertLess((time.process_time() - start) / lookups, LOOKUP_BUDGET)
+
+
+class TestTypeaheadView(TestCase):
+    def setUp(self) -> None:
+        get_typeahead_store().clear()
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="pumps")
+        for name in ("pump", "pump_south", "valve"):
+            self.create_device(self.group, name)
+
+        self.other_member = create_member(**OTHER_MEMBER)
+        other_group = self.other_member.devicegroup_set.create(name="other_pumps")
+        self.create_device(other_group, "pump_north")
+
+        client_login(self.client, MEMBER)
+        self.url = reverse("devices:typeahead")
+        return super().setUp()
+
+    def create_device(self, group: DeviceGroup, name: str) -> Device:
+        return group.device_set.create(
+            name=name,
+            uid=Device.generate_device_uid(f"{group.owner.username}-{group.name}-{name}"),
+        )
+
+    def get_names(self, **params: Any) -> List[str]:
+        response = self.client.get(self.url, dict(name="pump", **params))
+        self.assertEqual(response.status_code, 200)
+        return [result["name"] for result in response.json()["results"]]
+
+    def test_results_of_member(self):
+        response = self.client.get(self.url, dict(name=" PUMP_S "))
+
+        device = Device.objects.get(name="pump_south")
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {
+                        "name": "pump_south",
+                        "kind": "device",
+                        "url": reverse("devices:device_details", kwargs=dict(device_uid=device.uid)),
+                    }
+                ]
+            },
+        )
+        self.assertEqual(self.get_names(), ["pump", "pump_south", "pumps"])
+
+    def test_results_of_a_kind_and_limit(self):
+        self.assertEqual(self.get_names(search_for="group"), ["pumps"])
+        self.assertEqual(self.get_names(limit=1), ["pump"])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, dict(name="p", search_for="x")).status_code, 400)
+        self.assertEqual(self.client.get(self.url, dict(name="p", limit="x")).status_code, 400)
+
+    def test_empty_prefix(self):
+        self.assertEqual(self.client.get(self.url).json(), {"results": []})
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, dict(name="pump")).status_code, 302)
+
+    def test_index_is_served_from_memory(self):
+        self.get_names()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_names(), ["pump", "pump_south", "pumps"])
+
+        # session and member only
+        self.assertFalse([query for query in queries if "devices_" in query["sql"]])
+
+    def test_index_is_invalidated_on_changes(self):
+        self.get_names()
+
+        device = self.create_device(self.group, "pump_east")
+        self.assertIn("pump_east", self.get_names())
+
+        device.name = "valve_east"
+        device.save()
+        self.assertNotIn("pump_east", self.get_names())
+
+        Device.objects.get(name="pump").delete()
+        self.assertNotIn("pump", self.get_names())
+
+        self.group.name = "valves"
+        self.group.save()
+        self.assertEqual(self.get_names(search_for="group"), [])
+
+    def test_group_owner_change_invalidates_both_members(self):
+        self.get_names()
+        self.client.logout()
+        client_login(self.client, OTHER_MEMBER)
+        self.assertEqual(self.get_names(), ["pump_north"])
+
+        self.group.owner = self.other_member
+        self.group.save()
+
+        self.assertEqual(self.get_names(), ["pump", "pump_north", "pump_south", "pumps"])
+        self.client.logout()
+        client_login(self.client, MEMBER)
+        self.assertEqual(self.get_names(), [])
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "typeahead": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+)
+class TestTypeaheadIndexStore(TestCase):
+    def setUp(self) -> None:
+        self.member = create_member(**MEMBER)
+        self.group = self.member.devicegroup_set.create(name="pumps")
+        self.other_member = create_member(**OTHER_MEMBER)
+        return super().setUp()
+
+    def test_least_recently_used_indexes_are_dropped(self):
+        store = TypeaheadIndexStore(max_members=1)
+        index = store.get(self.member.pk)
+        self.assertIs(store.get(self.member.pk), index)
+        self.assertEqual(store.get_group_owner(self.group.pk), self.member.pk)
+
+        store.get(self.other_member.pk)
+
+        self.assertIsNot(store.get(self.member.pk), index)
+
+    def test_indexes_older_than_max_age_are_rebuilt(self):
+        store = TypeaheadIndexStore(max_members=10, max_age=60)
+        with mock.patch("devices.typeahead.time.monotonic", return_value=1000.0) as monotonic:
+            index = store.get(self.member.pk)
+            monotonic.return_value = 1059.0
+            self.assertIs(store.get(self.member.pk), index)
+
+            # e.g. the member's devices were changed in another worker
+            self.group.device_set.create(name="pump", uid=Device.generate_device_uid("pump"))
+            monotonic.return_value = 1060.0
+
+            self.assertEqual(
+                [entry.name for entry in store.get(self.member.pk).top("pump", 10)],
+                ["pump", "pumps"],
+            )
+
+    @override_settings(DATABASE_REPLICAS={"default": ["default_replica_0"]})
+    def test_indexes_are_built_from_the_primary(self):
+        token = replica_reads.set(True)
+        self.addCleanup(replica_reads.reset, token)
+
+        # the replica isn't configured, reading from it would fail
+        self.assertEqual(len(TypeaheadIndex.build(self.member.pk)), 1)
+
+    def test_shared_invalidations(self):
+        first_worker = TypeaheadIndexStore(max_members=10, cache_alias="typeahead")
+        second_worker = TypeaheadIndexStore(max_members=10, cache_alias="typeahead")
+        index = second_worker.get(self.member.pk)
+
+        # group isn't in the first worker's indexes, its owner is queried
+        first_worker.invalidate(first_worker.get_group_owner(self.group.pk))
+
+        self.assertIsNot(second_worker.get(self.member.pk), index)
@@ -0,0 +1,234 @@
+"""
+In-memory typeahead (autocomplete) index of members' devices and groups names.
+
+Each member's index is built lazily, on their first typeahead request, from
+the names of their devices and groups, sorted by kind, so that the top
+results for a prefix are found by bisection, without touching the database.
+
+Indexes are built from the primary database (never from a replica, that
+may lag behind the invalidation), and kept in-process, in a store of the most
+recently used `TYPEAHEAD_MAX_MEMBERS` indexes. They're dropped when one of
+their devices or groups is saved or deleted (see devices.signals), and
+rebuilt when they're older than `TYPEAHEAD_MAX_AGE` seconds, which bounds
+the staleness of indexes of other workers (that don't see in-process
+invalidations), and of updates that skip signals (bulk_create,
+QuerySet.update). Set `TYPEAHEAD_CACHE` to a cache alias (e.g. a shared
+memcached/redis cache) to share invalidations between workers: indexes are
+versioned in the cache, and rebuilt when their version changes.
+
+Classes:
+--------
+
+    - TypeaheadEntry
+    - TypeaheadIndex
+    - TypeaheadIndexStore
+
+Functions:
+----------
+
+    - get_typeahead_store() -> TypeaheadIndexStore
+
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+from typing import *
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from .forms import DeviceSearchForm
+from .models import Device, DeviceGroup
+
+Kind = DeviceSearchForm.SearchFor
+
+
+class TypeaheadEntry(NamedTuple):
+    """An indexed name, its kind, and the key of its page (device uid, group name)"""
+
+    name: str
+    kind: str
+    key: str
+
+
+class TypeaheadIndex:
+    """
+    Sorted names of a member's devices and groups, searched by prefix
+    """
+
+    def __init__(self, entries: Iterable[TypeaheadEntry], group_ids: Iterable[int]) -> None:
+        self._entries: Dict[str, List[TypeaheadEntry]] = {kind: [] for kind in Kind.values}
+        for entry in entries:
+            self._entries[entry.kind].append(entry)
+        for kind_entries in self._entries.values():
+            kind_entries.sort()
+        self._names: Dict[str, List[str]] = {
+            kind: [entry.name for entry in kind_entries]
+            for kind, kind_entries in self._entries.items()
+        }
+        # groups of the member, to find the index of a device's member
+        self.group_ids = frozenset(group_ids)
+
+    @classmethod
+    def build(cls, member_id: int) -> "TypeaheadIndex":
+        """Build the index of a member's devices and groups, from the primary database"""
+        using = router.db_for_write(DeviceGroup)
+        groups = list(
+            DeviceGroup.objects.using(using).filter(owner_id=member_id).values_list("pk", "name")
+        )
+        devices = (
+            Device.objects.using(using)
+            .filter(group__owner_id=member_id)
+            .values_list("name", "uid")
+        )
+        entries = itertools.chain(
+            (TypeaheadEntry(name, Kind.GROUP, name) for _, name in groups),
+            (TypeaheadEntry(name, Kind.DEVICE, str(uid)) for name, uid in devices),
+        )
+        return cls(entries, (pk for pk, _ in groups))
+
+    def __len__(self) -> int:
+        return sum(len(kind_entries) for kind_entries in self._entries.values())
+
+    def _matches(self, kind: str, prefix: str) -> Iterator[TypeaheadEntry]:
+        """Entries of a kind whose names start with prefix, sorted by name"""
+        entries = self._entries[kind]
+        names = self._names[kind]
+        for position in range(bisect_left(names, prefix), len(names)):
+            if not names[position].startswith(prefix):
+                return
+            yield entries[position]
+
+    def top(self, prefix: str, limit: int, kind: str | None = None) -> List[TypeaheadEntry]:
+        """
+        Get the first names (by name) starting with a prefix
+
+        :param prefix: prefix of the names (lowercase)
+        :type prefix: str
+        :param limit: maximum number of results
+        :type limit: int
+        :param kind: search devices ('device') or groups ('group') only, default: both
+        :type kind: str | None
+        :return: entries, sorted by name, then kind
+        :rtype: List[TypeaheadEntry]
+        """
+        kinds = Kind.values if kind is None else [kind]
+        matches = heapq.merge(*(self._matches(kind, prefix) for kind in kinds))
+        return list(itertools.islice(matches, limit))
+
+
+class TypeaheadIndexStore:
+    """
+    In-process, thread safe, store of the most recently used members' indexes
+    """
+
+    def __init__(
+        self,
+        max_members: int,
+        cache_alias: str | None = None,
+        max_age: float | None = None,
+    ) -> None:
+        self.max_members = max_members
+        self.cache = None if cache_alias is None else caches[cache_alias]
+        # seconds, indexes are rebuilt when they're older, never if None
+        self.max_age = max_age
+        # member id -> (version, build time, index), least recently used first
+        self._indexes: OrderedDict[int, Tuple[str | None, float, TypeaheadIndex]] = OrderedDict()
+        # group id -> member id, of the groups of stored indexes
+        self._group_owners: Dict[int, int] = {}
+        # incremented by invalidations, indexes built meanwhile aren't stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version_key(member_id: int) -> str:
+        return f"typeahead:{member_id}"
+
+    def _get_version(self, member_id: int) -> str | None:
+        if self.cache is None:
+            return None
+        return self.cache.get(self.version_key(member_id))
+
+    def get(self, member_id: int) -> TypeaheadIndex:
+        """Get a member's index, built if it's not stored (or outdated, or too old)"""
+        version = self._get_version(member_id)
+        with self._lock:
+            stored = self._indexes.get(member_id)
+            if stored is not None and stored[0] == version and not self._expired(stored[1]):
+                self._indexes.move_to_end(member_id)
+                return stored[2]
+            generation = self._generation
+
+        built = time.monotonic()
+        index = TypeaheadIndex.build(member_id)
+        with self._lock:
+            if generation == self._generation:
+                self._drop(member_id)
+                self._indexes[member_id] = (version, built, index)
+                self._group_owners.update(dict.fromkeys(index.group_ids, member_id))
+                while len(self._indexes) > self.max_members:
+                    self._drop(next(iter(self._indexes)))
+        return index
+
+    def _expired(self, built: float) -> bool:
+        return self.max_age is not None and time.monotonic() - built >= self.max_age
+
+    def _drop(self, member_id: int) -> None:
+        stored = self._indexes.pop(member_id, None)
+        if stored is not None:
+            for group_id in stored[2].group_ids:
+                self._group_owners.pop(group_id, None)
+
+    def get_group_owner(self, group_id: int) -> int | None:
+        """
+        Get the member owning a group, if the group is in a stored index, or
+        if invalidations are shared (by the database)
+        """
+        owner_id = self._group_owners.get(group_id)
+        if owner_id is None and self.cache is not None:
+            owner_id = (
+                DeviceGroup.objects.using(router.db_for_write(DeviceGroup))
+                .filter(pk=group_id)
+                .values_list("owner_id", flat=True)
+                .first()
+            )
+        return owner_id
+
+    def invalidate(self, *member_ids: int | None) -> None:
+        """Drop members' indexes, in all workers when invalidations are shared"""
+        member_ids = {member_id for member_id in member_ids if member_id is not None}
+        if not member_ids:
+            return
+        with self._lock:
+            self._generation += 1
+            for member_id in member_ids:
+                self._drop(member_id)
+        if self.cache is not None:
+            version = uuid.uuid4().hex
+            self.cache.set_many(
+                {self.version_key(member_id): version for member_id in member_ids},
+                timeout=None,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._indexes.clear()
+            self._group_owners.clear()
+
+
+@lru_cache(maxsize=None)
+def get_typeahead_store() -> TypeaheadIndexStore:
+    """Get the typeahead indexes store of this process"""
+    return TypeaheadIndexStore(
+        settings.TYPEAHEAD_MAX_MEMBERS,
+        settings.TYPEAHEAD_CACHE,
+        settings.TYPEAHEAD_MAX_AGE or None,
+    )
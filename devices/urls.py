@@ -64,4 +64,5 @@ urlpatterns = [
     path("group/", include(group_urls)),
     path("data/", include(device_data)),
     path("search/", views.DeviceSearchResultsView.as_view(), name="search"),
+    path("search/typeahead/", views.DeviceTypeaheadView.as_view(), name="typeahead"),
 ]
@@ -0,0 +1,167 @@
+"""
+Device data message validation.
+
+A device message is validated in a single pass: string messages are
+decoded once and JSON objects are encoded once (which checks value types),
+using orjson when it's installed (see common.fastjson).
+Nesting depth and key count are bounded by counting brackets and colons in
+the encoded message, containers are only walked when those bounds exceed
+the limits. orjson encodes NaN and Infinity as null, containers of messages
+encoded with nulls are walked for them. The encoded form is returned along with
+the value, so it can be stored without encoding the message again
+(see devices.fields.SerializedJSON).
+
+Limits are read from settings:
+
+    - DEVICE_MESSAGE_MAX_BYTES: max size of the encoded message
+    - DEVICE_MESSAGE_MAX_DEPTH: max nesting depth of objects and arrays
+    - DEVICE_MESSAGE_MAX_KEYS: max number of keys in all objects of the message
+
+"""
+
+import math
+from typing import *
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+from common import fastjson
+from devices.fields import SerializedJSON
+
+DEFAULT_MESSAGE_MAX_BYTES: Final[int] = 4096
+DEFAULT_MESSAGE_MAX_DEPTH: Final[int] = 8
+DEFAULT_MESSAGE_MAX_KEYS: Final[int] = 256
+
+_CONTAINER_TYPES: Final[Tuple[type, ...]] = (dict, list, tuple)
+
+
+def _has_non_finite_floats(value: Any) -> bool:
+    """Does a JSON object have NaN or Infinity values"""
+    nodes = [value]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, dict):
+            node = node.values()
+        for child in node:
+            if isinstance(child, float):
+                if not math.isfinite(child):
+                    return True
+            elif isinstance(child, _CONTAINER_TYPES):
+                nodes.append(child)
+    return False
+
+
+class DeviceMessageValidator:
+    """
+    Validate a device data message, and serialize it.
+
+    The message is either a JSON object (dict or list), or a UTF-8 encoded
+    JSON string.
+    """
+
+    error_messages = {
+        "invalid_json": _(
+            "Message must be either a valid JSON object or a UTF-8 encoded JSON string."
+        ),
+        "max_bytes": _("Message must be at most %(limit)d bytes long."),
+        "max_depth": _("Message must be nested at most %(limit)d levels deep."),
+        "max_keys": _("Message must contain at most %(limit)d keys."),
+    }
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        max_depth: int | None = None,
+        max_keys: int | None = None,
+    ) -> None:
+        self.max_bytes = max_bytes or getattr(
+            settings, "DEVICE_MESSAGE_MAX_BYTES", DEFAULT_MESSAGE_MAX_BYTES
+        )
+        self.max_depth = max_depth or getattr(
+            settings, "DEVICE_MESSAGE_MAX_DEPTH", DEFAULT_MESSAGE_MAX_DEPTH
+        )
+        self.max_keys = max_keys or getattr(
+            settings, "DEVICE_MESSAGE_MAX_KEYS", DEFAULT_MESSAGE_MAX_KEYS
+        )
+
+    def __call__(self, value: Any) -> SerializedJSON:
+        """
+        Validate message
+
+        :param value: message, a JSON object or a JSON string
+        :type value: Any
+        :return: validated message, paired with its JSON encoded form
+        :rtype: SerializedJSON
+        :raises: ValidationError if message is invalid or exceeds the limits
+        """
+        if isinstance(value, str):
+            serialized = value
+            self.check_size(serialized)
+            try:
+                value = fastjson.loads(serialized)
+            except ValueError:
+                self.fail("invalid_json")
+            self.check_structure(value, serialized)
+
+        elif isinstance(value, (dict, list)):
+            try:
+                serialized = fastjson.dumps(value)
+            except (TypeError, ValueError):
+                self.fail("invalid_json")
+            if "null" in serialized and _has_non_finite_floats(value):
+                self.fail("invalid_json")
+            self.check_size(serialized)
+            self.check_structure(value, serialized)
+
+        else:
+            self.fail("invalid_json")
+
+        return SerializedJSON(value, serialized)
+
+    def fail(self, code: str, **params) -> NoReturn:
+        raise ValidationError(self.error_messages[code], code=code, params=params)
+
+    def check_size(self, serialized: str) -> None:
+        if serialized.isascii():
+            size = len(serialized)
+        else:
+            try:
+                size = len(serialized.encode("utf-8"))
+            except UnicodeEncodeError:
+                self.fail("invalid_json")
+        if size > self.max_bytes:
+            self.fail("max_bytes", limit=self.max_bytes)
+
+    def check_structure(self, value: Any, serialized: str) -> None:
+        """Check nesting depth and key count of message"""
+        max_depth, max_keys = self.max_depth, self.max_keys
+
+        # every container opens with a bracket and every key is followed by
+        # a colon, so counting them (even inside strings) gives upper bounds
+        # of depth and key count, and most messages don't need to be walked
+        if (
+            serialized.count("{") + serialized.count("[") <= max_depth
+            and serialized.count(":") <= max_keys
+        ):
+            return
+
+        # walk message containers once, level by level
+        key_count = 0
+        depth = 0
+        level = [value]
+        while level:
+            depth += 1
+            if depth > max_depth:
+                self.fail("max_depth", limit=max_depth)
+            next_level = []
+            for node in level:
+                if isinstance(node, dict):
+                    key_count += len(node)
+                    node = node.values()
+                next_level += [
+                    child for child in node if isinstance(child, _CONTAINER_TYPES)
+                ]
+            if key_count > max_keys:
+                self.fail("max_keys", limit=max_keys)
+            level = next_level
@@ -4,16 +4,17 @@ from django.conf import settings
 from django.core.paginator import InvalidPage, Paginator
 from django.db.models import Count, F, Q, QuerySet
 from django.db.models.query import QuerySet
-from django.http import Http404, HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.http.response import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils.translation import gettext as _
-from django.views.generic import DetailView, ListView
+from django.views.generic import DetailView, ListView, View
 from django.views.generic.edit import CreateView, DeleteView, FormView, UpdateView
 
 from accounts.forms import MemberConfirmActionForm
-from common.views.mixins import MemberLoginRequiredMixin
+from common.middleware import Priority
+from common.views.mixins import Jinja2ViewMixin, MemberLoginRequiredMixin
 
 from .forms import (
     DeviceCreateForm,
@@ -22,15 +23,22 @@ from .forms import (
     DeviceGroupEditForm,
     DeviceSearchForm,
 )
-from .models import Device, DeviceData, DeviceGroup
+from .models import Device, DeviceData, DeviceDataPurge, DeviceGroup
+from .search import search
+from .typeahead import TypeaheadEntry, get_typeahead_store
 
 # Create your views here.
 
 
 class SearchBarMixin:
-    extra_context = dict(
-        search_form=DeviceSearchForm(),
-    )
+    # pages without a search bar unset it
+    extra_context = dict()
+
+    def get_context_data(self, **kwargs):
+        # a new form per page, rendered by the current form renderer
+        if self.extra_context is not None:
+            kwargs.setdefault("search_form", DeviceSearchForm())
+        return super().get_context_data(**kwargs)
 
 
 # -----------------------------------------------------------------------
@@ -111,7 +119,7 @@ class DeviceGroupDetailView(BaseDeviceGroupBySlugView, DetailView):
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context["device_count"] = self.object.device_set.count()
-        context["device_list"] = self.object.device_set.all()
+        context["device_list"] = self.object.device_set.select_related("heartbeat")
         return context
 
 
@@ -162,7 +170,7 @@ class DeviceCreateView(BaseDeviceWithMemberFormView, CreateView):
     template_name = "devices/device/create.html"
 
 
-class DeviceListView(BaseDeviceView, DevicesByOwnerMixin, ListView):
+class DeviceListView(BaseDeviceView, DevicesByOwnerMixin, Jinja2ViewMixin, ListView):
     fields = [
         "name",
         "uid",
@@ -185,6 +193,7 @@ class DeviceListView(BaseDeviceView, DevicesByOwnerMixin, ListView):
                 group_name=F("group__name"),
                 owner_name=F("group__owner__username"),
             )
+            .select_related("heartbeat")
             .order_by("group_name", "name")
         )
         return qs
@@ -202,6 +211,9 @@ class DeviceDetailView(BaseDeviceBySlugDetailsView, DetailView):
     template_name = "devices/device/details.html"
     context_object_name = "device"
 
+    def get_queryset(self) -> QuerySet[Any]:
+        return super().get_queryset().select_related("heartbeat")
+
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context_data = super().get_context_data(**kwargs)
         context_data["device_group"] = self.object.group
@@ -225,10 +237,12 @@ class DeviceDeleteView(BaseDeviceBySlugEditView, DeleteView):
     success_url = reverse_lazy("devices:device_list")
 
 
-class DeviceDataHistoryView(BaseDeviceBySlugDetailsView, ListView):
+class DeviceDataHistoryView(BaseDeviceBySlugDetailsView, Jinja2ViewMixin, ListView):
     template_name = "devices/device/data_history.html"
     context_object_name = "device_data_list"
     paginate_by = settings.PAGINATION_SIZE
+    load_shedding_priority = Priority.LOW
+    read_from_replica = True
 
     def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         self.device = get_object_or_404(
@@ -255,10 +269,16 @@ class BaseDeviceDataView(MemberLoginRequiredMixin, SearchBarMixin):
 class DeviceDataByMember(BaseDeviceDataView):
     def get_queryset(self) -> QuerySet[Any]:
         # TODO active devices only
-        device_member_filter = Q(
-            device__group__owner=self.request.user
-        )  # & Q(device__is_active=True)
-        return super().get_queryset().filter(device_member_filter)
+        # owner is denormalized on device data, member's data (ordered by
+        # date) is a range of the (owner, -date) index, without joins, and
+        # devices are prefetched, as they may be in another database
+        device_member_filter = Q(owner=self.request.user)  # & Q(device__is_active=True)
+        queryset = super().get_queryset().filter(device_member_filter)
+        # data of deleted devices, until it's purged (see devices.purge)
+        deleted_device_ids = DeviceDataPurge.objects.pending_device_ids(self.request.user.pk)
+        if deleted_device_ids:
+            queryset = queryset.exclude(device_id__in=deleted_device_ids)
+        return queryset.prefetch_related("device")
 
 
 class DeviceDataDetailsView(DeviceDataByMember, DetailView):
@@ -266,11 +286,13 @@ class DeviceDataDetailsView(DeviceDataByMember, DetailView):
     context_object_name = "device_data"
 
 
-class DeviceDataListView(DeviceDataByMember, ListView):
+class DeviceDataListView(DeviceDataByMember, Jinja2ViewMixin, ListView):
     template_name = "devices/data/list.html"
     context_object_name = "device_data_list"
     ordering = ["-date"]
     paginate_by = settings.PAGINATION_SIZE
+    load_shedding_priority = Priority.LOW
+    read_from_replica = True
 
 
 # -----------------------------------------------------------------------
@@ -286,8 +308,9 @@ class DeviceSearchResultsView(MemberLoginRequiredMixin, FormView):
     paginator_class = Paginator
     page_kwarg = "page"
     context_object_name = "search_results"
-    ordering = ["name"]
     template_name = "devices/search.html"
+    load_shedding_priority = Priority.LOW
+    read_from_replica = True
 
     def get_queryset(self):
         search_for = self.request.GET.get("search_for", None)
@@ -296,29 +319,24 @@ class DeviceSearchResultsView(MemberLoginRequiredMixin, FormView):
         if search_for is None or name is None:
             return Device.objects.none()
 
+        # ranked results of the search index (see devices.search)
         if search_for == DeviceSearchForm.SearchFor.DEVICE:
-            self.queryset = Device.objects.filter(
-                group__owner=self.request.user, name__icontains=name
-            )
-        else:
-            self.queryset = DeviceGroup.objects.filter(
-                owner=self.request.user, name__icontains=name
-            )
+            return search(Device, self.request.user, name)
+        return search(DeviceGroup, self.request.user, name)
 
-        queryset = self.queryset.all()
-
-        ordering = self.ordering
-        queryset = queryset.order_by(*ordering)
-
-        return queryset
-
-    def paginate_queryset(self, queryset, page_size):
-        paginator = self.paginator_class(
+    def get_paginator(self, queryset, page_size) -> Paginator:
+        return self.paginator_class(
             queryset,
             page_size,
             orphans=self.paginate_orphans,
             allow_empty_first_page=self.allow_empty,
         )
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.get_page(self.get_paginator(queryset, page_size))
+
+    def get_page(self, paginator: Paginator):
+        """Get requested page of the results, (paginator, page, object list, is paginated)"""
         page_kwarg = self.page_kwarg
         page = self.kwargs.get(page_kwarg) or self.request.GET.get(page_kwarg) or 1
         try:
@@ -350,10 +368,10 @@ class DeviceSearchResultsView(MemberLoginRequiredMixin, FormView):
         queryset = object_list if object_list is not None else self.get_queryset()
         page_size = self.paginate_by
         context_object_name = self.get_context_object_name(queryset)
-        if queryset and queryset.count() > 0 and page_size:
-            paginator, page, queryset, is_paginated = self.paginate_queryset(
-                queryset, page_size
-            )
+        # results are counted once, by the paginator
+        paginator = self.get_paginator(queryset, page_size) if page_size else None
+        if paginator is not None and paginator.count > 0:
+            paginator, page, queryset, is_paginated = self.get_page(paginator)
             context = {
                 "paginator": paginator,
                 "page_obj": page,
@@ -394,3 +412,46 @@ class DeviceSearchResultsView(MemberLoginRequiredMixin, FormView):
     def post(self, request: HttpRequest, *args: str, **kwargs: Any) -> HttpResponse:
         """Method is not allowed"""
         return HttpResponse(status=405)
+
+
+# -----------------------------------------------------------------------
+# DeviceGroup/Device Typeahead View
+# -----------------------------------------------------------------------
+class DeviceTypeaheadView(MemberLoginRequiredMixin, View):
+    """
+    Names of the member's devices and groups starting with a prefix (search
+    bar autocomplete), as JSON, from the member's in-memory index (see
+    devices.typeahead)
+    """
+
+    http_method_names = ["get"]
+    load_shedding_priority = Priority.LOW
+    read_from_replica = True
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        prefix = request.GET.get("name", "").strip().lower()
+        kind = request.GET.get("search_for") or None
+        if kind is not None and kind not in DeviceSearchForm.SearchFor.values:
+            return JsonResponse({"detail": _("Invalid search for value.")}, status=400)
+        try:
+            limit = int(request.GET.get("limit", settings.TYPEAHEAD_RESULTS))
+        except ValueError:
+            return JsonResponse({"detail": _("Invalid limit.")}, status=400)
+        limit = max(0, min(limit, settings.TYPEAHEAD_RESULTS))
+
+        entries = []
+        if prefix and limit:
+            entries = get_typeahead_store().get(request.user.pk).top(prefix, limit, kind)
+        return JsonResponse(
+            {
+                "results": [
+                    {"name": entry.name, "kind": entry.kind, "url": self.get_entry_url(entry)}
+                    for entry in entries
+                ]
+            }
+        )
+
+    def get_entry_url(self, entry: TypeaheadEntry) -> str:
+        if entry.kind == DeviceSearchForm.SearchFor.DEVICE:
+            return reverse("devices:device_details", kwargs={"device_uid": entry.key})
+        return reverse("devices:group_details", kwargs={"group_name": entry.key})
@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from .models import Job, PeriodicTask, QueuedEmail
+
+# Register your models here.
+
+
+class JobModelAdmin(admin.ModelAdmin):
+    model = Job
+    list_display = ["task", "status", "priority", "run_at", "attempts", "locked_by", "finished"]
+    list_filter = ["status", "task"]
+
+
+class PeriodicTaskModelAdmin(admin.ModelAdmin):
+    model = PeriodicTask
+    list_display = ["task", "next_run_at"]
+
+
+class QueuedEmailModelAdmin(admin.ModelAdmin):
+    model = QueuedEmail
+    list_display = ["from_email", "recipients", "status", "attempts", "created", "sent"]
+    list_filter = ["status"]
+    exclude = ["message"]
+
+
+admin.site.register(Job, JobModelAdmin)
+admin.site.register(PeriodicTask, PeriodicTaskModelAdmin)
+admin.site.register(QueuedEmail, QueuedEmailModelAdmin)
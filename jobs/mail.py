@@ -0,0 +1,170 @@
+"""
+Queued email backend.
+
+`EMAIL_BACKEND = "jobs.mail.QueuedEmailBackend"` stores sent emails (their
+MIME messages) in the database and enqueues a background job, instead of
+connecting to the mail server in the request. Workers (`manage.py
+run_workers`) send queued emails in batches of `EMAIL_QUEUE_BATCH_SIZE`,
+each batch over a single connection of `EMAIL_QUEUE_BACKEND` (e.g. SMTP, or
+the file backend locally).
+
+Batches are claimed with a conditional `UPDATE` (as jobs are, see
+jobs.runner), so concurrent workers never send an email twice, unless the
+worker sending it is lost (its batch lease expired). Failed deliveries are
+retried, with exponential delays, until they reach `JOBS_MAX_ATTEMPTS`.
+
+Classes:
+--------
+
+    - QueuedEmailBackend
+    - QueuedEmailMessage
+
+Functions:
+----------
+
+    - send_queued_emails(batch_size: int | None = None) -> int
+
+"""
+
+import uuid
+from email import message_from_bytes, policy
+from email.message import Message
+from typing import *
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import QueuedEmail
+from .tasks import enqueue, get_task
+
+# task sending queued emails (see jobs.tasks)
+SEND_TASK: Final[str] = "jobs.send_queued_emails"
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Email backend storing emails, sent by background jobs
+    """
+
+    def send_messages(self, email_messages: Sequence[EmailMessage]) -> int:
+        queued = [
+            QueuedEmail(
+                from_email=message.from_email,
+                recipients=message.recipients(),
+                message=message.message().as_bytes(),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        if not queued:
+            return 0
+        QueuedEmail.objects.bulk_create(queued)
+        enqueue(SEND_TASK)
+        return len(queued)
+
+
+class QueuedMIMEMessage(MIMEMixin, Message):
+    """Parsed MIME message (and parts) of a queued email, serialized as django's"""
+
+
+class QueuedEmailMessage(EmailMessage):
+    """
+    Queued email, sent as the MIME message generated when it was queued
+    """
+
+    def __init__(self, queued: QueuedEmail) -> None:
+        super().__init__(from_email=queued.from_email, to=queued.recipients)
+        self.raw_message = bytes(queued.message)
+
+    def message(self) -> Message:
+        return message_from_bytes(self.raw_message, _class=QueuedMIMEMessage, policy=policy.compat32)
+
+    def recipients(self) -> List[str]:
+        return self.to
+
+
+def _claim_batch(batch_size: int) -> List[QueuedEmail]:
+    """Claim the next due emails (oldest first), or emails of lost batches"""
+    now = timezone.now()
+    claimable = Q(status=QueuedEmail.Status.PENDING, send_after__lte=now) | Q(
+        status=QueuedEmail.Status.SENDING, locked_until__lt=now
+    )
+    ids = list(
+        QueuedEmail.objects.filter(claimable).order_by("pk").values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    batch = uuid.uuid4().hex
+    QueuedEmail.objects.filter(claimable, pk__in=ids).update(
+        status=QueuedEmail.Status.SENDING,
+        batch=batch,
+        locked_until=now + get_task(SEND_TASK).get_lease(),
+    )
+    return list(QueuedEmail.objects.filter(batch=batch).order_by("pk"))
+
+
+def send_queued_emails(batch_size: int | None = None) -> int:
+    """
+    Send due queued emails, in batches, each batch over one connection
+
+    :param batch_size: max emails per connection, default: `EMAIL_QUEUE_BATCH_SIZE`
+    :type batch_size: int | None
+    :return: number of sent emails
+    :rtype: int
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    send_task = get_task(SEND_TASK)
+    sent = 0
+    while True:
+        batch = _claim_batch(batch_size)
+        if not batch:
+            return sent
+
+        retry_at = None
+        try:
+            # opened once, for the whole batch
+            connection = get_connection(settings.EMAIL_QUEUE_BACKEND)
+            connection.open()
+        except Exception:
+            # released, and the job retried
+            QueuedEmail.objects.filter(batch=batch[0].batch, status=QueuedEmail.Status.SENDING).update(
+                status=QueuedEmail.Status.PENDING, locked_until=None
+            )
+            raise
+
+        with connection:
+            for queued in batch:
+                emails = QueuedEmail.objects.filter(pk=queued.pk, batch=queued.batch)
+                try:
+                    connection.send_messages([QueuedEmailMessage(queued)])
+                except Exception as error:
+                    attempts = queued.attempts + 1
+                    if attempts < send_task.get_max_attempts():
+                        send_after = timezone.now() + send_task.get_retry_delay(attempts)
+                        retry_at = min(retry_at or send_after, send_after)
+                        emails.update(
+                            status=QueuedEmail.Status.PENDING,
+                            send_after=send_after,
+                            attempts=attempts,
+                            last_error=repr(error),
+                            locked_until=None,
+                        )
+                    else:
+                        emails.update(
+                            status=QueuedEmail.Status.FAILED,
+                            attempts=attempts,
+                            last_error=repr(error),
+                            locked_until=None,
+                        )
+                    continue
+                emails.update(status=QueuedEmail.Status.SENT, sent=timezone.now(), locked_until=None)
+                sent += 1
+
+        if retry_at is not None:
+            enqueue(SEND_TASK, run_at=retry_at)
+        if len(batch) < batch_size:
+            return sent
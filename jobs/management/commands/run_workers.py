@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.runner import run_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background job workers (see jobs.runner), in threads or processes, "
+        "until stopped (SIGTERM or SIGINT)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of workers (default: JOBS_WORKERS).",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Run workers in processes, instead of threads (for CPU bound tasks).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="Seconds between polls of idle workers (default: JOBS_POLL_INTERVAL).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Stop workers when no job is due.",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"] or settings.JOBS_WORKERS
+        mode = "processes" if options["processes"] else "threads"
+        self.stdout.write(f"Running {workers} job workers ({mode})")
+        run_workers(
+            workers,
+            processes=options["processes"],
+            poll_interval=options["poll_interval"],
+            burst=options["burst"],
+        )
+        self.stdout.write("Job workers stopped")
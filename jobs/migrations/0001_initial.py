@@ -0,0 +1,45 @@
+# Generated by Django 4.2.4 on 2026-10-19 10:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodicTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=200, unique=True, verbose_name='task')),
+                ('next_run_at', models.DateTimeField(verbose_name='next run at')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=200, verbose_name='task')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='arguments')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='keyword arguments')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='priority')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='status')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='run at')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=1, verbose_name='max attempts')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100, verbose_name='locked by')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='locked until')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='last error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', '-priority', 'run_at'], name='job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-19 11:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_email', models.CharField(max_length=254, verbose_name='from')),
+                ('recipients', models.JSONField(default=list, verbose_name='recipients')),
+                ('message', models.BinaryField(verbose_name='message')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='status')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='send after')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('batch', models.CharField(blank=True, db_index=True, default='', max_length=32, verbose_name='batch')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='locked until')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='last error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='sent')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'send_after'], name='queued_email_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,130 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# Create your models here.
+
+
+class Job(models.Model):
+    """
+    Background job, a call of a registered task (see jobs.tasks), run by
+    workers (see jobs.runner).
+
+    fields:
+        - task: name of the registered task
+        - args, kwargs: arguments of the task (JSON)
+        - priority: jobs with higher priorities run first
+        - status: pending, running (leased by a worker), succeeded or failed
+        - run_at: when the job is due (retries are delayed)
+        - attempts: number of times the job was started
+        - max_attempts: the job fails after this many failed attempts
+        - locked_by: worker running the job
+        - locked_until: end of the worker's lease, the job is run again
+          (by any worker) if it's still running after it
+        - last_error: traceback of the last failed attempt
+        - created: when the job was enqueued
+        - finished: when the job succeeded, or failed for the last time
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        SUCCEEDED = "succeeded", _("Succeeded")
+        FAILED = "failed", _("Failed")
+
+    task = models.CharField(verbose_name=_("task"), max_length=200)
+    args = models.JSONField(verbose_name=_("arguments"), default=list, blank=True)
+    kwargs = models.JSONField(verbose_name=_("keyword arguments"), default=dict, blank=True)
+    priority = models.SmallIntegerField(verbose_name=_("priority"), default=0)
+    status = models.CharField(
+        verbose_name=_("status"),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    run_at = models.DateTimeField(verbose_name=_("run at"), default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(verbose_name=_("attempts"), default=0)
+    max_attempts = models.PositiveSmallIntegerField(verbose_name=_("max attempts"), default=1)
+    locked_by = models.CharField(verbose_name=_("locked by"), max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(verbose_name=_("locked until"), null=True, blank=True)
+    last_error = models.TextField(verbose_name=_("last error"), blank=True, default="")
+    created = models.DateTimeField(verbose_name=_("created"), auto_now_add=True)
+    finished = models.DateTimeField(verbose_name=_("finished"), null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # due jobs, by priority (see jobs.runner.claim_job)
+            models.Index(fields=["status", "-priority", "run_at"], name="job_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task}#{self.pk} ({self.status})"
+
+
+class PeriodicTask(models.Model):
+    """
+    Schedule of a periodic task (see jobs.tasks.task), its next run.
+
+    fields:
+        - task: name of the registered task
+        - next_run_at: when the task is enqueued next
+    """
+
+    task = models.CharField(verbose_name=_("task"), max_length=200, unique=True)
+    next_run_at = models.DateTimeField(verbose_name=_("next run at"))
+
+    def __str__(self):
+        return f"{self.task} (next run at {self.next_run_at})"
+
+
+class QueuedEmail(models.Model):
+    """
+    Email queued by the queued email backend (see jobs.mail), sent in
+    batches by a background job.
+
+    fields:
+        - from_email: sender address
+        - recipients: to, cc and bcc addresses
+        - message: MIME message, as generated when the email was queued
+        - status: pending, sending (claimed by a batch), sent or failed
+        - send_after: when the email is due (retries are delayed)
+        - attempts: number of failed deliveries
+        - batch: batch sending the email
+        - locked_until: end of the batch's lease, the email is sent again
+          (by any batch) if it's still sending after it
+        - last_error: error of the last failed delivery
+        - created: when the email was queued
+        - sent: when the email was sent
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        SENDING = "sending", _("Sending")
+        SENT = "sent", _("Sent")
+        FAILED = "failed", _("Failed")
+
+    from_email = models.CharField(verbose_name=_("from"), max_length=254)
+    recipients = models.JSONField(verbose_name=_("recipients"), default=list)
+    message = models.BinaryField(verbose_name=_("message"))
+    status = models.CharField(
+        verbose_name=_("status"),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    send_after = models.DateTimeField(verbose_name=_("send after"), default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(verbose_name=_("attempts"), default=0)
+    batch = models.CharField(verbose_name=_("batch"), max_length=32, blank=True, default="", db_index=True)
+    locked_until = models.DateTimeField(verbose_name=_("locked until"), null=True, blank=True)
+    last_error = models.TextField(verbose_name=_("last error"), blank=True, default="")
+    created = models.DateTimeField(verbose_name=_("created"), auto_now_add=True)
+    sent = models.DateTimeField(verbose_name=_("sent"), null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # due emails (see jobs.mail.send_queued_emails)
+            models.Index(fields=["status", "send_after"], name="queued_email_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.from_email} -> {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,354 @@
+"""
+Background jobs runner, without an external broker.
+
+Workers poll the job table (see jobs.models.Job) for due jobs, highest
+priority first, and lease them before running them:
+
+    - PostgreSQL (and other databases supporting it): the job row is
+      selected with `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent
+      workers skip each other's rows, and leased in the same transaction.
+    - SQLite: candidate rows are leased with a conditional `UPDATE` (still
+      pending, or its lease expired), writes being serialized by SQLite,
+      only one worker's update matches the row.
+
+A lease lasts the task's `lease`, a job still running after it (e.g. its
+worker was killed) is run again by another worker. Failed jobs are retried,
+with exponential delays, until they reach their maximum number of attempts.
+Workers also enqueue periodic tasks when they're due (at most one worker
+enqueues each run).
+
+Workers run in threads or processes of `manage.py run_workers`.
+
+Classes:
+--------
+
+    - Worker
+
+Functions:
+----------
+
+    - claim_job(worker_id: str, now: datetime | None = None) -> Job | None
+    - run_job(job: Job, worker_id: str) -> bool
+    - enqueue_periodic_tasks(now: datetime | None = None) -> List[Job]
+    - run_pending_jobs(worker_id: str = "inline") -> int
+    - run_workers(workers: int, processes: bool = False, poll_interval: float | None = None, burst: bool = False) -> None
+
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import *
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+from common.db.pool import close_pools
+
+from .models import Job, PeriodicTask
+from .tasks import enqueue, get_task, get_tasks
+
+logger = logging.getLogger(__name__)
+
+# pending jobs tried per claim, on databases without SKIP LOCKED
+CLAIM_CANDIDATES: Final[int] = 10
+
+# attempts to record a job's result while the database is locked, and delay
+# before the first retry (seconds, doubled for each retry)
+RESULT_ATTEMPTS: Final[int] = 5
+RESULT_RETRY_DELAY: Final[float] = 0.05
+
+
+# -----------------------------------------------------------------------------
+# Jobs
+# -----------------------------------------------------------------------------
+def _claimable(now: datetime) -> Q:
+    """Due pending jobs, and running jobs whose lease expired"""
+    return Q(status=Job.Status.PENDING, run_at__lte=now) | Q(
+        status=Job.Status.RUNNING, locked_until__lt=now
+    )
+
+
+def _get_lease(task_name: str) -> timedelta:
+    """Lease of a task's jobs (default lease for unregistered tasks, failed when they're run)"""
+    try:
+        return get_task(task_name).get_lease()
+    except LookupError:
+        return timedelta(seconds=settings.JOBS_LEASE)
+
+
+def claim_job(worker_id: str, now: datetime | None = None) -> Job | None:
+    """
+    Lease the next due job (highest priority, then oldest) to a worker
+
+    :param worker_id: worker leasing the job
+    :type worker_id: str
+    :param now: current time, default: now
+    :type now: datetime | None
+    :return: leased job, None if no job is due
+    :rtype: Job | None
+    """
+    now = now or timezone.now()
+    using = router.db_for_write(Job)
+    candidates = Job.objects.using(using).filter(_claimable(now)).order_by("-priority", "run_at", "pk")
+
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            job = candidates.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = Job.Status.RUNNING
+            job.locked_by = worker_id
+            job.locked_until = now + _get_lease(job.task)
+            job.attempts += 1
+            job.save(update_fields=["status", "locked_by", "locked_until", "attempts"])
+            return job
+
+    for pk, task_name in candidates.values_list("pk", "task")[:CLAIM_CANDIDATES]:
+        leased = (
+            Job.objects.using(using)
+            .filter(_claimable(now), pk=pk)
+            .update(
+                status=Job.Status.RUNNING,
+                locked_by=worker_id,
+                locked_until=now + _get_lease(task_name),
+                attempts=F("attempts") + 1,
+            )
+        )
+        if leased:
+            return Job.objects.using(using).get(pk=pk)
+    return None
+
+
+def _record_result(leased_job: QuerySet, **fields: Any) -> None:
+    """
+    Record the result of a job, retried while the database is locked (e.g.
+    SQLite, by other workers), the job would be run again otherwise
+    """
+    for attempt in range(RESULT_ATTEMPTS):
+        try:
+            leased_job.update(locked_by="", locked_until=None, **fields)
+            return
+        except OperationalError:
+            if attempt + 1 == RESULT_ATTEMPTS:
+                raise
+            time.sleep(RESULT_RETRY_DELAY * 2**attempt)
+
+
+def run_job(job: Job, worker_id: str) -> bool:
+    """
+    Run a leased job, and record its result: succeeded, failed (retried
+    later, if it has attempts left), or failed for good
+
+    :param job: job leased by the worker
+    :type job: Job
+    :param worker_id: worker running the job
+    :type worker_id: str
+    :return: whether the job succeeded
+    :rtype: bool
+    """
+    # results of a job leased again by another worker (lease expired) are ignored
+    leased_job = Job.objects.filter(pk=job.pk, locked_by=worker_id, status=Job.Status.RUNNING)
+    try:
+        get_task(job.task).function(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s failed (attempt %s of %s)", job, job.attempts, job.max_attempts)
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            try:
+                retry_at = now + get_task(job.task).get_retry_delay(job.attempts)
+            except LookupError:
+                retry_at = now
+            _record_result(leased_job, status=Job.Status.PENDING, run_at=retry_at, last_error=error)
+        else:
+            _record_result(leased_job, status=Job.Status.FAILED, finished=now, last_error=error)
+        return False
+
+    _record_result(leased_job, status=Job.Status.SUCCEEDED, finished=timezone.now())
+    return True
+
+
+def enqueue_periodic_tasks(now: datetime | None = None) -> List[Job]:
+    """
+    Enqueue periodic tasks that are due, and schedule their next run (the
+    worker that moves a task's next run enqueues it, others skip it)
+
+    :return: enqueued jobs
+    :rtype: List[Job]
+    """
+    now = now or timezone.now()
+    using = router.db_for_write(PeriodicTask)
+    jobs = []
+    for task in get_tasks().values():
+        if task.every is None:
+            continue
+        schedule, _ = PeriodicTask.objects.using(using).get_or_create(
+            task=task.name, defaults={"next_run_at": now}
+        )
+        if schedule.next_run_at > now:
+            continue
+        with transaction.atomic(using=using):
+            scheduled = (
+                PeriodicTask.objects.using(using)
+                .filter(pk=schedule.pk, next_run_at=schedule.next_run_at)
+                .update(next_run_at=now + task.every)
+            )
+            if scheduled:
+                jobs.append(enqueue(task.name, using=using))
+    return jobs
+
+
+def run_pending_jobs(worker_id: str = "inline") -> int:
+    """
+    Run due jobs (and periodic tasks) in the current thread, until none is due
+
+    :return: number of jobs run
+    :rtype: int
+    """
+    return Worker(worker_id).run(burst=True)
+
+
+# -----------------------------------------------------------------------------
+# Workers
+# -----------------------------------------------------------------------------
+class Worker:
+    """
+    Job worker, runs due jobs one at a time, and waits for new ones
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        poll_interval: float | None = None,
+        stop_event: threading.Event | None = None,
+    ) -> None:
+        self.worker_id = worker_id
+        self.poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.stop_event = stop_event or threading.Event()
+        # periodic tasks are checked once per poll interval, not before each job
+        self._next_periodic_check = 0.0
+
+    def run_once(self) -> bool:
+        """Enqueue due periodic tasks, then run the next due job, return whether a job was run"""
+        if time.monotonic() >= self._next_periodic_check:
+            enqueue_periodic_tasks()
+            self._next_periodic_check = time.monotonic() + self.poll_interval
+        job = claim_job(self.worker_id)
+        if job is None:
+            return False
+        run_job(job, self.worker_id)
+        return True
+
+    def run(self, burst: bool = False) -> int:
+        """
+        Run jobs until stopped (or until no job is due, in burst mode)
+
+        :return: number of jobs run
+        :rtype: int
+        """
+        jobs = 0
+        while not self.stop_event.is_set():
+            try:
+                ran = self.run_once()
+            except Exception:
+                # e.g. the database is unavailable, or locked, retried after a poll interval
+                logger.exception("Worker %s failed to get a job", self.worker_id)
+                self.stop_event.wait(self.poll_interval)
+                continue
+            jobs += ran
+            if not ran:
+                if burst:
+                    break
+                self.stop_event.wait(self.poll_interval)
+        return jobs
+
+
+def get_worker_id(index: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def _run_worker_thread(worker: Worker, burst: bool) -> None:
+    try:
+        worker.run(burst=burst)
+    finally:
+        # connections are per thread
+        connections.close_all()
+
+
+def _run_worker_process(index: int, poll_interval: float | None, burst: bool) -> None:
+    """Worker process, stopped by SIGTERM (or SIGINT)"""
+    stop_event = threading.Event()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signal_number, lambda *_: stop_event.set())
+    _run_worker_thread(Worker(get_worker_id(index), poll_interval, stop_event), burst)
+
+
+def run_workers(
+    workers: int,
+    processes: bool = False,
+    poll_interval: float | None = None,
+    burst: bool = False,
+) -> None:
+    """
+    Run a pool of workers, in threads or processes, until SIGTERM or SIGINT
+    (or until no job is due, in burst mode)
+
+    :param workers: number of workers
+    :type workers: int
+    :param processes: run workers in processes, instead of threads
+    :type processes: bool
+    :param poll_interval: seconds between polls, when no job is due, default: JOBS_POLL_INTERVAL
+    :type poll_interval: float | None
+    :param burst: stop workers when no job is due
+    :type burst: bool
+    """
+    stop_event = threading.Event()
+    if processes:
+        # connections aren't shared with forked processes, closed connections
+        # are released to the pools (see common.db.pool), which are closed too
+        connections.close_all()
+        close_pools()
+        pool = [
+            multiprocessing.Process(
+                target=_run_worker_process, args=(index, poll_interval, burst), daemon=True
+            )
+            for index in range(workers)
+        ]
+    else:
+        pool = [
+            threading.Thread(
+                target=_run_worker_thread,
+                args=(Worker(get_worker_id(index), poll_interval, stop_event), burst),
+                name=f"jobs-worker-{index}",
+            )
+            for index in range(workers)
+        ]
+
+    def stop(*_: Any) -> None:
+        stop_event.set()
+        if processes:
+            for process in pool:
+                if process.is_alive():
+                    process.terminate()
+
+    previous_handlers = {
+        signal_number: signal.signal(signal_number, stop)
+        for signal_number in (signal.SIGTERM, signal.SIGINT)
+    }
+    try:
+        for worker in pool:
+            worker.start()
+        for worker in pool:
+            worker.join()
+    finally:
+        for signal_number, handler in previous_handlers.items():
+            signal.signal(signal_number, handler)
@@ -0,0 +1,193 @@
+"""
+Background tasks registry.
+
+Tasks are functions registered with the `task` decorator, in the `tasks`
+module of their app (imported when the jobs app is ready), and run by
+workers (`manage.py run_workers`, see jobs.runner) when they're enqueued as
+jobs, or periodically (`every`). Arguments of enqueued tasks must be JSON
+serializable.
+
+    from jobs.tasks import enqueue, task
+
+    @task(max_attempts=5, every=timedelta(hours=1))
+    def refresh_rollups(month: str | None = None) -> None:
+        ...
+
+    enqueue(refresh_rollups, kwargs={"month": "2026-10"})
+
+Jobs are rows of the default database: enqueued in a transaction, they're
+run only if (and once) it's committed.
+
+Classes:
+--------
+
+    - Task
+
+Functions:
+----------
+
+    - task(name: str | None = None, **options) -> Callable
+    - get_task(name: str) -> Task
+    - get_tasks() -> Dict[str, Task]
+    - enqueue(task: str | Callable, args: Sequence = (), kwargs: Dict | None = None, priority: int | None = None, run_at: datetime | None = None, using: str | None = None) -> Job
+    - delete_finished_jobs() -> int
+    - send_queued_emails() -> int
+
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import *
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import Job
+
+
+@dataclass(frozen=True)
+class Task:
+    """A registered task, and its options"""
+
+    name: str
+    function: Callable[..., Any]
+    # jobs with higher priorities run first
+    priority: int = 0
+    # default: JOBS_MAX_ATTEMPTS
+    max_attempts: int | None = None
+    # delay of the first retry, doubled for each retry, default: JOBS_RETRY_DELAY
+    retry_delay: timedelta | None = None
+    # how long a worker may run the task before it's run again, default: JOBS_LEASE
+    lease: timedelta | None = None
+    # enqueued periodically, if set
+    every: timedelta | None = None
+
+    def get_max_attempts(self) -> int:
+        return self.max_attempts or settings.JOBS_MAX_ATTEMPTS
+
+    def get_retry_delay(self, attempts: int) -> timedelta:
+        """Delay before retrying a job that failed `attempts` times"""
+        delay = self.retry_delay or timedelta(seconds=settings.JOBS_RETRY_DELAY)
+        return delay * 2 ** (attempts - 1)
+
+    def get_lease(self) -> timedelta:
+        return self.lease or timedelta(seconds=settings.JOBS_LEASE)
+
+
+_tasks: Dict[str, Task] = {}
+
+
+def task(
+    name: str | None = None,
+    *,
+    priority: int = 0,
+    max_attempts: int | None = None,
+    retry_delay: timedelta | None = None,
+    lease: timedelta | None = None,
+    every: timedelta | None = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Register a function as a background task
+
+    :param name: task name, default: the function's module and name
+    :type name: str | None
+    :return: decorator, registering the function (returned as is)
+    :rtype: Callable
+    """
+
+    def register(function: Callable[..., Any]) -> Callable[..., Any]:
+        task_name = name or f"{function.__module__}.{function.__qualname__}"
+        registered = _tasks.get(task_name)
+        if registered is not None and registered.function.__qualname__ != function.__qualname__:
+            raise ImproperlyConfigured(f"Task '{task_name}' is already registered.")
+        _tasks[task_name] = Task(
+            name=task_name,
+            function=function,
+            priority=priority,
+            max_attempts=max_attempts,
+            retry_delay=retry_delay,
+            lease=lease,
+            every=every,
+        )
+        function.task_name = task_name
+        return function
+
+    return register
+
+
+def get_task(name: str) -> Task:
+    """Get a registered task, raise LookupError if it's not registered"""
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f"Task '{name}' is not registered.") from None
+
+
+def get_tasks() -> Dict[str, Task]:
+    return dict(_tasks)
+
+
+def enqueue(
+    task: str | Callable[..., Any],
+    args: Sequence[Any] = (),
+    kwargs: Dict[str, Any] | None = None,
+    *,
+    priority: int | None = None,
+    run_at: datetime | None = None,
+    using: str | None = None,
+) -> Job:
+    """
+    Enqueue a job, a call of a registered task
+
+    :param task: task, or task name
+    :type task: str | Callable
+    :param args: positional arguments (JSON serializable)
+    :type args: Sequence
+    :param kwargs: keyword arguments (JSON serializable)
+    :type kwargs: Dict | None
+    :param priority: job priority, default: the task's
+    :type priority: int | None
+    :param run_at: when the job is due, default: now
+    :type run_at: datetime | None
+    :param using: database alias, default: the jobs' database
+    :type using: str | None
+    :return: pending job
+    :rtype: Job
+    """
+    registered = get_task(task if isinstance(task, str) else getattr(task, "task_name", ""))
+    return Job.objects.using(using).create(
+        task=registered.name,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=registered.priority if priority is None else priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=registered.get_max_attempts(),
+    )
+
+
+@task(name="jobs.delete_finished_jobs", every=timedelta(days=1))
+def delete_finished_jobs() -> int:
+    """
+    Delete jobs finished more than `JOBS_RETENTION_DAYS` days ago
+
+    :return: number of deleted jobs
+    :rtype: int
+    """
+    finished_before = timezone.now() - timedelta(days=settings.JOBS_RETENTION_DAYS)
+    deleted, _ = Job.objects.filter(finished__lt=finished_before).delete()
+    return deleted
+
+
+@task(name="jobs.send_queued_emails", priority=10, every=timedelta(minutes=10))
+def send_queued_emails() -> int:
+    """
+    Send queued emails (see jobs.mail), enqueued when emails are queued, and
+    periodically, for emails of lost batches
+
+    :return: number of sent emails
+    :rtype: int
+    """
+    from .mail import send_queued_emails
+
+    return send_queued_emails()
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from io import StringIO
+from typing import *
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job, PeriodicTask
+from common.db.pool import close_pools, get_pool
+from jobs.runner import claim_job, enqueue_periodic_tasks, run_job, run_pending_jobs, run_workers
+from jobs.tasks import delete_finished_jobs, enqueue, get_task, get_tasks, task
+
+# calls of the test tasks
+CALLS: Final[List[Any]] = []
+
+
+@task(name="jobs.tests.record")
+def record(value: Any) -> None:
+    CALLS.append(value)
+
+
+@task(name="jobs.tests.fail", max_attempts=3, retry_delay=timedelta(seconds=10))
+def fail() -> None:
+    raise ValueError("failed")
+
+
+@task(name="jobs.tests.periodic", every=timedelta(minutes=5))
+def periodic() -> None:
+    CALLS.append("periodic")
+
+
+def postpone_periodic_tasks() -> None:
+    """Schedule periodic tasks tomorrow, so that workers run enqueued jobs only"""
+    PeriodicTask.objects.bulk_create(
+        PeriodicTask(task=name, next_run_at=timezone.now() + timedelta(days=1))
+        for name, registered in get_tasks().items()
+        if registered.every is not None
+    )
+
+
+class TestJobs(TestCase):
+    def setUp(self) -> None:
+        CALLS.clear()
+        postpone_periodic_tasks()
+        return super().setUp()
+
+    def test_jobs_run_by_priority_then_age(self):
+        enqueue(record, ["low"])
+        enqueue(record, ["high"], priority=10)
+        enqueue("jobs.tests.record", ["low_later"])
+        enqueue(record, ["delayed"], priority=20, run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(run_pending_jobs(), 3)
+
+        self.assertEqual(CALLS, ["high", "low", "low_later"])
+        self.assertEqual(Job.objects.filter(status=Job.Status.SUCCEEDED).count(), 3)
+        self.assertEqual(Job.objects.get(status=Job.Status.PENDING).args, ["delayed"])
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        job = enqueue(fail)
+        self.assertEqual(job.max_attempts, 3)
+
+        for attempt, delay in ((1, 10), (2, 20)):
+            now = timezone.now()
+            self.assertFalse(run_job(claim_job("worker"), "worker"))
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.Status.PENDING)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn("ValueError: failed", job.last_error)
+            self.assertAlmostEqual((job.run_at - now).total_seconds(), delay, delta=1)
+            # not due before its retry
+            self.assertIsNone(claim_job("worker"))
+            Job.objects.filter(pk=job.pk).update(run_at=now)
+
+        run_job(claim_job("worker"), "worker")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNotNone(job.finished)
+
+    def test_unregistered_tasks_fail(self):
+        job = Job.objects.create(task="jobs.tests.unregistered")
+
+        run_pending_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn("LookupError", job.last_error)
+
+    def test_leased_jobs_are_claimed_once(self):
+        job = enqueue(record, ["once"])
+
+        claimed = claim_job("first_worker")
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        self.assertEqual(claimed.locked_by, "first_worker")
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim_job("second_worker"))
+
+    def test_expired_leases_are_claimed_again(self):
+        enqueue(record, ["again"])
+        lost = claim_job("lost_worker")
+        lease = get_task("jobs.tests.record").get_lease()
+
+        self.assertIsNone(claim_job("worker", now=timezone.now() + lease / 2))
+        claimed = claim_job("worker", now=timezone.now() + lease * 2)
+        self.assertEqual(claimed.pk, lost.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+        # the lost worker's results are ignored
+        run_job(lost, "lost_worker")
+        self.assertEqual(Job.objects.get().status, Job.Status.RUNNING)
+        run_job(claimed, "worker")
+        self.assertEqual(Job.objects.get().status, Job.Status.SUCCEEDED)
+        self.assertEqual(CALLS, ["again", "again"])
+
+    def test_periodic_tasks_are_enqueued_once_per_period(self):
+        PeriodicTask.objects.all().delete()
+        now = timezone.now()
+
+        jobs = [job for job in enqueue_periodic_tasks(now) if job.task == "jobs.tests.periodic"]
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(
+            PeriodicTask.objects.get(task="jobs.tests.periodic").next_run_at, now + timedelta(minutes=5)
+        )
+        jobs = enqueue_periodic_tasks(now + timedelta(minutes=1))
+        self.assertNotIn("jobs.tests.periodic", [job.task for job in jobs])
+
+        jobs = enqueue_periodic_tasks(now + timedelta(minutes=5))
+        self.assertIn("jobs.tests.periodic", [job.task for job in jobs])
+
+    @override_settings(JOBS_RETENTION_DAYS=7)
+    def test_finished_jobs_are_deleted(self):
+        old = timezone.now() - timedelta(days=8)
+        enqueue(record, [1])
+        Job.objects.create(task="jobs.tests.record", status=Job.Status.SUCCEEDED, finished=old)
+        Job.objects.create(task="jobs.tests.record", status=Job.Status.FAILED, finished=old)
+        Job.objects.create(task="jobs.tests.record", status=Job.Status.SUCCEEDED, finished=timezone.now())
+
+        self.assertEqual(delete_finished_jobs(), 2)
+        self.assertEqual(Job.objects.count(), 2)
+
+
+class TestRunWorkers(TransactionTestCase):
+    def setUp(self) -> None:
+        CALLS.clear()
+        postpone_periodic_tasks()
+        return super().setUp()
+
+    def test_workers_run_each_job_once(self):
+        for value in range(20):
+            enqueue(record, [value])
+
+        stdout = StringIO()
+        call_command("run_workers", "--workers", "2", "--poll-interval", "0.01", "--burst", stdout=stdout)
+
+        self.assertIn("Running 2 job workers (threads)", stdout.getvalue())
+        self.assertEqual(sorted(CALLS), list(range(20)))
+        self.assertEqual(
+            Job.objects.filter(task="jobs.tests.record", status=Job.Status.SUCCEEDED).count(), 20
+        )
+
+    @override_settings(DATABASE_POOL_SIZE=2)
+    def test_pooled_connections_are_closed_before_forking_workers(self):
+        self.addCleanup(close_pools)
+        pooled_connection = mock.Mock()
+        get_pool("default").put(pooled_connection)
+        closed_on_start = []
+
+        with mock.patch("jobs.runner.multiprocessing.Process") as process:
+            process.return_value.start.side_effect = lambda: closed_on_start.append(
+                pooled_connection.close.called
+            )
+            run_workers(2, processes=True, burst=True)
+
+        self.assertEqual(closed_on_start, [True, True])
+        self.assertEqual(len(get_pool("default")), 0)
@@ -0,0 +1,146 @@
+import tempfile
+from pathlib import Path
+from smtplib import SMTPRecipientsRefused
+from test.pages.common import PasswordReset
+from test.utils.helpers import create_member
+from typing import *
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMessage, get_connection, send_mass_mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import mail as mail_module
+from jobs.mail import SEND_TASK, send_queued_emails
+from jobs.models import Job, QueuedEmail
+from jobs.runner import run_pending_jobs
+
+SENDER: Final[str] = "sia@example.com"
+
+
+def create_messages(count: int) -> List[Tuple[str, str, str, List[str]]]:
+    return [
+        (f"subject {index}", f"body {index}", SENDER, [f"member_{index}@example.com"])
+        for index in range(count)
+    ]
+
+
+@override_settings(
+    EMAIL_BACKEND="jobs.mail.QueuedEmailBackend",
+    EMAIL_QUEUE_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class TestQueuedEmails(TestCase):
+    def test_emails_are_queued(self):
+        self.assertEqual(send_mass_mail(create_messages(3)), 3)
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.Status.PENDING).count(), 3)
+        self.assertTrue(Job.objects.filter(task=SEND_TASK, status=Job.Status.PENDING).exists())
+
+    def test_queued_emails_are_sent_over_one_connection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                EMAIL_QUEUE_BACKEND="django.core.mail.backends.filebased.EmailBackend",
+                EMAIL_FILE_PATH=directory,
+            ):
+                send_mass_mail(create_messages(3))
+                self.assertEqual(list(Path(directory).iterdir()), [])
+
+                run_pending_jobs()
+
+                files = list(Path(directory).iterdir())
+                self.assertEqual(len(files), 1)
+                content = files[0].read_text()
+
+        for subject, body, _, recipients in create_messages(3):
+            self.assertIn(f"Subject: {subject}", content)
+            self.assertIn(body, content)
+            self.assertIn(f"To: {recipients[0]}", content)
+        self.assertFalse(QueuedEmail.objects.exclude(status=QueuedEmail.Status.SENT).exists())
+
+    def test_emails_are_sent_in_batches(self):
+        send_mass_mail(create_messages(5))
+
+        with mock.patch.object(mail_module, "get_connection", wraps=get_connection) as connect:
+            self.assertEqual(send_queued_emails(batch_size=2), 5)
+
+        self.assertEqual(connect.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].message()["Subject"], "subject 0")
+
+    @override_settings(EMAIL_QUEUE_BACKEND="django.core.mail.backends.smtp.EmailBackend")
+    def test_emails_are_sent_over_one_smtp_connection(self):
+        send_mass_mail(create_messages(3))
+        EmailMessage("Température", "Relevé ✓", SENDER, ["member@example.com"]).send()
+        queued = bytes(QueuedEmail.objects.last().message)
+
+        with mock.patch("smtplib.SMTP") as smtp:
+            self.assertEqual(send_queued_emails(), 4)
+
+        smtp.assert_called_once()
+        sendmail = smtp.return_value.sendmail
+        self.assertEqual(sendmail.call_count, 4)
+        sender, recipients, message = sendmail.call_args.args
+        self.assertEqual((sender, recipients), (SENDER, ["member@example.com"]))
+        self.assertEqual(message.replace(b"\r\n", b"\n"), queued)
+
+    def test_bcc_recipients_are_kept(self):
+        EmailMessage("subject", "body", SENDER, ["to@example.com"], bcc=["bcc@example.com"]).send()
+
+        send_queued_emails()
+
+        self.assertEqual(mail.outbox[0].recipients(), ["to@example.com", "bcc@example.com"])
+        self.assertIsNone(mail.outbox[0].message()["Bcc"])
+
+    def test_failed_deliveries_are_retried(self):
+        send_mass_mail(create_messages(2))
+        refused = SMTPRecipientsRefused({"member_0@example.com": (550, b"refused")})
+
+        with mock.patch.object(LocmemEmailBackend, "send_messages", side_effect=[refused, 1]):
+            self.assertEqual(send_queued_emails(), 1)
+
+        failed = QueuedEmail.objects.get(status=QueuedEmail.Status.PENDING)
+        self.assertEqual(failed.recipients, ["member_0@example.com"])
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("SMTPRecipientsRefused", failed.last_error)
+        self.assertGreater(failed.send_after, timezone.now())
+        # retried when it's due
+        self.assertTrue(Job.objects.filter(task=SEND_TASK, run_at=failed.send_after).exists())
+        self.assertEqual(send_queued_emails(), 0)
+
+        QueuedEmail.objects.filter(pk=failed.pk).update(send_after=timezone.now())
+        self.assertEqual(send_queued_emails(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(JOBS_MAX_ATTEMPTS=1)
+    def test_failed_deliveries_without_attempts_left_fail(self):
+        send_mass_mail(create_messages(1))
+
+        with mock.patch.object(LocmemEmailBackend, "send_messages", side_effect=OSError("unreachable")):
+            self.assertEqual(send_queued_emails(), 0)
+
+        self.assertEqual(QueuedEmail.objects.get().status, QueuedEmail.Status.FAILED)
+
+    def test_connection_failure_releases_the_batch(self):
+        send_mass_mail(create_messages(2))
+
+        with mock.patch.object(LocmemEmailBackend, "open", side_effect=OSError("unreachable"), create=True):
+            with self.assertRaises(OSError):
+                send_queued_emails()
+
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.Status.PENDING).count(), 2)
+        self.assertEqual(mail.outbox, [])
+
+    def test_password_reset_email_is_queued(self):
+        create_member(username="member", password="password", email="member@example.com")
+
+        response = self.client.post(PasswordReset.get_url(), data=dict(email="member@example.com"))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        run_pending_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].recipients(), ["member@example.com"])
+        self.assertIn("/accounts/password_reset/confirm/", mail.outbox[0].message().get_payload())
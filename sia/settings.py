@@ -75,6 +75,9 @@ INSTALLED_APPS = [
     # api
     "api.apps.ApiConfig",
     
+    # background jobs
+    "jobs.apps.JobsConfig",
+    
     # django rest framework
     "rest_framework",
     
@@ -84,10 +87,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "common.middleware.LoadSheddingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "common.middleware.ReadReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 
@@ -114,10 +119,33 @@ TEMPLATES = [
             "debug": True,
         },
     },
+    {
+        # hot pages, selected by JINJA2_VIEWS (see common.templating)
+        "BACKEND": "django.template.backends.jinja2.Jinja2",
+        "NAME": "jinja2",
+        "APP_DIRS": True,
+        "DIRS": [
+            BASE_DIR / "common/jinja2",
+        ],
+        "OPTIONS": {
+            "environment": "common.templating.environment",
+        },
+    },
 ]
 
-# email settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# views rendered with their Jinja2 templates (view class names), e.g.
+# DeviceListView,DeviceDataListView,DeviceDataHistoryView
+JINJA2_VIEWS = env.list("JINJA2_VIEWS", default=[])
+
+# compile all templates when workers boot (see common.warmup)
+TEMPLATES_WARMUP = env.bool("TEMPLATES_WARMUP", default=False)
+
+# email settings, with EMAIL_BACKEND="jobs.mail.QueuedEmailBackend" (the default
+# of sia.settings_production), emails are queued and sent by background jobs, in
+# batches of emails over one connection of EMAIL_QUEUE_BACKEND (see jobs.mail)
+EMAIL_BACKEND = env("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+EMAIL_QUEUE_BACKEND = env("EMAIL_QUEUE_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+EMAIL_QUEUE_BATCH_SIZE = env.int("EMAIL_QUEUE_BATCH_SIZE", default=100)
 EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
 
 WSGI_APPLICATION = "sia.wsgi.application"
@@ -128,11 +156,65 @@ WSGI_APPLICATION = "sia.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "common.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
 
+# separate database for high volume telemetry (device data), see common.routers
+TELEMETRY_DATABASE_URL = env("TELEMETRY_DATABASE_URL", default=None)
+if TELEMETRY_DATABASE_URL:
+    DATABASES["telemetry"] = env.db_url_config(TELEMETRY_DATABASE_URL)
+
+# read-only replicas of the databases (PostgreSQL standbys, or SQLite snapshots),
+# used by read-only views, aliases by primary alias (see common.routers)
+DATABASE_REPLICAS = {}
+for _primary, _replica_urls in (
+    ("default", env.list("DATABASE_REPLICA_URLS", default=[])),
+    ("telemetry", env.list("TELEMETRY_DATABASE_REPLICA_URLS", default=[])),
+):
+    if _primary not in DATABASES:
+        continue
+    for _index, _replica_url in enumerate(_replica_urls):
+        _alias = f"{_primary}_replica_{_index}"
+        DATABASES[_alias] = env.db_url_config(_replica_url)
+        DATABASES[_alias]["TEST"] = {"MIRROR": _primary}
+        DATABASE_REPLICAS.setdefault(_primary, []).append(_alias)
+
+# connection management of all databases (see common.db): persistent connections
+# (seconds, 0 closes connections at the end of each request), health checks of
+# reused connections, and an in-process pool of idle connections (size, 0
+# disables it) shared by the threads of a worker
+DATABASE_CONN_MAX_AGE = env.int("DATABASE_CONN_MAX_AGE", default=0)
+DATABASE_CONN_HEALTH_CHECKS = env.bool("DATABASE_CONN_HEALTH_CHECKS", default=False)
+DATABASE_POOL_SIZE = env.int("DATABASE_POOL_SIZE", default=0)
+DATABASE_POOL_MAX_IDLE = env.float("DATABASE_POOL_MAX_IDLE", default=300.0)
+
+# pragmas of new SQLite connections, e.g. journal_mode=WAL,synchronous=NORMAL
+SQLITE_PRAGMAS = env.dict("SQLITE_PRAGMAS", default={})
+
+# database backends with connection management
+DATABASE_ENGINES = {
+    "django.db.backends.sqlite3": "common.db.backends.sqlite3",
+    "django.db.backends.postgresql": "common.db.backends.postgresql",
+}
+for _database in DATABASES.values():
+    _database["ENGINE"] = DATABASE_ENGINES.get(_database["ENGINE"], _database["ENGINE"])
+    _database.setdefault("CONN_MAX_AGE", DATABASE_CONN_MAX_AGE)
+    _database.setdefault("CONN_HEALTH_CHECKS", DATABASE_CONN_HEALTH_CHECKS)
+    if _database["ENGINE"] == "common.db.backends.sqlite3":
+        # in-memory test databases, django's default for its SQLite engine
+        _database.setdefault("TEST", {}).setdefault("NAME", ":memory:")
+
+# members read from the primaries for this many seconds after a write, to see
+# their own changes before they reach the replicas
+DATABASE_REPLICA_STICKY_SECONDS = env.int("DATABASE_REPLICA_STICKY_SECONDS", default=15)
+
+DATABASE_ROUTERS = ["common.routers.TelemetryRouter"]
+
+# models stored in the telemetry database (app_label.model_name)
+TELEMETRY_MODELS = ["devices.devicedata"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -188,8 +270,91 @@ LOGIN_REDIRECT_URL = "/"
 PAGINATION_SIZE = 10
 MOST_RECENT_SIZE = 5
 
+# device data message limits
+DEVICE_MESSAGE_MAX_BYTES = env.int("DEVICE_MESSAGE_MAX_BYTES", default=4096)
+DEVICE_MESSAGE_MAX_DEPTH = env.int("DEVICE_MESSAGE_MAX_DEPTH", default=8)
+DEVICE_MESSAGE_MAX_KEYS = env.int("DEVICE_MESSAGE_MAX_KEYS", default=256)
+
 REST_FRAMEWORK = {
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     # 'PAGE_SIZE': 1,
-}
\ No newline at end of file
+    "DEFAULT_THROTTLE_RATES": {
+        # device data ingestion, per device and per member (all devices)
+        "device_ingest": env("API_DEVICE_INGEST_RATE", default="60/min"),
+        "member_ingest": env("API_MEMBER_INGEST_RATE", default="600/min"),
+    },
+}
+
+# route native async variants of the device and device data API views, for
+# ASGI deployments (see api.v1.async_views)
+API_ASYNC_VIEWS = env.bool("API_ASYNC_VIEWS", default=False)
+
+# cache alias used to share API throttling state between workers,
+# throttling state is kept in-process when not set
+API_THROTTLE_CACHE = env("API_THROTTLE_CACHE", default=None)
+
+# search bar typeahead, in-memory indexes of members' devices and groups names
+# (see devices.typeahead), rebuilt after TYPEAHEAD_MAX_AGE seconds (never if 0),
+# shared invalidations between workers through this cache alias, in-process
+# when not set
+TYPEAHEAD_RESULTS = env.int("TYPEAHEAD_RESULTS", default=10)
+TYPEAHEAD_MAX_MEMBERS = env.int("TYPEAHEAD_MAX_MEMBERS", default=1000)
+TYPEAHEAD_MAX_AGE = env.float("TYPEAHEAD_MAX_AGE", default=60.0)
+TYPEAHEAD_CACHE = env("TYPEAHEAD_CACHE", default=None)
+
+# load shedding, low priority views are rejected (503) while the database
+# or the view is slower than these thresholds (see common.middleware)
+LOAD_SHEDDING_ENABLED = env.bool("LOAD_SHEDDING_ENABLED", default=True)
+LOAD_SHEDDING_WINDOW = env.float("LOAD_SHEDDING_WINDOW", default=10.0)
+LOAD_SHEDDING_MIN_SAMPLES = env.int("LOAD_SHEDDING_MIN_SAMPLES", default=10)
+LOAD_SHEDDING_DB_LATENCY = env.float("LOAD_SHEDDING_DB_LATENCY", default=0.5)
+LOAD_SHEDDING_REQUEST_LATENCY = env.float("LOAD_SHEDDING_REQUEST_LATENCY", default=2.0)
+LOAD_SHEDDING_RETRY_AFTER = env.int("LOAD_SHEDDING_RETRY_AFTER", default=10)
+
+# device data partitions (PostgreSQL) and retention, see devices.partitions
+DEVICE_DATA_PARTITIONS_AHEAD = env.int("DEVICE_DATA_PARTITIONS_AHEAD", default=2)
+DEVICE_DATA_RETENTION_MONTHS = env.int("DEVICE_DATA_RETENTION_MONTHS", default=0)
+
+# data of deleted devices is purged after their deletion, in batches of rows,
+# pausing between batches (seconds), by a background job, or only by
+# `manage.py purge_device_data` when disabled (see devices.purge)
+DEVICE_DATA_PURGE_BATCH_SIZE = env.int("DEVICE_DATA_PURGE_BATCH_SIZE", default=1000)
+DEVICE_DATA_PURGE_BATCH_PAUSE = env.float("DEVICE_DATA_PURGE_BATCH_PAUSE", default=0.01)
+DEVICE_DATA_PURGE_IN_BACKGROUND = env.bool("DEVICE_DATA_PURGE_IN_BACKGROUND", default=True)
+
+# device heartbeats (see devices.heartbeats): devices are offline after they're
+# silent for longer than their expected interval (seconds, default for devices
+# without one), heartbeats are kept in memory and flushed every flush interval
+# (seconds, 0 flushes each report), and offline devices swept periodically
+DEVICE_HEARTBEAT_INTERVAL = env.int("DEVICE_HEARTBEAT_INTERVAL", default=300)
+DEVICE_HEARTBEAT_FLUSH_INTERVAL = env.float("DEVICE_HEARTBEAT_FLUSH_INTERVAL", default=10.0)
+DEVICE_HEARTBEAT_SWEEP_INTERVAL = env.int("DEVICE_HEARTBEAT_SWEEP_INTERVAL", default=60)
+
+# device commands (see devices.commands): seconds a device's long-poll request
+# is held while it has no command (at most, devices may ask for less), and max
+# commands delivered per response, or acknowledged per request
+DEVICE_COMMANDS_POLL_TIMEOUT = env.int("DEVICE_COMMANDS_POLL_TIMEOUT", default=30)
+DEVICE_COMMANDS_BATCH_SIZE = env.int("DEVICE_COMMANDS_BATCH_SIZE", default=100)
+
+# device rules are evaluated in memory (see devices.rules), each process checks
+# for changes to rules made by other processes every refresh interval (seconds)
+DEVICE_RULES_REFRESH_INTERVAL = env.float("DEVICE_RULES_REFRESH_INTERVAL", default=10.0)
+
+# device schedules, run by `manage.py run_scheduler` (see devices.schedules):
+# seconds between loads of schedules changed since the last load, and seconds
+# a run may be late (e.g. the scheduler was stopped) before it's skipped
+DEVICE_SCHEDULES_REFRESH_INTERVAL = env.float("DEVICE_SCHEDULES_REFRESH_INTERVAL", default=10.0)
+DEVICE_SCHEDULES_MISFIRE_GRACE = env.int("DEVICE_SCHEDULES_MISFIRE_GRACE", default=300)
+
+# background jobs, run by `manage.py run_workers` (see jobs.runner): workers
+# per command, seconds between polls of an idle worker, seconds a job may run
+# before it's run again by another worker, attempts per job, and seconds
+# before the first retry of a failed job (doubled for each retry), and days
+# finished jobs are kept
+JOBS_WORKERS = env.int("JOBS_WORKERS", default=2)
+JOBS_POLL_INTERVAL = env.float("JOBS_POLL_INTERVAL", default=1.0)
+JOBS_LEASE = env.int("JOBS_LEASE", default=300)
+JOBS_MAX_ATTEMPTS = env.int("JOBS_MAX_ATTEMPTS", default=3)
+JOBS_RETRY_DELAY = env.float("JOBS_RETRY_DELAY", default=10.0)
+JOBS_RETENTION_DAYS = env.int("JOBS_RETENTION_DAYS", default=7)
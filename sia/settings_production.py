@@ -0,0 +1,71 @@
+"""
+Production settings profile for sia project.
+
+Development settings (sia.settings), without the development tools: their
+apps are neither imported at startup nor checked, the debug toolbar
+middleware isn't in the request path, and templates don't keep debug
+information, are cached once compiled, and compiled at worker boot.
+Select it in production deployments:
+
+    DJANGO_SETTINGS_MODULE=sia.settings_production
+
+Startup (import) time and per-request middleware overhead of this profile
+are measured by benchmarks.bench_startup, and kept within a budget by
+tests (api/v1/tests/test_api_startup_budget.py).
+"""
+
+from sia.settings import *  # noqa: F401,F403
+
+
+# apps used only in development (shell_plus, debug toolbar, ...), or not
+# used at all (filters and tastypie resources)
+DEVELOPMENT_APPS = [
+    "django_extensions",
+    "django_filters",
+    "environ",
+    "debug_toolbar",
+    "tastypie",
+]
+
+DEVELOPMENT_MIDDLEWARE = [
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+]
+
+DEBUG = False
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEVELOPMENT_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE if middleware not in DEVELOPMENT_MIDDLEWARE
+]
+
+# compiled templates are cached (by the cached loader), and compiled when
+# workers boot (see common.warmup)
+TEMPLATES = [dict(template, OPTIONS=dict(template["OPTIONS"])) for template in TEMPLATES]
+for _template in TEMPLATES:
+    if _template["BACKEND"] != "django.template.backends.django.DjangoTemplates":
+        continue
+    # replaced by the app directories loader
+    _template["APP_DIRS"] = False
+    _template["OPTIONS"].update(
+        context_processors=[
+            processor
+            for processor in _template["OPTIONS"]["context_processors"]
+            if processor != "django.template.context_processors.debug"
+        ],
+        debug=False,
+        loaders=[
+            (
+                "django.template.loaders.cached.Loader",
+                [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ],
+            ),
+        ],
+    )
+
+TEMPLATES_WARMUP = env.bool("TEMPLATES_WARMUP", default=True)
+
+# emails are queued, and sent by the job workers (`manage.py run_workers`)
+EMAIL_BACKEND = env("EMAIL_BACKEND", default="jobs.mail.QueuedEmailBackend")
@@ -15,6 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
@@ -47,7 +48,8 @@ urlpatterns = [
     
     # homepage
     path("", dashboard_views.DashboardView.as_view(), name="homepage"),
-    
-    # debug toolbar 
-    path('__debug__/', include('debug_toolbar.urls')),
 ]
+
+# debug toolbar, not installed in production (see sia.settings_production)
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path('__debug__/', include('debug_toolbar.urls')))